@@ -3,11 +3,16 @@ Gemini AI Actions - Integración con Google Gemini para análisis inteligente
 """
 import json
 import logging
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Iterator
 import requests
 from datetime import datetime
 import re
 import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
 
 # CORRECCIÓN: Se elimina la importación global para evitar el ciclo.
 # El Resolver se importará localmente dentro de las funciones que lo necesiten.
@@ -43,48 +48,128 @@ logger = logging.getLogger(__name__)
 # CONFIGURACIÓN Y CONSTANTES
 # ============================================================================
 
-# URL de la API correcta para Gemini
-GEMINI_API_BASE = "https://generativelanguage.googleapis.com/v1"
+# URL de la API correcta para Gemini (GEMINI_API_URL permite apuntar a un endpoint local/falso en pruebas)
+GEMINI_API_BASE = (getattr(settings, "GEMINI_API_URL", "") or "https://generativelanguage.googleapis.com/v1").split("/models/")[0].rstrip("/")
 GEMINI_MODEL = getattr(settings, "GEMINI_MODEL", "gemini-1.5-flash")  # Permite override desde settings
 
-def _get_gemini_url():
+# Caché de respuestas direccionada por contenido (modelo + payload completo)
+GEMINI_CACHE_TTL = int(getattr(settings, "GEMINI_CACHE_TTL", 600))
+GEMINI_CACHE_MAX_ENTRIES = int(getattr(settings, "GEMINI_CACHE_MAX_ENTRIES", 512))
+_gemini_cache: "OrderedDict[str, tuple]" = OrderedDict()
+_gemini_inflight: Dict[str, Future] = {}
+_gemini_cache_lock = threading.Lock()
+
+def _get_gemini_url(method: str = "generateContent"):
     """Construye la URL correcta para Gemini API"""
     api_key = settings.GEMINI_API_KEY
     if not api_key:
         raise ValueError("GEMINI_API_KEY no configurado")
     
-    # Usar v1 en lugar de v1beta
-    return f"{GEMINI_API_BASE}/models/{GEMINI_MODEL}:generateContent?key={api_key}"
-
-def _make_gemini_request(prompt: str, system_instruction: Optional[str] = None) -> Dict[str, Any]:
-    """Realiza una solicitud a Gemini API con manejo de errores mejorado"""
+    # Usar v1 en lugar de v1beta; streamGenerateContent con alt=sse emite eventos SSE
+    if method == "streamGenerateContent":
+        return f"{GEMINI_API_BASE}/models/{GEMINI_MODEL}:streamGenerateContent?alt=sse&key={api_key}"
+    return f"{GEMINI_API_BASE}/models/{GEMINI_MODEL}:{method}?key={api_key}"
+
+def _gemini_cache_key(payload: Dict[str, Any]) -> str:
+    raw = json.dumps({"model": GEMINI_MODEL, "payload": payload}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def _get_cached_gemini_response(key: str) -> Optional[Dict[str, Any]]:
+    with _gemini_cache_lock:
+        entry = _gemini_cache.get(key)
+        if not entry:
+            return None
+        expires_at, response = entry
+        if expires_at < time.time():
+            del _gemini_cache[key]
+            return None
+        _gemini_cache.move_to_end(key)
+        return response
+
+def _store_gemini_response(key: str, response: Dict[str, Any]) -> None:
+    with _gemini_cache_lock:
+        _gemini_cache[key] = (time.time() + GEMINI_CACHE_TTL, response)
+        _gemini_cache.move_to_end(key)
+        while len(_gemini_cache) > GEMINI_CACHE_MAX_ENTRIES:
+            _gemini_cache.popitem(last=False)
+
+def clear_gemini_cache() -> None:
+    """Vacía la caché de respuestas de Gemini."""
+    with _gemini_cache_lock:
+        _gemini_cache.clear()
+
+def _make_gemini_request(prompt: str, system_instruction: Optional[str] = None, use_cache: bool = True) -> Dict[str, Any]:
+    """
+    Realiza una solicitud a Gemini API con manejo de errores mejorado.
+    
+    Las respuestas exitosas se cachean por contenido (modelo + prompt + configuración)
+    durante GEMINI_CACHE_TTL segundos, y las llamadas concurrentes con el mismo
+    contenido comparten una única petición en vuelo.
+    """
+    payload = _build_gemini_payload(prompt, system_instruction)
+    if not use_cache or GEMINI_CACHE_TTL <= 0:
+        return _send_gemini_request(payload)
+    
+    key = _gemini_cache_key(payload)
+    cached = _get_cached_gemini_response(key)
+    if cached is not None:
+        return {**cached, "cached": True}
+    
+    with _gemini_cache_lock:
+        inflight = _gemini_inflight.get(key)
+        owner = inflight is None
+        if owner:
+            inflight = Future()
+            _gemini_inflight[key] = inflight
+    
+    if not owner:
+        # Otra petición idéntica ya está en curso: se espera su resultado
+        return {**inflight.result(), "deduplicated": True}
+    
     try:
-        url = _get_gemini_url()
-        
-        # Construir el payload según la documentación de Gemini
-        payload = {
-            "contents": [
-                {
-                    "parts": [
-                        {"text": prompt}
-                    ]
-                }
-            ],
-            "generationConfig": {
-                "temperature": 0.7,
-                "topK": 40,
-                "topP": 0.95,
-                "maxOutputTokens": 8192,
-            }
-        }
-        
-        # Agregar system instruction si existe
-        if system_instruction:
-            payload["systemInstruction"] = {
+        response = _send_gemini_request(payload)
+        if response.get("success"):
+            _store_gemini_response(key, response)
+        inflight.set_result(response)
+        return response
+    except BaseException as e:
+        inflight.set_result({"success": False, "error": str(e)})
+        raise
+    finally:
+        with _gemini_cache_lock:
+            _gemini_inflight.pop(key, None)
+
+def _build_gemini_payload(prompt: str, system_instruction: Optional[str] = None) -> Dict[str, Any]:
+    """Construye el payload según la documentación de Gemini"""
+    payload = {
+        "contents": [
+            {
                 "parts": [
-                    {"text": system_instruction}
+                    {"text": prompt}
                 ]
             }
+        ],
+        "generationConfig": {
+            "temperature": 0.7,
+            "topK": 40,
+            "topP": 0.95,
+            "maxOutputTokens": 8192,
+        }
+    }
+    
+    # Agregar system instruction si existe
+    if system_instruction:
+        payload["systemInstruction"] = {
+            "parts": [
+                {"text": system_instruction}
+            ]
+        }
+    return payload
+
+def _send_gemini_request(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Envía el payload a Gemini API y normaliza la respuesta"""
+    try:
+        url = _get_gemini_url()
         
         headers = {
             "Content-Type": "application/json"
@@ -139,6 +224,61 @@ def _make_gemini_request(prompt: str, system_instruction: Optional[str] = None)
             "error": str(e)
         }
 
+def _stream_gemini_request(payload: Dict[str, Any]) -> Iterator[str]:
+    """Envía el payload a streamGenerateContent y emite los fragmentos de texto según llegan"""
+    url = _get_gemini_url("streamGenerateContent")
+    logger.info(f"Llamando a Gemini API en streaming: {GEMINI_MODEL}")
+    
+    with requests.post(url, json=payload, headers={"Content-Type": "application/json"}, timeout=30, stream=True) as response:
+        response.raise_for_status()
+        for raw_line in response.iter_lines(decode_unicode=True):
+            if not raw_line or not raw_line.startswith("data:"):
+                continue
+            chunk = json.loads(raw_line[len("data:"):].strip())
+            for candidate in chunk.get("candidates") or []:
+                for part in (candidate.get("content") or {}).get("parts") or []:
+                    if part.get("text"):
+                        yield part["text"]
+
+def iter_gemini_text(prompt: str, system_instruction: Optional[str] = None, use_cache: bool = True) -> Iterator[Dict[str, Any]]:
+    """
+    Genera texto con Gemini emitiendo {"type": "delta", "text": ...} por fragmento y
+    un {"type": "done", "success": ..., "text": ...} final con el texto completo.
+    
+    Las respuestas en caché se emiten de una vez; si el streaming falla antes del primer
+    fragmento se recurre a la petición normal, así que el consumidor siempre recibe 'done'.
+    """
+    payload = _build_gemini_payload(prompt, system_instruction)
+    key = _gemini_cache_key(payload)
+    cached = _get_cached_gemini_response(key) if use_cache else None
+    if cached is not None:
+        yield {"type": "delta", "text": cached["text"]}
+        yield {"type": "done", "success": True, "text": cached["text"], "cached": True}
+        return
+    
+    parts: List[str] = []
+    try:
+        for text in _stream_gemini_request(payload):
+            parts.append(text)
+            yield {"type": "delta", "text": text}
+    except Exception as e:
+        if parts:
+            logger.error(f"Streaming de Gemini interrumpido: {e}")
+            yield {"type": "done", "success": False, "text": "".join(parts), "error": str(e)}
+            return
+        logger.warning(f"Streaming de Gemini no disponible ({e}); usando petición completa")
+        response = _make_gemini_request(prompt, system_instruction, use_cache=use_cache)
+        if response.get("success"):
+            yield {"type": "delta", "text": response["text"]}
+        yield {"type": "done", "success": response.get("success", False), "text": response.get("text", ""),
+               "error": response.get("error")}
+        return
+    
+    full_text = "".join(parts)
+    if use_cache and full_text:
+        _store_gemini_response(key, {"success": True, "text": full_text})
+    yield {"type": "done", "success": True, "text": full_text}
+
 # ============================================================================
 # FUNCIONES PÚBLICAS
 # ============================================================================
@@ -495,27 +635,15 @@ Responde en formato JSON."""
         }
 
 def summarize_conversation(client: Any, params: Dict[str, Any]) -> Dict[str, Any]:
-    """Resume una conversación o serie de mensajes"""
+    """Resume una conversación o serie de mensajes (stream=True devuelve los fragmentos según se generan)"""
+    if params.get("stream"):
+        return _summarize_conversation_stream(params)
     try:
         messages = params.get("messages", [])
         summary_type = params.get("summary_type", "executive")
         max_length = params.get("max_length", 500)
         
-        # Construir el contexto de la conversación
-        conversation_text = "\n".join([
-            f"{msg.get('sender', 'Unknown')}: {msg.get('content', '')}"
-            for msg in messages
-        ])
-        
-        prompt = f"""Resume esta conversación de manera {summary_type}:
-
-{conversation_text}
-
-Requisitos:
-- Máximo {max_length} caracteres
-- Incluir puntos clave
-- Mencionar decisiones o acciones pendientes
-- Tono profesional y ejecutivo"""
+        prompt = _build_summary_prompt(params)
 
         gemini_response = _make_gemini_request(prompt)
         
@@ -553,6 +681,46 @@ Requisitos:
             "error": str(e)
         }
 
+def _build_summary_prompt(params: Dict[str, Any]) -> str:
+    messages = params.get("messages", [])
+    conversation_text = "\n".join([
+        f"{msg.get('sender', 'Unknown')}: {msg.get('content', '')}"
+        for msg in messages
+    ])
+    return f"""Resume esta conversación de manera {params.get("summary_type", "executive")}:
+
+{conversation_text}
+
+Requisitos:
+- Máximo {params.get("max_length", 500)} caracteres
+- Incluir puntos clave
+- Mencionar decisiones o acciones pendientes
+- Tono profesional y ejecutivo"""
+
+def _summarize_conversation_stream(params: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Variante en streaming de summarize_conversation; respeta max_length cortando los fragmentos"""
+    max_length = params.get("max_length", 500)
+    emitted = 0
+    for record in iter_gemini_text(_build_summary_prompt(params)):
+        if record["type"] == "delta":
+            text = record["text"][:max(0, max_length - emitted)]
+            emitted += len(text)
+            if text:
+                yield {"type": "delta", "text": text}
+            continue
+        summary = record.get("text", "")[:max_length]
+        yield {
+            "type": "done",
+            "success": record.get("success", False),
+            "error": record.get("error"),
+            "data": {
+                "summary": summary,
+                "message_count": len(params.get("messages", [])),
+                "summary_type": params.get("summary_type", "executive"),
+                "length": len(summary)
+            }
+        }
+
 def classify_message_intent(client: Any, params: Dict[str, Any]) -> Dict[str, Any]:
     """Clasifica la intención de un mensaje"""
     try:
@@ -1,6 +1,8 @@
 # app/actions/hubspot_actions.py
+import json
 import logging
-from typing import Dict, Any
+import hashlib
+from typing import Dict, Any, List, Optional
 from hubspot import HubSpot
 from hubspot.crm.contacts import SimplePublicObjectInput, PublicObjectSearchRequest
 from hubspot.crm.deals import SimplePublicObjectInput as DealSimplePublicObjectInput
@@ -11,6 +13,8 @@ from datetime import datetime
 
 # Importación de la configuración central
 from app.core.config import settings
+from app.shared.helpers.local_store import get_local_store
+from app.shared.helpers.json_response import dumps_bytes
 # ✅ IMPORTACIÓN DIRECTA DEL RESOLVER PARA EVITAR CIRCULARIDAD
 def _get_resolver():
     from app.actions.resolver_actions import Resolver
@@ -21,18 +25,11 @@ logger = logging.getLogger(__name__)
 # --- FUNCIÓN DE INGENIERÍA PARA CORRECCIÓN DE ERRORES ---
 def _serialize_datetimes(data: Any) -> Any:
     """
-    Recorre recursivamente un objeto (dict o list) y convierte cualquier
-    instancia de datetime a su representación en string ISO 8601 para
-    garantizar la compatibilidad con JSON. Soluciona el error 'datetime is not JSON serializable'.
+    Convierte un objeto (dict o list) a tipos nativos de JSON: datetime a ISO 8601,
+    Decimal a número, etc. Soluciona el error 'datetime is not JSON serializable'.
+    Se hace con un solo paso por el serializador (en C) en lugar de recorrerlo en Python.
     """
-    if isinstance(data, dict):
-        return {k: _serialize_datetimes(v) for k, v in data.items()}
-    elif isinstance(data, list):
-        return [_serialize_datetimes(i) for i in data]
-    elif isinstance(data, datetime):
-        return data.isoformat()
-    else:
-        return data
+    return json.loads(dumps_bytes(data))
 
 # --- HELPERS DE CONEXIÓN Y MANEJO DE ERRORES ---
 
@@ -662,4 +659,204 @@ def hubspot_manage_pipeline(client: Any, params: Dict[str, Any]) -> Dict[str, An
         logger.error(f"Error en {action_name}: {str(e)}")
         return _handle_hubspot_api_error(e, action_name)
 
+
+# ============================================================================
+# SINCRONIZACIÓN INCREMENTAL (CURSOR POR FECHA DE MODIFICACIÓN)
+# ============================================================================
+
+_SYNC_NAMESPACE = "hubspot_sync_cursor"
+_SEARCH_PAGE_MAX = 200  # Máximo permitido por la Search API
+_SEARCH_RESULT_WINDOW = 10000  # La Search API no pagina más allá de 10k resultados por consulta
+
+_SYNC_DEFAULT_PROPERTIES = {
+    "contacts": ["email", "firstname", "lastname", "phone", "lastmodifieddate"],
+    "deals": ["dealname", "amount", "dealstage", "closedate", "pipeline", "hs_lastmodifieddate"],
+    "companies": ["name", "domain", "industry", "website", "hs_lastmodifieddate"],
+}
+
+
+def _get_modified_property(object_type: str) -> str:
+    """Los contactos exponen 'lastmodifieddate'; el resto de objetos CRM 'hs_lastmodifieddate'."""
+    return "lastmodifieddate" if object_type == "contacts" else "hs_lastmodifieddate"
+
+
+def _get_sync_cursor_key(params: Dict[str, Any], object_type: str) -> str:
+    """Clave del cursor separada por cuenta (hash del token) y tipo de objeto."""
+    token = params.get("hubspot_token_override", settings.HUBSPOT_PRIVATE_APP_KEY) or ""
+    account_hash = hashlib.sha256(token.encode("utf-8")).hexdigest()[:12]
+    return f"{account_hash}:{object_type}"
+
+
+def _search_objects(hs_client: HubSpot, object_type: str, search_request: PublicObjectSearchRequest) -> Any:
+    """Ejecuta la Search API usando el cliente específico del objeto o el genérico de 'objects'."""
+    if object_type in ("contacts", "deals", "companies"):
+        search_api = getattr(hs_client.crm, object_type).search_api
+        return search_api.do_search(public_object_search_request=search_request)
+    return hs_client.crm.objects.search_api.do_search(object_type=object_type, public_object_search_request=search_request)
+
+
+def _to_epoch_ms(value: Any) -> Optional[int]:
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return int(value.timestamp() * 1000)
+    if isinstance(value, (int, float)) or str(value).isdigit():
+        return int(value)
+    try:
+        return int(datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp() * 1000)
+    except ValueError:
+        return None
+
+
+def _flatten_search_record(record: Any) -> Dict[str, Any]:
+    """Convierte un resultado de la Search API a dict plano sin recorrer recursivamente el modelo."""
+    created_at = getattr(record, "created_at", None)
+    updated_at = getattr(record, "updated_at", None)
+    return {
+        "id": record.id,
+        "properties": record.properties or {},
+        "created_at": created_at.isoformat() if isinstance(created_at, datetime) else created_at,
+        "updated_at": updated_at.isoformat() if isinstance(updated_at, datetime) else updated_at,
+        "archived": getattr(record, "archived", False),
+    }
+
+
+def hubspot_sync_changes(client: Any, params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Exporta solo los registros modificados desde la última ejecución.
+
+    Mantiene un cursor (high-water mark) por cuenta y tipo de objeto en el almacén
+    local y consulta la Search API ordenada ascendentemente por fecha de modificación.
+    El cursor se guarda al terminar con éxito, así que una ejecución limitada por
+    'max_records' continúa donde quedó en la siguiente llamada y una que falla a
+    mitad no pierde los cambios que no llegó a entregar.
+
+    Params:
+        object_type: contacts | deals | companies | <otro objeto CRM> (default: contacts)
+        properties: propiedades a devolver (default según object_type)
+        since: fecha ISO u epoch ms para forzar el punto de partida
+        reset: True para descartar el cursor guardado y exportar todo
+        max_records: tope de registros por ejecución (default 10000)
+        page_size: tamaño de página de la Search API (máx. 200)
+    """
+    action_name = "hubspot_sync_changes"
+    try:
+        hs_client = _get_hubspot_client(params)
+        object_type = params.get("object_type", "contacts")
+        modified_prop = _get_modified_property(object_type)
+        properties = list(params.get("properties") or _SYNC_DEFAULT_PROPERTIES.get(object_type, [modified_prop]))
+        if modified_prop not in properties:
+            properties.append(modified_prop)
+        page_size = min(int(params.get("page_size", 100)), _SEARCH_PAGE_MAX)
+        max_records = int(params.get("max_records", _SEARCH_RESULT_WINDOW))
+
+        store = get_local_store()
+        cursor_key = _get_sync_cursor_key(params, object_type)
+        if params.get("reset"):
+            store.delete(_SYNC_NAMESPACE, cursor_key)
+
+        cursor = store.get(_SYNC_NAMESPACE, cursor_key) or {}
+        if params.get("since") is not None:
+            cursor = {"timestamp_ms": _to_epoch_ms(params["since"]), "ids_at_cursor": []}
+        previous_cursor_ms = cursor.get("timestamp_ms")
+
+        watermark_ms = previous_cursor_ms
+        # IDs ya exportados con el mismo timestamp que el cursor (el filtro es GTE)
+        ids_at_watermark = set(cursor.get("ids_at_cursor", []))
+        records: List[Dict[str, Any]] = []
+        has_more = False
+        pages_fetched = 0
+
+        while len(records) < max_records:
+            filters = []
+            if watermark_ms is not None:
+                filters.append({"propertyName": modified_prop, "operator": "GTE", "value": str(watermark_ms)})
+            query_start_ms = watermark_ms
+            after = None
+            window_exhausted = False
+
+            while len(records) < max_records:
+                search_request = PublicObjectSearchRequest(
+                    filter_groups=[{"filters": filters}] if filters else [],
+                    sorts=[{"propertyName": modified_prop, "direction": "ASCENDING"}],
+                    properties=properties,
+                    limit=page_size,
+                    after=after
+                )
+                page = _search_objects(hs_client, object_type, search_request)
+                pages_fetched += 1
+
+                for record in page.results or []:
+                    record_ms = _to_epoch_ms((record.properties or {}).get(modified_prop)) or _to_epoch_ms(getattr(record, "updated_at", None))
+                    if record_ms is not None and watermark_ms is not None and record_ms == watermark_ms and record.id in ids_at_watermark:
+                        continue
+                    records.append(_flatten_search_record(record))
+                    if record_ms is not None:
+                        if watermark_ms is None or record_ms > watermark_ms:
+                            watermark_ms = record_ms
+                            ids_at_watermark = set()
+                        ids_at_watermark.add(record.id)
+
+                next_page = getattr(getattr(page, "paging", None), "next", None)
+                after = getattr(next_page, "after", None)
+                if not after:
+                    break
+                if int(after) + page_size > _SEARCH_RESULT_WINDOW:
+                    window_exhausted = True
+                    break
+            else:
+                has_more = True
+
+            # La Search API corta en 10k resultados: reabrir la consulta desde el nuevo cursor
+            if window_exhausted:
+                if watermark_ms == query_start_ms:
+                    logger.warning(f"{action_name}: más de {_SEARCH_RESULT_WINDOW} registros comparten el mismo timestamp; se detiene la paginación.")
+                    has_more = True
+                    break
+                continue
+            break
+
+        # El cursor se guarda solo cuando los registros van a entregarse: si una página
+        # falla, la siguiente ejecución vuelve a exportar desde el cursor anterior
+        if watermark_ms is not None:
+            store.set(_SYNC_NAMESPACE, cursor_key, {
+                "timestamp_ms": watermark_ms,
+                "ids_at_cursor": sorted(ids_at_watermark),
+                "updated_at": datetime.utcnow().isoformat() + "Z"
+            })
+
+        return {
+            "status": "success",
+            "data": {
+                "object_type": object_type,
+                "results": records,
+                "total": len(records),
+                "has_more": has_more,
+                "pages_fetched": pages_fetched,
+                "previous_cursor": datetime.utcfromtimestamp(previous_cursor_ms / 1000).isoformat() + "Z" if previous_cursor_ms else None,
+                "cursor": datetime.utcfromtimestamp(watermark_ms / 1000).isoformat() + "Z" if watermark_ms else None,
+                "full_export": previous_cursor_ms is None
+            }
+        }
+    except Exception as e:
+        return _handle_hubspot_api_error(e, action_name)
+
+
+def hubspot_reset_sync_cursor(client: Any, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Elimina el cursor de sincronización incremental de un tipo de objeto (o de todos)."""
+    action_name = "hubspot_reset_sync_cursor"
+    try:
+        store = get_local_store()
+        object_type = params.get("object_type")
+        if object_type:
+            removed = int(store.delete(_SYNC_NAMESPACE, _get_sync_cursor_key(params, object_type)))
+        else:
+            account_prefix = _get_sync_cursor_key(params, "").rstrip(":") + ":"
+            removed = 0
+            for key, _ in store.items(_SYNC_NAMESPACE, prefix=account_prefix):
+                removed += int(store.delete(_SYNC_NAMESPACE, key))
+        return {"status": "success", "message": f"{removed} cursor(es) de sincronización eliminados."}
+    except Exception as e:
+        return _handle_hubspot_api_error(e, action_name)
+
 # --- FIN DEL MÓDULO actions/hubspot_actions.py ---
\ No newline at end of file
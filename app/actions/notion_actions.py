@@ -2,8 +2,14 @@
 import logging
 import requests
 import json
-from typing import Dict, Any, Optional, List, Union, Callable
+import time
+import random
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Any, Optional, List, Union, Callable, Iterator, Tuple
 from functools import wraps
+from requests.adapters import HTTPAdapter
 
 from app.core.config import settings
 # ✅ IMPORTACIÓN DIRECTA DEL RESOLVER PARA EVITAR CIRCULARIDAD
@@ -11,6 +17,7 @@ def _get_resolver():
     from app.actions.resolver_actions import Resolver
     return Resolver()
 from app.shared.helpers.http_client import AuthenticatedHttpClient
+from app.shared.helpers.rate_limiter import get_rate_limiter
 
 logger = logging.getLogger(__name__)
 
@@ -88,6 +95,129 @@ def _get_notion_api_headers(params: Dict[str, Any]) -> Dict[str, str]:
         "Content-Type": "application/json"
     }
 
+# --- CLIENTE HTTP COMPARTIDO (POOL + RATE LIMIT) ---
+
+NOTION_REQUESTS_PER_SECOND = 3.0  # Límite medio documentado por Notion por integración
+NOTION_MAX_RETRIES = 4
+NOTION_NAME_CACHE_TTL = 600  # segundos
+
+_notion_session: Optional[requests.Session] = None
+_notion_session_lock = threading.Lock()
+
+_notion_rate_limiter = get_rate_limiter("notion", NOTION_REQUESTS_PER_SECOND)
+
+def _get_notion_session() -> requests.Session:
+    """Sesión HTTP reutilizable (keep-alive) para no pagar un handshake TLS por llamada."""
+    global _notion_session
+    if _notion_session is None:
+        with _notion_session_lock:
+            if _notion_session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+                session.mount("https://", adapter)
+                _notion_session = session
+    return _notion_session
+
+def _notion_request(method: str, path: str, params: Dict[str, Any], json_payload: Optional[Dict[str, Any]] = None,
+                    query: Optional[Any] = None) -> requests.Response:
+    """
+    Ejecuta una llamada a la Notion API a través de la sesión compartida.
+    Respeta el rate limit, reintenta 429 (según 'Retry-After') y 5xx con backoff exponencial,
+    y lanza HTTPError para el resto de errores.
+    """
+    headers = _get_notion_api_headers(params)
+    url = path if path.startswith("http") else f"{NOTION_API_BASE_URL}{path}"
+    session = _get_notion_session()
+    attempt = 0
+    while True:
+        _notion_rate_limiter.acquire()
+        try:
+            response = session.request(method, url, headers=headers, json=json_payload, params=query,
+                                       timeout=settings.DEFAULT_API_TIMEOUT)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            if attempt >= NOTION_MAX_RETRIES:
+                raise
+            sleep_s = 0.5 * (2 ** attempt) + random.uniform(0, 0.25)
+            logger.warning(f"Error de red en Notion {method} {path}: {e}. Reintentando en {sleep_s:.2f}s")
+            time.sleep(sleep_s)
+            attempt += 1
+            continue
+
+        if response.status_code == 429 and attempt < NOTION_MAX_RETRIES:
+            try:
+                retry_after = float(response.headers.get("Retry-After", 1))
+            except ValueError:
+                retry_after = 1.0
+            logger.warning(f"Notion rate limit (429) en {method} {path}. Pausando {retry_after:.1f}s")
+            _notion_rate_limiter.block_for(retry_after)
+            attempt += 1
+            continue
+        if response.status_code in (500, 502, 503, 504) and attempt < NOTION_MAX_RETRIES:
+            sleep_s = 0.5 * (2 ** attempt) + random.uniform(0, 0.25)
+            logger.warning(f"Notion HTTP {response.status_code} en {method} {path}. Reintentando en {sleep_s:.2f}s")
+            time.sleep(sleep_s)
+            attempt += 1
+            continue
+
+        response.raise_for_status()
+        return response
+
+# --- CACHÉ DE RESOLUCIÓN NOMBRE -> ID ---
+
+_notion_name_cache: Dict[str, Dict[str, Any]] = {}
+_notion_name_cache_lock = threading.Lock()
+
+def _name_cache_key(params: Dict[str, Any], object_type: str, name: str) -> str:
+    token = params.get("access_token", settings.NOTION_API_KEY) or ""
+    token_hash = hashlib.sha256(token.encode("utf-8")).hexdigest()[:12]
+    return f"{token_hash}:{object_type}:{name.strip().lower()}"
+
+def _get_cached_notion_object(params: Dict[str, Any], object_type: str, name: str) -> Optional[Dict[str, Any]]:
+    key = _name_cache_key(params, object_type, name)
+    with _notion_name_cache_lock:
+        cached = _notion_name_cache.get(key)
+        if cached and time.time() < cached["expires"]:
+            return cached["data"]
+        _notion_name_cache.pop(key, None)
+    return None
+
+def _cache_notion_object(params: Dict[str, Any], object_type: str, name: str, data: Dict[str, Any]) -> None:
+    with _notion_name_cache_lock:
+        _notion_name_cache[_name_cache_key(params, object_type, name)] = {
+            "data": data,
+            "expires": time.time() + NOTION_NAME_CACHE_TTL
+        }
+
+def _invalidate_notion_id(object_id: str) -> None:
+    """Elimina de la caché cualquier nombre que resuelva a 'object_id' (p. ej. tras un 404)."""
+    with _notion_name_cache_lock:
+        for key in [k for k, v in _notion_name_cache.items() if v["data"].get("id") == object_id]:
+            _notion_name_cache.pop(key, None)
+
+def _get_object_title(obj: Dict[str, Any]) -> str:
+    """Extrae el título plano de una base de datos o página devuelta por /search."""
+    if obj.get("object") == NOTION_OBJECT_TYPES["DATABASE"]:
+        rich_title = obj.get("title", [])
+    else:
+        rich_title = next((p.get("title", []) for p in obj.get("properties", {}).values() if p.get("type") == "title"), [])
+    return "".join(t.get("plain_text", "") for t in rich_title)
+
+def _find_notion_object_by_name(client: Optional[Any], params: Dict[str, Any], name: str, object_type: str) -> Optional[Dict[str, Any]]:
+    """Resuelve un nombre a su objeto Notion usando la caché TTL y, si falla, /search."""
+    if params.get("use_cache", True):
+        cached = _get_cached_notion_object(params, object_type, name)
+        if cached:
+            return cached
+
+    payload = {"query": name, "filter": {"value": object_type, "property": NOTION_FILTER_PROPERTIES["OBJECT"]}}
+    results = _notion_request("POST", "/search", params, json_payload=payload).json().get("results", [])
+    if not results:
+        return None
+    # Preferir coincidencia exacta de título; si no hay, el primer resultado (comportamiento previo)
+    match = next((r for r in results if _get_object_title(r).strip().lower() == name.strip().lower()), results[0])
+    _cache_notion_object(params, object_type, name, match)
+    return match
+
 def _handle_notion_api_error(e: Exception, action_name: str, params_for_log: Optional[Dict[str, Any]] = None) -> NotionResult:
     """
     Helper para manejar errores de Notion API.
@@ -173,9 +303,7 @@ def notion_search_general(client: Optional[Any], params: Dict[str, Any]) -> Noti
     }
     payload_search = {k: v for k, v in payload_search.items() if v is not None}
 
-    headers = _get_notion_api_headers(params)
-    response = requests.post(f"{NOTION_API_BASE_URL}/search", headers=headers, json=payload_search, timeout=settings.DEFAULT_API_TIMEOUT)
-    response.raise_for_status()
+    response = _notion_request("POST", "/search", params, json_payload=payload_search)
     return {"status": "success", "data": response.json()}
 
 @notion_error_handler
@@ -195,9 +323,7 @@ def notion_get_database(client: Optional[Any], params: Dict[str, Any]) -> Notion
     """
     database_id = params.get("database_id")
     if not database_id: raise ValueError("'database_id' es requerido.")
-    headers = _get_notion_api_headers(params)
-    response = requests.get(f"{NOTION_API_BASE_URL}/databases/{database_id}", headers=headers, timeout=settings.DEFAULT_API_TIMEOUT)
-    response.raise_for_status()
+    response = _notion_request("GET", f"/databases/{database_id}", params)
     return {"status": "success", "data": response.json()}
 
 @notion_error_handler
@@ -218,9 +344,7 @@ def notion_query_database(client: Optional[Any], params: Dict[str, Any]) -> Noti
     database_id = params.get("database_id")
     query_payload = params.get("query_payload", {})
     if not database_id: raise ValueError("'database_id' es requerido.")
-    headers = _get_notion_api_headers(params)
-    response = requests.post(f"{NOTION_API_BASE_URL}/databases/{database_id}/query", headers=headers, json=query_payload, timeout=settings.DEFAULT_API_TIMEOUT)
-    response.raise_for_status()
+    response = _notion_request("POST", f"/databases/{database_id}/query", params, json_payload=query_payload)
     return {"status": "success", "data": response.json()}
 
 @notion_error_handler
@@ -240,9 +364,7 @@ def notion_retrieve_page(client: Optional[Any], params: Dict[str, Any]) -> Notio
     """
     page_id = params.get("page_id")
     if not page_id: raise ValueError("'page_id' es requerido.")
-    headers = _get_notion_api_headers(params)
-    response = requests.get(f"{NOTION_API_BASE_URL}/pages/{page_id}", headers=headers, timeout=settings.DEFAULT_API_TIMEOUT)
-    response.raise_for_status()
+    response = _notion_request("GET", f"/pages/{page_id}", params)
     return {"status": "success", "data": response.json()}
 
 @notion_error_handler
@@ -263,9 +385,7 @@ def notion_create_page(client: Optional[Any], params: Dict[str, Any]) -> NotionR
     page_payload = params.get("page_payload")
     if not page_payload or not page_payload.get("parent"):
         raise ValueError("'page_payload' con una clave 'parent' es requerido.")
-    headers = _get_notion_api_headers(params)
-    response = requests.post(f"{NOTION_API_BASE_URL}/pages", headers=headers, json=page_payload, timeout=settings.DEFAULT_API_TIMEOUT)
-    response.raise_for_status()
+    response = _notion_request("POST", "/pages", params, json_payload=page_payload)
     return {"status": "success", "data": response.json()}
 
 @notion_error_handler
@@ -287,9 +407,7 @@ def notion_update_page(client: Optional[Any], params: Dict[str, Any]) -> NotionR
     update_payload = params.get("update_payload")
     if not page_id or not update_payload:
         raise ValueError("'page_id' y 'update_payload' son requeridos.")
-    headers = _get_notion_api_headers(params)
-    response = requests.patch(f"{NOTION_API_BASE_URL}/pages/{page_id}", headers=headers, json=update_payload, timeout=settings.DEFAULT_API_TIMEOUT)
-    response.raise_for_status()
+    response = _notion_request("PATCH", f"/pages/{page_id}", params, json_payload=update_payload)
     return {"status": "success", "data": response.json()}
 
 @notion_error_handler
@@ -309,9 +427,7 @@ def notion_delete_block(client: Optional[Any], params: Dict[str, Any]) -> Notion
     """
     block_id = params.get("block_id")
     if not block_id: raise ValueError("'block_id' es requerido.")
-    headers = _get_notion_api_headers(params)
-    response = requests.delete(f"{NOTION_API_BASE_URL}/blocks/{block_id}", headers=headers, timeout=settings.DEFAULT_API_TIMEOUT)
-    response.raise_for_status()
+    response = _notion_request("DELETE", f"/blocks/{block_id}", params)
     return {"status": "success", "data": response.json()}
 
 # --- ACCIONES AVANZADAS Y "RESOLVERS" DE LA AUDITORÍA ---
@@ -323,7 +439,8 @@ def notion_find_database_by_name(client: Optional[Any], params: Dict[str, Any])
     
     Args:
         client: Cliente HTTP (no utilizado en esta implementación).
-        params: Debe contener query_name.
+        params: Debe contener query_name. 'use_cache' (default True) reutiliza
+            resoluciones previas durante NOTION_NAME_CACHE_TTL segundos.
         
     Returns:
         Información de la base de datos encontrada o error si no se encuentra.
@@ -334,23 +451,34 @@ def notion_find_database_by_name(client: Optional[Any], params: Dict[str, Any])
     query_name = params.get("query_name")
     if not query_name: raise ValueError("'query_name' es requerido.")
     
-    search_params = {
-        "search_query_text": query_name,
-        "filter": {"value": NOTION_OBJECT_TYPES["DATABASE"], "property": NOTION_FILTER_PROPERTIES["OBJECT"]}
-    }
-    search_params.update(params) # Para pasar access_token etc.
-    
-    search_result = notion_search_general(client, search_params)
-    
-    if search_result.get("status") != "success":
-        return search_result
-        
-    databases = search_result.get("data", {}).get("results", [])
-    if not databases:
+    database = _find_notion_object_by_name(client, params, query_name, NOTION_OBJECT_TYPES["DATABASE"])
+    if not database:
         return {"status": "error", "message": f"No se encontró base de datos con el nombre '{query_name}'.", "http_status": 404}
+    return {"status": "success", "data": database}
 
-    # Podría haber múltiples resultados, devolvemos el primero por simplicidad.
-    return {"status": "success", "data": databases[0]}
+@notion_error_handler
+def notion_find_page_by_name(client: Optional[Any], params: Dict[str, Any]) -> NotionResult:
+    """
+    Busca una página de Notion por título.
+    
+    Args:
+        client: Cliente HTTP (no utilizado en esta implementación).
+        params: Debe contener query_name. 'use_cache' (default True) reutiliza
+            resoluciones previas durante NOTION_NAME_CACHE_TTL segundos.
+        
+    Returns:
+        Información de la página encontrada o error si no se encuentra.
+        
+    Raises:
+        ValueError: Si no se proporciona query_name.
+    """
+    query_name = params.get("query_name")
+    if not query_name: raise ValueError("'query_name' es requerido.")
+    
+    page = _find_notion_object_by_name(client, params, query_name, NOTION_OBJECT_TYPES["PAGE"])
+    if not page:
+        return {"status": "error", "message": f"No se encontró página con el nombre '{query_name}'.", "http_status": 404}
+    return {"status": "success", "data": page}
 
 @notion_error_handler
 def notion_create_page_in_database(client: Optional[Any], params: Dict[str, Any]) -> NotionResult:
@@ -359,18 +487,28 @@ def notion_create_page_in_database(client: Optional[Any], params: Dict[str, Any]
     
     Args:
         client: Cliente HTTP (no utilizado en esta implementación).
-        params: Debe contener database_id y properties_payload.
+        params: Debe contener database_id (o database_name, resuelto vía caché)
+            y properties_payload (o properties).
         
     Returns:
         Información de la página creada en la base de datos.
         
     Raises:
-        ValueError: Si no se proporciona database_id o properties_payload.
+        ValueError: Si no se proporciona database_id/database_name o properties_payload.
     """
     database_id = params.get("database_id")
-    properties_payload = params.get("properties_payload")
-    if not database_id or not properties_payload:
-        raise ValueError("'database_id' y 'properties_payload' son requeridos.")
+    database_name = params.get("database_name")
+    properties_payload = params.get("properties_payload") or params.get("properties")
+    if not (database_id or database_name) or not properties_payload:
+        raise ValueError("'database_id' (o 'database_name') y 'properties_payload' son requeridos.")
+    
+    resolved_from_cache = False
+    if not database_id:
+        database = _find_notion_object_by_name(client, params, database_name, NOTION_OBJECT_TYPES["DATABASE"])
+        if not database:
+            return {"status": "error", "message": f"No se encontró base de datos con el nombre '{database_name}'.", "http_status": 404}
+        database_id = database["id"]
+        resolved_from_cache = True
     
     page_payload = {
         "parent": {"database_id": database_id},
@@ -383,8 +521,15 @@ def notion_create_page_in_database(client: Optional[Any], params: Dict[str, Any]
     
     create_params = {"page_payload": page_payload}
     create_params.update(params) # Para pasar access_token etc.
+    create_params["page_payload"] = page_payload
 
-    return notion_create_page(client, create_params)
+    result = notion_create_page(client, create_params)
+    # Si el ID cacheado ya no existe (base borrada o movida), re-resolver una vez sin caché
+    if resolved_from_cache and result.get("http_status") == 404 and params.get("use_cache", True):
+        _invalidate_notion_id(database_id)
+        retry_params = dict(params, use_cache=False)
+        return notion_create_page_in_database(client, retry_params)
+    return result
 
 @notion_error_handler
 def notion_append_text_block_to_page(client: Optional[Any], params: Dict[str, Any]) -> NotionResult:
@@ -406,9 +551,6 @@ def notion_append_text_block_to_page(client: Optional[Any], params: Dict[str, An
     if not page_id or text_content is None:
         raise ValueError("'page_id' y 'text_content' son requeridos.")
 
-    headers = _get_notion_api_headers(params)
-    url = f"{NOTION_API_BASE_URL}/blocks/{page_id}/children"
-    
     payload = {
         "children": [{
             "object": NOTION_OBJECT_TYPES["BLOCK"],
@@ -419,34 +561,129 @@ def notion_append_text_block_to_page(client: Optional[Any], params: Dict[str, An
         }]
     }
 
-    response = requests.patch(url, headers=headers, json=payload, timeout=settings.DEFAULT_API_TIMEOUT)
-    response.raise_for_status()
+    response = _notion_request("PATCH", f"/blocks/{page_id}/children", params, json_payload=payload)
     return {"status": "success", "data": response.json()}
 
+# Bloques cuyo contenido es otra página/base de datos: no se expanden al leer el árbol
+_NON_EXPANDABLE_BLOCK_TYPES = (NOTION_BLOCK_TYPES["CHILD_PAGE"], NOTION_BLOCK_TYPES["CHILD_DATABASE"])
+NOTION_TREE_MAX_WORKERS = 8
+
+def _list_block_children(params: Dict[str, Any], block_id: str) -> List[Dict[str, Any]]:
+    """Devuelve todos los hijos directos de un bloque siguiendo 'next_cursor'."""
+    children: List[Dict[str, Any]] = []
+    cursor = None
+    while True:
+        query = {"page_size": 100}
+        if cursor:
+            query["start_cursor"] = cursor
+        data = _notion_request("GET", f"/blocks/{block_id}/children", params, query=query).json()
+        children.extend(data.get("results", []))
+        cursor = data.get("next_cursor")
+        if not data.get("has_more") or not cursor:
+            return children
+
+def _iter_block_tree(params: Dict[str, Any], root_id: str, max_depth: Optional[int] = None,
+                     max_workers: int = 4) -> Iterator[Tuple[str, int, List[Dict[str, Any]]]]:
+    """
+    Recorre el árbol de bloques bajo 'root_id' y produce (parent_id, depth, children)
+    a medida que llega cada lista de hijos. Los hijos de cada bloque se solicitan en
+    cuanto se descubre el bloque, así que el tiempo total depende de la profundidad
+    del árbol y no del número de bloques (el rate limiter compartido acota la concurrencia real).
+    'depth' es 1 para los bloques de primer nivel.
+    """
+    pool = ThreadPoolExecutor(max_workers=max(1, min(max_workers, NOTION_TREE_MAX_WORKERS)))
+    try:
+        pending = {pool.submit(_list_block_children, params, root_id): (root_id, 1)}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                parent_id, depth = pending.pop(future)
+                children = future.result()
+                if max_depth is None or depth < max_depth:
+                    for child in children:
+                        if child.get("has_children") and child.get("type") not in _NON_EXPANDABLE_BLOCK_TYPES:
+                            pending[pool.submit(_list_block_children, params, child["id"])] = (child["id"], depth + 1)
+                yield parent_id, depth, children
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def _block_tree_limits(params: Dict[str, Any]) -> Tuple[Optional[int], int]:
+    """max_depth (None = sin límite; si se indica, >= 1) y max_workers de params como enteros."""
+    max_depth = params.get("max_depth")
+    if max_depth is not None:
+        max_depth = int(max_depth)
+        if max_depth < 1:
+            raise ValueError("'max_depth' debe ser 1 o mayor.")
+    return max_depth, int(params.get("max_workers", 4))
+
+def iter_notion_page_blocks(params: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """
+    Versión streaming de notion_get_page_content: produce cada bloque (con 'parent_id'
+    y 'depth') en cuanto se recibe. Los errores se emiten como un último registro
+    {"status": "error", ...} porque ya no pueden convertirse en respuesta HTTP.
+    """
+    page_id = params.get("page_id")
+    try:
+        max_depth, max_workers = _block_tree_limits(params)
+        for parent_id, depth, children in _iter_block_tree(params, page_id, max_depth, max_workers):
+            for block in children:
+                yield {**block, "parent_id": parent_id, "depth": depth}
+    except Exception as e:
+        yield _handle_notion_api_error(e, "notion_get_page_content", params)
+
 @notion_error_handler
-def notion_get_page_content(client: Optional[Any], params: Dict[str, Any]) -> NotionResult:
+def notion_get_page_content(client: Optional[Any], params: Dict[str, Any]) -> Union[NotionResult, Iterator[Dict[str, Any]]]:
     """
-    Obtiene el contenido de una página de Notion.
+    Obtiene el contenido completo de una página de Notion.
+    
+    Sigue la paginación ('next_cursor') de cada nivel y, por defecto, desciende
+    recursivamente en bloques anidados (toggles, columnas, listas...). Las subpáginas
+    y bases de datos hijas no se expanden.
     
     Args:
         client: Cliente HTTP (no utilizado en esta implementación).
-        params: Debe contener page_id.
+        params: Debe contener page_id. Opcionales: recursive (default True),
+            max_depth (niveles a leer; 1 = solo primer nivel), max_workers (default 4),
+            stream (default False; devuelve un iterador de bloques para respuesta NDJSON).
         
     Returns:
-        Contenido de la página.
+        Contenido de la página con los hijos anidados en la clave 'children' de cada bloque,
+        o un iterador de bloques si stream=True.
         
     Raises:
-        ValueError: Si no se proporciona page_id.
+        ValueError: Si no se proporciona page_id o max_depth no es un entero >= 1.
     """
     page_id = params.get("page_id")
     if not page_id: raise ValueError("'page_id' es requerido.")
+    if not params.get("recursive", True):
+        params = dict(params, max_depth=1)
+    max_depth, max_workers = _block_tree_limits(params)
+    if params.get("stream"):
+        return iter_notion_page_blocks(params)
+
+    blocks_by_id: Dict[str, Dict[str, Any]] = {}
+    top_level: List[Dict[str, Any]] = []
+    deepest = 0
+    for parent_id, depth, children in _iter_block_tree(params, page_id, max_depth, max_workers):
+        deepest = max(deepest, depth if children else 0)
+        for child in children:
+            blocks_by_id[child["id"]] = child
+        if parent_id == page_id:
+            top_level = children
+        else:
+            blocks_by_id[parent_id]["children"] = children
 
-    headers = _get_notion_api_headers(params)
-    url = f"{NOTION_API_BASE_URL}/blocks/{page_id}/children"
-    
-    response = requests.get(url, headers=headers, timeout=settings.DEFAULT_API_TIMEOUT)
-    response.raise_for_status()
-    return {"status": "success", "data": response.json()}
+    return {
+        "status": "success",
+        "data": {
+            "object": "list",
+            "results": top_level,
+            "next_cursor": None,
+            "has_more": False,
+            "block_count": len(blocks_by_id),
+            "depth": deepest
+        }
+    }
 
 # Nuevas acciones adicionales para manejo de bloques
 
@@ -470,11 +707,7 @@ def notion_update_block(client: Optional[Any], params: Dict[str, Any]) -> Notion
     if not block_id or not block_content:
         raise ValueError("'block_id' y 'block_content' son requeridos.")
 
-    headers = _get_notion_api_headers(params)
-    url = f"{NOTION_API_BASE_URL}/blocks/{block_id}"
-    
-    response = requests.patch(url, headers=headers, json=block_content, timeout=settings.DEFAULT_API_TIMEOUT)
-    response.raise_for_status()
+    response = _notion_request("PATCH", f"/blocks/{block_id}", params, json_payload=block_content)
     return {"status": "success", "data": response.json()}
 
 @notion_error_handler
@@ -495,11 +728,7 @@ def notion_get_block(client: Optional[Any], params: Dict[str, Any]) -> NotionRes
     block_id = params.get("block_id")
     if not block_id: raise ValueError("'block_id' es requerido.")
 
-    headers = _get_notion_api_headers(params)
-    url = f"{NOTION_API_BASE_URL}/blocks/{block_id}"
-    
-    response = requests.get(url, headers=headers, timeout=settings.DEFAULT_API_TIMEOUT)
-    response.raise_for_status()
+    response = _notion_request("GET", f"/blocks/{block_id}", params)
     return {"status": "success", "data": response.json()}
 
 @notion_error_handler
@@ -524,15 +753,13 @@ def notion_create_database(client: Optional[Any], params: Dict[str, Any]) -> Not
     if not parent or not properties:
         raise ValueError("'parent' y 'properties' son requeridos.")
 
-    headers = _get_notion_api_headers(params)
     payload = {
         "parent": parent,
         "title": title,
         "properties": properties,
     }
     
-    response = requests.post(f"{NOTION_API_BASE_URL}/databases", headers=headers, json=payload, timeout=settings.DEFAULT_API_TIMEOUT)
-    response.raise_for_status()
+    response = _notion_request("POST", "/databases", params, json_payload=payload)
     return {"status": "success", "data": response.json()}
 
 @notion_error_handler
@@ -556,15 +783,11 @@ def notion_add_users_to_page(client: Optional[Any], params: Dict[str, Any]) -> N
     if not page_id or not user_ids:
         raise ValueError("'page_id' y 'user_ids' son requeridos.")
 
-    headers = _get_notion_api_headers(params)
-    url = f"{NOTION_API_BASE_URL}/pages/{page_id}/users"
-    
     payload = {
         "users": user_ids
     }
     
-    response = requests.post(url, headers=headers, json=payload, timeout=settings.DEFAULT_API_TIMEOUT)
-    response.raise_for_status()
+    response = _notion_request("POST", f"/pages/{page_id}/users", params, json_payload=payload)
     return {"status": "success", "data": response.json()}
 
 @notion_error_handler
@@ -586,13 +809,202 @@ def notion_archive_page(client: Optional[Any], params: Dict[str, Any]) -> Notion
     if not page_id:
         raise ValueError("'page_id' es requerido.")
 
-    headers = _get_notion_api_headers(params)
-    url = f"{NOTION_API_BASE_URL}/pages/{page_id}"
-    
     payload = {
         "archived": True
     }
     
-    response = requests.patch(url, headers=headers, json=payload, timeout=settings.DEFAULT_API_TIMEOUT)
-    response.raise_for_status()
-    return {"status": "success", "data": response.json()}
\ No newline at end of file
+    response = _notion_request("PATCH", f"/pages/{page_id}", params, json_payload=payload)
+    return {"status": "success", "data": response.json()}
+
+# --- OPERACIONES MASIVAS SOBRE BASES DE DATOS ---
+
+NOTION_BULK_DEFAULT_WORKERS = 3
+
+def _resolve_database_id(client: Optional[Any], params: Dict[str, Any]) -> str:
+    """Obtiene database_id directamente o resolviendo database_name vía la caché de nombres."""
+    database_id = params.get("database_id")
+    if database_id:
+        return database_id
+    database_name = params.get("database_name")
+    if not database_name:
+        raise ValueError("'database_id' o 'database_name' es requerido.")
+    database = _find_notion_object_by_name(client, params, database_name, NOTION_OBJECT_TYPES["DATABASE"])
+    if not database:
+        raise ValueError(f"No se encontró base de datos con el nombre '{database_name}'.")
+    return database["id"]
+
+def _run_bulk(params: Dict[str, Any], items: List[Any], operation: Callable[[Any], Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Aplica 'operation' a cada item con concurrencia acotada. El rate limiter compartido
+    evita ráfagas de 429; los fallos se registran por item sin abortar el lote.
+    """
+    max_workers = max(1, min(int(params.get("max_workers", NOTION_BULK_DEFAULT_WORKERS)), NOTION_TREE_MAX_WORKERS))
+    results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+
+    def _run(index: int, item: Any) -> None:
+        try:
+            data = operation(item)
+            results[index] = {"index": index, "status": "success", "id": data.get("id")}
+        except Exception as e:
+            status_code = getattr(getattr(e, "response", None), "status_code", None)
+            logger.warning(f"Operación masiva Notion falló en item {index}: {e}")
+            results[index] = {"index": index, "status": "error", "error": str(e), "http_status": status_code}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for index, item in enumerate(items):
+            pool.submit(_run, index, item)
+
+    failed = [r for r in results if r and r["status"] == "error"]
+    summary = {
+        "total": len(items),
+        "succeeded": len(items) - len(failed),
+        "failed": len(failed),
+        "results": results
+    }
+    if failed and len(failed) == len(items):
+        return {"status": "error", "message": "Todas las operaciones del lote fallaron.", "details": summary, "http_status": 502}
+    return {"status": "partial" if failed else "success", "data": summary}
+
+@notion_error_handler
+def notion_bulk_create_pages_in_database(client: Optional[Any], params: Dict[str, Any]) -> NotionResult:
+    """
+    Crea muchas filas (páginas) en una base de datos de Notion en paralelo.
+    
+    Args:
+        client: Cliente HTTP (no utilizado en esta implementación).
+        params: database_id o database_name, y rows: lista de dicts de propiedades
+            o de {"properties": {...}, "children": [...]}. Opcional max_workers.
+        
+    Returns:
+        Resumen del lote con el resultado (id o error) de cada fila, en el orden recibido.
+    """
+    rows = params.get("rows")
+    if not rows or not isinstance(rows, list):
+        raise ValueError("'rows' (lista de propiedades) es requerido.")
+    database_id = _resolve_database_id(client, params)
+
+    def _create(row: Dict[str, Any]) -> Dict[str, Any]:
+        payload = {"parent": {"database_id": database_id}}
+        if "properties" in row:
+            payload["properties"] = row["properties"]
+            if row.get("children"):
+                payload["children"] = row["children"]
+        else:
+            payload["properties"] = row
+        return _notion_request("POST", "/pages", params, json_payload=payload).json()
+
+    result = _run_bulk(params, rows, _create)
+    if result.get("status") in ("success", "partial"):
+        result["data"]["database_id"] = database_id
+    return result
+
+@notion_error_handler
+def notion_bulk_update_pages(client: Optional[Any], params: Dict[str, Any]) -> NotionResult:
+    """
+    Actualiza muchas páginas/filas de Notion en paralelo.
+    
+    Args:
+        client: Cliente HTTP (no utilizado en esta implementación).
+        params: updates: lista de {"page_id": str, "properties": {...}} o
+            {"page_id": str, "update_payload": {...}}. Opcional max_workers.
+        
+    Returns:
+        Resumen del lote con el resultado de cada actualización.
+    """
+    updates = params.get("updates")
+    if not updates or not isinstance(updates, list):
+        raise ValueError("'updates' (lista de {page_id, properties}) es requerido.")
+    if any(not u.get("page_id") for u in updates):
+        raise ValueError("Cada elemento de 'updates' requiere 'page_id'.")
+
+    def _update(update: Dict[str, Any]) -> Dict[str, Any]:
+        payload = update.get("update_payload") or {"properties": update.get("properties", {})}
+        return _notion_request("PATCH", f"/pages/{update['page_id']}", params, json_payload=payload).json()
+
+    return _run_bulk(params, updates, _update)
+
+@notion_error_handler
+def notion_bulk_archive_pages(client: Optional[Any], params: Dict[str, Any]) -> NotionResult:
+    """
+    Archiva muchas páginas/filas de Notion en paralelo.
+    
+    Args:
+        client: Cliente HTTP (no utilizado en esta implementación).
+        params: page_ids: lista de IDs. Opcional max_workers.
+        
+    Returns:
+        Resumen del lote con el resultado de cada archivado.
+    """
+    page_ids = params.get("page_ids")
+    if not page_ids or not isinstance(page_ids, list):
+        raise ValueError("'page_ids' (lista de IDs) es requerido.")
+
+    def _archive(page_id: str) -> Dict[str, Any]:
+        return _notion_request("PATCH", f"/pages/{page_id}", params, json_payload={"archived": True}).json()
+
+    return _run_bulk(params, page_ids, _archive)
+
+def iter_notion_database_rows(params: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """
+    Itera todas las filas de una base de datos siguiendo 'next_cursor'.
+    'filter' y 'sorts' se envían a Notion (el filtrado ocurre en el servidor).
+    Requiere params['database_id'] ya resuelto.
+    """
+    payload: Dict[str, Any] = {"page_size": min(int(params.get("page_size", 100)), 100)}
+    if params.get("filter"):
+        payload["filter"] = params["filter"]
+    if params.get("sorts"):
+        payload["sorts"] = params["sorts"]
+    if params.get("filter_properties"):
+        query = [("filter_properties", p) for p in params["filter_properties"]]
+    else:
+        query = None
+    max_rows = params.get("max_rows")
+    yielded = 0
+    while True:
+        data = _notion_request("POST", f"/databases/{params['database_id']}/query", params,
+                               json_payload=payload, query=query).json()
+        for row in data.get("results", []):
+            yield row
+            yielded += 1
+            if max_rows and yielded >= max_rows:
+                return
+        if not data.get("has_more") or not data.get("next_cursor"):
+            return
+        payload["start_cursor"] = data["next_cursor"]
+
+@notion_error_handler
+def notion_query_database_all(client: Optional[Any], params: Dict[str, Any]) -> Union[NotionResult, Iterator[Dict[str, Any]]]:
+    """
+    Consulta una base de datos de Notion completa (todas las páginas de resultados).
+    
+    Args:
+        client: Cliente HTTP (no utilizado en esta implementación).
+        params: database_id o database_name. Opcionales: filter, sorts (se aplican en Notion),
+            filter_properties (IDs de propiedades a devolver), max_rows,
+            stream (default False; devuelve un iterador de filas para respuesta NDJSON).
+        
+    Returns:
+        Todas las filas que cumplen el filtro, o un iterador si stream=True.
+    """
+    query_params = dict(params, database_id=_resolve_database_id(client, params))
+    if params.get("stream"):
+        def _stream() -> Iterator[Dict[str, Any]]:
+            try:
+                yield from iter_notion_database_rows(query_params)
+            except Exception as e:
+                yield _handle_notion_api_error(e, "notion_query_database_all", params)
+        return _stream()
+
+    rows = list(iter_notion_database_rows(query_params))
+    return {
+        "status": "success",
+        "data": {
+            "object": "list",
+            "database_id": query_params["database_id"],
+            "results": rows,
+            "total": len(rows),
+            "has_more": False,
+            "next_cursor": None
+        }
+    }
@@ -2,11 +2,13 @@
 import logging
 import requests # Para requests.exceptions.HTTPError
 import json # Para el helper de error
-from typing import Dict, List, Optional, Any, Union
+import hashlib
+from typing import Dict, List, Optional, Any, Union, Iterator
 
 # Importar la configuración y el cliente HTTP autenticado
 from app.core.config import settings
 from app.shared.helpers.http_client import AuthenticatedHttpClient
+from app.shared.helpers.local_store import get_local_store
 
 logger = logging.getLogger(__name__)
 
@@ -82,11 +84,6 @@ def chat_completion(client: AuthenticatedHttpClient, params: Dict[str, Any]) ->
     if not messages or not isinstance(messages, list) or not all(isinstance(m, dict) and 'role' in m and 'content' in m for m in messages):
         return {"status": "error", "action": action_name, "message": "Parámetro 'messages' (lista de objetos {'role': '...', 'content': '...'}) es requerido y debe tener formato válido.", "http_status": 400}
 
-    if params.get("stream", False): # Streaming no es manejado por este backend directamente, el cliente debería manejarlo.
-        logger.warning(f"{action_name}: Solicitud de Chat Completion para despliegue '{deployment_id}' con stream=true. "
-                       "Esta acción no soporta streaming directamente y procederá de forma síncrona. "
-                       "El cliente es responsable de manejar respuestas de stream si la API de Azure lo permite para este endpoint.")
-
     base_url = str(settings.AZURE_OPENAI_RESOURCE_ENDPOINT).rstrip('/')
     url = f"{base_url}/openai/deployments/{deployment_id}/chat/completions?api-version={settings.AZURE_OPENAI_API_VERSION}"
 
@@ -97,7 +94,7 @@ def chat_completion(client: AuthenticatedHttpClient, params: Dict[str, Any]) ->
     allowed_api_params = [
         "temperature", "max_tokens", "top_p", "frequency_penalty", "presence_penalty", 
         "stop", "logit_bias", "user", "n", "logprobs", "top_logprobs", 
-        "response_format", "seed", "tools", "tool_choice", "stream" # Aunque stream no se maneje, se pasa a la API.
+        "response_format", "seed", "tools", "tool_choice", "stream" # stream=true devuelve un generador de fragmentos
     ]
     for param_key, value in params.items():
         if param_key in allowed_api_params and value is not None: # Solo añadir si el valor no es None
@@ -110,6 +107,10 @@ def chat_completion(client: AuthenticatedHttpClient, params: Dict[str, Any]) ->
     if not openai_scope: # Doble chequeo por si acaso
          return {"status": "error", "action": action_name, "message": "Scope de Azure OpenAI no configurado.", "http_status": 500}
 
+    if payload.get("stream"):
+        # Con stream=true se devuelve un generador de fragmentos; los endpoints lo emiten como SSE/NDJSON
+        return _stream_chat_completion(client, url, openai_scope, payload, action_name, params)
+
     try:
         # AuthenticatedHttpClient maneja la adición del token y Content-Type para json_data
         response = client.post(
@@ -123,7 +124,65 @@ def chat_completion(client: AuthenticatedHttpClient, params: Dict[str, Any]) ->
     except Exception as e:
         return _handle_openai_api_error(e, action_name, params)
 
+def _stream_chat_completion(client: AuthenticatedHttpClient, url: str, scope: Any, payload: Dict[str, Any],
+                            action_name: str, params: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """
+    Consume la respuesta SSE de Azure OpenAI y emite {"type": "delta", "text": ...} por
+    cada fragmento, terminando con {"type": "done", ...} que incluye el texto completo.
+    Si la petición falla antes del primer fragmento, emite el error estándar de la acción.
+    """
+    content_parts: List[str] = []
+    finish_reason = None
+    try:
+        response = client.post(
+            url=url,
+            scope=scope,
+            json_data=payload,
+            stream=True,
+            timeout=params.get("timeout", settings.DEFAULT_API_TIMEOUT)
+        )
+        with response:
+            for raw_line in response.iter_lines(decode_unicode=True):
+                if not raw_line or not raw_line.startswith("data:"):
+                    continue
+                data = raw_line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                chunk = json.loads(data)
+                for choice in chunk.get("choices") or []:
+                    delta_text = (choice.get("delta") or {}).get("content")
+                    if delta_text:
+                        content_parts.append(delta_text)
+                        yield {"type": "delta", "text": delta_text}
+                    finish_reason = choice.get("finish_reason") or finish_reason
+    except Exception as e:
+        error = _handle_openai_api_error(e, action_name, params)
+        yield {"type": "error", **error, "partial_content": "".join(content_parts) or None}
+        return
+    yield {"type": "done", "status": "success", "content": "".join(content_parts), "finish_reason": finish_reason}
+
+# Límite de entradas por petición de embeddings en Azure OpenAI (despliegues antiguos: 16, usar batch_size)
+EMBEDDING_MAX_BATCH_SIZE = 2048
+_EMBEDDING_CACHE_DB = "embeddings.db"
+
+def _embedding_cache_namespace(deployment_id: str, payload_options: Dict[str, Any]) -> str:
+    # Las dimensiones/input_type cambian el vector resultante: forman parte del espacio de caché
+    options = ",".join(f"{k}={payload_options[k]}" for k in sorted(payload_options))
+    return f"embeddings:{deployment_id}:{options}"
+
+def _embedding_cache_key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
 def get_embedding(client: AuthenticatedHttpClient, params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Genera embeddings para uno o varios textos.
+
+    Las entradas se agrupan en peticiones de hasta 'batch_size' textos (máximo
+    EMBEDDING_MAX_BATCH_SIZE) y cada vector se guarda en una caché local en disco por
+    despliegue + hash del contenido: reembeddear un corpus sin cambios no hace llamadas.
+    use_cache=False fuerza el cálculo. La respuesta mantiene el formato de la API
+    (data[i].index alineado con la entrada) más un bloque 'cache' con aciertos/fallos.
+    """
     params = params or {}
     action_name = "openai_get_embedding"
     log_params = {k:v for k,v in params.items() if k != 'input'}
@@ -146,33 +205,68 @@ def get_embedding(client: AuthenticatedHttpClient, params: Dict[str, Any]) -> Di
     base_url = str(settings.AZURE_OPENAI_RESOURCE_ENDPOINT).rstrip('/')
     url = f"{base_url}/openai/deployments/{deployment_id}/embeddings?api-version={settings.AZURE_OPENAI_API_VERSION}"
 
-    payload: Dict[str, Any] = {"input": input_data}
-    if user_param: payload["user"] = user_param
-    if input_type_param: payload["input_type"] = input_type_param
+    texts: List[str] = [input_data] if isinstance(input_data, str) else list(input_data)
+    payload_options: Dict[str, Any] = {}
+    if input_type_param: payload_options["input_type"] = input_type_param
     # Otros parámetros como 'dimensions' pueden ser añadidos si la API los soporta.
     if params.get("dimensions") is not None and isinstance(params["dimensions"], int):
-        payload["dimensions"] = params["dimensions"]
+        payload_options["dimensions"] = params["dimensions"]
 
-
-    log_input_type_desc = "lista de strings" if isinstance(input_data, list) else "string"
-    logger.info(f"{action_name}: Generando Embeddings con Azure OpenAI, despliegue '{deployment_id}' para entrada tipo '{log_input_type_desc}'. Payload keys: {list(payload.keys())}")
-    
     openai_scope = settings.OPENAI_API_DEFAULT_SCOPE
     if not openai_scope:
          return {"status": "error", "action": action_name, "message": "Scope de Azure OpenAI no configurado.", "http_status": 500}
 
+    use_cache = params.get("use_cache", True)
+    namespace = _embedding_cache_namespace(deployment_id, payload_options)
+    keys = [_embedding_cache_key(text) for text in texts]
+    store = get_local_store(_EMBEDDING_CACHE_DB) if use_cache else None
+    vectors: Dict[str, List[float]] = store.get_many(namespace, keys) if store else {}
+
+    # Textos únicos que faltan en caché, en orden de aparición
+    pending: Dict[str, str] = {}
+    for key, text in zip(keys, texts):
+        if key not in vectors and key not in pending:
+            pending[key] = text
+
+    batch_size = max(1, min(int(params.get("batch_size", EMBEDDING_MAX_BATCH_SIZE)), EMBEDDING_MAX_BATCH_SIZE))
+    pending_items = list(pending.items())
+    usage = {"prompt_tokens": 0, "total_tokens": 0}
+    model_name = None
+    logger.info(f"{action_name}: {len(texts)} entradas, {len(texts) - len(pending_items)} en caché, "
+                f"{len(pending_items)} a generar en lotes de {batch_size} (despliegue '{deployment_id}').")
+
     try:
-        response = client.post(
-            url=url,
-            scope=openai_scope,
-            json_data=payload,
-            timeout=params.get("timeout", settings.DEFAULT_API_TIMEOUT)
-        )
-        response_data = response.json()
-        return {"status": "success", "data": response_data}
+        for start in range(0, len(pending_items), batch_size):
+            batch = pending_items[start:start + batch_size]
+            payload: Dict[str, Any] = {"input": [text for _, text in batch], **payload_options}
+            if user_param: payload["user"] = user_param
+            response = client.post(
+                url=url,
+                scope=openai_scope,
+                json_data=payload,
+                timeout=params.get("timeout", settings.DEFAULT_API_TIMEOUT)
+            )
+            response_data = response.json()
+            model_name = response_data.get("model", model_name)
+            for metric in usage:
+                usage[metric] += (response_data.get("usage") or {}).get(metric, 0)
+            new_vectors = {batch[item["index"]][0]: item["embedding"] for item in response_data.get("data", [])}
+            vectors.update(new_vectors)
+            if store:
+                store.set_many(namespace, new_vectors)
     except Exception as e:
         return _handle_openai_api_error(e, action_name, params)
 
+    response_data = {
+        "object": "list",
+        "data": [{"object": "embedding", "index": index, "embedding": vectors[key]} for index, key in enumerate(keys)],
+        "model": model_name or deployment_id,
+        "usage": usage,
+        "cache": {"hits": len(texts) - len(pending_items), "misses": len(pending_items),
+                  "requests": -(-len(pending_items) // batch_size)}
+    }
+    return {"status": "success", "data": response_data}
+
 def completion(client: AuthenticatedHttpClient, params: Dict[str, Any]) -> Dict[str, Any]:
     # Esta es para modelos de completion más antiguos (no chat).
     params = params or {}
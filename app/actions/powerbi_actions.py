@@ -1,15 +1,23 @@
 # app/actions/powerbi_actions.py
 import logging
 import requests # Usado directamente para las llamadas a Power BI API
+from requests.adapters import HTTPAdapter
 import json
-import time # Podría usarse para monitorear exportaciones, aunque no implementado actualmente
-from typing import Dict, List, Optional, Any
+import time
+import heapq
+import hashlib
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Any, Tuple, Union
 
 from azure.identity import ClientSecretCredential, CredentialUnavailableError # Para la autenticación de PBI
 
 from app.core.config import settings
 # AuthenticatedHttpClient no se usa aquí, pero se mantiene en la firma por consistencia con action_mapper
 from app.shared.helpers.http_client import AuthenticatedHttpClient 
+from app.shared.helpers.streaming import FileStream
 
 logger = logging.getLogger(__name__)
 
@@ -20,13 +28,60 @@ PBI_API_DEFAULT_SCOPE = settings.POWER_BI_DEFAULT_SCOPE
 # Timeout para llamadas a Power BI API
 PBI_API_CALL_TIMEOUT = max(settings.DEFAULT_API_TIMEOUT, 120) # Default más largo para PBI
 
+# Exportaciones (ExportToFile) gestionadas como jobs en segundo plano
+PBI_EXPORT_MEDIA_TYPES = {
+    "PDF": "application/pdf",
+    "PPTX": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+    "PNG": "image/png",
+}
+PBI_EXPORT_EXTENSION_MEDIA_TYPES = {"pdf": "application/pdf", "pptx": PBI_EXPORT_MEDIA_TYPES["PPTX"], "png": "image/png", "zip": "application/zip"}
+PBI_EXPORT_TERMINAL_STATES = ("Succeeded", "Failed", "TimedOut")
+PBI_EXPORT_DEFAULT_POLL_SECONDS = 5.0 # Si Power BI no envía Retry-After
+PBI_EXPORT_MAX_POLL_SECONDS = 60.0
+PBI_EXPORT_MAX_POLL_ERRORS = 5
+PBI_EXPORT_TIMEOUT_SECONDS = 60 * 60
+PBI_EXPORT_JOB_RETENTION_SECONDS = 24 * 60 * 60 # Power BI conserva el archivo unas 24 h
+PBI_EXPORT_MAX_WORKERS = 4 # Hilos para sondeos y subidas; la espera entre sondeos no ocupa hilos
+PBI_EXPORT_CHUNK_SIZE = 1024 * 1024
+PBI_EXPORT_UPLOAD_PART_SIZE = 16 * 327680 # 5 MiB, múltiplo de 320 KiB como exige Graph
+
+_pbi_export_jobs: Dict[str, Dict[str, Any]] = {}
+_pbi_export_lock = threading.Lock()
+_pbi_export_schedule: List[Tuple[float, str]] = []
+_pbi_export_wakeup = threading.Condition()
+_pbi_export_scheduler: Optional[threading.Thread] = None
+_pbi_export_executor = ThreadPoolExecutor(max_workers=PBI_EXPORT_MAX_WORKERS, thread_name_prefix="pbi-export")
+
+# Inventario del tenant
+PBI_INVENTORY_MAX_WORKERS = 8
+PBI_INVENTORY_MAX_WORKERS_LIMIT = 16
+PBI_INVENTORY_CACHE_TTL = 120 # segundos
+PBI_INVENTORY_REFRESH_TOP = 5 # refrescos recientes por dataset
+PBI_LIST_PAGE_SIZE = 5000
+PBI_LIST_MAX_PAGES = 200 # Tope de seguridad ante paginación que no avanza
+PBI_THROTTLE_MAX_RETRIES = 3
+
+_pbi_inventory_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+_pbi_inventory_lock = threading.Lock()
+_pbi_session: Optional[requests.Session] = None
+
 # --- Helper de Autenticación (Específico para Power BI API con Client Credentials) ---
-_pbi_credential_instance: Optional[ClientSecretCredential] = None
+# Tanto las credenciales como los tokens se reutilizan por (tenant, client, secreto):
+# get_token solo se llama cuando el token en caché está a menos de
+# PBI_TOKEN_REFRESH_MARGIN_SECONDS de expirar.
+PBI_TOKEN_REFRESH_MARGIN_SECONDS = 300
 
-def _get_powerbi_api_token(params_from_action: Optional[Dict[str, Any]] = None) -> str:
-    global _pbi_credential_instance
+_pbi_credentials: Dict[str, ClientSecretCredential] = {}
+_pbi_token_cache: Dict[str, Tuple[str, float]] = {} # clave -> (token, expires_on epoch)
+_pbi_token_lock = threading.Lock()
+
+def _pbi_credential_key(tenant_id: str, client_id: str, client_secret: str) -> str:
+    # El secreto entra solo como hash para no mantenerlo en claro en las claves
+    secret_hash = hashlib.sha256(str(client_secret).encode("utf-8")).hexdigest()[:16]
+    return f"{tenant_id}:{client_id}:{secret_hash}"
 
-    auth_override_params = params_from_action.get("auth_override") if params_from_action else {}
+def _get_powerbi_api_token(params_from_action: Optional[Dict[str, Any]] = None) -> str:
+    auth_override_params = (params_from_action.get("auth_override") if params_from_action else None) or {}
     
     # Leer credenciales desde settings (que a su vez las lee de variables de entorno)
     # o desde el override si se proporciona.
@@ -44,37 +99,37 @@ def _get_powerbi_api_token(params_from_action: Optional[Dict[str, Any]] = None)
         logger.critical(msg)
         raise ValueError(msg) # Este error debería ser capturado por _handle_pbi_api_error
 
-    # Recrear instancia si no existe o si los IDs han cambiado (improbable en este flujo si no hay override, pero robusto)
-    # Si hay auth_override, siempre se crea una nueva instancia para esas credenciales específicas.
-    current_credential_instance: ClientSecretCredential
-    if auth_override_params:
-        logger.info("Creando instancia de ClientSecretCredential para Power BI con credenciales de 'auth_override'.")
-        current_credential_instance = ClientSecretCredential(
-            tenant_id=str(tenant_id), client_id=str(client_id), client_secret=str(client_secret)
-        )
-    else: # Usar instancia global si no hay override
-        if _pbi_credential_instance is None or \
-           (_pbi_credential_instance._tenant_id != tenant_id or _pbi_credential_instance._client_id != client_id): # type: ignore
-            logger.info("Creando/Recreando instancia ClientSecretCredential global para Power BI API.")
-            _pbi_credential_instance = ClientSecretCredential(
-                tenant_id=str(tenant_id), client_id=str(client_id), client_secret=str(client_secret)
-            )
-        current_credential_instance = _pbi_credential_instance
-    
     if not PBI_API_DEFAULT_SCOPE or not PBI_API_DEFAULT_SCOPE[0]: # Scope debe estar definido
         raise ValueError("POWER_BI_DEFAULT_SCOPE no está configurado correctamente en settings.")
 
-    try:
-        logger.info(f"Solicitando token para Power BI API con scope: {PBI_API_DEFAULT_SCOPE[0]}")
-        token_credential = current_credential_instance.get_token(PBI_API_DEFAULT_SCOPE[0])
-        logger.info("Token para Power BI API obtenido exitosamente.")
+    cache_key = _pbi_credential_key(str(tenant_id), str(client_id), str(client_secret))
+    with _pbi_token_lock:
+        cached = _pbi_token_cache.get(cache_key)
+        if cached and cached[1] - PBI_TOKEN_REFRESH_MARGIN_SECONDS > time.time():
+            return cached[0]
+
+        credential = _pbi_credentials.get(cache_key)
+        if credential is None:
+            logger.info(f"Creando instancia ClientSecretCredential para Power BI API ({'auth_override' if auth_override_params else 'settings'}).")
+            credential = ClientSecretCredential(
+                tenant_id=str(tenant_id), client_id=str(client_id), client_secret=str(client_secret)
+            )
+            _pbi_credentials[cache_key] = credential
+
+        # Se solicita dentro del lock para que peticiones concurrentes no pidan varios tokens a la vez
+        try:
+            logger.info(f"Solicitando token para Power BI API con scope: {PBI_API_DEFAULT_SCOPE[0]}")
+            token_credential = credential.get_token(PBI_API_DEFAULT_SCOPE[0])
+            logger.info("Token para Power BI API obtenido exitosamente.")
+        except CredentialUnavailableError as cred_unavailable_err:
+            logger.critical(f"Credencial no disponible para obtener token Power BI: {cred_unavailable_err}", exc_info=True)
+            raise ConnectionAbortedError(f"Credencial para Power BI no disponible: {cred_unavailable_err}") from cred_unavailable_err
+        except Exception as token_err: # Captura cualquier otra excepción de get_token
+            logger.error(f"Error inesperado obteniendo token Power BI: {type(token_err).__name__} - {token_err}", exc_info=True)
+            raise ConnectionRefusedError(f"Error obteniendo token para Power BI: {token_err}") from token_err
+
+        _pbi_token_cache[cache_key] = (token_credential.token, float(token_credential.expires_on))
         return token_credential.token
-    except CredentialUnavailableError as cred_unavailable_err:
-        logger.critical(f"Credencial no disponible para obtener token Power BI: {cred_unavailable_err}", exc_info=True)
-        raise ConnectionAbortedError(f"Credencial para Power BI no disponible: {cred_unavailable_err}") from cred_unavailable_err
-    except Exception as token_err: # Captura cualquier otra excepción de get_token
-        logger.error(f"Error inesperado obteniendo token Power BI: {type(token_err).__name__} - {token_err}", exc_info=True)
-        raise ConnectionRefusedError(f"Error obteniendo token para Power BI: {token_err}") from token_err
 
 def _get_pbi_auth_headers(params_from_action: Optional[Dict[str, Any]] = None) -> Dict[str, str]:
     try:
@@ -160,43 +215,44 @@ def list_reports(client: Optional[AuthenticatedHttpClient], params: Dict[str, An
         return _handle_pbi_api_error(e, f"{action_name} en {log_owner_context}", params)
 
 def export_report(client: Optional[AuthenticatedHttpClient], params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Inicia un ExportToFile y lo registra como job gestionado: el estado se sondea en
+    segundo plano respetando Retry-After. Si se indica 'destination', el archivo
+    terminado se sube por partes a OneDrive/SharePoint sin pasar por la petición.
+    """
     params = params or {}
     action_name = "powerbi_export_report"
-    logger.info(f"Ejecutando {action_name} con params: {params}")
+    logger.info(f"Ejecutando {action_name} con params: { {k: v for k, v in params.items() if k != 'auth_override'} }")
 
     report_id: Optional[str] = params.get("report_id")
     workspace_id: Optional[str] = params.get("workspace_id") # Opcional, si el reporte no está en "My Workspace"
     export_format: str = params.get("format", "PDF").upper()
+    destination: Optional[Dict[str, Any]] = params.get("destination")
     
     if not report_id:
         return {"status": "error", "action": action_name, "message": "Parámetro 'report_id' es requerido.", "http_status": 400}
-    if export_format not in ["PDF", "PPTX", "PNG"]: # Otros formatos pueden existir, verificar docs.
+    if export_format not in PBI_EXPORT_MEDIA_TYPES: # Otros formatos pueden existir, verificar docs.
         return {"status": "error", "action": action_name, "message": "Parámetro 'format' debe ser PDF, PPTX, o PNG.", "http_status": 400}
+    if destination is not None:
+        destination_error = _validate_export_destination(destination, client)
+        if destination_error:
+            return {"status": "error", "action": action_name, "message": destination_error, "http_status": 400}
     
     try:
         pbi_headers = _get_pbi_auth_headers(params)
     except Exception as auth_err:
         return _handle_pbi_api_error(auth_err, action_name, params)
 
-    log_report_context: str
+    url = f"{_pbi_report_base_url(report_id, workspace_id)}/ExportToFile"
     if workspace_id:
-        url = f"{PBI_API_BASE_URL_MYORG}/groups/{workspace_id}/reports/{report_id}/ExportToFile"
         log_report_context = f"reporte '{report_id}' en workspace '{workspace_id}'"
     else:
-        url = f"{PBI_API_BASE_URL_MYORG}/reports/{report_id}/ExportToFile" # Para reportes en "My Workspace"
         log_report_context = f"reporte '{report_id}' (asumiendo 'My Workspace')"
         logger.warning(f"{action_name}: Exportando reporte '{report_id}' sin workspace_id. Se asume que está en 'My Workspace' del usuario efectivo de la App Principal.")
 
     # Payload para la API de ExportToFile
     # https://learn.microsoft.com/en-us/rest/api/power-bi/reports/export-to-file
     payload_export: Dict[str, Any] = {"format": export_format}
-    # Se pueden añadir configuraciones adicionales al payload, ej. para reportLevelFilters, specificPages, etc.
-    # page_name = params.get("page_name") # Para exportar una página específica
-    # if page_name: payload_export["powerBIReportConfiguration"] = {"pages": [{"pageName": page_name}]}
-    # visual_name = params.get("visual_name") # Para exportar un visual específico (más complejo)
-    # report_level_filters = params.get("report_level_filters") # Lista de filtros
-    # dataset_bindings = params.get("dataset_bindings") # Para cambiar la conexión del dataset
-
     if params.get("powerbi_report_configuration") and isinstance(params["powerbi_report_configuration"], dict):
         payload_export["powerBIReportConfiguration"] = params["powerbi_report_configuration"]
         logger.info(f"Aplicando 'powerbi_report_configuration' personalizado a la exportación.")
@@ -210,12 +266,17 @@ def export_report(client: Optional[AuthenticatedHttpClient], params: Dict[str, A
             export_job_details = response.json()
             export_id = export_job_details.get("id") # ID del trabajo de exportación
             logger.info(f"Exportación iniciada para {log_report_context}. Export Job ID: {export_id}. Estado actual: {export_job_details.get('status')}")
+            timeout_seconds = float(params.get("poll_timeout_seconds") or PBI_EXPORT_TIMEOUT_SECONDS)
+            job = _register_export_job(export_id, report_id, workspace_id, export_format, export_job_details,
+                                       params, client, destination, timeout_seconds)
+            _schedule_export_poll(export_id, _parse_retry_after(response))
             return {
                 "status": "pending", # Indicar que es una operación asíncrona
-                "message": "Exportación de reporte iniciada. Use 'export_id' para verificar el estado.",
+                "message": "Exportación de reporte iniciada. Use 'powerbi_get_export_status' con 'export_id' para seguir el progreso y 'powerbi_download_export' para descargar el archivo.",
                 "export_id": export_id, 
                 "report_id": report_id,
                 "current_status": export_job_details.get('status'), # Ej. "Running"
+                "job": _public_export_job(job),
                 "details": export_job_details, 
                 "http_status": 202
             }
@@ -227,6 +288,357 @@ def export_report(client: Optional[AuthenticatedHttpClient], params: Dict[str, A
     except Exception as e:
         return _handle_pbi_api_error(e, f"export_report para {log_report_context}", params)
 
+def get_export_status(client: Optional[AuthenticatedHttpClient], params: Dict[str, Any]) -> Dict[str, Any]:
+    """Estado de una exportación. Sin job registrado (p. ej. tras reiniciar) se consulta a Power BI directamente."""
+    params = params or {}
+    action_name = "powerbi_get_export_status"
+    export_id: Optional[str] = params.get("export_id")
+    if not export_id:
+        return {"status": "error", "action": action_name, "message": "Parámetro 'export_id' es requerido.", "http_status": 400}
+
+    with _pbi_export_lock:
+        job = _pbi_export_jobs.get(export_id)
+        if job is not None:
+            return {"status": "success", "data": _public_export_job(job)}
+
+    if not params.get("report_id"):
+        return {"status": "error", "action": action_name, "message": f"Exportación '{export_id}' no registrada en este proceso; indique 'report_id' (y 'workspace_id') para consultarla en Power BI.", "http_status": 404}
+    try:
+        state, _ = _fetch_export_state(params.get("report_id"), params.get("workspace_id"), export_id, params)
+        return {"status": "success", "data": state}
+    except Exception as e:
+        return _handle_pbi_api_error(e, action_name, params)
+
+def download_export(client: Optional[AuthenticatedHttpClient], params: Dict[str, Any]) -> Union[FileStream, Dict[str, Any]]:
+    """
+    Descarga el archivo de una exportación terminada. Sin 'destination' se devuelve en
+    streaming al llamador; con 'destination' se sube por partes a OneDrive/SharePoint.
+    """
+    params = params or {}
+    action_name = "powerbi_download_export"
+    export_id: Optional[str] = params.get("export_id")
+    destination: Optional[Dict[str, Any]] = params.get("destination")
+    if not export_id:
+        return {"status": "error", "action": action_name, "message": "Parámetro 'export_id' es requerido.", "http_status": 400}
+    if destination is not None:
+        destination_error = _validate_export_destination(destination, client)
+        if destination_error:
+            return {"status": "error", "action": action_name, "message": destination_error, "http_status": 400}
+
+    with _pbi_export_lock:
+        job = _pbi_export_jobs.get(export_id)
+        job_snapshot = dict(job) if job else None
+
+    try:
+        if job_snapshot is None:
+            if not params.get("report_id"):
+                return {"status": "error", "action": action_name, "message": f"Exportación '{export_id}' no registrada en este proceso; indique 'report_id' (y 'workspace_id').", "http_status": 404}
+            state, _ = _fetch_export_state(params.get("report_id"), params.get("workspace_id"), export_id, params)
+            job_snapshot = dict(state, _auth_params=_export_auth_params(params))
+
+        if job_snapshot.get("status") != "Succeeded":
+            return {
+                "status": "error", "action": action_name,
+                "message": f"La exportación '{export_id}' aún no está lista (estado: {job_snapshot.get('status')}).",
+                "details": {k: v for k, v in job_snapshot.items() if not k.startswith("_")},
+                "http_status": 409
+            }
+
+        if destination is not None:
+            delivered = _deliver_export_file(client, job_snapshot, destination)
+            return {"status": "success", "message": "Exportación subida al destino.", "data": delivered}
+
+        response = _open_export_file(job_snapshot)
+        size_header = response.headers.get("Content-Length")
+        return FileStream(
+            response.iter_content(chunk_size=PBI_EXPORT_CHUNK_SIZE),
+            media_type=_export_media_type(job_snapshot),
+            filename=_export_filename(job_snapshot),
+            size=int(size_header) if size_header and size_header.isdigit() else None,
+            on_close=response.close,
+        )
+    except Exception as e:
+        return _handle_pbi_api_error(e, action_name, params)
+
+# ---- Jobs de exportación gestionados ----
+# El sondeo no ocupa hilos mientras espera: un planificador mantiene un heap con la
+# próxima consulta de cada job y solo despacha al pool las que ya vencieron.
+
+def _pbi_report_base_url(report_id: str, workspace_id: Optional[str]) -> str:
+    if workspace_id:
+        return f"{PBI_API_BASE_URL_MYORG}/groups/{workspace_id}/reports/{report_id}"
+    return f"{PBI_API_BASE_URL_MYORG}/reports/{report_id}" # Para reportes en "My Workspace"
+
+def _parse_retry_after(response: Optional[requests.Response], default: float = PBI_EXPORT_DEFAULT_POLL_SECONDS) -> float:
+    value = response.headers.get("Retry-After") if response is not None else None
+    try:
+        seconds = float(value) if value is not None else default
+    except (TypeError, ValueError):
+        seconds = default
+    return min(max(seconds, 1.0), PBI_EXPORT_MAX_POLL_SECONDS)
+
+def _export_auth_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    # Solo se conserva lo necesario para renovar el token durante el sondeo
+    return {"auth_override": params["auth_override"]} if params.get("auth_override") else {}
+
+def _validate_export_destination(destination: Any, client: Optional[AuthenticatedHttpClient]) -> Optional[str]:
+    if not isinstance(destination, dict):
+        return "'destination' debe ser un objeto."
+    destination_type = str(destination.get("type", "")).lower()
+    if destination_type not in ("onedrive", "sharepoint"):
+        return "'destination.type' debe ser 'onedrive' o 'sharepoint'."
+    if destination_type == "onedrive" and not destination.get("user_id"):
+        return "'destination.user_id' es requerido para OneDrive."
+    if destination_type == "sharepoint" and not (destination.get("site_id") or destination.get("site_name")):
+        return "'destination.site_id' o 'destination.site_name' es requerido para SharePoint."
+    if client is None:
+        return "Se requiere un cliente de Microsoft Graph autenticado para subir la exportación."
+    return None
+
+def _register_export_job(export_id: str, report_id: str, workspace_id: Optional[str], export_format: str,
+                         details: Dict[str, Any], params: Dict[str, Any], client: Optional[AuthenticatedHttpClient],
+                         destination: Optional[Dict[str, Any]], timeout_seconds: float) -> Dict[str, Any]:
+    now = datetime.now(timezone.utc).isoformat()
+    job: Dict[str, Any] = {
+        "export_id": export_id,
+        "report_id": report_id,
+        "workspace_id": workspace_id,
+        "format": export_format,
+        "status": details.get("status", "NotStarted"),
+        "percent_complete": details.get("percentComplete", 0),
+        "report_name": details.get("reportName"),
+        "file_extension": details.get("resourceFileExtension"),
+        "expiration_time": details.get("expirationTime"),
+        "error": None,
+        "destination": {k: v for k, v in destination.items()} if destination else None,
+        "delivery": None,
+        "created_at": now,
+        "updated_at": now,
+        "_auth_params": _export_auth_params(params),
+        "_client": client,
+        "_deadline": time.monotonic() + timeout_seconds,
+        "_created": time.monotonic(),
+        "_poll_errors": 0,
+    }
+    with _pbi_export_lock:
+        _prune_export_jobs()
+        _pbi_export_jobs[export_id] = job
+    return job
+
+def _prune_export_jobs() -> None:
+    # Se llama con el lock tomado; descarta jobs terminados más antiguos que la retención
+    cutoff = time.monotonic() - PBI_EXPORT_JOB_RETENTION_SECONDS
+    for export_id in [k for k, j in _pbi_export_jobs.items() if j["status"] in PBI_EXPORT_TERMINAL_STATES and j["_created"] < cutoff]:
+        del _pbi_export_jobs[export_id]
+
+def _public_export_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in job.items() if not k.startswith("_")}
+
+def _update_export_job(export_id: str, **changes: Any) -> Optional[Dict[str, Any]]:
+    with _pbi_export_lock:
+        job = _pbi_export_jobs.get(export_id)
+        if job is None:
+            return None
+        job.update(changes)
+        job["updated_at"] = datetime.now(timezone.utc).isoformat()
+        return dict(job)
+
+def _schedule_export_poll(export_id: str, delay_seconds: float) -> None:
+    global _pbi_export_scheduler
+    with _pbi_export_wakeup:
+        heapq.heappush(_pbi_export_schedule, (time.monotonic() + delay_seconds, export_id))
+        if _pbi_export_scheduler is None or not _pbi_export_scheduler.is_alive():
+            _pbi_export_scheduler = threading.Thread(target=_export_scheduler_loop, name="pbi-export-scheduler", daemon=True)
+            _pbi_export_scheduler.start()
+        _pbi_export_wakeup.notify()
+
+def _export_scheduler_loop() -> None:
+    while True:
+        with _pbi_export_wakeup:
+            while not _pbi_export_schedule or _pbi_export_schedule[0][0] > time.monotonic():
+                timeout = _pbi_export_schedule[0][0] - time.monotonic() if _pbi_export_schedule else None
+                _pbi_export_wakeup.wait(timeout)
+            _, export_id = heapq.heappop(_pbi_export_schedule)
+        _pbi_export_executor.submit(_poll_export_job, export_id).add_done_callback(_log_export_poll_failure)
+
+def _log_export_poll_failure(future) -> None:
+    if future.exception() is not None:
+        logger.error(f"Error inesperado sondeando exportación Power BI: {future.exception()}", exc_info=future.exception())
+
+def _fetch_export_state(report_id: str, workspace_id: Optional[str], export_id: str,
+                        auth_params: Optional[Dict[str, Any]]) -> Tuple[Dict[str, Any], requests.Response]:
+    """GET /exports/{id}: devuelve el estado normalizado y la respuesta (para leer Retry-After)."""
+    headers = _get_pbi_auth_headers(auth_params)
+    response = requests.get(f"{_pbi_report_base_url(report_id, workspace_id)}/exports/{export_id}",
+                            headers=headers, timeout=PBI_API_CALL_TIMEOUT)
+    response.raise_for_status()
+    details = response.json()
+    state = {
+        "export_id": export_id,
+        "report_id": report_id,
+        "workspace_id": workspace_id,
+        "status": details.get("status"),
+        "percent_complete": details.get("percentComplete"),
+        "report_name": details.get("reportName"),
+        "file_extension": details.get("resourceFileExtension"),
+        "expiration_time": details.get("expirationTime"),
+    }
+    if details.get("status") == "Failed":
+        state["error"] = details.get("error") or "Power BI reportó la exportación como fallida."
+    return state, response
+
+def _poll_export_job(export_id: str) -> None:
+    with _pbi_export_lock:
+        job = _pbi_export_jobs.get(export_id)
+        job = dict(job) if job else None
+    if job is None or job["status"] in PBI_EXPORT_TERMINAL_STATES:
+        return
+    if time.monotonic() > job["_deadline"]:
+        logger.warning(f"Exportación Power BI '{export_id}' superó el tiempo máximo de sondeo.")
+        _update_export_job(export_id, status="TimedOut", error="La exportación no terminó dentro del tiempo máximo de sondeo.")
+        return
+
+    try:
+        state, response = _fetch_export_state(job["report_id"], job["workspace_id"], export_id, job["_auth_params"])
+    except Exception as e:
+        poll_errors = job["_poll_errors"] + 1
+        if poll_errors > PBI_EXPORT_MAX_POLL_ERRORS:
+            logger.error(f"Exportación Power BI '{export_id}': sondeo abandonado tras {poll_errors} errores: {e}")
+            _update_export_job(export_id, status="Failed", error=f"Error consultando el estado: {e}", _poll_errors=poll_errors)
+            return
+        # 429/5xx y errores de red: se reintenta respetando Retry-After si la respuesta lo trae
+        error_response = getattr(e, "response", None)
+        delay = _parse_retry_after(error_response, default=min(2 ** poll_errors, PBI_EXPORT_MAX_POLL_SECONDS))
+        logger.warning(f"Exportación Power BI '{export_id}': error de sondeo ({poll_errors}/{PBI_EXPORT_MAX_POLL_ERRORS}), reintento en {delay:.0f}s: {e}")
+        _update_export_job(export_id, _poll_errors=poll_errors)
+        _schedule_export_poll(export_id, delay)
+        return
+
+    changes = {k: v for k, v in state.items() if k not in ("export_id", "report_id", "workspace_id")}
+    updated = _update_export_job(export_id, _poll_errors=0, **changes)
+    if updated is None:
+        return
+    if state["status"] == "Succeeded":
+        logger.info(f"Exportación Power BI '{export_id}' completada ({updated.get('file_extension')}).")
+        if updated.get("destination"):
+            _update_export_job(export_id, delivery={"status": "uploading"})
+            try:
+                delivered = _deliver_export_file(updated["_client"], updated, updated["destination"])
+                _update_export_job(export_id, delivery={"status": "completed", **delivered})
+            except Exception as e:
+                logger.error(f"Exportación Power BI '{export_id}': fallo subiendo al destino: {e}", exc_info=True)
+                _update_export_job(export_id, delivery={"status": "failed", "error": f"{type(e).__name__}: {e}"})
+    elif state["status"] == "Failed":
+        logger.error(f"Exportación Power BI '{export_id}' fallida: {state.get('error')}")
+    else:
+        _schedule_export_poll(export_id, _parse_retry_after(response))
+
+def _export_media_type(job: Dict[str, Any]) -> str:
+    extension = (job.get("file_extension") or "").lower().lstrip(".")
+    return PBI_EXPORT_EXTENSION_MEDIA_TYPES.get(extension) or PBI_EXPORT_MEDIA_TYPES.get(job.get("format") or "", "application/octet-stream")
+
+def _export_filename(job: Dict[str, Any]) -> str:
+    extension = (job.get("file_extension") or f".{(job.get('format') or 'bin').lower()}")
+    base_name = job.get("report_name") or job.get("report_id") or "powerbi_export"
+    return f"{base_name}{extension if extension.startswith('.') else '.' + extension}"
+
+def _open_export_file(job: Dict[str, Any]) -> requests.Response:
+    """GET /exports/{id}/file con stream=True; el llamador debe cerrar la respuesta."""
+    headers = _get_pbi_auth_headers(job.get("_auth_params"))
+    url = f"{_pbi_report_base_url(job['report_id'], job.get('workspace_id'))}/exports/{job['export_id']}/file"
+    response = requests.get(url, headers=headers, stream=True, timeout=PBI_API_CALL_TIMEOUT)
+    try:
+        response.raise_for_status()
+    except Exception:
+        response.close()
+        raise
+    return response
+
+def _export_destination_item_endpoint(client: AuthenticatedHttpClient, destination: Dict[str, Any], filename: str) -> str:
+    """Endpoint 'root:/carpeta/archivo' (direccionamiento por path) del item destino."""
+    folder_path = str(destination.get("folder_path") or destination.get("ruta_destino_relativa") or "").strip("/")
+    target_path = f"{folder_path}/{filename}" if folder_path else filename
+    if str(destination.get("type")).lower() == "onedrive":
+        from app.actions.onedrive_actions import _get_od_user_item_by_path_endpoint
+        return _get_od_user_item_by_path_endpoint(destination["user_id"], target_path)
+    from app.actions.sharepoint_actions import _get_drive_id, _get_sp_item_endpoint_by_path, _obtener_site_id_sp
+    site_id = _obtener_site_id_sp(client, destination)
+    drive_id = _get_drive_id(client, site_id, destination.get("drive_id_or_name"))
+    return _get_sp_item_endpoint_by_path(site_id, drive_id, target_path)
+
+def _iter_upload_parts(chunks: Iterable[bytes], part_size: int) -> Iterable[bytes]:
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer.extend(chunk)
+        while len(buffer) >= part_size:
+            yield bytes(buffer[:part_size])
+            del buffer[:part_size]
+    if buffer:
+        yield bytes(buffer)
+
+def _deliver_export_file(client: AuthenticatedHttpClient, job: Dict[str, Any], destination: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Sube el archivo exportado a OneDrive/SharePoint con una sesión de carga de Graph,
+    leyendo la descarga de Power BI por partes. Si Power BI no informa Content-Length
+    se acumula en un archivo temporal para conocer el tamaño total.
+    """
+    filename = destination.get("filename") or _export_filename(job)
+    item_endpoint = _export_destination_item_endpoint(client, destination, filename)
+    files_rw_scope = getattr(settings, 'GRAPH_SCOPE_FILES_READ_WRITE_ALL', settings.GRAPH_API_DEFAULT_SCOPE)
+    conflict_behavior = destination.get("conflict_behavior", "rename")
+
+    response = _open_export_file(job)
+    spool = None
+    try:
+        size_header = response.headers.get("Content-Length")
+        chunks: Iterable[bytes] = response.iter_content(chunk_size=PBI_EXPORT_CHUNK_SIZE)
+        if size_header and size_header.isdigit():
+            total_size = int(size_header)
+        else:
+            spool = tempfile.SpooledTemporaryFile(max_size=PBI_EXPORT_UPLOAD_PART_SIZE)
+            for chunk in chunks:
+                spool.write(chunk)
+            total_size = spool.tell()
+            spool.seek(0)
+            chunks = iter(lambda: spool.read(PBI_EXPORT_CHUNK_SIZE), b"")
+
+        session_body = {"item": {"@microsoft.graph.conflictBehavior": conflict_behavior, "name": filename}}
+        session_response = client.post(f"{item_endpoint}:/createUploadSession", scope=files_rw_scope, json_data=session_body)
+        upload_url = session_response.json().get("uploadUrl")
+        if not upload_url:
+            raise ValueError("No se pudo obtener 'uploadUrl' de la sesión de carga.")
+
+        start_byte = 0
+        final_item: Optional[Dict[str, Any]] = None
+        for part in _iter_upload_parts(chunks, PBI_EXPORT_UPLOAD_PART_SIZE):
+            end_byte = start_byte + len(part) - 1
+            part_timeout = max(settings.DEFAULT_API_TIMEOUT, int(len(part) / (50 * 1024)) + 60)
+            part_response = requests.put(
+                upload_url, data=part,
+                headers={"Content-Length": str(len(part)), "Content-Range": f"bytes {start_byte}-{end_byte}/{total_size}"},
+                timeout=part_timeout
+            )
+            part_response.raise_for_status()
+            start_byte = end_byte + 1
+            if part_response.status_code in (200, 201):
+                final_item = part_response.json()
+        if start_byte != total_size:
+            raise ValueError(f"Tamaño subido ({start_byte}) distinto del esperado ({total_size}).")
+    finally:
+        response.close()
+        if spool is not None:
+            spool.close()
+
+    logger.info(f"Exportación Power BI '{job.get('export_id')}' subida a {destination.get('type')} como '{filename}' ({total_size} bytes).")
+    final_item = final_item or {}
+    return {
+        "destination_type": str(destination.get("type")).lower(),
+        "filename": filename,
+        "size_bytes": total_size,
+        "item_id": final_item.get("id"),
+        "web_url": final_item.get("webUrl"),
+    }
+
 
 # Funciones para dashboards y datasets (siguiendo el mismo patrón)
 def list_dashboards(client: Optional[AuthenticatedHttpClient], params: Dict[str, Any]) -> Dict[str, Any]:
@@ -347,11 +759,178 @@ def refresh_dataset(client: Optional[AuthenticatedHttpClient], params: Dict[str,
     except Exception as e:
         return _handle_pbi_api_error(e, f"refresh_dataset para {log_dataset_context}", params)
 
-# Las funciones "powerbi_listar_workspaces" y "powerbi_obtener_estado_refresco_dataset"
-# estaban comentadas en el action_mapper original. Si se necesitan, se pueden implementar:
-# - Listar Workspaces (Grupos): GET /groups
-# - Obtener Estado de Refresco: GET /groups/{groupId}/datasets/{datasetId}/refreshes (para ver historial y estado)
-#   o GET /groups/{groupId}/datasets/{datasetId}/refreshes/{refreshId} (para un refresco específico)
-# - Obtener estado de exportación: GET /groups/{groupId}/reports/{reportId}/exports/{exportId}
+# ---- Inventario del tenant (workspaces -> reports/datasets/historial de refrescos) ----
+
+def list_workspaces(client: Optional[AuthenticatedHttpClient], params: Dict[str, Any]) -> Dict[str, Any]:
+    params = params or {}
+    action_name = "powerbi_list_workspaces"
+    logger.info(f"Ejecutando {action_name}")
+    try:
+        pbi_headers = _get_pbi_auth_headers(params)
+        odata_params = {k: params[k] for k in ("$filter", "$top", "$skip") if params.get(k)}
+        if odata_params.get("$top"):
+            workspaces = _pbi_get_json(f"{PBI_API_BASE_URL_MYORG}/groups", pbi_headers, odata_params).get("value", [])
+        else:
+            workspaces = _pbi_list_all(f"{PBI_API_BASE_URL_MYORG}/groups", pbi_headers, odata_params)
+        return {"status": "success", "data": workspaces, "total": len(workspaces)}
+    except Exception as e:
+        return _handle_pbi_api_error(e, action_name, params)
+
+def get_tenant_inventory(client: Optional[AuthenticatedHttpClient], params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Recorre los workspaces accesibles y devuelve sus reports, datasets y el historial
+    reciente de refrescos. Las consultas por workspace/dataset se hacen en paralelo
+    (máximo 'max_workers') y el resultado se guarda en caché PBI_INVENTORY_CACHE_TTL segundos.
+    """
+    params = params or {}
+    action_name = "powerbi_get_tenant_inventory"
+    include = params.get("include") or ["reports", "datasets", "refresh_history"]
+    if isinstance(include, str):
+        include = [part.strip() for part in include.split(",") if part.strip()]
+    workspace_ids: Optional[List[str]] = params.get("workspace_ids")
+    refresh_top = int(params.get("refresh_history_top", PBI_INVENTORY_REFRESH_TOP))
+    max_workers = max(1, min(int(params.get("max_workers", PBI_INVENTORY_MAX_WORKERS)), PBI_INVENTORY_MAX_WORKERS_LIMIT))
+    logger.info(f"Ejecutando {action_name}: include={include}, workspaces={'todos' if not workspace_ids else len(workspace_ids)}, max_workers={max_workers}")
+
+    try:
+        pbi_headers = _get_pbi_auth_headers(params)
+    except Exception as auth_err:
+        return _handle_pbi_api_error(auth_err, action_name, params)
+
+    auth_scope = _pbi_credential_key(*_pbi_auth_identity(params))
+    cache_key = json.dumps([auth_scope, sorted(include), sorted(workspace_ids or []), refresh_top], sort_keys=True)
+    if params.get("use_cache", True):
+        with _pbi_inventory_lock:
+            cached = _pbi_inventory_cache.get(cache_key)
+        if cached and cached[0] > time.monotonic():
+            return dict(cached[1], cached=True)
+
+    started = time.monotonic()
+    errors: List[Dict[str, Any]] = []
+    try:
+        workspaces = _pbi_list_all(f"{PBI_API_BASE_URL_MYORG}/groups", pbi_headers, {})
+    except Exception as e:
+        return _handle_pbi_api_error(e, f"{action_name} (listado de workspaces)", params)
+    if workspace_ids:
+        wanted = set(workspace_ids)
+        workspaces = [ws for ws in workspaces if ws.get("id") in wanted]
+
+    inventory = [{"id": ws.get("id"), "name": ws.get("name"), "type": ws.get("type"), "reports": [], "datasets": []} for ws in workspaces]
+    by_id = {entry["id"]: entry for entry in inventory}
+
+    # Primera ola: reports y datasets de cada workspace
+    # El historial de refrescos cuelga de cada dataset, así que también requiere listarlos
+    tasks = [(ws_id, kind) for ws_id in by_id for kind in ("reports", "datasets") if kind in include or (kind == "datasets" and "refresh_history" in include)]
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pbi-inventory") as executor:
+        futures = {
+            executor.submit(_pbi_list_all, f"{PBI_API_BASE_URL_MYORG}/groups/{ws_id}/{kind}", pbi_headers, {}): (ws_id, kind)
+            for ws_id, kind in tasks
+        }
+        for future in as_completed(futures):
+            ws_id, kind = futures[future]
+            try:
+                by_id[ws_id][kind] = future.result()
+            except Exception as e:
+                errors.append({"workspace_id": ws_id, "resource": kind, "error": f"{type(e).__name__}: {e}"})
+
+        # Segunda ola: historial de refrescos de los datasets refrescables
+        if "refresh_history" in include:
+            refresh_futures = {}
+            for ws_id, entry in by_id.items():
+                for dataset in entry["datasets"]:
+                    if dataset.get("isRefreshable") is False:
+                        continue
+                    url = f"{PBI_API_BASE_URL_MYORG}/groups/{ws_id}/datasets/{dataset.get('id')}/refreshes"
+                    refresh_futures[executor.submit(_pbi_get_json, url, pbi_headers, {"$top": refresh_top})] = (ws_id, dataset)
+            for future in as_completed(refresh_futures):
+                ws_id, dataset = refresh_futures[future]
+                try:
+                    dataset["refresh_history"] = future.result().get("value", [])
+                except Exception as e:
+                    dataset["refresh_history"] = []
+                    errors.append({"workspace_id": ws_id, "dataset_id": dataset.get("id"), "resource": "refresh_history", "error": f"{type(e).__name__}: {e}"})
+
+    result = {
+        "status": "partial" if errors else "success",
+        "data": inventory,
+        "summary": {
+            "workspaces": len(inventory),
+            "reports": sum(len(entry.get("reports", [])) for entry in inventory),
+            "datasets": sum(len(entry.get("datasets", [])) for entry in inventory),
+            "elapsed_seconds": round(time.monotonic() - started, 2),
+        },
+        "errors": errors,
+        "cached": False,
+    }
+    logger.info(f"{action_name}: {result['summary']} ({len(errors)} errores)")
+    if not errors:
+        with _pbi_inventory_lock:
+            _pbi_inventory_cache[cache_key] = (time.monotonic() + PBI_INVENTORY_CACHE_TTL, result)
+    return result
+
+def clear_inventory_cache() -> None:
+    with _pbi_inventory_lock:
+        _pbi_inventory_cache.clear()
+
+def _pbi_auth_identity(params: Optional[Dict[str, Any]]) -> Tuple[str, str, str]:
+    auth_override_params = (params.get("auth_override") if params else None) or {}
+    return (
+        str(auth_override_params.get("pbi_tenant_id", settings.PBI_TENANT_ID)),
+        str(auth_override_params.get("pbi_client_id", settings.PBI_CLIENT_ID)),
+        str(auth_override_params.get("pbi_client_secret", settings.PBI_CLIENT_SECRET)),
+    )
+
+def _get_pbi_session() -> requests.Session:
+    global _pbi_session
+    if _pbi_session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=PBI_INVENTORY_MAX_WORKERS_LIMIT)
+        session.mount("https://", adapter)
+        _pbi_session = session
+    return _pbi_session
+
+def _pbi_get_json(url: str, headers: Dict[str, str], query: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """GET con sesión compartida; ante 429 espera lo indicado por Retry-After y reintenta."""
+    for attempt in range(PBI_THROTTLE_MAX_RETRIES + 1):
+        response = _get_pbi_session().get(url, headers=headers, params=query, timeout=PBI_API_CALL_TIMEOUT)
+        if response.status_code == 429 and attempt < PBI_THROTTLE_MAX_RETRIES:
+            delay = _parse_retry_after(response, default=float(2 ** attempt))
+            logger.warning(f"Power BI limitó la petición (429) a {url}; reintento en {delay:.0f}s.")
+            time.sleep(delay)
+            continue
+        response.raise_for_status()
+        return response.json()
+    return {}
+
+def _pbi_list_all(url: str, headers: Dict[str, str], query: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Lista completa: sigue @odata.nextLink si Power BI lo devuelve y, si no, pagina con $top/$skip.
+    Se detiene si una página repite el primer elemento de la anterior (el endpoint ignoró $skip)
+    o al llegar a PBI_LIST_MAX_PAGES páginas.
+    """
+    items: List[Dict[str, Any]] = []
+    skip = int(query.get("$skip", 0) or 0)
+    next_url: Optional[str] = None
+    previous_first: Optional[str] = None
+    for _ in range(PBI_LIST_MAX_PAGES):
+        if next_url:
+            data = _pbi_get_json(next_url, headers)
+        else:
+            data = _pbi_get_json(url, headers, dict(query, **{"$top": PBI_LIST_PAGE_SIZE, "$skip": skip}))
+        page = data.get("value", [])
+        if not page:
+            return items
+        first = page[0].get("id") or json.dumps(page[0], sort_keys=True, default=str)
+        if first == previous_first:
+            logger.warning(f"Power BI repitió la página anterior en {url}; se detiene la paginación.")
+            return items
+        previous_first = first
+        items.extend(page)
+        next_url = data.get("@odata.nextLink")
+        if not next_url and len(page) < PBI_LIST_PAGE_SIZE:
+            return items
+        skip += len(page)
+    logger.warning(f"Listado de {url} truncado tras {PBI_LIST_MAX_PAGES} páginas ({len(items)} elementos).")
+    return items
 
 # --- FIN DEL MÓDULO actions/powerbi_actions.py ---
\ No newline at end of file
@@ -5,9 +5,13 @@ Implementación completa de todas las acciones WhatsApp Business Cloud API
 
 import os
 import json
+import uuid
+import asyncio
 import logging
 import requests
+import threading
 import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from typing import Dict, Any, Optional, List
 from app.services.auth.whatsapp_auth import (
     get_whatsapp_client, 
@@ -15,6 +19,7 @@ from app.services.auth.whatsapp_auth import (
     format_whatsapp_message,
     WhatsAppAuthError
 )
+from app.shared.helpers.rate_limiter import TokenBucket, get_rate_limiter
 
 logger = logging.getLogger(__name__)
 
@@ -541,76 +546,186 @@ async def whatsapp_get_message_status(client, params: Dict[str, Any]) -> Dict[st
             "details": {}
         }
 
+# ----------------------------------------------------------------------------
+# Broadcast como job en segundo plano
+# ----------------------------------------------------------------------------
+# Los envíos se hacen en hilos (el cliente WhatsApp es síncrono), así que el event
+# loop nunca queda bloqueado. El ritmo lo marca un token bucket por número emisor
+# ajustado al tier de throughput de la Cloud API, y un 429 pausa a todos los hilos.
+
+WHATSAPP_THROUGHPUT_TIERS = {"standard": 80.0, "high": 1000.0}  # mensajes/segundo por número
+WHATSAPP_BROADCAST_MPS = float(os.getenv("WHATSAPP_BROADCAST_MPS", WHATSAPP_THROUGHPUT_TIERS[os.getenv("WHATSAPP_THROUGHPUT_TIER", "standard")]))
+WHATSAPP_BROADCAST_DEFAULT_CONCURRENCY = 8
+WHATSAPP_BROADCAST_MAX_CONCURRENCY = 32
+WHATSAPP_BROADCAST_MAX_RUNNING = 4  # broadcasts simultáneos por proceso
+WHATSAPP_BROADCAST_MAX_RETRIES = 3
+WHATSAPP_BROADCAST_RETENTION_SECONDS = 24 * 60 * 60
+
+_broadcast_jobs: Dict[str, Dict[str, Any]] = {}
+_broadcast_lock = threading.Lock()
+_broadcast_runner = ThreadPoolExecutor(max_workers=WHATSAPP_BROADCAST_MAX_RUNNING, thread_name_prefix="wa-broadcast")
+
+def _get_rate_limiter(phone_number_id: str) -> TokenBucket:
+    return get_rate_limiter(f"whatsapp:{phone_number_id}", WHATSAPP_BROADCAST_MPS)
+
+def _broadcast_summary(job: Dict[str, Any], include_results: bool = False, offset: int = 0, limit: Optional[int] = None) -> Dict[str, Any]:
+    summary = {k: v for k, v in job.items() if k != "results" and not k.startswith("_")}
+    elapsed = (job.get("finished_at") or time.time()) - job["started_at"] if job.get("started_at") else 0
+    summary["progress_pct"] = round(100.0 * job["processed"] / job["total_contacts"], 1) if job["total_contacts"] else 100.0
+    summary["throughput_mps"] = round(job["processed"] / elapsed, 2) if elapsed > 0 else 0.0
+    if include_results:
+        results = [r for r in job["results"] if r is not None]
+        summary["results"] = results[offset:offset + limit] if limit else results[offset:]
+    return summary
+
+def _send_broadcast_message(job: Dict[str, Any], index: int, phone: str, wa_client, limiters: List[TokenBucket]) -> None:
+    record: Dict[str, Any] = {"phone": phone}
+    try:
+        to = validate_phone_number(phone)
+        message_data = format_whatsapp_message(
+            "template",
+            template_name=job["template_name"],
+            lang=job["lang"],
+            components=job["_components"]
+        )
+        message_data["to"] = to
+        path = f"{wa_client.phone_number_id}/messages"
+        for attempt in range(WHATSAPP_BROADCAST_MAX_RETRIES + 1):
+            for limiter in limiters:
+                limiter.acquire()
+            if job["_cancel"].is_set():
+                return  # Cancelado mientras esperaba turno: no se envía ni se cuenta
+            send_result = wa_client.wa_post(path, message_data, "whatsapp_broadcast_segment")
+            retry_after = (send_result.get("details") or {}).get("retry_after") if send_result.get("status") != "success" else None
+            if retry_after is None or attempt >= WHATSAPP_BROADCAST_MAX_RETRIES:
+                break
+            try:
+                pause = float(retry_after)
+            except (TypeError, ValueError):
+                pause = 1.0
+            logger.warning(f"Broadcast {job['broadcast_id']}: rate limit de WhatsApp, pausando {pause:.1f}s")
+            limiters[0].block_for(pause)
+        record["status"] = send_result.get("status")
+        if send_result.get("status") == "success":
+            record["message_id"] = send_result.get("data", {}).get("messages", [{}])[0].get("id")
+        else:
+            record["error"] = send_result.get("message")
+    except Exception as e:
+        record["status"] = "error"
+        record["error"] = str(e)
+
+    with _broadcast_lock:
+        job["results"][index] = record
+        job["processed"] += 1
+        if record["status"] == "success":
+            job["successful_sends"] += 1
+        else:
+            job["failed_sends"] += 1
+
+def _run_broadcast(job: Dict[str, Any], to_list: List[str]) -> None:
+    with _broadcast_lock:
+        job["status"] = "running"
+        job["started_at"] = time.time()
+    try:
+        wa_client = get_whatsapp_client()
+        limiters = [_get_rate_limiter(wa_client.phone_number_id)]
+        if job["rate_limit_mps"] < WHATSAPP_BROADCAST_MPS:
+            limiters.append(TokenBucket(job["rate_limit_mps"]))
+
+        concurrency = job["concurrency"]
+        in_flight = set()
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=f"wa-send-{job['broadcast_id'][:8]}") as executor:
+            for index, phone in enumerate(to_list):
+                if job["_cancel"].is_set():
+                    break
+                # Se acota la cola para no crear miles de futures de golpe
+                if len(in_flight) >= concurrency * 2:
+                    _, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                in_flight.add(executor.submit(_send_broadcast_message, job, index, phone, wa_client, limiters))
+            wait(in_flight)
+        final_status = "cancelled" if job["_cancel"].is_set() else "completed"
+    except Exception as e:
+        logger.error(f"Error en broadcast {job['broadcast_id']}: {e}", exc_info=True)
+        final_status = "failed"
+        job["error"] = str(e)
+
+    with _broadcast_lock:
+        job["status"] = final_status
+        job["finished_at"] = time.time()
+    logger.info(f"Broadcast {job['broadcast_id']} {final_status}: {job['successful_sends']} enviados, {job['failed_sends']} fallidos de {job['total_contacts']}")
+
+def _prune_broadcast_jobs() -> None:
+    # Se llama con el lock tomado
+    cutoff = time.time() - WHATSAPP_BROADCAST_RETENTION_SECONDS
+    for broadcast_id in [k for k, j in _broadcast_jobs.items() if j.get("finished_at") and j["finished_at"] < cutoff]:
+        del _broadcast_jobs[broadcast_id]
+
 async def whatsapp_broadcast_segment(client, params: Dict[str, Any]) -> Dict[str, Any]:
-    """Envía template a lista de contactos con throttling"""
+    """
+    Envía un template a una lista de contactos como job en segundo plano.
+    Devuelve 'broadcast_id' de inmediato (consultar con whatsapp_get_broadcast_status);
+    con 'wait': true espera el resultado completo sin bloquear el event loop.
+    """
     try:
         to_list = params.get("to_list", [])
         template_name = params.get("template_name", "")
         lang = params.get("lang", os.getenv("WHATSAPP_DEFAULT_TEMPLATE_LANG", "es"))
         components = params.get("components", [])
-        batch_size = params.get("batch_size", 50)
-        delay_between_batches = params.get("delay_seconds", 5)
+        concurrency = int(params.get("concurrency", WHATSAPP_BROADCAST_DEFAULT_CONCURRENCY))
+        concurrency = max(1, min(concurrency, WHATSAPP_BROADCAST_MAX_CONCURRENCY))
+        messages_per_second = float(params.get("messages_per_second") or WHATSAPP_BROADCAST_MPS)
         
         if not to_list:
             return {"status": "error", "message": "Parámetro 'to_list' requerido"}
         if not template_name:
             return {"status": "error", "message": "Parámetro 'template_name' requerido"}
-        
-        wa_client = get_whatsapp_client()
-        
-        results = []
-        total_contacts = len(to_list)
-        successful_sends = 0
-        failed_sends = 0
-        
-        # Procesar en lotes
-        for i in range(0, total_contacts, batch_size):
-            batch = to_list[i:i + batch_size]
-            
-            for phone in batch:
-                try:
-                    # Enviar template individual
-                    send_result = await whatsapp_send_template(client, {
-                        "to": phone,
-                        "template_name": template_name,
-                        "lang": lang,
-                        "components": components
-                    })
-                    
-                    if send_result.get("status") == "success":
-                        successful_sends += 1
-                    else:
-                        failed_sends += 1
-                    
-                    results.append({
-                        "phone": phone,
-                        "status": send_result.get("status"),
-                        "message_id": send_result.get("data", {}).get("messages", [{}])[0].get("id")
-                    })
-                    
-                    # Pequeño delay entre mensajes individuales
-                    time.sleep(0.1)
-                    
-                except Exception as e:
-                    failed_sends += 1
-                    results.append({
-                        "phone": phone,
-                        "status": "error",
-                        "error": str(e)
-                    })
-            
-            # Delay entre lotes
-            if i + batch_size < total_contacts:
-                time.sleep(delay_between_batches)
-        
+        if messages_per_second <= 0:
+            return {"status": "error", "message": "Parámetro 'messages_per_second' debe ser mayor que 0"}
+
+        broadcast_id = str(uuid.uuid4())
+        job: Dict[str, Any] = {
+            "broadcast_id": broadcast_id,
+            "status": "queued",
+            "template_name": template_name,
+            "lang": lang,
+            "total_contacts": len(to_list),
+            "processed": 0,
+            "successful_sends": 0,
+            "failed_sends": 0,
+            "concurrency": concurrency,
+            "rate_limit_mps": min(messages_per_second, WHATSAPP_BROADCAST_MPS),
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "results": [None] * len(to_list),
+            "_components": components,
+            "_cancel": threading.Event(),
+        }
+        with _broadcast_lock:
+            _prune_broadcast_jobs()
+            _broadcast_jobs[broadcast_id] = job
+        future = _broadcast_runner.submit(_run_broadcast, job, list(to_list))
+        logger.info(f"Broadcast {broadcast_id} encolado: {len(to_list)} contactos, template '{template_name}', {job['rate_limit_mps']} msg/s, concurrencia {concurrency}")
+
+        if not params.get("wait"):
+            return {
+                "status": "success",
+                "action": "whatsapp_broadcast_segment",
+                "message": "Broadcast encolado. Consulte el progreso con 'whatsapp_get_broadcast_status'.",
+                "data": _broadcast_summary(job),
+                "http_status": 202
+            }
+
+        await asyncio.wrap_future(future)
         final_result = {
             "status": "success",
             "action": "whatsapp_broadcast_segment",
             "data": {
-                "total_contacts": total_contacts,
-                "successful_sends": successful_sends,
-                "failed_sends": failed_sends,
-                "results": results,
+                "broadcast_id": broadcast_id,
+                "total_contacts": job["total_contacts"],
+                "successful_sends": job["successful_sends"],
+                "failed_sends": job["failed_sends"],
+                "results": [r for r in job["results"] if r is not None],
                 "template_used": template_name
             }
         }
@@ -637,6 +752,31 @@ async def whatsapp_broadcast_segment(client, params: Dict[str, Any]) -> Dict[str
             "details": {}
         }
 
+async def whatsapp_get_broadcast_status(client, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Progreso de un broadcast; con 'include_results' añade los resultados por destinatario (paginables)."""
+    broadcast_id = params.get("broadcast_id", "")
+    with _broadcast_lock:
+        job = _broadcast_jobs.get(broadcast_id)
+        if job is None:
+            return {"status": "error", "action": "whatsapp_get_broadcast_status", "message": f"Broadcast '{broadcast_id}' no encontrado", "http_status": 404}
+        data = _broadcast_summary(
+            job,
+            include_results=bool(params.get("include_results")),
+            offset=int(params.get("offset", 0)),
+            limit=int(params["limit"]) if params.get("limit") else None
+        )
+    return {"status": "success", "action": "whatsapp_get_broadcast_status", "data": data}
+
+async def whatsapp_cancel_broadcast(client, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Detiene un broadcast en curso; los mensajes ya enviados no se revierten."""
+    broadcast_id = params.get("broadcast_id", "")
+    with _broadcast_lock:
+        job = _broadcast_jobs.get(broadcast_id)
+    if job is None:
+        return {"status": "error", "action": "whatsapp_cancel_broadcast", "message": f"Broadcast '{broadcast_id}' no encontrado", "http_status": 404}
+    job["_cancel"].set()
+    return {"status": "success", "action": "whatsapp_cancel_broadcast", "data": {"broadcast_id": broadcast_id, "status": job["status"], "processed": job["processed"]}}
+
 # ============================================================================
 # HANDOVER Y TICKETS
 # ============================================================================
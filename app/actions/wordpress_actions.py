@@ -1,10 +1,13 @@
 import requests, json, base64, logging
-from typing import Dict, Any, Optional, List  # ✅ Any disponible
+from typing import Dict, Any, Optional, List, Iterator, Iterable, Tuple, Callable  # ✅ Any disponible
 from datetime import datetime, timedelta
-import hashlib, time, os, random
+import hashlib, time, os, random, gzip, tempfile
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from urllib.parse import urljoin, quote
 from app.core.auth_manager import token_manager
 from app.core.config import settings  # ✅ IMPORT FALTANTE AGREGADO
+from app.shared.helpers.local_store import get_local_store
 # ✅ IMPORTACIÓN DIRECTA DEL RESOLVER PARA EVITAR CIRCULARIDAD
 def _get_resolver():
     from app.actions.resolver_actions import Resolver
@@ -18,12 +21,13 @@ _wp_sessions = {}
 _wp_cache = {}
 
 # Helper: HTTP request with retries (429/5xx)
-def _request_with_retries(method: str, url: str, request_params: Dict[str, Any], retries: int = 3, backoff_base: float = 0.5):
-    """Performs an HTTP request with exponential backoff on 429/5xx."""
+def _request_with_retries(method: str, url: str, request_params: Dict[str, Any], retries: int = 3, backoff_base: float = 0.5,
+                          session: Optional[requests.Session] = None):
+    """Performs an HTTP request with exponential backoff on 429/5xx (optionally over a pooled session)."""
     attempt = 0
     while True:
         try:
-            resp = requests.request(method, url, **request_params)
+            resp = (session or requests).request(method, url, **request_params)
             # Raise for HTTP errors
             resp.raise_for_status()
             return resp
@@ -254,6 +258,159 @@ def _make_wc_request(method: str, endpoint: str, params: Dict[str, Any],
         # Usar el handler de errores existente
         return _handle_wp_api_error(e, "woocommerce_request", params.get('site_url', ''))
 
+# === PAGINACIÓN COMPLETA DE COLECCIONES (WP REST / WOOCOMMERCE) ===
+
+WP_MAX_PER_PAGE = 100
+WP_COLLECTION_MAX_WORKERS = 8
+
+def _build_wp_request_context(params: Dict[str, Any], api: str = 'wp') -> Dict[str, Any]:
+    """
+    Resuelve una sola vez URL base, cabeceras de autenticación y sesión HTTP para
+    operaciones que hacen muchas llamadas seguidas (backups, lotes, iteradores).
+    api: 'wp' (wp/v2) o 'wc' (wc/v3).
+    """
+    if api == 'wc':
+        site_url = (params.get('site_url') or settings.WP_SITE_URL).rstrip('/')
+        auth_data = token_manager.get_wordpress_auth(site_url, 'woocommerce')
+        base_url = f"{site_url}/wp-json/wc/v3"
+        request_params = {'headers': auth_data['headers']}
+        if 'auth' in auth_data:
+            request_params['auth'] = auth_data['auth']
+    else:
+        credentials = _get_wp_credentials(params)
+        credentials['auth_mode'] = params.get('auth_mode') or 'jwt'
+        if not _validate_wp_credentials(credentials):
+            raise ValueError("Credenciales de WordPress incompletas o inválidas")
+        site_url = credentials['site_url'].rstrip('/')
+        base_url = f"{site_url}/wp-json/wp/v2"
+        request_params = {'headers': _get_wp_auth_headers(credentials, 'auto')}
+
+    request_params['timeout'] = params.get('timeout', 30)
+    request_params['verify'] = params.get('verify_ssl', True)
+    return _new_wp_context(site_url, base_url, request_params)
+
+def _new_wp_context(site_url: str, base_url: str, request_params: Dict[str, Any]) -> Dict[str, Any]:
+    """Crea el contexto de peticiones con una sesión HTTP cuyo pool cubre la concurrencia máxima."""
+    session = requests.Session()
+    pool_size = WP_COLLECTION_MAX_WORKERS * 2
+    session.mount('https://', HTTPAdapter(pool_connections=2, pool_maxsize=pool_size))
+    session.mount('http://', HTTPAdapter(pool_connections=2, pool_maxsize=pool_size))
+    return {'site_url': site_url, 'base_url': base_url, 'request_params': request_params, 'session': session}
+
+def _wp_context_request(ctx: Dict[str, Any], method: str, endpoint: str,
+                        data: Optional[Dict[str, Any]] = None, query_params: Optional[Dict[str, Any]] = None) -> Any:
+    """Petición individual reutilizando la autenticación y la sesión del contexto."""
+    request_params = dict(ctx['request_params'])
+    if data is not None:
+        request_params['json'] = data
+    if query_params:
+        request_params['params'] = query_params
+    response = _request_with_retries(method, f"{ctx['base_url']}/{endpoint.lstrip('/')}", request_params, session=ctx['session'])
+    return response.json() if response.content else {}
+
+def _fetch_collection_page(ctx: Dict[str, Any], endpoint: str, query: Dict[str, Any], page: int) -> Tuple[List[Dict[str, Any]], int, int]:
+    """Descarga una página de una colección y devuelve (items, total_pages, total_items)."""
+    request_params = dict(ctx['request_params'], params={**query, 'page': page})
+    response = _request_with_retries('GET', f"{ctx['base_url']}/{endpoint.lstrip('/')}", request_params, session=ctx['session'])
+    items = response.json() if response.content else []
+    total_pages = int(response.headers.get('X-WP-TotalPages', 1) or 1)
+    total_items = int(response.headers.get('X-WP-Total', len(items)) or 0)
+    return items, total_pages, total_items
+
+def _iter_wp_collection(ctx: Dict[str, Any], endpoint: str, query: Optional[Dict[str, Any]] = None,
+                        max_workers: int = 4, stats: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Itera todos los elementos de una colección REST paginada.
+
+    La primera página revela X-WP-TotalPages; el resto se descarga en paralelo con una
+    ventana deslizante (como máximo 2*max_workers páginas en vuelo), entregando los
+    elementos en orden de página para mantener la memoria acotada.
+    Si se pasa 'stats', se completa con total_pages/total_items.
+    """
+    query = {**(query or {}), 'per_page': WP_MAX_PER_PAGE}
+    items, total_pages, total_items = _fetch_collection_page(ctx, endpoint, query, 1)
+    if stats is not None:
+        stats.update({'total_pages': total_pages, 'total_items': total_items})
+    yield from items
+    if total_pages <= 1:
+        return
+
+    workers = max(1, min(max_workers, WP_COLLECTION_MAX_WORKERS))
+    window = workers * 2
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        next_page = 2
+        in_flight = []
+        while next_page <= total_pages or in_flight:
+            while next_page <= total_pages and len(in_flight) < window:
+                in_flight.append(pool.submit(_fetch_collection_page, ctx, endpoint, query, next_page))
+                next_page += 1
+            page_items, _, _ = in_flight.pop(0).result()
+            yield from page_items
+
+# === MOTOR DE OPERACIONES MASIVAS ===
+
+WP_BULK_DEFAULT_WORKERS = 4
+_WP_BULK_NAMESPACE = "wordpress_bulk_checksum"
+
+def _wp_content_checksum(data: Any) -> str:
+    """Checksum estable del contenido (independiente del orden de claves)."""
+    return hashlib.sha256(json.dumps(data, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')).hexdigest()
+
+def _run_wp_bulk(items: Iterable[Any], operation: Callable[[Any], Dict[str, Any]], max_workers: int = WP_BULK_DEFAULT_WORKERS,
+                 keep_results: bool = True) -> Dict[str, Any]:
+    """
+    Aplica 'operation' a cada item con concurrencia acotada. 'items' puede ser un iterador
+    perezoso (p. ej. _iter_wp_collection): solo hay 2*max_workers items en vuelo, así que
+    recorrer bibliotecas de decenas de miles de elementos no dispara la memoria.
+
+    'operation' devuelve {"status": "success"|"skipped", ...}; las excepciones se
+    registran por item sin abortar el lote.
+    """
+    workers = max(1, min(int(max_workers), WP_COLLECTION_MAX_WORKERS))
+    summary = {"total": 0, "succeeded": 0, "skipped": 0, "failed": 0}
+    results: List[Dict[str, Any]] = []
+
+    def _apply(index: int, item: Any) -> Dict[str, Any]:
+        try:
+            outcome = operation(item) or {}
+            return {"index": index, "status": outcome.pop("status", "success"), **outcome}
+        except Exception as e:
+            status_code = getattr(getattr(e, "response", None), "status_code", None)
+            logger.warning(f"Operación masiva WordPress falló en item {index}: {e}")
+            return {"index": index, "status": "error", "error": str(e), "http_status": status_code}
+
+    def _collect(outcome: Dict[str, Any]) -> None:
+        key = {"success": "succeeded", "skipped": "skipped"}.get(outcome["status"], "failed")
+        summary[key] += 1
+        if keep_results or key == "failed":
+            results.append(outcome)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        in_flight = []
+        for index, item in enumerate(items):
+            summary["total"] += 1
+            in_flight.append(pool.submit(_apply, index, item))
+            if len(in_flight) >= workers * 2:
+                _collect(in_flight.pop(0).result())
+        for future in in_flight:
+            _collect(future.result())
+
+    summary["results"] = results
+    return summary
+
+def _bulk_result(action_name: str, summary: Dict[str, Any], **extra: Any) -> Dict[str, Any]:
+    """Convierte el resumen del lote en la respuesta estándar de las acciones."""
+    if summary["failed"] and summary["failed"] == summary["total"]:
+        return {"status": "error", "action": action_name, "message": "Todas las operaciones del lote fallaron.",
+                "details": summary, "http_status": 502}
+    return {
+        "status": "partial" if summary["failed"] else "success",
+        "data": summary,
+        "action": action_name,
+        **extra,
+        "timestamp": datetime.now().isoformat()
+    }
+
 # === FUNCIONES PRINCIPALES (MANTIENEN ESTRUCTURA ORIGINAL) ===
 
 def wordpress_create_post(client, params: Dict[str, Any]) -> Dict[str, Any]:
@@ -337,6 +494,137 @@ def wordpress_update_post(client, params: Dict[str, Any]) -> Dict[str, Any]:
     except Exception as e:
         return _handle_wp_api_error(e, action_name, params.get('site_url', ''))
 
+_WP_POST_FIELDS = ['title', 'content', 'status', 'excerpt', 'author', 'categories', 'tags', 'featured_media', 'meta', 'slug', 'date']
+
+def wordpress_bulk_upsert_posts(client, params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Crea o actualiza muchos posts en paralelo.
+
+    Params:
+        posts: lista de dicts con los campos del post; con 'id' se actualiza, sin 'id' se crea
+            (si ya se creó antes uno con el mismo 'slug' desde aquí, se actualiza ese)
+        skip_unchanged: omitir posts cuyo contenido coincide con el último enviado y que nadie ha
+            modificado después en el sitio (se compara su modified_gmt remoto; default True)
+        max_workers: peticiones simultáneas (default 4)
+    Para lotes grandes, invocar con _async para ejecutarlo como job en segundo plano.
+    """
+    action_name = "wordpress_bulk_upsert_posts"
+
+    try:
+        posts = params.get('posts')
+        if not posts or not isinstance(posts, list):
+            raise ValueError("'posts' (lista de posts) es requerido")
+
+        ctx = _build_wp_request_context(params, 'wp')
+        store = get_local_store()
+        skip_unchanged = params.get('skip_unchanged', True)
+
+        def _prepare(post: Dict[str, Any]) -> Dict[str, Any]:
+            payload = {k: post[k] for k in _WP_POST_FIELDS if post.get(k) is not None}
+            post_id = post.get('id')
+            slug_key = f"{ctx['site_url']}:slug:{payload['slug']}" if payload.get('slug') else None
+            if not post_id and slug_key:
+                post_id = (store.get(_WP_BULK_NAMESPACE, slug_key) or {}).get('id')
+            return {"payload": payload, "checksum": _wp_content_checksum(payload), "id": post_id, "slug_key": slug_key}
+
+        def _remote_modified(post_ids: List[str]) -> Dict[str, Any]:
+            # modified_gmt actual de los posts candidatos a omitirse, en lotes de una página
+            modified: Dict[str, Any] = {}
+            for start in range(0, len(post_ids), WP_MAX_PER_PAGE):
+                query = {'include': ','.join(post_ids[start:start + WP_MAX_PER_PAGE]), 'status': 'any',
+                         'context': 'edit', '_fields': 'id,modified_gmt'}
+                for item in _iter_wp_collection(ctx, 'posts', query):
+                    modified[str(item.get('id'))] = item.get('modified_gmt')
+            return modified
+
+        def _upsert(prepared: Dict[str, Any]) -> Dict[str, Any]:
+            payload, post_id, slug_key = prepared['payload'], prepared['id'], prepared['slug_key']
+            if prepared.get('unchanged'):
+                return {"status": "skipped", "id": post_id, "reason": "unchanged"}
+
+            endpoint = f"posts/{post_id}" if post_id else 'posts'
+            response = _wp_context_request(ctx, 'POST', endpoint, data=payload)
+            post_id = response.get('id', post_id)
+            store.set(_WP_BULK_NAMESPACE, f"{ctx['site_url']}:post:{post_id}",
+                      {"checksum": prepared['checksum'], "modified_gmt": response.get('modified_gmt')})
+            if slug_key:
+                store.set(_WP_BULK_NAMESPACE, slug_key, {"id": post_id})
+            return {"status": "success", "id": post_id, "operation": "update" if endpoint != 'posts' else "create"}
+
+        try:
+            prepared_posts = [_prepare(post) for post in posts]
+            if skip_unchanged:
+                # Mismo contenido que el último envío: solo se omite si el post no se editó
+                # en el sitio desde entonces (p. ej. desde el panel de WordPress)
+                candidates: Dict[str, Dict[str, Any]] = {}
+                for prepared in prepared_posts:
+                    if not prepared['id']:
+                        continue
+                    previous = store.get(_WP_BULK_NAMESPACE, f"{ctx['site_url']}:post:{prepared['id']}")
+                    if isinstance(previous, dict) and previous.get('checksum') == prepared['checksum'] and previous.get('modified_gmt'):
+                        candidates.setdefault(str(prepared['id']), previous)
+                remote = _remote_modified(list(candidates)) if candidates else {}
+                for prepared in prepared_posts:
+                    previous = candidates.get(str(prepared['id']))
+                    prepared['unchanged'] = previous is not None and remote.get(str(prepared['id'])) == previous['modified_gmt']
+            summary = _run_wp_bulk(prepared_posts, _upsert, params.get('max_workers', WP_BULK_DEFAULT_WORKERS))
+        finally:
+            ctx['session'].close()
+        return _bulk_result(action_name, summary, site_url=ctx['site_url'])
+
+    except Exception as e:
+        return _handle_wp_api_error(e, action_name, params.get('site_url', ''))
+
+def wordpress_bulk_update_posts(client, params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Aplica los mismos cambios a todos los posts que cumplan un filtro, recorriendo
+    todas las páginas y actualizando en paralelo.
+
+    Params:
+        changes: dict de campos a fijar (title, content, status, categories, tags, meta...)
+        query: filtros del endpoint /posts (status, categories, search, author...; default status=any)
+        modified_after: fecha ISO; solo posts modificados después
+        max_workers: peticiones simultáneas (default 4)
+    Los posts que ya tienen esos valores se omiten sin escribir.
+    """
+    action_name = "wordpress_bulk_update_posts"
+
+    try:
+        changes = {k: v for k, v in (params.get('changes') or {}).items() if k in _WP_POST_FIELDS}
+        if not changes:
+            raise ValueError(f"'changes' es requerido (campos válidos: {_WP_POST_FIELDS})")
+
+        ctx = _build_wp_request_context(params, 'wp')
+        query = {'status': 'any', **(params.get('query') or {}), 'context': 'edit'}
+        if params.get('modified_after'):
+            query['modified_after'] = params['modified_after']
+
+        def _current_value(post: Dict[str, Any], field: str) -> Any:
+            value = post.get(field)
+            # Con context=edit los campos renderizados traen también el valor 'raw'
+            return value.get('raw') if isinstance(value, dict) and 'raw' in value else value
+
+        def _update(post: Dict[str, Any]) -> Dict[str, Any]:
+            pending = {k: v for k, v in changes.items() if _current_value(post, k) != v}
+            if not pending:
+                return {"status": "skipped", "id": post.get('id'), "reason": "unchanged"}
+            _wp_context_request(ctx, 'POST', f"posts/{post['id']}", data=pending)
+            return {"status": "success", "id": post.get('id'), "updated_fields": list(pending.keys())}
+
+        # Se materializa primero solo id + campos afectados: así el listado es ligero y la
+        # paginación no se desplaza cuando los cambios alteran el propio filtro (p. ej. status)
+        query['_fields'] = ','.join(['id', *changes.keys()])
+        try:
+            posts = list(_iter_wp_collection(ctx, 'posts', query))
+            summary = _run_wp_bulk(posts, _update, params.get('max_workers', WP_BULK_DEFAULT_WORKERS),
+                                   keep_results=params.get('include_results', True))
+        finally:
+            ctx['session'].close()
+        return _bulk_result(action_name, summary, site_url=ctx['site_url'])
+
+    except Exception as e:
+        return _handle_wp_api_error(e, action_name, params.get('site_url', ''))
+
 def wordpress_delete_post(client, params: Dict[str, Any]) -> Dict[str, Any]:
     """Elimina un post de WordPress."""
     action_name = "wordpress_delete_post"
@@ -710,56 +998,139 @@ def wordpress_get_tags(client, params: Dict[str, Any]) -> Dict[str, Any]:
     except Exception as e:
         return _handle_wp_api_error(e, action_name, params.get('site_url', ''))
 
+# Colecciones respaldables: tipo -> (api, endpoint, query base, soporta modified_after)
+WP_BACKUP_COLLECTIONS = {
+    'posts': ('wp', 'posts', {'status': 'any', 'context': 'edit'}, True),
+    'pages': ('wp', 'pages', {'status': 'any', 'context': 'edit'}, True),
+    'media': ('wp', 'media', {}, True),
+    'users': ('wp', 'users', {'context': 'edit'}, False),
+    'categories': ('wp', 'categories', {}, False),
+    'tags': ('wp', 'tags', {}, False),
+    'comments': ('wp', 'comments', {}, False),
+    'products': ('wc', 'products', {'status': 'any'}, True),
+    'orders': ('wc', 'orders', {}, True),
+    'customers': ('wc', 'customers', {}, False),
+    'coupons': ('wc', 'coupons', {}, True),
+}
+_WP_BACKUP_NAMESPACE = "wordpress_backup_watermark"
+# Campo de fecha de modificación con el mismo reloj que el filtro 'modified_after' de cada API:
+# WP lo compara con la hora local del sitio; WC, con 'dates_are_gmt=true', en GMT
+_WP_BACKUP_MODIFIED_FIELD = {'wp': 'modified', 'wc': 'date_modified_gmt'}
+
 def wordpress_backup_content(client, params: Dict[str, Any]) -> Dict[str, Any]:
-    """Realiza un backup de contenido de WordPress."""
+    """
+    Realiza un backup completo de contenido de WordPress/WooCommerce.
+
+    Recorre todas las páginas de cada colección (X-WP-TotalPages) con descargas en
+    paralelo y escribe cada registro como una línea JSON en un archivo .jsonl.gz,
+    sin mantener el contenido completo en memoria.
+
+    Params:
+        backup_types: colecciones a respaldar (ver WP_BACKUP_COLLECTIONS; default posts, pages, media, users, categories, tags)
+        modified_after: fecha ISO; solo registros modificados después (colecciones que lo soportan;
+            hora local del sitio en WordPress, GMT en WooCommerce)
+        incremental: True para usar como modified_after la marca del último backup exitoso de cada
+            colección (la fecha de modificación más reciente respaldada)
+        backup_path: directorio de destino (default: directorio temporal del sistema)
+        max_workers: páginas descargadas en paralelo por colección (default 4)
+    """
     action_name = "wordpress_backup_content"
+    contexts: Dict[str, Dict[str, Any]] = {}
     
     try:
-        backup_types = params.get('backup_types', ['posts', 'pages', 'users'])
-        backup_data = {}
-        
-        for backup_type in backup_types:
-            if backup_type == 'posts':
-                posts_result = wordpress_get_posts(client, {**params, 'per_page': 100})
-                if posts_result['status'] == 'success':
-                    backup_data['posts'] = posts_result['data']
-            
-            elif backup_type == 'pages':
-                pages_result = wordpress_get_pages(client, {**params, 'per_page': 100})
-                if pages_result['status'] == 'success':
-                    backup_data['pages'] = pages_result['data']
-            
-            elif backup_type == 'users':
-                users_result = wordpress_get_users(client, {**params, 'per_page': 100})
-                if users_result['status'] == 'success':
-                    backup_data['users'] = users_result['data']
-            
-            elif backup_type == 'categories':
-                categories_result = wordpress_get_categories(client, {**params, 'per_page': 100})
-                if categories_result['status'] == 'success':
-                    backup_data['categories'] = categories_result['data']
-        
-        # Guardar backup en archivo si se especifica
-        if params.get('save_to_file'):
-            backup_filename = f"wp_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-            backup_path = params.get('backup_path', '/tmp/') + backup_filename
-            
-            with open(backup_path, 'w', encoding='utf-8') as f:
-                json.dump(backup_data, f, indent=2, ensure_ascii=False)
-            
-            backup_data['backup_file'] = backup_path
-        
+        backup_types = params.get('backup_types', ['posts', 'pages', 'media', 'users', 'categories', 'tags'])
+        unknown = [t for t in backup_types if t not in WP_BACKUP_COLLECTIONS]
+        if unknown:
+            raise ValueError(f"Tipos de backup no soportados: {unknown}. Disponibles: {list(WP_BACKUP_COLLECTIONS.keys())}")
+
+        max_workers = int(params.get('max_workers', 4))
+        store = get_local_store()
+
+        backup_dir = params.get('backup_path') or tempfile.gettempdir()
+        os.makedirs(backup_dir, exist_ok=True)
+        run_started = datetime.utcnow().replace(microsecond=0)
+        backup_path = os.path.join(backup_dir, f"wp_backup_{run_started.strftime('%Y%m%d_%H%M%S')}.jsonl.gz")
+
+        counts: Dict[str, int] = {}
+        cutoffs: Dict[str, Optional[str]] = {}
+        errors: Dict[str, str] = {}
+
+        with gzip.open(backup_path, 'wt', encoding='utf-8') as archive:
+            for backup_type in backup_types:
+                api, endpoint, base_query, supports_modified = WP_BACKUP_COLLECTIONS[backup_type]
+                try:
+                    if api not in contexts:
+                        contexts[api] = _build_wp_request_context(params, api)
+                    ctx = contexts[api]
+                    watermark_key = f"{ctx['site_url']}:{backup_type}"
+
+                    modified_after = params.get('modified_after')
+                    if not modified_after and params.get('incremental'):
+                        modified_after = store.get(_WP_BACKUP_NAMESPACE, watermark_key)
+                    # Orden estable por id (WP y WC lo admiten en todas estas colecciones): con el
+                    # orden por fecha por defecto, un registro editado durante el recorrido cambia de
+                    # página y puede repetirse u omitirse entre páginas descargadas en paralelo
+                    query = {'orderby': 'id', 'order': 'asc', **base_query}
+                    if supports_modified and modified_after:
+                        query['modified_after'] = modified_after
+                        if api == 'wc':
+                            query['dates_are_gmt'] = 'true'
+                    cutoffs[backup_type] = query.get('modified_after')
+
+                    modified_field = _WP_BACKUP_MODIFIED_FIELD[api]
+                    latest_modified = None
+                    count = 0
+                    for item in _iter_wp_collection(ctx, endpoint, query, max_workers):
+                        archive.write(json.dumps({"type": backup_type, "item": item}, ensure_ascii=False) + "\n")
+                        count += 1
+                        modified = item.get(modified_field)
+                        if modified and (latest_modified is None or modified > latest_modified):
+                            latest_modified = modified
+                    counts[backup_type] = count
+                    # Solo se avanza la marca cuando la colección se respaldó completa, y con la
+                    # fecha del propio sitio (no el reloj de este servidor)
+                    if supports_modified and latest_modified:
+                        store.set(_WP_BACKUP_NAMESPACE, watermark_key, latest_modified)
+                except Exception as type_error:
+                    logger.error(f"Backup de '{backup_type}' falló: {type_error}")
+                    errors[backup_type] = str(type_error)
+
+            manifest = {
+                "type": "_manifest",
+                "item": {
+                    "created_at": run_started.isoformat() + "Z",
+                    "site_url": next(iter(contexts.values()))['site_url'] if contexts else params.get('site_url'),
+                    "counts": counts,
+                    "modified_after": cutoffs,
+                    "errors": errors
+                }
+            }
+            archive.write(json.dumps(manifest, ensure_ascii=False) + "\n")
+
+        if errors and not counts:
+            raise ValueError(f"Ninguna colección pudo respaldarse: {errors}")
+
         return {
-            "status": "success",
-            "data": backup_data,
+            "status": "success" if not errors else "partial",
+            "data": {
+                "backup_file": backup_path,
+                "format": "jsonl.gz",
+                "counts": counts,
+                "modified_after": cutoffs,
+                "errors": errors,
+                "size_bytes": os.path.getsize(backup_path)
+            },
             "action": action_name,
             "backup_types": backup_types,
-            "total_items": sum(len(v) if isinstance(v, list) else 1 for k, v in backup_data.items() if k != 'backup_file'),
+            "total_items": sum(counts.values()),
             "timestamp": datetime.now().isoformat()
         }
         
     except Exception as e:
         return _handle_wp_api_error(e, action_name, params.get('site_url', ''))
+    finally:
+        for ctx in contexts.values():
+            ctx['session'].close()
 
 # === FUNCIONES DE WOOCOMMERCE (OPTIMIZADAS) ===
 
@@ -1167,4 +1538,237 @@ def woocommerce_get_reports(client, params: Dict[str, Any]) -> Dict[str, Any]:
         }
         
     except Exception as e:
-        return _handle_wp_api_error(e, action_name, params.get('site_url', ''))
\ No newline at end of file
+        return _handle_wp_api_error(e, action_name, params.get('site_url', ''))
+
+# === WOOCOMMERCE: OPERACIONES POR LOTES Y CATÁLOGO CACHEADO ===
+
+WC_BATCH_SIZE = 100  # Límite de operaciones por llamada de los endpoints /batch
+WC_BATCH_DEFAULT_WORKERS = 2
+WC_CATALOG_CACHE_TTL = 120  # segundos
+
+def _wc_catalog_cache_key(site_url: str, query: Dict[str, Any]) -> str:
+    return f"wc_catalog:{site_url}:{json.dumps(query, sort_keys=True, default=str)}"
+
+def _invalidate_wc_catalog_cache(site_url: str) -> None:
+    """Descarta los listados de catálogo cacheados de un sitio tras escribir en él."""
+    prefix = f"wc_catalog:{site_url}:"
+    for key in [k for k in list(_wp_cache.keys()) if k.startswith(prefix)]:
+        _wp_cache.pop(key, None)
+
+def iter_woocommerce_catalog(params: Dict[str, Any], ctx: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Itera todos los productos del catálogo (todas las páginas, descargadas en paralelo).
+
+    El listado completo se guarda en caché durante 'cache_ttl' segundos (default
+    WC_CATALOG_CACHE_TTL) por sitio y filtro; use_cache=False fuerza la lectura remota.
+    Filtros opcionales: status, category, sku, search, fields (lista de campos a devolver).
+    """
+    own_ctx = ctx is None
+    ctx = ctx or _build_wp_request_context(params, 'wc')
+    try:
+        query = {'status': params.get('status', 'any')}
+        for key in ('category', 'sku', 'search', 'type', 'stock_status'):
+            if params.get(key) is not None:
+                query[key] = params[key]
+        if params.get('fields'):
+            query['_fields'] = ','.join(params['fields']) if isinstance(params['fields'], list) else params['fields']
+
+        cache_key = _wc_catalog_cache_key(ctx['site_url'], query)
+        cached = _wp_cache.get(cache_key)
+        if params.get('use_cache', True) and cached and cached[0] > time.time():
+            yield from cached[1]
+            return
+
+        products = []
+        for product in _iter_wp_collection(ctx, 'products', query, params.get('max_workers', 4)):
+            products.append(product)
+            yield product
+        ttl = params.get('cache_ttl', WC_CATALOG_CACHE_TTL)
+        if ttl:
+            _wp_cache[cache_key] = (time.time() + ttl, products)
+    finally:
+        if own_ctx:
+            ctx['session'].close()
+
+def _stream_woocommerce_catalog(params: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """
+    iter_woocommerce_catalog para respuestas en streaming: un fallo de la API se emite
+    como un último registro {"status": "error", ...}, ya que no puede convertirse en
+    respuesta HTTP.
+    """
+    try:
+        yield from iter_woocommerce_catalog(params)
+    except Exception as e:
+        yield _handle_wp_api_error(e, "woocommerce_get_catalog", params.get('site_url', ''))
+
+def woocommerce_get_catalog(client, params: Dict[str, Any]) -> Any:
+    """
+    Obtiene el catálogo completo de productos (todas las páginas) con caché de corta duración.
+
+    Params: status, category, sku, search, fields, use_cache, cache_ttl, max_workers.
+    Con stream=True devuelve un generador (la ruta /dynamics lo emite como NDJSON); si la
+    API falla, el último registro es el error.
+    """
+    action_name = "woocommerce_get_catalog"
+
+    if params.get('stream'):
+        return _stream_woocommerce_catalog(params)
+
+    try:
+        products = list(iter_woocommerce_catalog(params))
+        return {
+            "status": "success",
+            "data": products,
+            "action": action_name,
+            "total_products": len(products),
+            "timestamp": datetime.now().isoformat()
+        }
+
+    except Exception as e:
+        return _handle_wp_api_error(e, action_name, params.get('site_url', ''))
+
+def _wc_batch(ctx: Dict[str, Any], resource: str, operations: Dict[str, List[Any]],
+              max_workers: int = WC_BATCH_DEFAULT_WORKERS) -> Dict[str, Any]:
+    """
+    Envía create/update/delete a '{resource}/batch' en bloques de WC_BATCH_SIZE
+    operaciones, con varias llamadas en paralelo. WooCommerce devuelve los errores por
+    elemento dentro de la respuesta, así que se cuentan individualmente.
+    """
+    chunks: List[Dict[str, List[Any]]] = []
+    current: Dict[str, List[Any]] = {}
+    size = 0
+    for operation in ('create', 'update', 'delete'):
+        for item in operations.get(operation) or []:
+            current.setdefault(operation, []).append(item)
+            size += 1
+            if size == WC_BATCH_SIZE:
+                chunks.append(current)
+                current, size = {}, 0
+    if current:
+        chunks.append(current)
+
+    def _send(chunk: Dict[str, List[Any]]) -> Dict[str, Any]:
+        response = _wp_context_request(ctx, 'POST', f"{resource}/batch", data=chunk)
+        outcome = {"results": response, "errors": []}
+        for operation, items in (response or {}).items():
+            for item in items or []:
+                if isinstance(item, dict) and item.get('error'):
+                    outcome["errors"].append({"operation": operation, "id": item.get('id'), "error": item['error']})
+        return outcome
+
+    summary = {"requests": len(chunks), "created": [], "updated": [], "deleted": [], "errors": []}
+    workers = max(1, min(int(max_workers), WP_COLLECTION_MAX_WORKERS))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_send, chunk) for chunk in chunks]
+        for chunk, future in zip(chunks, futures):
+            try:
+                outcome = future.result()
+            except Exception as e:
+                logger.warning(f"Lote WooCommerce {resource}/batch falló: {e}")
+                summary["errors"].extend({"operation": op, "item": item, "error": str(e)}
+                                         for op, items in chunk.items() for item in items)
+                continue
+            summary["errors"].extend(outcome["errors"])
+            for operation, key in (('create', 'created'), ('update', 'updated'), ('delete', 'deleted')):
+                summary[key].extend(item.get('id') for item in outcome["results"].get(operation) or []
+                                    if isinstance(item, dict) and not item.get('error'))
+    return summary
+
+def _run_wc_batch_action(action_name: str, resource: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        operations = {op: params.get(op) or [] for op in ('create', 'update', 'delete')}
+        total = sum(len(items) for items in operations.values())
+        if not total:
+            raise ValueError("Se requiere al menos una lista 'create', 'update' o 'delete'")
+
+        ctx = _build_wp_request_context(params, 'wc')
+        try:
+            summary = _wc_batch(ctx, resource, operations, params.get('max_workers', WC_BATCH_DEFAULT_WORKERS))
+        finally:
+            ctx['session'].close()
+        if resource == 'products':
+            _invalidate_wc_catalog_cache(ctx['site_url'])
+
+        failed = len(summary["errors"])
+        if failed and failed == total:
+            return {"status": "error", "action": action_name, "message": "Todas las operaciones del lote fallaron.",
+                    "details": summary, "http_status": 502}
+        return {
+            "status": "partial" if failed else "success",
+            "data": summary,
+            "action": action_name,
+            "total_operations": total,
+            "timestamp": datetime.now().isoformat()
+        }
+
+    except Exception as e:
+        return _handle_wp_api_error(e, action_name, params.get('site_url', ''))
+
+def woocommerce_batch_products(client, params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Crea, actualiza y elimina productos en bloque vía /products/batch (100 por llamada).
+
+    Params: create (lista de productos), update (lista con 'id'), delete (lista de ids), max_workers.
+    """
+    return _run_wc_batch_action("woocommerce_batch_products", 'products', params)
+
+def woocommerce_batch_orders(client, params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Crea, actualiza y elimina pedidos en bloque vía /orders/batch (100 por llamada).
+
+    Params: create (lista de pedidos), update (lista con 'id'), delete (lista de ids), max_workers.
+    """
+    return _run_wc_batch_action("woocommerce_batch_orders", 'orders', params)
+
+def woocommerce_sync_products_by_sku(client, params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Sincroniza precios/inventario por SKU: resuelve SKU -> id con el catálogo cacheado
+    y envía solo los productos cuyos valores cambian, agrupados en lotes de 100.
+
+    Params:
+        updates: lista de {"sku": str, "regular_price"?, "sale_price"?, "stock_quantity"?, ...}
+        max_workers, use_cache
+    """
+    action_name = "woocommerce_sync_products_by_sku"
+
+    try:
+        updates = params.get('updates')
+        if not updates or not isinstance(updates, list):
+            raise ValueError("'updates' (lista de {sku, campos}) es requerido")
+
+        ctx = _build_wp_request_context(params, 'wc')
+        try:
+            fields = sorted({k for update in updates for k in update if k != 'sku'})
+            catalog_params = {**params, 'fields': ['id', 'sku', *fields]}
+            by_sku = {p.get('sku'): p for p in iter_woocommerce_catalog(catalog_params, ctx) if p.get('sku')}
+
+            batch_updates, unchanged, missing = [], [], []
+            for update in updates:
+                product = by_sku.get(update.get('sku'))
+                if not product:
+                    missing.append(update.get('sku'))
+                    continue
+                # La API devuelve precios como string: se compara en ese formato
+                changes = {k: v for k, v in update.items() if k != 'sku' and str(product.get(k)) != str(v)}
+                if changes:
+                    batch_updates.append({'id': product['id'], **changes})
+                else:
+                    unchanged.append(update.get('sku'))
+
+            summary = _wc_batch(ctx, 'products', {'update': batch_updates}, params.get('max_workers', WC_BATCH_DEFAULT_WORKERS))
+        finally:
+            ctx['session'].close()
+        if batch_updates:
+            _invalidate_wc_catalog_cache(ctx['site_url'])
+
+        summary.update({"unchanged": len(unchanged), "missing_skus": missing})
+        return {
+            "status": "partial" if summary["errors"] or missing else "success",
+            "data": summary,
+            "action": action_name,
+            "total_updates": len(batch_updates),
+            "timestamp": datetime.now().isoformat()
+        }
+
+    except Exception as e:
+        return _handle_wp_api_error(e, action_name, params.get('site_url', ''))
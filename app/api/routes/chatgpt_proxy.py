@@ -19,6 +19,8 @@ import re
 import os
 
 from app.core.action_mapper import ACTION_MAP
+from app.core.action_index import ActionIndex
+from app.shared.helpers.json_response import FastJSONResponse
 from app.core.auth_manager import get_current_user, AuthenticatedUser
 
 # Importación segura con fallback (similar a main.py)
@@ -86,6 +88,9 @@ NATURAL_LANGUAGE_MAP = {
     "estado sistema": "get_system_status"
 }
 
+# Índice invertido sobre nombres, descripciones y alias; se construye una sola vez
+ACTION_INDEX = ActionIndex(ACTION_MAP, aliases=NATURAL_LANGUAGE_MAP)
+
 async def process_chatgpt_query(query: str, params: dict) -> JSONResponse:
     """
     Función auxiliar para procesar queries de ChatGPT
@@ -97,29 +102,9 @@ async def process_chatgpt_query(query: str, params: dict) -> JSONResponse:
     try:
         logger.info(f"ChatGPT Query recibido: {query}")
         
-        # Buscar acción correspondiente
-        action_name = None
-        
-        # 1. Buscar coincidencia exacta en el mapa de lenguaje natural
-        for phrase, action in NATURAL_LANGUAGE_MAP.items():
-            if phrase in query:
-                action_name = action
-                break
-        
-        # 2. Si no encuentra, buscar palabras clave en las acciones disponibles
-        if not action_name:
-            query_words = query.split()
-            best_match = None
-            max_matches = 0
-            
-            for action in ACTION_MAP.keys():
-                matches = sum(1 for word in query_words if word in action.lower())
-                if matches > max_matches:
-                    max_matches = matches
-                    best_match = action
-            
-            if max_matches > 0:
-                action_name = best_match
+        # 1-2. Buscar en el índice (frases naturales, nombres y descripciones de acciones)
+        action_candidates = ACTION_INDEX.search(query, k=5)
+        action_name = action_candidates[0]["action"] if action_candidates else None
         
         # 3. Casos especiales y extracción de parámetros
         extracted_params = {}
@@ -127,7 +112,7 @@ async def process_chatgpt_query(query: str, params: dict) -> JSONResponse:
         if not action_name:
             if "listar" in query or "mostrar" in query:
                 if "acciones" in query:
-                    return JSONResponse({
+                    return FastJSONResponse({
                         "status": "success",
                         "data": {
                             "total_actions": len(ACTION_MAP),
@@ -142,7 +127,7 @@ async def process_chatgpt_query(query: str, params: dict) -> JSONResponse:
                     action_name = "list_workflows"
                 
             elif "ayuda" in query or "help" in query:
-                return JSONResponse({
+                return FastJSONResponse({
                     "status": "success", 
                     "data": {
                         "message": "Sistema ChatGPT Proxy para Elite Dynamics",
@@ -180,7 +165,7 @@ async def process_chatgpt_query(query: str, params: dict) -> JSONResponse:
         
         # 4. Si aún no encuentra acción, dar sugerencias
         if not action_name:
-            return JSONResponse({
+            return FastJSONResponse({
                 "status": "error",
                 "message": f"No se pudo interpretar: '{query}'",
                 "suggestions": [
@@ -189,12 +174,13 @@ async def process_chatgpt_query(query: str, params: dict) -> JSONResponse:
                     "guardar memoria",
                     "mostrar acciones"
                 ],
+                "action_candidates": action_candidates,
                 "chatgpt_friendly": True
             })
         
         # 5. Ejecutar la acción encontrada
         if action_name not in ACTION_MAP:
-            return JSONResponse({
+            return FastJSONResponse({
                 "status": "error",
                 "message": f"Acción '{action_name}' no encontrada en el sistema",
                 "chatgpt_friendly": True
@@ -232,23 +218,25 @@ async def process_chatgpt_query(query: str, params: dict) -> JSONResponse:
                 if result.get("status") != "error":
                     result["query_original"] = query
                     result["action_executed"] = action_name
+                    result["action_candidates"] = action_candidates
                     result["chatgpt_friendly"] = True
                     result["session_id"] = session_id
                 
-                return JSONResponse(result)
+                return FastJSONResponse(result)
             else:
-                return JSONResponse({
+                return FastJSONResponse({
                     "status": "success",
                     "data": result,
                     "query_original": query,
                     "action_executed": action_name,
+                    "action_candidates": action_candidates,
                     "chatgpt_friendly": True,
                     "session_id": session_id
                 })
         
         except Exception as e:
             logger.error(f"Error ejecutando acción {action_name}: {e}")
-            return JSONResponse({
+            return FastJSONResponse({
                 "status": "error",
                 "message": f"Error ejecutando '{action_name}': {str(e)}",
                 "action_attempted": action_name,
@@ -257,7 +245,7 @@ async def process_chatgpt_query(query: str, params: dict) -> JSONResponse:
     
     except Exception as e:
         logger.error(f"Error general en proceso ChatGPT: {e}")
-        return JSONResponse({
+        return FastJSONResponse({
             "status": "error",
             "message": f"Error procesando query: {str(e)}",
             "chatgpt_friendly": True
@@ -270,7 +258,7 @@ async def chatgpt_proxy_get(query: str):
     """
     try:
         if not query or not str(query).strip():
-            return JSONResponse({
+            return FastJSONResponse({
                 "status": "error",
                 "message": "Se requiere un parámetro 'query'",
                 "example": "GET /api/v1/chatgpt?query=listar workflows"
@@ -282,7 +270,7 @@ async def chatgpt_proxy_get(query: str):
         
     except Exception as e:
         logger.error(f"Error en ChatGPT GET proxy: {e}")
-        return JSONResponse({
+        return FastJSONResponse({
             "status": "error",
             "message": f"Error procesando query: {str(e)}",
             "chatgpt_friendly": True
@@ -333,7 +321,7 @@ async def chatgpt_proxy_post(request: Request, current_user: AuthenticatedUser =
 
         # Validación: debe existir query (derivada o explícita)
         if not query or not str(query).strip():
-            return JSONResponse({
+            return FastJSONResponse({
                 "status": "error",
                 "message": "Formato no reconocido. Envíe 'message' (modo libre) o 'query' (modo tradicional).",
                 "example": {
@@ -349,7 +337,7 @@ async def chatgpt_proxy_post(request: Request, current_user: AuthenticatedUser =
         
     except Exception as e:
         logger.error(f"Error en ChatGPT POST proxy: {e}")
-        return JSONResponse({
+        return FastJSONResponse({
             "status": "error",
             "message": f"Error procesando query: {str(e)}",
             "chatgpt_friendly": True
@@ -358,7 +346,7 @@ async def chatgpt_proxy_post(request: Request, current_user: AuthenticatedUser =
 @router.get("/chatgpt/help")
 async def chatgpt_help():
     """Endpoint de ayuda para ChatGPT"""
-    return JSONResponse({
+    return FastJSONResponse({
         "status": "success",
         "data": {
             "title": "ChatGPT Proxy - Elite Dynamics API",
@@ -385,7 +373,7 @@ async def chatgpt_help():
 @router.get("/chatgpt/actions")
 async def chatgpt_actions():
     """Lista todas las acciones disponibles"""
-    return JSONResponse({
+    return FastJSONResponse({
         "status": "success",
         "data": {
             "total_actions": len(ACTION_MAP),
@@ -7,6 +7,8 @@ from azure.core.exceptions import ClientAuthenticationError
 from typing import Any, Optional, Union, Sequence
 from uuid import uuid4
 from datetime import datetime, timezone
+import asyncio
+import inspect
 import os
 
 from app.api.schemas import ActionRequest, ErrorResponse 
@@ -31,6 +33,9 @@ except Exception as e:
     settings = _FallbackSettings()
 
 from app.shared.helpers.http_client import AuthenticatedHttpClient # <--- LÍNEA CONFIRMADA Y NECESARIA
+from app.shared.helpers.json_response import FastJSONResponse
+from app.shared.helpers.projection import apply_pushdown, is_projection_error, project_result, requested_fields
+from app.shared.helpers.streaming import FileStream, file_stream_response, is_stream_result, streaming_response
 
 router = APIRouter()
 
@@ -49,11 +54,40 @@ def _job_record(status: str, result: Optional[Any] = None, error: Optional[str]
         rec["error"] = error
     return rec
 
-def _run_action_and_store(job_id: str, action_fn, http_client, params: dict):
+def _retry_without_pushdown(result: Any, pushed_down: dict, params: dict) -> bool:
+    """
+    Si Graph rechazó la selección empujada (propiedad inexistente en $select/$expand),
+    la quita de params y devuelve True para repetir la llamada; el recorte se hace aquí.
+    Otros errores 400 no se reintentan: la acción podría tener efectos secundarios.
+    """
+    if not pushed_down or not is_projection_error(result):
+        return False
+    for key in pushed_down:
+        params.pop(key, None)
+    return True
+
+def _run_action_and_store(job_id: str, action_fn, http_client, params: dict,
+                          fields: Optional[list] = None, pushed_down: Optional[dict] = None):
     try:
         JOBS[job_id] = _job_record("running")
         res = action_fn(http_client, params)
+        # Las acciones async (p. ej. WhatsApp) se ejecutan en el loop propio de este hilo
+        if inspect.isawaitable(res):
+            res = asyncio.run(res)
+        if _retry_without_pushdown(res, pushed_down or {}, params):
+            res = action_fn(http_client, params)
+            if inspect.isawaitable(res):
+                res = asyncio.run(res)
+        if fields and isinstance(res, dict) and res.get("status") != "error":
+            res = project_result(res, fields)
+        # Las acciones en modo streaming devuelven generadores: en un job se materializan
+        if inspect.isgenerator(res):
+            res = list(res)
         # Normalizamos tipos de resultado a algo serializable cuando es dict/str
+        if isinstance(res, FileStream):
+            # Una descarga en streaming no se guarda en memoria dentro del job
+            res.close()
+            res = {"info": "Resultado binario en streaming. Ejecute la acción sin _async para descargarlo."}
         if isinstance(res, (dict, list, str, int, float, bool)) or res is None:
             JOBS[job_id] = _job_record("succeeded", result=res)
         else:
@@ -94,7 +128,7 @@ def create_error_response(
         graph_error_code=graph_error_code 
     ).model_dump(exclude_none=True) 
     
-    return JSONResponse(status_code=status_code, content=error_content)
+    return FastJSONResponse(status_code=status_code, content=error_content)
 
 @router.post(
     "/dynamics", 
@@ -125,6 +159,8 @@ async def process_dynamic_action(
         "_async": bool(action_request.params.pop("_async", False)),
         "_continue": action_request.params.pop("_continue", None),
         "_session_id": action_request.params.pop("_session_id", None),
+        # Proyección de campos: 'fields' en el cuerpo, o '_fields' en params
+        "_fields": requested_fields(action_request.params, action_request.fields),
     }
 
     action_name = action_request.action
@@ -196,13 +232,19 @@ async def process_dynamic_action(
             message=f"La acción '{action_name}' no es válida o no está implementada en el backend."
         )
 
+    # Si la acción admite selección nativa ($select de Graph), el origen solo envía los campos pedidos
+    requested = orchestration_flags["_fields"]
+    pushed_down = apply_pushdown(action_function, params_req, requested) if requested else {}
+    if pushed_down:
+        logger.info(f"{logging_prefix} Proyección empujada al origen: {pushed_down}")
+
     # Modo asíncrono opcional: si el cliente pide _async, devolvemos 202 + job_id
     if orchestration_flags["_async"]:
         job_id = str(uuid4())
         JOBS[job_id] = _job_record("queued")
-        background_tasks.add_task(_run_action_and_store, job_id, action_function, auth_http_client, params_req)
+        background_tasks.add_task(_run_action_and_store, job_id, action_function, auth_http_client, params_req, requested, pushed_down)
         logger.info(f"{logging_prefix} Acción encolada como job {job_id}")
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=http_status_codes.HTTP_202_ACCEPTED,
             content={
                 "status": "accepted",
@@ -216,8 +258,21 @@ async def process_dynamic_action(
     
     try:
         result = action_function(auth_http_client, params_req)
+        if inspect.isawaitable(result):
+            result = await result
+
+        # Un campo pedido que no es propiedad del recurso hace fallar el $select en Graph (400)
+        if _retry_without_pushdown(result, pushed_down, params_req):
+            logger.warning(f"{logging_prefix} El origen rechazó la proyección {pushed_down}; reintentando sin ella.")
+            result = action_function(auth_http_client, params_req)
+            if inspect.isawaitable(result):
+                result = await result
 
-        if isinstance(result, bytes):
+        if isinstance(result, FileStream):
+            logger.info(f"{logging_prefix} Acción devolvió un archivo en streaming ({result.media_type}, {result.size or 'tamaño desconocido'} bytes).")
+            return file_stream_response(result)
+
+        elif isinstance(result, bytes):
             logger.info(f"{logging_prefix} Acción devolvió datos binarios ({len(result)} bytes).")
             media_type = "application/octet-stream" 
             content_disposition = "attachment"
@@ -254,6 +309,10 @@ async def process_dynamic_action(
             logger.info(f"{logging_prefix} Acción devolvió CSV como string ({len(result)} chars).")
             return Response(content=result, media_type="text/csv", headers={"Content-Disposition": "attachment; filename=memory_export.csv"})
 
+        elif is_stream_result(result):
+            logger.info(f"{logging_prefix} Acción devolvió un iterador; respondiendo en streaming (SSE/NDJSON).")
+            return streaming_response(result, request)
+
         elif isinstance(result, dict):
             if result.get("status") == "error":
                 error_status_code = result.get("http_status", http_status_codes.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -275,8 +334,10 @@ async def process_dynamic_action(
                 if not (200 <= success_status_code < 300):
                     logger.warning(f"{logging_prefix} Acción devolvió status de éxito pero con http_status de error/redirect ({success_status_code}). Usando 200 OK.")
                     success_status_code = http_status_codes.HTTP_200_OK
-                
-                return JSONResponse(status_code=success_status_code, content=result)
+
+                if requested:
+                    result = project_result(result, requested)
+                return FastJSONResponse(status_code=success_status_code, content=result)
         else: 
             logger.error(f"{logging_prefix} La acción devolvió un tipo de resultado inesperado: {type(result)}. Resultado: {str(result)[:200]}...")
             return create_error_response(
@@ -306,5 +367,5 @@ async def process_dynamic_action(
 async def get_job_status(job_id: str):
     rec = JOBS.get(job_id)
     if not rec:
-        return JSONResponse(status_code=http_status_codes.HTTP_404_NOT_FOUND, content={"status": "error", "message": "Job no encontrado."})
-    return JSONResponse(status_code=http_status_codes.HTTP_200_OK, content=rec)
\ No newline at end of file
+        return FastJSONResponse(status_code=http_status_codes.HTTP_404_NOT_FOUND, content={"status": "error", "message": "Job no encontrado."})
+    return FastJSONResponse(status_code=http_status_codes.HTTP_200_OK, content=rec)
\ No newline at end of file
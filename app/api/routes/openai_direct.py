@@ -5,7 +5,6 @@ Bypasea todos los validadores y procesadores problemáticos
 """
 import logging
 from fastapi import APIRouter, Request, HTTPException
-from fastapi.responses import JSONResponse
 from typing import Any, Dict, Optional
 from datetime import datetime
 import json
@@ -13,6 +12,9 @@ import json
 # Importar lo esencial
 from app.core.action_mapper import ACTION_MAP, get_all_actions
 from app.shared.helpers.http_client import AuthenticatedHttpClient
+from app.shared.helpers.streaming import is_stream_result, streaming_response
+from app.shared.helpers.cached_response import BUILD_TIMESTAMP, cached_document, document_response
+from app.shared.helpers.json_response import FastJSONResponse
 from azure.identity import DefaultAzureCredential
 
 logger = logging.getLogger(__name__)
@@ -31,7 +33,7 @@ async def openai_direct_action(request: Request):
         try:
             body = json.loads(raw_body.decode('utf-8'))
         except:
-            return JSONResponse(
+            return FastJSONResponse(
                 status_code=400,
                 content={
                     "status": "error", 
@@ -104,7 +106,7 @@ async def openai_direct_action(request: Request):
                 '{"function_name": "action_name", "arguments": {"param1": "value1"}}',
                 '{"message": "action_name", "param1": "value1"}'
             ]
-            return JSONResponse(
+            return FastJSONResponse(
                 status_code=400,
                 content={
                     "status": "error",
@@ -130,7 +132,7 @@ async def openai_direct_action(request: Request):
         
         # Verificar si la acción existe
         if action not in all_actions:
-            return JSONResponse(
+            return FastJSONResponse(
                 status_code=404,
                 content={
                     "status": "error",
@@ -150,7 +152,7 @@ async def openai_direct_action(request: Request):
             auth_client = AuthenticatedHttpClient(credential=credential)
         except Exception as auth_error:
             logger.error(f"Authentication error: {auth_error}")
-            return JSONResponse(
+            return FastJSONResponse(
                 status_code=500,
                 content={
                     "status": "error",
@@ -169,11 +171,15 @@ async def openai_direct_action(request: Request):
             
             logger.info(f"OpenAI Direct: Action {action} completed successfully")
             
+            # Acciones en modo streaming (p. ej. stream=true en chat completions): SSE o NDJSON
+            if is_stream_result(result):
+                return streaming_response(result, request)
+            
             # Formatear respuesta para OpenAI
             if isinstance(result, dict):
                 if result.get("status") == "error":
                     logger.warning(f"OpenAI Direct: Action {action} returned error: {result.get('message')}")
-                    return JSONResponse(
+                    return FastJSONResponse(
                         status_code=400,
                         content={
                             "status": "error",
@@ -186,7 +192,7 @@ async def openai_direct_action(request: Request):
                     )
                 else:
                     # Respuesta exitosa
-                    return JSONResponse(
+                    return FastJSONResponse(
                         status_code=200,
                         content={
                             "status": "success",
@@ -198,7 +204,7 @@ async def openai_direct_action(request: Request):
                     )
             else:
                 # Resultado no es dict, wrapearlo
-                return JSONResponse(
+                return FastJSONResponse(
                     status_code=200,
                     content={
                         "status": "success",
@@ -219,7 +225,7 @@ async def openai_direct_action(request: Request):
             sig = inspect.signature(action_function)
             expected_params = list(sig.parameters.keys())
             
-            return JSONResponse(
+            return FastJSONResponse(
                 status_code=400,
                 content={
                     "status": "error",
@@ -246,7 +252,7 @@ async def openai_direct_action(request: Request):
             
             logger.error(f"Execution error ({error_type}) for action '{action}': {error_msg}")
             
-            return JSONResponse(
+            return FastJSONResponse(
                 status_code=500,
                 content={
                     "status": "error",
@@ -266,7 +272,7 @@ async def openai_direct_action(request: Request):
             
     except Exception as general_error:
         logger.error(f"General error in openai_direct: {general_error}")
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=500,
             content={
                 "status": "error",
@@ -276,43 +282,44 @@ async def openai_direct_action(request: Request):
             }
         )
 
+def _build_actions_catalog() -> Dict[str, Any]:
+    """Catálogo de acciones por categoría; no cambia durante la vida del proceso."""
+    all_actions = get_all_actions()
+    
+    # Organizar por categorías para mejor legibilidad
+    categorized_actions = {}
+    
+    for action_name in all_actions.keys():
+        # Extraer categoría del nombre de la acción
+        if "_" in action_name:
+            category = action_name.split("_")[0]
+        else:
+            category = "general"
+        
+        if category not in categorized_actions:
+            categorized_actions[category] = []
+        
+        categorized_actions[category].append(action_name)
+    
+    return {
+        "status": "success",
+        "total_actions": len(all_actions),
+        "categories": len(categorized_actions),
+        "actions_by_category": categorized_actions,
+        "all_actions": list(all_actions.keys()),
+        "timestamp": BUILD_TIMESTAMP  # Constante por despliegue: el ETag no varía entre workers
+    }
+
 @router.get("/openai/actions")
-async def list_available_actions():
+async def list_available_actions(request: Request):
     """
-    Lista todas las acciones disponibles para OpenAI
+    Lista todas las acciones disponibles para OpenAI (catálogo precalculado con ETag)
     """
     try:
-        all_actions = get_all_actions()
-        
-        # Organizar por categorías para mejor legibilidad
-        categorized_actions = {}
-        
-        for action_name in all_actions.keys():
-            # Extraer categoría del nombre de la acción
-            if "_" in action_name:
-                category = action_name.split("_")[0]
-            else:
-                category = "general"
-            
-            if category not in categorized_actions:
-                categorized_actions[category] = []
-            
-            categorized_actions[category].append(action_name)
-        
-        return JSONResponse(
-            status_code=200,
-            content={
-                "status": "success",
-                "total_actions": len(all_actions),
-                "categories": len(categorized_actions),
-                "actions_by_category": categorized_actions,
-                "all_actions": list(all_actions.keys()),
-                "timestamp": datetime.now().isoformat()
-            }
-        )
+        return document_response(request, cached_document("openai_actions", _build_actions_catalog))
         
     except Exception as error:
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=500,
             content={
                 "status": "error",
@@ -340,7 +347,7 @@ async def test_openai_connection():
                 test_function = all_actions["resolver_get_all_actions"]
                 test_result = test_function(auth_client, {})
                 
-                return JSONResponse(
+                return FastJSONResponse(
                     status_code=200,
                     content={
                         "status": "success",
@@ -352,7 +359,7 @@ async def test_openai_connection():
                     }
                 )
             except Exception as test_error:
-                return JSONResponse(
+                return FastJSONResponse(
                     status_code=500,
                     content={
                         "status": "error",
@@ -362,7 +369,7 @@ async def test_openai_connection():
                     }
                 )
         else:
-            return JSONResponse(
+            return FastJSONResponse(
                 status_code=200,
                 content={
                     "status": "success",
@@ -374,7 +381,7 @@ async def test_openai_connection():
             )
             
     except Exception as error:
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=500,
             content={
                 "status": "error",
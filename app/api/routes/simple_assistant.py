@@ -8,12 +8,13 @@ import json
 import re
 from typing import Dict, Any, Optional, List
 from fastapi import APIRouter, Request, HTTPException
-from fastapi.responses import JSONResponse
 from datetime import datetime
 
 # Importar lo esencial
 from app.core.action_mapper import get_all_actions
 from app.shared.helpers.http_client import AuthenticatedHttpClient
+from app.shared.helpers.intent_router import IntentRouter
+from app.shared.helpers.json_response import FastJSONResponse
 from azure.identity import DefaultAzureCredential
 
 logger = logging.getLogger(__name__)
@@ -74,6 +75,8 @@ COMMAND_MAPPINGS = {
     }
 }
 
+COMMAND_ROUTER = IntentRouter(COMMAND_MAPPINGS.items())
+
 def extract_email_from_text(text: str) -> Optional[str]:
     """Extrae email del texto usando regex"""
     email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
@@ -153,15 +156,13 @@ def smart_parameter_extraction(text: str, action: str) -> Dict[str, Any]:
 
 def find_best_action(text: str) -> tuple[str, Dict[str, Any]]:
     """Encuentra la mejor acción basada en el texto usando IA simple"""
-    text_lower = text.lower()
-    
-    for pattern, config in COMMAND_MAPPINGS.items():
-        if re.search(pattern, text_lower):
-            action = config["action"]
-            params = smart_parameter_extraction(text, action)
-            
-            logger.info(f"Simple Assistant: Matched pattern '{pattern}' -> action '{action}'")
-            return action, params
+    match = COMMAND_ROUTER.best(text)
+    if match:
+        action = match.payload["action"]
+        params = smart_parameter_extraction(text, action)
+        
+        logger.info(f"Simple Assistant: Matched pattern '{match.pattern}' -> action '{action}'")
+        return action, params
     
     # Fallback - acción por defecto
     return "intelligent_chat", {"query": text}
@@ -257,7 +258,7 @@ async def simple_assistant(request: Request):
         try:
             body = json.loads(raw_body.decode('utf-8'))
         except json.JSONDecodeError:
-            return JSONResponse(
+            return FastJSONResponse(
                 status_code=400,
                 content={
                     "respuesta": "❌ Error: No pude entender el mensaje. Usa formato: {\"mensaje\": \"tu petición aquí\"}",
@@ -271,7 +272,7 @@ async def simple_assistant(request: Request):
             mensaje = body.get("mensaje") or body.get("message") or body.get("text") or body.get("query")
         
         if not mensaje or not isinstance(mensaje, str) or not mensaje.strip():
-            return JSONResponse(
+            return FastJSONResponse(
                 status_code=400,
                 content={
                     "respuesta": "❌ Por favor proporciona un mensaje. Ejemplo: {\"mensaje\": \"lee mis correos\"}",
@@ -295,7 +296,7 @@ async def simple_assistant(request: Request):
         # PASO 2: Verificar que la acción existe
         all_actions = get_all_actions()
         if action not in all_actions:
-            return JSONResponse(
+            return FastJSONResponse(
                 status_code=400,
                 content={
                     "respuesta": f"❌ No encontré una acción para '{mensaje}'. Intenta ser más específico.",
@@ -316,7 +317,7 @@ async def simple_assistant(request: Request):
             auth_client = AuthenticatedHttpClient(credential=credential)
         except Exception as auth_error:
             logger.error(f"Authentication error: {auth_error}")
-            return JSONResponse(
+            return FastJSONResponse(
                 status_code=500,
                 content={
                     "respuesta": "❌ Error de autenticación. Intenta de nuevo en unos minutos.",
@@ -334,7 +335,7 @@ async def simple_assistant(request: Request):
             
             logger.info(f"Simple Assistant: Action completed successfully")
             
-            return JSONResponse(
+            return FastJSONResponse(
                 status_code=200,
                 content={
                     "respuesta": human_response,
@@ -358,7 +359,7 @@ async def simple_assistant(request: Request):
             else:
                 user_msg = f"❌ Error al ejecutar la tarea: {error_msg}"
             
-            return JSONResponse(
+            return FastJSONResponse(
                 status_code=500,
                 content={
                     "respuesta": user_msg,
@@ -370,7 +371,7 @@ async def simple_assistant(request: Request):
     
     except Exception as general_error:
         logger.error(f"General error in simple_assistant: {general_error}")
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=500,
             content={
                 "respuesta": "❌ Error interno del sistema. Intenta de nuevo en unos minutos.",
@@ -381,7 +382,7 @@ async def simple_assistant(request: Request):
 @router.get("/simple/help")
 async def simple_help():
     """Ayuda y ejemplos para el endpoint simple"""
-    return JSONResponse(
+    return FastJSONResponse(
         content={
             "titulo": "Asistente Simple - Guía de Uso",
             "descripcion": "Envía comandos en lenguaje natural y recibe respuestas claras",
@@ -3,52 +3,58 @@ Sistema de información y documentación del API
 Proporciona endpoints para consultar estado, acciones disponibles y documentación
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from datetime import datetime, timedelta
 import json
 from typing import Dict, Any, List
 from app.core.action_mapper import ACTION_MAP
+from app.shared.helpers.cached_response import BUILD_TIMESTAMP, cached_document, document_response
 import platform
 import psutil
 import os
 
 router = APIRouter()
 
+def _build_actions_summary() -> Dict[str, Any]:
+    """Resumen de acciones por categoría; se genera una vez por proceso."""
+    # Organizar acciones por categorías
+    categories = {}
+    popular_actions = []
+    new_features = []
+    
+    for action_name in ACTION_MAP:
+        # ACTION_MAP guarda funciones: la categoría es el prefijo del nombre
+        category = action_name.split('_')[0] if '_' in action_name else 'otros'
+        
+        if category not in categories:
+            categories[category] = []
+        
+        categories[category].append(action_name)
+        
+        # Marcar acciones populares (ejemplo)
+        if any(keyword in action_name for keyword in ['email', 'calendario', 'intelligent', 'runway']):
+            popular_actions.append(action_name)
+        
+        # Marcar funciones nuevas (ejemplo)
+        if any(keyword in action_name for keyword in ['runway', 'stream', 'vivainsights']):
+            new_features.append(action_name)
+    
+    return {
+        "total_actions": len(ACTION_MAP),
+        "categories": categories,
+        "popular_actions": popular_actions[:10],  # Top 10
+        "new_features": new_features[:5],  # Top 5 nuevas
+        "last_updated": BUILD_TIMESTAMP,  # Constante por despliegue: el ETag no varía entre workers
+        "description": "EliteDynamics API - Sistema empresarial completo con integraciones avanzadas"
+    }
+
 @router.get("/actions")
-async def get_available_actions():
+async def get_available_actions(request: Request):
     """
-    Lista todas las acciones disponibles organizadas por categorías
+    Lista todas las acciones disponibles organizadas por categorías (precalculado, con ETag)
     """
     try:
-        # Organizar acciones por categorías
-        categories = {}
-        popular_actions = []
-        new_features = []
-        
-        for action_name, action_config in ACTION_MAP.items():
-            category = action_config.get('category', 'otros')
-            
-            if category not in categories:
-                categories[category] = []
-            
-            categories[category].append(action_name)
-            
-            # Marcar acciones populares (ejemplo)
-            if any(keyword in action_name for keyword in ['email', 'calendario', 'intelligent', 'runway']):
-                popular_actions.append(action_name)
-            
-            # Marcar funciones nuevas (ejemplo)
-            if any(keyword in action_name for keyword in ['runway', 'stream', 'vivainsights']):
-                new_features.append(action_name)
-        
-        return {
-            "total_actions": len(ACTION_MAP),
-            "categories": categories,
-            "popular_actions": popular_actions[:10],  # Top 10
-            "new_features": new_features[:5],  # Top 5 nuevas
-            "last_updated": datetime.now().isoformat(),
-            "description": "EliteDynamics API - Sistema empresarial completo con integraciones avanzadas"
-        }
+        return document_response(request, cached_document("system_actions", _build_actions_summary))
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error obteniendo acciones: {str(e)}")
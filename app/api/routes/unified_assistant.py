@@ -14,8 +14,8 @@ Incluye interfaz web, micrófono, síntesis de voz y toma de decisiones autónom
 import logging
 from datetime import datetime
 from fastapi import APIRouter, Request, HTTPException, Depends
-from fastapi.responses import JSONResponse, HTMLResponse
-from typing import Any, Dict, Optional, List
+from fastapi.responses import HTMLResponse
+from typing import Any, AsyncIterator, Dict, Optional, List
 import json
 import re
 import os
@@ -26,6 +26,9 @@ from app.core.auth_manager import get_current_user, AuthenticatedUser, get_auth_
 from app.memory.intelligent_assistant import IntelligentAssistant
 from app.memory.simple_memory import simple_memory_manager as memory_manager
 from app.workflows.auto_workflow import AutoWorkflowManager
+from app.shared.helpers.streaming import streaming_response, wants_event_stream
+from app.shared.helpers.intent_router import IntentRouter
+from app.shared.helpers.json_response import FastJSONResponse
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -94,6 +97,25 @@ CONVERSATION_PATTERNS = {
     r"(toma la decisión|hazlo|procede|continúa)": "autonomous_action"
 }
 
+# Frases naturales que apuntan directamente a una acción (menor prioridad que los patrones)
+NATURAL_ACTION_PHRASES = {
+    "enviar email": "enviar_correo_outlook",
+    "leer correos": "leer_correos_outlook",
+    "crear evento": "calendario_crear_evento",
+    "listar eventos": "calendario_listar_eventos",
+    "subir archivo": "subir_archivo_onedrive",
+    "crear campaña": "metaads_create_campaign",
+    "analizar métricas": "google_ads_get_campaign_performance",
+    "backup completo": "execute_workflow",
+    "listar workflows": "list_workflows"
+}
+
+# Patrones y frases compilados una sola vez en un único autómata
+INTENT_ROUTER = IntentRouter(
+    list(CONVERSATION_PATTERNS.items())
+    + [(phrase, f"action_{action}") for phrase, action in NATURAL_ACTION_PHRASES.items()]
+)
+
 class UnifiedAssistantProcessor:
     """Procesador principal del asistente unificado"""
     
@@ -105,6 +127,20 @@ class UnifiedAssistantProcessor:
         """
         Procesa lenguaje natural sin restricciones y toma decisiones autónomas
         """
+        result: Dict[str, Any] = {}
+        async for event in self.process_natural_language_events(query, user_id):
+            if event["type"] in ("done", "error"):
+                result = {k: v for k, v in event.items() if k != "type"}
+        return result
+    
+    async def process_natural_language_events(self, query: str, user_id: str = "default") -> AsyncIterator[Dict[str, Any]]:
+        """
+        Versión incremental de process_natural_language: emite la respuesta del asistente
+        ("delta") en cuanto se decide, antes de ejecutar la acción; después el resultado
+        de la ejecución ("result") y finalmente el payload completo ("done").
+        La respuesta sale de plantillas por intención, no de un modelo, así que llega en
+        un único "delta"; lo que se adelanta es la espera de la acción.
+        """
         try:
             # Normalizar query
             query = query.strip().lower()
@@ -131,16 +167,25 @@ class UnifiedAssistantProcessor:
             
             # 4. Tomar decisión autónoma o sugerir acción
             decision = await self._make_autonomous_decision(intent, params, context, query)
+            yield {
+                "type": "delta",
+                "text": decision["response"],
+                "intent": intent,
+                "action": decision.get("action"),
+                "will_execute": decision.get("execute_immediately", False)
+            }
             
             # 5. Ejecutar acción si está autorizada
             if decision.get("execute_immediately", False):
                 result = await self._execute_action(decision["action"], decision["params"])
                 decision["execution_result"] = result
+                yield {"type": "result", "action": decision["action"], "execution_result": result}
             
             # 6. Aprender de la interacción
             await self._learn_from_interaction(query, intent, decision, user_id)
             
-            return {
+            yield {
+                "type": "done",
                 "status": "success",
                 "response": decision["response"],
                 "intent": intent,
@@ -157,7 +202,8 @@ class UnifiedAssistantProcessor:
             
         except Exception as e:
             logger.error(f"Error procesando lenguaje natural: {e}")
-            return {
+            yield {
+                "type": "error",
                 "status": "error",
                 "message": f"Error procesando consulta: {str(e)}",
                 "query": query,
@@ -165,17 +211,9 @@ class UnifiedAssistantProcessor:
             }
     
     def _detect_intent(self, query: str) -> str:
-        """Detecta la intención basada en patrones conversacionales"""
-        for pattern, intent in CONVERSATION_PATTERNS.items():
-            if re.search(pattern, query, re.IGNORECASE):
-                return intent
-        
-        # Si no encuentra patrón específico, buscar en acciones disponibles
-        for natural_phrase, action in self._get_action_mappings().items():
-            if natural_phrase in query:
-                return f"action_{action}"
-        
-        return "general_query"
+        """Detecta la intención basada en patrones conversacionales (y, después, frases de acciones)"""
+        match = INTENT_ROUTER.best(query)
+        return match.payload if match else "general_query"
     
     def _extract_parameters(self, query: str, intent: str) -> Dict[str, Any]:
         """Extrae parámetros del lenguaje natural"""
@@ -366,17 +404,7 @@ class UnifiedAssistantProcessor:
     
     def _get_action_mappings(self) -> Dict[str, str]:
         """Obtiene mapeo de frases naturales a acciones"""
-        return {
-            "enviar email": "enviar_correo_outlook",
-            "leer correos": "leer_correos_outlook",
-            "crear evento": "calendario_crear_evento",
-            "listar eventos": "calendario_listar_eventos",
-            "subir archivo": "subir_archivo_onedrive",
-            "crear campaña": "metaads_create_campaign",
-            "analizar métricas": "google_ads_get_campaign_performance",
-            "backup completo": "execute_workflow",
-            "listar workflows": "list_workflows"
-        }
+        return NATURAL_ACTION_PHRASES
     
     def _determine_workflow_params(self, query: str, params: Dict) -> Dict[str, Any]:
         """Determina parámetros de workflow basado en la consulta"""
@@ -476,20 +504,24 @@ async def unified_assistant_chat(request: Request):
         user_id = body.get("user_id", "default")
         
         if not query:
-            return JSONResponse({
+            return FastJSONResponse({
                 "status": "error",
                 "message": "Se requiere un mensaje o query",
                 "example": {"message": "Hola, ¿qué puedes hacer por mí?"}
             })
         
+        # Clientes con Accept: text/event-stream o "stream": true reciben la respuesta por eventos
+        if wants_event_stream(request, body):
+            return streaming_response(processor.process_natural_language_events(query, user_id), request)
+        
         # Procesar con el asistente unificado
         result = await processor.process_natural_language(query, user_id)
         
-        return JSONResponse(result)
+        return FastJSONResponse(result)
         
     except Exception as e:
         logger.error(f"Error en unified assistant chat: {e}")
-        return JSONResponse({
+        return FastJSONResponse({
             "status": "error",
             "message": f"Error procesando mensaje: {str(e)}",
             "timestamp": datetime.now().isoformat()
@@ -799,7 +831,7 @@ async def serve_unified_interface():
 @router.get("/assistant/status")
 async def assistant_status():
     """Estado del asistente unificado"""
-    return JSONResponse({
+    return FastJSONResponse({
         "status": "active",
         "name": ASSISTANT_CONFIG["name"],
         "personality": ASSISTANT_CONFIG["personality"],
@@ -819,14 +851,14 @@ async def get_learned_data(user_id: str = "default"):
     """Obtiene datos aprendidos del usuario"""
     try:
         patterns = await intelligent_assistant.analyze_user_patterns(user_id)
-        return JSONResponse({
+        return FastJSONResponse({
             "status": "success",
             "user_id": user_id,
             "learned_patterns": patterns,
             "timestamp": datetime.now().isoformat()
         })
     except Exception as e:
-        return JSONResponse({
+        return FastJSONResponse({
             "status": "error",
             "message": f"Error obteniendo datos aprendidos: {str(e)}"
         })
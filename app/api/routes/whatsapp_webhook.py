@@ -6,15 +6,22 @@ Maneja eventos entrantes de WhatsApp Business API
 import os
 import json
 import hmac
+import uuid
+import zlib
+import queue
+import socket
+import asyncio
 import hashlib
 import logging
+import threading
 import time
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from fastapi import APIRouter, Request, HTTPException, Query
 from fastapi.responses import PlainTextResponse
 
 from app.services.auth.whatsapp_auth import get_whatsapp_client
 from app.actions.whatsapp_actions import whatsapp_send_text, whatsapp_send_interactive
+from app.shared.helpers.local_store import get_local_store
 
 logger = logging.getLogger(__name__)
 
@@ -78,11 +85,13 @@ async def handle_whatsapp_webhook(request: Request):
             logger.error(f"Invalid JSON in webhook: {str(e)}")
             raise HTTPException(status_code=400, detail="Invalid JSON")
         
-        # Procesar eventos
-        await _process_webhook_events(webhook_data)
+        # Encolar de forma durable y responder ya: el procesamiento (IA, respuestas,
+        # memoria) lo hacen los workers, así Meta no reintenta por lentitud
+        events = _extract_events(webhook_data)
+        enqueued = await asyncio.to_thread(_enqueue_events, events)
         
         # WhatsApp espera respuesta 200
-        return {"status": "success", "message": "Webhook processed"}
+        return {"status": "success", "message": "Webhook queued", "events": len(events), "enqueued": enqueued}
         
     except HTTPException:
         raise
@@ -117,82 +126,220 @@ def _validate_signature(payload: bytes, signature: str) -> bool:
         logger.error(f"Error validating signature: {str(e)}")
         return False
 
-async def _process_webhook_events(webhook_data: Dict[str, Any]):
-    """Procesa eventos del webhook de WhatsApp"""
-    try:
-        # Estructura típica: entry[0].changes[0].value
-        entries = webhook_data.get("entry", [])
-        
-        for entry in entries:
-            changes = entry.get("changes", [])
-            
-            for change in changes:
-                field = change.get("field", "")
-                value = change.get("value", {})
-                
-                if field == "messages":
-                    await _handle_messages(value)
-                elif field == "message_statuses":
-                    await _handle_message_statuses(value)
-                
-    except Exception as e:
-        logger.error(f"Error processing webhook events: {str(e)}")
+# ============================================================================
+# COLA DURABLE Y WORKERS
+# ============================================================================
+# Cada mensaje o status del webhook es un evento con ID propio (idempotencia) y una
+# clave de conversación (el teléfono). Los eventos se guardan en SQLite antes de
+# responder y se reparten entre workers por hash de conversación: los mensajes de
+# una misma conversación se procesan en orden, y conversaciones distintas en paralelo.
+# Cada worker es un hilo con su propio event loop, de modo que las llamadas
+# bloqueantes de los handlers no frenan el loop de la API.
+#
+# Varios procesos (workers de uvicorn/gunicorn) comparten el mismo archivo: el alta
+# en 'seen' es un INSERT OR IGNORE (solo un proceso acepta cada evento) y cada fila
+# de la cola tiene un arrendamiento (owner + caducidad) del proceso que la procesa.
+# Al arrancar, y periódicamente, solo se recuperan las filas cuyo arrendamiento
+# caducó, es decir, las de procesos caídos.
 
-async def _handle_messages(message_data: Dict[str, Any]):
-    """Maneja mensajes entrantes"""
-    try:
-        messages = message_data.get("messages", [])
-        contacts = message_data.get("contacts", [])
-        
-        # Crear mapa de contactos para lookup rápido
-        contact_map = {contact["wa_id"]: contact for contact in contacts}
-        
-        for message in messages:
-            sender_phone = message.get("from", "")
-            message_type = message.get("type", "")
-            message_id = message.get("id", "")
-            timestamp = message.get("timestamp", "")
-            
-            # Obtener info del contacto
-            contact_info = contact_map.get(sender_phone, {})
-            sender_name = contact_info.get("profile", {}).get("name", "Usuario")
-            
-            logger.info(f"Received {message_type} message from {sender_phone} ({sender_name})")
-            
-            # Persistir mensaje entrante
-            await _persist_incoming_message(message, contact_info)
-            
-            # Procesar según tipo de mensaje
-            if message_type == "text":
-                await _handle_text_message(message, contact_info)
-            elif message_type == "interactive":
-                await _handle_interactive_response(message, contact_info)
-            elif message_type in ["image", "video", "audio", "document"]:
-                await _handle_media_message(message, contact_info)
-            elif message_type == "location":
-                await _handle_location_message(message, contact_info)
-            
-    except Exception as e:
-        logger.error(f"Error handling messages: {str(e)}")
+WEBHOOK_QUEUE_NAMESPACE = "whatsapp_webhook_queue"
+WEBHOOK_SEEN_NAMESPACE = "whatsapp_webhook_seen"
+WEBHOOK_DEAD_NAMESPACE = "whatsapp_webhook_dead"
+WEBHOOK_WORKERS = int(os.getenv("WHATSAPP_WEBHOOK_WORKERS", "8"))
+WEBHOOK_MAX_ATTEMPTS = 3
+WEBHOOK_SEEN_TTL_SECONDS = 7 * 24 * 60 * 60  # Meta reintenta durante días como máximo
+WEBHOOK_LEASE_SECONDS = int(os.getenv("WHATSAPP_WEBHOOK_LEASE_SECONDS", "300"))
+# Identidad de este proceso; el sufijo aleatorio evita heredar leases de un PID reutilizado
+WEBHOOK_WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
 
-async def _handle_message_statuses(status_data: Dict[str, Any]):
-    """Maneja delivery/read receipts"""
-    try:
-        statuses = status_data.get("statuses", [])
-        
-        for status in statuses:
-            message_id = status.get("id", "")
-            recipient_id = status.get("recipient_id", "")
-            status_type = status.get("status", "")
-            timestamp = status.get("timestamp", "")
-            
-            logger.info(f"Message {message_id} to {recipient_id}: {status_type}")
-            
-            # Persistir status update
-            await _persist_message_status(status)
-            
-    except Exception as e:
-        logger.error(f"Error handling message statuses: {str(e)}")
+_webhook_partitions: List["queue.Queue[Tuple[str, Dict[str, Any]]]"] = []
+_webhook_workers_lock = threading.Lock()
+
+def _webhook_store():
+    return get_local_store("whatsapp_webhook.db")
+
+class WebhookEventError(Exception):
+    """Un paso del procesamiento de un evento falló; el worker lo reintenta y, si persiste, va a 'dead'."""
+
+def _require_success(result: Any, operation: str) -> Any:
+    """Las acciones devuelven sus errores en vez de lanzarlos: aquí se convierten en excepción."""
+    if isinstance(result, dict) and (result.get("status") == "error" or result.get("success") is False):
+        raise WebhookEventError(f"{operation}: {result.get('message') or result.get('error') or result}")
+    return result
+
+def _extract_events(webhook_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Aplana el payload (entry[].changes[].value) en eventos individuales."""
+    events: List[Dict[str, Any]] = []
+    for entry in webhook_data.get("entry", []):
+        for change in entry.get("changes", []):
+            field = change.get("field", "")
+            value = change.get("value", {}) or {}
+            if field not in ("messages", "message_statuses"):
+                continue
+            contact_map = {contact.get("wa_id"): contact for contact in value.get("contacts", [])}
+            for message in value.get("messages", []):
+                sender_phone = message.get("from", "")
+                events.append({
+                    "event_id": f"message:{message.get('id') or hashlib.sha256(json.dumps(message, sort_keys=True).encode()).hexdigest()}",
+                    "conversation": sender_phone,
+                    "kind": "message",
+                    "message": message,
+                    "contact_info": contact_map.get(sender_phone, {}),
+                })
+            # Los receipts llegan dentro de field="messages" (value.statuses)
+            for status in value.get("statuses", []):
+                events.append({
+                    "event_id": f"status:{status.get('id', '')}:{status.get('status', '')}",
+                    "conversation": status.get("recipient_id", ""),
+                    "kind": "status",
+                    "status": status,
+                })
+    return events
+
+def _enqueue_events(events: List[Dict[str, Any]]) -> int:
+    """Persiste los eventos nuevos (los ya vistos se ignoran) y los entrega a los workers."""
+    if not events:
+        return 0
+    store = _webhook_store()
+    fresh: Dict[str, Dict[str, Any]] = {}
+    for event in events:
+        event["received_at"] = time.time()
+        # time_ns como prefijo mantiene el orden de llegada al recuperar la cola
+        queue_key = f"{time.time_ns():020d}:{event['event_id']}"
+        # Fila y lease antes del alta en 'seen': si el proceso cae en medio, el evento
+        # se recupera al caducar el lease en lugar de perderse
+        store.acquire_lease(WEBHOOK_QUEUE_NAMESPACE, queue_key, WEBHOOK_WORKER_ID, WEBHOOK_LEASE_SECONDS)
+        store.set(WEBHOOK_QUEUE_NAMESPACE, queue_key, event)
+        if store.add(WEBHOOK_SEEN_NAMESPACE, event["event_id"], {"state": "queued"}):
+            fresh[queue_key] = event
+        else:
+            # Duplicado (reintento de Meta o ya aceptado por otro proceso)
+            store.delete(WEBHOOK_QUEUE_NAMESPACE, queue_key)
+            store.release_lease(WEBHOOK_QUEUE_NAMESPACE, queue_key, WEBHOOK_WORKER_ID)
+    if not fresh:
+        return 0
+
+    start_webhook_workers()
+    for queue_key, event in fresh.items():
+        _dispatch_to_worker(queue_key, event)
+    return len(fresh)
+
+def _dispatch_to_worker(queue_key: str, event: Dict[str, Any]) -> None:
+    partition = zlib.crc32(event.get("conversation", "").encode("utf-8")) % len(_webhook_partitions)
+    _webhook_partitions[partition].put((queue_key, event))
+
+def _recover_expired_events() -> int:
+    """Reclama y reencola las filas de la cola cuyo lease caducó (procesos caídos)."""
+    store = _webhook_store()
+    recovered = 0
+    for queue_key, event in store.unleased_items(WEBHOOK_QUEUE_NAMESPACE):
+        # Otro proceso puede reclamar la misma fila a la vez: solo uno obtiene el lease
+        if store.acquire_lease(WEBHOOK_QUEUE_NAMESPACE, queue_key, WEBHOOK_WORKER_ID, WEBHOOK_LEASE_SECONDS):
+            _dispatch_to_worker(queue_key, event)
+            recovered += 1
+    if recovered:
+        logger.info(f"Recuperados {recovered} eventos de WhatsApp pendientes de la cola local")
+    return recovered
+
+def _recovery_loop() -> None:
+    while True:
+        time.sleep(max(1, WEBHOOK_LEASE_SECONDS // 2))
+        try:
+            _recover_expired_events()
+        except Exception as e:
+            logger.warning(f"Error recuperando eventos de WhatsApp pendientes: {e}")
+
+def start_webhook_workers() -> None:
+    """Arranca los workers (una vez por proceso) y recupera lo que dejaron pendiente procesos caídos."""
+    with _webhook_workers_lock:
+        if _webhook_partitions:
+            return
+        for index in range(max(1, WEBHOOK_WORKERS)):
+            partition: "queue.Queue[Tuple[str, Dict[str, Any]]]" = queue.Queue()
+            _webhook_partitions.append(partition)
+            threading.Thread(target=_webhook_worker_loop, args=(partition,), name=f"wa-webhook-{index}", daemon=True).start()
+        threading.Thread(target=_recovery_loop, name="wa-webhook-recovery", daemon=True).start()
+
+    store = _webhook_store()
+    store.purge_older_than(WEBHOOK_SEEN_NAMESPACE, WEBHOOK_SEEN_TTL_SECONDS)
+    _recover_expired_events()
+
+def _webhook_worker_loop(partition: "queue.Queue[Tuple[str, Dict[str, Any]]]") -> None:
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    while True:
+        queue_key, event = partition.get()
+        try:
+            loop.run_until_complete(_process_queued_event(queue_key, event))
+        except Exception as e:
+            logger.error(f"Error inesperado en worker de webhook ({event.get('event_id')}): {e}", exc_info=True)
+
+async def _process_queued_event(queue_key: str, event: Dict[str, Any]) -> None:
+    store = _webhook_store()
+    event_id = event["event_id"]
+    # Renovar el lease justo antes de procesar: si esperó en la partición más de lo que
+    # dura y otro proceso lo reclamó, ese proceso es quien lo atiende
+    if not store.acquire_lease(WEBHOOK_QUEUE_NAMESPACE, queue_key, WEBHOOK_WORKER_ID, WEBHOOK_LEASE_SECONDS):
+        logger.info(f"Evento WhatsApp {event_id} reclamado por otro proceso; se omite")
+        return
+    # Un evento ya completado puede seguir en la cola si el proceso cayó antes de borrarlo
+    if (store.get(WEBHOOK_SEEN_NAMESPACE, event_id) or {}).get("state") == "done":
+        store.delete(WEBHOOK_QUEUE_NAMESPACE, queue_key)
+        store.release_lease(WEBHOOK_QUEUE_NAMESPACE, queue_key, WEBHOOK_WORKER_ID)
+        return
+
+    last_error: Optional[str] = None
+    for attempt in range(1, WEBHOOK_MAX_ATTEMPTS + 1):
+        # Renovar el lease en cada intento: con los reintentos y sus esperas el evento
+        # puede superar WEBHOOK_LEASE_SECONDS y otro proceso lo daría por abandonado
+        if attempt > 1 and not store.acquire_lease(WEBHOOK_QUEUE_NAMESPACE, queue_key, WEBHOOK_WORKER_ID, WEBHOOK_LEASE_SECONDS):
+            logger.warning(f"Evento WhatsApp {event_id}: lease perdido antes del intento {attempt}; lo atiende otro proceso")
+            return
+        try:
+            if event["kind"] == "message":
+                await _handle_message(event["message"], event.get("contact_info", {}))
+            else:
+                await _handle_message_status(event["status"])
+            last_error = None
+            break
+        except Exception as e:
+            last_error = f"{type(e).__name__}: {e}"
+            logger.warning(f"Evento WhatsApp {event_id}: intento {attempt}/{WEBHOOK_MAX_ATTEMPTS} fallido: {last_error}")
+            await asyncio.sleep(0.5 * 2 ** attempt)
+
+    if last_error:
+        store.set(WEBHOOK_DEAD_NAMESPACE, queue_key, dict(event, error=last_error))
+    store.set(WEBHOOK_SEEN_NAMESPACE, event_id, {"state": "failed" if last_error else "done", "processed_at": time.time()})
+    store.delete(WEBHOOK_QUEUE_NAMESPACE, queue_key)
+    store.release_lease(WEBHOOK_QUEUE_NAMESPACE, queue_key, WEBHOOK_WORKER_ID)
+
+async def _handle_message(message: Dict[str, Any], contact_info: Dict[str, Any]):
+    """Maneja un mensaje entrante"""
+    sender_phone = message.get("from", "")
+    message_type = message.get("type", "")
+    sender_name = contact_info.get("profile", {}).get("name", "Usuario")
+    
+    logger.info(f"Received {message_type} message from {sender_phone} ({sender_name})")
+    
+    # Persistir mensaje entrante
+    await _persist_incoming_message(message, contact_info)
+    
+    # Procesar según tipo de mensaje
+    if message_type == "text":
+        await _handle_text_message(message, contact_info)
+    elif message_type == "interactive":
+        await _handle_interactive_response(message, contact_info)
+    elif message_type in ["image", "video", "audio", "document"]:
+        await _handle_media_message(message, contact_info)
+    elif message_type == "location":
+        await _handle_location_message(message, contact_info)
+
+async def _handle_message_status(status: Dict[str, Any]):
+    """Maneja un delivery/read receipt"""
+    logger.info(f"Message {status.get('id', '')} to {status.get('recipient_id', '')}: {status.get('status', '')}")
+    
+    # Persistir status update
+    await _persist_message_status(status)
 
 async def _handle_text_message(message: Dict[str, Any], contact_info: Dict[str, Any]):
     """Procesa mensaje de texto entrante"""
@@ -208,13 +355,14 @@ async def _handle_text_message(message: Dict[str, Any], contact_info: Dict[str,
             from app.core.auth_manager import get_auth_client
             client = get_auth_client()
             
-            await whatsapp_send_text(client, {
+            _require_success(await whatsapp_send_text(client, {
                 "to": sender_phone,
                 "text": response_text
-            })
+            }), "whatsapp_send_text")
             
     except Exception as e:
         logger.error(f"Error handling text message: {str(e)}")
+        raise
 
 async def _handle_interactive_response(message: Dict[str, Any], contact_info: Dict[str, Any]):
     """Procesa respuesta a mensaje interactivo"""
@@ -238,6 +386,7 @@ async def _handle_interactive_response(message: Dict[str, Any], contact_info: Di
             
     except Exception as e:
         logger.error(f"Error handling interactive response: {str(e)}")
+        raise
 
 async def _handle_media_message(message: Dict[str, Any], contact_info: Dict[str, Any]):
     """Procesa mensaje de media entrante"""
@@ -256,13 +405,14 @@ async def _handle_media_message(message: Dict[str, Any], contact_info: Dict[str,
         from app.core.auth_manager import get_auth_client
         client = get_auth_client()
         
-        await whatsapp_send_text(client, {
+        _require_success(await whatsapp_send_text(client, {
             "to": sender_phone,
             "text": f"✅ Recibido tu {message_type}. Gracias por compartir."
-        })
+        }), "whatsapp_send_text")
         
     except Exception as e:
         logger.error(f"Error handling media message: {str(e)}")
+        raise
 
 async def _handle_location_message(message: Dict[str, Any], contact_info: Dict[str, Any]):
     """Procesa mensaje de ubicación"""
@@ -281,13 +431,14 @@ async def _handle_location_message(message: Dict[str, Any], contact_info: Dict[s
         from app.core.auth_manager import get_auth_client
         client = get_auth_client()
         
-        await whatsapp_send_text(client, {
+        _require_success(await whatsapp_send_text(client, {
             "to": sender_phone,
             "text": f"📍 Ubicación recibida. Gracias por compartir tu localización."
-        })
+        }), "whatsapp_send_text")
         
     except Exception as e:
         logger.error(f"Error handling location message: {str(e)}")
+        raise
 
 async def _generate_auto_response(text: str, sender_phone: str, contact_info: Dict[str, Any]) -> Optional[str]:
     """Genera respuesta automática básica"""
@@ -323,23 +474,24 @@ async def _process_button_response(button_id: str, sender_phone: str, contact_in
         client = get_auth_client()
         
         if button_id == "confirmar":
-            await whatsapp_send_text(client, {
+            _require_success(await whatsapp_send_text(client, {
                 "to": sender_phone,
                 "text": "✅ Confirmado. Procederemos con tu solicitud."
-            })
+            }), "whatsapp_send_text")
         elif button_id == "reprogramar":
-            await whatsapp_send_text(client, {
+            _require_success(await whatsapp_send_text(client, {
                 "to": sender_phone, 
                 "text": "📅 Perfecto. Te contactaremos para reprogramar."
-            })
+            }), "whatsapp_send_text")
         elif button_id == "cancelar":
-            await whatsapp_send_text(client, {
+            _require_success(await whatsapp_send_text(client, {
                 "to": sender_phone,
                 "text": "❌ Entendido. Hemos cancelado tu solicitud."
-            })
+            }), "whatsapp_send_text")
         
     except Exception as e:
         logger.error(f"Error processing button response: {str(e)}")
+        raise
 
 async def _process_list_response(list_id: str, sender_phone: str, contact_info: Dict[str, Any]):
     """Procesa respuesta de lista"""
@@ -348,13 +500,14 @@ async def _process_list_response(list_id: str, sender_phone: str, contact_info:
         client = get_auth_client()
         
         # Respuesta genérica para selección de lista
-        await whatsapp_send_text(client, {
+        _require_success(await whatsapp_send_text(client, {
             "to": sender_phone,
             "text": f"✅ Has seleccionado: {list_id}. Procesaremos tu selección."
-        })
+        }), "whatsapp_send_text")
         
     except Exception as e:
         logger.error(f"Error processing list response: {str(e)}")
+        raise
 
 async def _persist_incoming_message(message: Dict[str, Any], contact_info: Dict[str, Any]):
     """Persiste mensaje entrante usando STORAGE_RULES"""
@@ -365,7 +518,7 @@ async def _persist_incoming_message(message: Dict[str, Any], contact_info: Dict[
         
         client = get_auth_client()
         
-        await save_memory(client, {
+        _require_success(await save_memory(client, {
             "storage_type": "document",
             "file_name": f"whatsapp_incoming_{message.get('id', int(time.time()))}.json",
             "content": {
@@ -376,10 +529,11 @@ async def _persist_incoming_message(message: Dict[str, Any], contact_info: Dict[
                 "processed": True
             },
             "tags": ["whatsapp", "incoming", message.get("type", "unknown")]
-        })
+        }), "save_memory")
         
     except Exception as e:
         logger.error(f"Error persisting incoming message: {str(e)}")
+        raise
 
 async def _persist_message_status(status: Dict[str, Any]):
     """Persiste status de mensaje"""
@@ -389,7 +543,7 @@ async def _persist_message_status(status: Dict[str, Any]):
         
         client = get_auth_client()
         
-        await save_memory(client, {
+        _require_success(await save_memory(client, {
             "storage_type": "analytics",
             "file_name": f"whatsapp_status_{status.get('id', int(time.time()))}.json",
             "content": {
@@ -398,7 +552,8 @@ async def _persist_message_status(status: Dict[str, Any]):
                 "recorded_at": time.time()
             },
             "tags": ["whatsapp", "status", status.get("status", "unknown")]
-        })
+        }), "save_memory")
         
     except Exception as e:
         logger.error(f"Error persisting message status: {str(e)}")
+        raise
@@ -6,20 +6,33 @@ Interfaz para ejecutar y monitorear todos los workflows del sistema
 
 from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
 from typing import Dict, Any, List, Optional
+import asyncio
 import logging
 from datetime import datetime
 import uuid
 
 from app.core.auth_manager import get_current_user, AuthenticatedUser
 from app.workflows.auto_workflow import AutoWorkflowManager
+from app.workflows import checkpoints, scheduler
 from app.shared.helpers.response_helpers import create_success_response, create_error_response
 
 logger = logging.getLogger(__name__)
 router = APIRouter(tags=["🔄 Workflow Management"])
 
-# Estado global de workflows en ejecución
+# Estado de workflows en ejecución en este proceso; el registro durable (para
+# consultar y reanudar tras un reinicio) vive en app.workflows.checkpoints
 workflow_status = {}
 
+def _get_execution(execution_id: str) -> Optional[Dict[str, Any]]:
+    """Estado en memoria o, si la ejecución es de otro proceso/anterior al reinicio, el registro durable."""
+    if execution_id in workflow_status:
+        return workflow_status[execution_id]
+    record = checkpoints.get_run(execution_id)
+    if record and record.get("status") in ("iniciando", "ejecutando") and checkpoints.is_run_stale(record):
+        # Su worker dejó de renovar el latido: quedó interrumpida
+        record["status"] = "interrumpido"
+    return record
+
 @router.get("/workflows", 
            summary="Listar workflows disponibles",
            description="Obtiene la lista completa de workflows predefinidos disponibles")
@@ -86,6 +99,11 @@ async def execute_workflow(
             "results": []
         }
         
+        run_record = {k: v for k, v in workflow_status[execution_id].items() if k != "results"}
+        run_record["params"] = params or {}
+        checkpoints.save_run(execution_id, run_record)
+        checkpoints.claim_run(execution_id)
+        
         # Ejecutar workflow en background
         background_tasks.add_task(
             _execute_workflow_background,
@@ -120,14 +138,13 @@ async def get_workflow_status(
 ):
     """Consulta el estado de una ejecución de workflow"""
     try:
-        if execution_id not in workflow_status:
+        status = _get_execution(execution_id)
+        if status is None:
             raise HTTPException(
                 status_code=404,
                 detail=f"Ejecución '{execution_id}' no encontrada"
             )
         
-        status = workflow_status[execution_id]
-        
         # Verificar que el usuario puede ver este workflow
         if status["user_id"] != current_user.user_id:
             raise HTTPException(
@@ -156,8 +173,10 @@ async def get_workflow_history(
     """Obtiene el historial de workflows del usuario"""
     try:
         user_workflows = []
+        executions = {run["execution_id"]: _get_execution(run["execution_id"]) for run in checkpoints.list_runs(current_user.user_id)}
+        executions.update(workflow_status)
         
-        for execution_id, status in workflow_status.items():
+        for execution_id, status in executions.items():
             if status["user_id"] == current_user.user_id:
                 user_workflows.append({
                     "execution_id": execution_id,
@@ -187,38 +206,174 @@ async def get_workflow_history(
         logger.error(f"Error obteniendo historial: {e}")
         return create_error_response(error=str(e), status_code=500)
 
+@router.post("/workflows/status/{execution_id}/resume",
+            summary="Reanudar ejecución",
+            description="Reanuda una ejecución fallida o interrumpida desde los pasos que no terminaron, reutilizando los checkpoints")
+async def resume_workflow_execution(
+    execution_id: str,
+    background_tasks: BackgroundTasks,
+    current_user: AuthenticatedUser = Depends(get_current_user)
+):
+    """Reanuda una ejecución de workflow a partir de sus checkpoints"""
+    try:
+        status = _get_execution(execution_id)
+        if status is None:
+            raise HTTPException(status_code=404, detail=f"Ejecución '{execution_id}' no encontrada")
+        if status["user_id"] != current_user.user_id:
+            raise HTTPException(status_code=403, detail="No tienes permisos para reanudar esta ejecución")
+        if status["status"] in ("iniciando", "ejecutando"):
+            raise HTTPException(status_code=409, detail="La ejecución sigue en curso")
+        if status["status"] == "completado":
+            raise HTTPException(status_code=409, detail="La ejecución ya se completó")
+        if not checkpoints.claim_run(execution_id):
+            raise HTTPException(status_code=409, detail="Otro worker ya está reanudando la ejecución")
+        
+        record = checkpoints.get_run(execution_id) or {}
+        workflow_status[execution_id] = {
+            "workflow_id": status["workflow_id"],
+            "status": "iniciando",
+            "started_at": status["started_at"],
+            "resumed_at": datetime.now().isoformat(),
+            "user_id": status["user_id"],
+            "current_step": 0,
+            "total_steps": status["total_steps"],
+            "results": []
+        }
+        background_tasks.add_task(
+            _execute_workflow_background,
+            execution_id,
+            status["workflow_id"],
+            record.get("params", {}),
+            current_user
+        )
+        
+        return create_success_response(
+            data={
+                "execution_id": execution_id,
+                "workflow_id": status["workflow_id"],
+                "status": "reanudado",
+                "monitor_url": f"/api/v1/workflows/status/{execution_id}"
+            },
+            message=f"Ejecución '{execution_id}' reanudada desde el último checkpoint"
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error reanudando ejecución {execution_id}: {e}")
+        return create_error_response(error=str(e), status_code=500)
+
+@router.get("/workflows/schedules",
+           summary="Listar programaciones",
+           description="Lista las ejecuciones programadas (cron) de workflows del usuario")
+async def list_workflow_schedules(current_user: AuthenticatedUser = Depends(get_current_user)):
+    """Lista las programaciones del usuario con su próxima ejecución"""
+    try:
+        schedules = scheduler.list_schedules(current_user.user_id)
+        for schedule in schedules:
+            schedule["next_run"] = datetime.fromtimestamp(schedule["next_run_at"]).isoformat()
+        return create_success_response(
+            data={"schedules": schedules, "total_schedules": len(schedules)},
+            message=f"Se encontraron {len(schedules)} programaciones"
+        )
+    except Exception as e:
+        logger.error(f"Error listando programaciones: {e}")
+        return create_error_response(error=str(e), status_code=500)
+
+@router.post("/workflows/schedules",
+            summary="Programar workflow",
+            description="Programa un workflow predefinido ('workflow_id') o personalizado ('workflow_definition') con una expresión cron y jitter opcional")
+async def create_workflow_schedule(
+    definition: Dict[str, Any],
+    current_user: AuthenticatedUser = Depends(get_current_user)
+):
+    """Crea una programación cron para un workflow"""
+    try:
+        workflow_id = definition.get("workflow_id")
+        if workflow_id and workflow_id not in AutoWorkflowManager().predefined_workflows:
+            raise HTTPException(status_code=404, detail=f"Workflow '{workflow_id}' no encontrado")
+        schedule = scheduler.create_schedule(dict(definition, user_id=current_user.user_id, schedule_id=None))
+        return create_success_response(
+            data=dict(schedule, next_run=datetime.fromtimestamp(schedule["next_run_at"]).isoformat()),
+            message=f"Workflow programado ({schedule['cron']})"
+        )
+    except HTTPException:
+        raise
+    except ValueError as e:
+        return create_error_response(error=str(e), status_code=400)
+    except Exception as e:
+        logger.error(f"Error creando programación: {e}")
+        return create_error_response(error=str(e), status_code=500)
+
+@router.delete("/workflows/schedules/{schedule_id}",
+              summary="Eliminar programación",
+              description="Elimina una ejecución programada de workflow")
+async def delete_workflow_schedule(
+    schedule_id: str,
+    current_user: AuthenticatedUser = Depends(get_current_user)
+):
+    """Elimina una programación del usuario"""
+    try:
+        schedule = scheduler.get_schedule(schedule_id)
+        if schedule is None:
+            raise HTTPException(status_code=404, detail=f"Programación '{schedule_id}' no encontrada")
+        if schedule.get("user_id") != current_user.user_id:
+            raise HTTPException(status_code=403, detail="No tienes permisos para eliminar esta programación")
+        scheduler.delete_schedule(schedule_id)
+        return create_success_response(data={"schedule_id": schedule_id}, message="Programación eliminada")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error eliminando programación {schedule_id}: {e}")
+        return create_error_response(error=str(e), status_code=500)
+
 async def _execute_workflow_background(
     execution_id: str,
     workflow_id: str,
     params: Dict[str, Any],
     current_user: AuthenticatedUser
 ):
-    """Ejecuta el workflow en background"""
-    try:
-        workflow_manager = AutoWorkflowManager()
+    """Ejecuta el workflow en background guardando un checkpoint por paso"""
+    status = workflow_status[execution_id]
+    
+    def on_step(index: int, outcome: Dict[str, Any]) -> None:
+        status["current_step"] = max(status["current_step"], index + 1)
+        status["results"].append({k: v for k, v in outcome.items() if k != "result"})
+    
+    with checkpoints.keep_alive(execution_id):
+        try:
+            workflow_manager = AutoWorkflowManager()
+            checkpoints.purge_expired()
         
-        # Actualizar estado a 'ejecutando'
-        workflow_status[execution_id]["status"] = "ejecutando"
+            # Actualizar estado a 'ejecutando'
+            status["status"] = "ejecutando"
+            checkpoints.save_run(execution_id, {"status": "ejecutando"})
         
-        # Ejecutar workflow
-        result = await workflow_manager.execute_predefined_workflow(
-            workflow_id, 
-            params, 
-            current_user
-        )
+            # Ejecutar workflow en un hilo: las acciones son bloqueantes
+            result = await asyncio.to_thread(
+                workflow_manager.execute_workflow,
+                workflow_id,
+                params,
+                execution_id,
+                on_step
+            )
         
-        # Actualizar estado final
-        workflow_status[execution_id].update({
-            "status": "completado" if result.get("success") else "error",
-            "completed_at": datetime.now().isoformat(),
-            "final_result": result,
-            "current_step": workflow_status[execution_id]["total_steps"]
-        })
+            # Actualizar estado final
+            status.update({
+                "status": "completado" if result.get("status") == "success" else "error",
+                "completed_at": datetime.now().isoformat(),
+                "final_result": result,
+                "current_step": status["total_steps"] if result.get("status") == "success" else status["current_step"]
+            })
         
-    except Exception as e:
-        logger.error(f"Error en ejecución background {execution_id}: {e}")
-        workflow_status[execution_id].update({
-            "status": "error",
-            "completed_at": datetime.now().isoformat(),
-            "error": str(e)
+        except Exception as e:
+            logger.error(f"Error en ejecución background {execution_id}: {e}")
+            status.update({
+                "status": "error",
+                "completed_at": datetime.now().isoformat(),
+                "error": str(e)
+            })
+    
+        checkpoints.save_run(execution_id, {
+            k: v for k, v in status.items() if k in ("status", "completed_at", "current_step", "error")
         })
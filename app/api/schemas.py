@@ -10,6 +10,7 @@ class ActionRequest(BaseModel):
     """
     action: str = Field(..., example="calendar_list_events", description="Nombre de la acción a ejecutar.")
     params: Dict[str, Any] = Field(default_factory=dict, example={"start_datetime": "2025-05-20T08:00:00Z", "end_datetime": "2025-05-20T17:00:00Z"}, description="Parámetros para la acción.")
+    fields: Optional[Union[str, List[str]]] = Field(None, example="id,subject,from.emailAddress.address", description="Campos a devolver (lista o cadena separada por comas; admite rutas con puntos). Equivale a params._fields.")
 
 class ErrorDetail(BaseModel):
     """
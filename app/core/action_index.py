@@ -0,0 +1,186 @@
+# app/core/action_index.py
+"""
+Índice invertido de acciones para interpretar peticiones en lenguaje natural.
+
+Se construye una vez sobre el nombre de cada acción, la primera línea de su docstring
+y los alias en lenguaje natural. Los textos se normalizan (minúsculas, sin tildes),
+se reducen a una raíz ligera español/inglés y los sinónimos se unifican en un término
+canónico ("correo", "email", "mail" -> "email"). Buscar solo recorre las listas de
+los términos de la consulta, así que no depende del tamaño del catálogo.
+
+Puntuación por término: peso del campo (alias > nombre > descripción) × idf; un alias
+cuyos términos aparecen todos en la consulta recibe además un bono, de modo que las
+frases conocidas ("enviar correo") ganan a coincidencias parciales.
+"""
+
+import re
+import math
+import heapq
+import inspect
+import unicodedata
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+NAME_WEIGHT = 3.0
+ALIAS_WEIGHT = 4.0
+DESCRIPTION_WEIGHT = 1.0
+ALIAS_PHRASE_BONUS = 10.0
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+_STOPWORDS = {
+    "a", "al", "de", "del", "el", "la", "las", "los", "lo", "un", "una", "unos", "unas", "y", "o", "en",
+    "con", "por", "para", "que", "mi", "mis", "me", "tu", "su", "sus", "se", "es", "the", "an", "of",
+    "to", "and", "or", "in", "on", "for", "my", "me", "by", "with", "from", "is", "this", "esto", "este",
+    "esta", "favor", "please", "quiero", "necesito", "puedes",
+}
+
+# Grupos de sinónimos (español/inglés, abreviaturas de plataformas); el primero es el canónico
+_SYNONYM_GROUPS = [
+    ["email", "correo", "mail", "outlook"],
+    ["send", "enviar", "mandar", "envia", "manda"],
+    ["list", "listar", "lista", "mostrar", "muestra", "ver", "show", "leer", "lee", "read", "consultar"],
+    ["get", "obtener", "obten", "traer", "fetch"],
+    ["create", "crear", "crea", "nuevo", "nueva", "new", "add", "agregar", "anadir"],
+    ["delete", "eliminar", "borrar", "remove", "quitar"],
+    ["update", "actualizar", "modificar", "editar", "edit", "cambiar"],
+    ["search", "buscar", "busca", "find", "encontrar", "query"],
+    ["upload", "subir", "sube", "cargar"],
+    ["download", "descargar", "bajar"],
+    ["file", "archivo", "documento", "document", "fichero"],
+    ["folder", "carpeta", "directorio"],
+    ["event", "evento", "reunion", "meeting", "cita"],
+    ["calendar", "calendario", "agenda"],
+    ["message", "mensaje", "msg", "chat"],
+    ["campaign", "campana"],
+    ["site", "sitio"],
+    ["team", "equipo"],
+    ["user", "usuario"],
+    ["contact", "contacto"],
+    ["task", "tarea"],
+    ["page", "pagina"],
+    ["memory", "memoria", "recuerdo"],
+    ["workflow", "flujo"],
+    ["execute", "ejecutar", "ejecuta", "run", "correr", "lanzar"],
+    ["report", "informe", "reporte"],
+    ["metric", "metrica", "estadistica", "stats", "insight", "analytics", "rendimiento", "performance"],
+    ["ad", "anuncio", "ads"],
+    ["video", "videos"],
+    ["post", "publicacion", "publicar", "publish"],
+    ["status", "estado"],
+    ["help", "ayuda"],
+    ["action", "accion"],
+    ["sharepoint", "sp"],
+    ["meta", "metaads", "facebook", "fb", "instagram"],
+    ["google", "googleads"],
+    ["product", "producto"],
+    ["order", "pedido", "orden"],
+    ["customer", "cliente"],
+    ["group", "grupo"],
+    ["channel", "canal"],
+    ["backup", "respaldo", "copia"],
+]
+
+_SUFFIXES = (
+    "aciones", "iciones", "acion", "icion", "mente", "ando", "iendo", "ados", "idas", "idos", "adas",
+    "ings", "ing", "ado", "ido", "ada", "ida", "ies", "ar", "er", "ir", "es", "ed", "s",
+)
+
+# Plural '-es' solo tras consonantes con las que termina un singular (canal-es, reunion-es,
+# match-es); tras otras ('mensaj-es', 'client-es') el singular acaba en 'e' y se quita solo la 's'
+_ES_PLURAL_AFTER = set("lnrdzysxh")
+# Palabras que parecen plurales pero no lo son ('news' no es 'new' -> create)
+_INVARIANT_WORDS = {"news"}
+
+
+def _strip_accents(text: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+
+
+def stem(word: str) -> str:
+    """Raíz ligera español/inglés (plurales, infinitivos, gerundios, participios)."""
+    if word in _INVARIANT_WORDS:
+        return word
+    for suffix in _SUFFIXES:
+        if suffix == "es" and word.endswith(suffix) and word[-3:-2] not in _ES_PLURAL_AFTER:
+            suffix = "s"
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+_SYNONYMS: Dict[str, str] = {}
+for _group in _SYNONYM_GROUPS:
+    _canonical = stem(_group[0])
+    for _word in _group:
+        _SYNONYMS.setdefault(stem(_word), _canonical)
+
+
+def tokenize(text: str) -> List[str]:
+    """Términos canónicos de un texto ('Envía los correos' -> ['send', 'email'])."""
+    words = _WORD_RE.findall(_strip_accents(text.lower()).replace("_", " "))
+    terms = []
+    for word in words:
+        if word in _STOPWORDS:
+            continue
+        stemmed = stem(word)
+        terms.append(_SYNONYMS.get(stemmed, stemmed))
+    return terms
+
+
+def _description(function: Callable) -> str:
+    doc = inspect.getdoc(function) or ""
+    return doc.strip().split("\n", 1)[0] if doc else ""
+
+
+class ActionIndex:
+    """Índice invertido término -> {acción: peso} con búsqueda top-k."""
+
+    def __init__(self, actions: Mapping[str, Callable], aliases: Optional[Mapping[str, str]] = None):
+        postings: Dict[str, Dict[str, float]] = {}
+
+        def _add(action: str, terms: Iterable[str], weight: float) -> None:
+            for term in set(terms):
+                entry = postings.setdefault(term, {})
+                entry[action] = max(entry.get(action, 0.0), weight)
+
+        for action, function in actions.items():
+            _add(action, tokenize(action), NAME_WEIGHT)
+            _add(action, tokenize(_description(function)), DESCRIPTION_WEIGHT)
+
+        # Alias solo de acciones existentes; cada uno se recuerda como frase completa
+        self._alias_terms: Dict[str, List[Set[str]]] = {}
+        for phrase, action in (aliases or {}).items():
+            if action in actions:
+                terms = tokenize(phrase)
+                _add(action, terms, ALIAS_WEIGHT)
+                if terms:
+                    self._alias_terms.setdefault(action, []).append(set(terms))
+
+        total = max(1, len(actions))
+        self._postings: Dict[str, List[Tuple[str, float]]] = {
+            term: [(action, weight * math.log(1 + total / len(entry))) for action, weight in entry.items()]
+            for term, entry in postings.items()
+        }
+        self.size = len(actions)
+
+    def search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
+        """Las k acciones con mayor puntuación: [{"action", "score", "matched_terms"}]."""
+        terms = set(tokenize(query))
+        scores: Dict[str, float] = {}
+        matched: Dict[str, List[str]] = {}
+        for term in terms:
+            for action, weight in self._postings.get(term, ()):
+                scores[action] = scores.get(action, 0.0) + weight
+                matched.setdefault(action, []).append(term)
+        for action in scores:
+            if any(alias <= terms for alias in self._alias_terms.get(action, ())):
+                scores[action] += ALIAS_PHRASE_BONUS
+        ranked = heapq.nsmallest(k, scores.items(), key=lambda item: (-item[1], item[0]))
+        return [
+            {"action": action, "score": round(score, 3), "matched_terms": sorted(matched[action])}
+            for action, score in ranked
+        ]
+
+    def best(self, query: str) -> Optional[str]:
+        results = self.search(query, k=1)
+        return results[0]["action"] if results else None
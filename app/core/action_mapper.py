@@ -387,6 +387,9 @@ HUBSPOT_ACTIONS: Dict[str, Callable] = {
     "hubspot_get_pipeline_stages": hubspot_actions.hubspot_get_pipeline_stages,
     # AGREGAR la nueva función restaurada:
     "hubspot_manage_pipeline": hubspot_actions.hubspot_manage_pipeline,
+    # Sincronización incremental por cursor de fecha de modificación
+    "hubspot_sync_changes": hubspot_actions.hubspot_sync_changes,
+    "hubspot_reset_sync_cursor": hubspot_actions.hubspot_reset_sync_cursor,
 }
 
 # ============================================================================
@@ -556,6 +559,7 @@ NOTION_ACTIONS: Dict[str, Callable] = {
     "notion_update_page": notion_actions.notion_update_page,
     "notion_delete_block": notion_actions.notion_delete_block,
     "notion_find_database_by_name": notion_actions.notion_find_database_by_name,
+    "notion_find_page_by_name": notion_actions.notion_find_page_by_name,
     "notion_create_page_in_database": notion_actions.notion_create_page_in_database,
     "notion_append_text_block_to_page": notion_actions.notion_append_text_block_to_page,
     "notion_get_page_content": notion_actions.notion_get_page_content,
@@ -564,6 +568,10 @@ NOTION_ACTIONS: Dict[str, Callable] = {
     "notion_create_database": notion_actions.notion_create_database,
     "notion_add_users_to_page": notion_actions.notion_add_users_to_page,
     "notion_archive_page": notion_actions.notion_archive_page,
+    "notion_bulk_create_pages_in_database": notion_actions.notion_bulk_create_pages_in_database,
+    "notion_bulk_update_pages": notion_actions.notion_bulk_update_pages,
+    "notion_bulk_archive_pages": notion_actions.notion_bulk_archive_pages,
+    "notion_query_database_all": notion_actions.notion_query_database_all,
 }
 
 # ============================================================================
@@ -658,9 +666,13 @@ POWER_AUTOMATE_ACTIONS: Dict[str, Callable] = {
 POWERBI_ACTIONS: Dict[str, Callable] = {
     "powerbi_list_reports": powerbi_actions.list_reports,
     "powerbi_export_report": powerbi_actions.export_report,
+    "powerbi_get_export_status": powerbi_actions.get_export_status,
+    "powerbi_download_export": powerbi_actions.download_export,
     "powerbi_list_dashboards": powerbi_actions.list_dashboards,
     "powerbi_list_datasets": powerbi_actions.list_datasets,
     "powerbi_refresh_dataset": powerbi_actions.refresh_dataset,
+    "powerbi_list_workspaces": powerbi_actions.list_workspaces,
+    "powerbi_get_tenant_inventory": powerbi_actions.get_tenant_inventory,
 }
 
 # ============================================================================
@@ -931,6 +943,8 @@ WORDPRESS_ACTIONS: Dict[str, Callable] = {
     # WordPress Core Actions (14 acciones)
     "wordpress_create_post": wordpress_actions.wordpress_create_post,
     "wordpress_update_post": wordpress_actions.wordpress_update_post,
+    "wordpress_bulk_upsert_posts": wordpress_actions.wordpress_bulk_upsert_posts,
+    "wordpress_bulk_update_posts": wordpress_actions.wordpress_bulk_update_posts,
     "wordpress_delete_post": wordpress_actions.wordpress_delete_post,
     "wordpress_get_posts": wordpress_actions.wordpress_get_posts,
     "wordpress_get_post": wordpress_actions.wordpress_get_post,
@@ -956,10 +970,14 @@ WORDPRESS_ACTIONS: Dict[str, Callable] = {
     "woocommerce_get_orders_by_customer": wordpress_actions.woocommerce_get_orders_by_customer,
     "woocommerce_get_product_categories": wordpress_actions.woocommerce_get_product_categories,
     "woocommerce_get_reports": wordpress_actions.woocommerce_get_reports,
+    "woocommerce_get_catalog": wordpress_actions.woocommerce_get_catalog,
+    "woocommerce_batch_products": wordpress_actions.woocommerce_batch_products,
+    "woocommerce_batch_orders": wordpress_actions.woocommerce_batch_orders,
+    "woocommerce_sync_products_by_sku": wordpress_actions.woocommerce_sync_products_by_sku,
 }
 
 # ============================================================================
-# MAPEO DE ACCIONES - WHATSAPP BUSINESS API (13 acciones) - NUEVO
+# MAPEO DE ACCIONES - WHATSAPP BUSINESS API (16 acciones) - NUEVO
 # ============================================================================
 
 WHATSAPP_ACTIONS: Dict[str, Callable] = {
@@ -980,8 +998,10 @@ WHATSAPP_ACTIONS: Dict[str, Callable] = {
     "whatsapp_create_template": whatsapp_actions.whatsapp_create_template,
     "whatsapp_get_message_status": whatsapp_actions.whatsapp_get_message_status,
     
-    # Broadcast y gestión (2 acciones)
+    # Broadcast y gestión (5 acciones)
     "whatsapp_broadcast_segment": whatsapp_actions.whatsapp_broadcast_segment,
+    "whatsapp_get_broadcast_status": whatsapp_actions.whatsapp_get_broadcast_status,
+    "whatsapp_cancel_broadcast": whatsapp_actions.whatsapp_cancel_broadcast,
     "whatsapp_handover_to_human": whatsapp_actions.whatsapp_handover_to_human,
     "whatsapp_close_ticket": whatsapp_actions.whatsapp_close_ticket,
 }
@@ -1,5 +1,6 @@
 # app/core/config.py
 import os
+import tempfile
 import logging  # ← YA TIENES ESTE IMPORT CORRECTO
 from typing import List, Optional, Union 
 from pydantic import HttpUrl, field_validator, Field 
@@ -69,6 +70,12 @@ class Settings(BaseSettings):
     DEFAULT_API_TIMEOUT: int = 90 
     MAILBOX_USER_ID: str = "me" 
 
+    # Estado local persistente (cursores de sincronización, checkpoints, cachés)
+    LOCAL_STATE_DIR: str = Field(
+        default=os.path.join(tempfile.gettempdir(), "elitedynamics_state"),
+        description="Directorio para el almacén local SQLite"
+    )
+
     # GitHub
     GITHUB_PAT: Optional[str] = None 
 
@@ -115,6 +122,8 @@ class Settings(BaseSettings):
     GEMINI_MODEL: str = Field("gemini-1.5-flash", env="GEMINI_MODEL")
     GEMINI_TEMPERATURE: float = Field(0.7, env="GEMINI_TEMPERATURE")
     GEMINI_MAX_TOKENS: int = Field(8192, env="GEMINI_MAX_TOKENS")
+    GEMINI_CACHE_TTL: int = Field(600, env="GEMINI_CACHE_TTL")
+    GEMINI_CACHE_MAX_ENTRIES: int = Field(512, env="GEMINI_CACHE_MAX_ENTRIES")
 
     # Google Ads Configuration
     GOOGLE_ADS_CLIENT_ID: Optional[str] = Field(None, env="GOOGLE_ADS_CLIENT_ID")
@@ -4,9 +4,13 @@ Configuración personalizada de OpenAPI para compatibilidad con Custom GPT
 Degrada OpenAPI de 3.1.0 a 3.0.3 para máxima compatibilidad
 """
 
+from fastapi import Request
 from fastapi.openapi.utils import get_openapi
+from fastapi.responses import Response
 from typing import Dict, Any
 
+from app.shared.helpers.cached_response import cached_document, document_response
+
 def get_custom_gpt_openapi(app) -> Dict[str, Any]:
     """
     Genera especificación OpenAPI 3.0.3 compatible con Custom GPT
@@ -117,4 +121,14 @@ def optimize_for_custom_gpt(app):
     # Reemplazar la función openapi por nuestra versión compatible
     app.openapi = lambda: get_custom_gpt_openapi(app)
     
+    # Servir el JSON ya serializado y comprimido (se genera en la primera petición,
+    # cuando todos los routers ya están incluidos) con ETag y GET condicional
+    if app.openapi_url:
+        app.router.routes[:] = [route for route in app.router.routes if getattr(route, "path", None) != app.openapi_url]
+        
+        async def openapi_document(request: Request) -> Response:
+            return document_response(request, cached_document("openapi", app.openapi))
+        
+        app.add_route(app.openapi_url, openapi_document, include_in_schema=False)
+    
     return app
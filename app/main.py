@@ -2,8 +2,9 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
+from app.middlewares.compression import CompressionMiddleware
+from app.shared.helpers.json_response import FastJSONResponse
 import logging
 from datetime import datetime
 import os
@@ -102,9 +103,31 @@ async def lifespan(app: FastAPI):
     logger.info("Iniciando EliteDynamicsAPI v1.1...")
     logger.info(f"Nivel de Logging configurado: {settings.LOG_LEVEL.upper()}")
     logger.info(f"Entorno: {settings.ENVIRONMENT}")
+    if whatsapp_webhook_router is not None:
+        # Retoma eventos de WhatsApp que quedaron en cola antes del reinicio
+        from app.api.routes.whatsapp_webhook import start_webhook_workers
+        try:
+            start_webhook_workers()
+        except Exception as e:
+            logger.warning("No se pudieron iniciar los workers del webhook de WhatsApp: %s", e)
+    if workflow_router is not None:
+        # Ejecuciones programadas (cron) de workflows
+        from app.workflows.scheduler import start_scheduler
+        try:
+            start_scheduler()
+        except Exception as e:
+            logger.warning("No se pudo iniciar el programador de workflows: %s", e)
     yield
     # Shutdown
     logger.info("Apagando EliteDynamicsAPI...")
+    # Las sesiones en memoria pasan al almacén local para retomarlas tras el reinicio
+    from app.shared.helpers.session_cache import flush_session_caches
+    try:
+        flushed = flush_session_caches()
+        if flushed:
+            logger.info(f"{flushed} sesiones volcadas al almacén local")
+    except Exception as e:
+        logger.warning("No se pudieron volcar las sesiones en memoria: %s", e)
 
 # Crear la instancia de la aplicación FastAPI con lifespan
 app = FastAPI(
@@ -114,7 +137,8 @@ app = FastAPI(
     docs_url="/api/v1/docs",
     redoc_url="/api/v1/redoc",
     openapi_url="/api/v1/openapi.json",
-    lifespan=lifespan  # Usar lifespan en lugar de on_event
+    lifespan=lifespan,  # Usar lifespan en lugar de on_event
+    default_response_class=FastJSONResponse  # Acepta datetime/Decimal; orjson si está instalado
 )
 
 # 🚀 OPTIMIZAR PARA CUSTOM GPT - CAMBIAR OPENAPI DE 3.1.0 A 3.0.3
@@ -129,10 +153,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compresión brotli/gzip de respuestas grandes (umbral RESPONSE_COMPRESSION_MIN_SIZE)
+app.add_middleware(CompressionMiddleware)
+
 # Normalización de errores 422 (validación) y 500 (genéricos) a JSON consistente
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=422,
         content={
             "status": "error",
@@ -146,7 +173,7 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
 async def generic_exception_handler(request: Request, exc: Exception):
     # Evita respuestas HTML y mantiene formato JSON homogéneo
     logger.exception("Unhandled exception: %s", exc)
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=500,
         content={
             "status": "error",
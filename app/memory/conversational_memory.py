@@ -8,6 +8,7 @@ Funcionalidades:
 - Resumen automático de conversaciones largas
 """
 
+import os
 import logging
 from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime, timedelta
@@ -17,11 +18,17 @@ from dataclasses import dataclass, asdict
 from collections import defaultdict
 
 from app.core.auth_manager import get_auth_client
+from app.shared.helpers.session_cache import SpillingSessionCache
 from app.actions import sharepoint_actions, notion_actions, gemini_actions
 from .persistent_memory import PersistentMemoryManager
 
 logger = logging.getLogger(__name__)
 
+# Usuarios con historial en memoria; el resto se desaloja al almacén local
+HISTORY_CACHE_USERS = int(os.getenv("CONVERSATION_HISTORY_CACHE_USERS", "1000"))
+# Las sesiones desalojadas que nadie retoma se purgan del disco tras este plazo
+SESSION_RETENTION_SECONDS = int(os.getenv("CONVERSATION_SESSION_RETENTION_DAYS", "30")) * 86400
+
 @dataclass
 class ConversationTurn:
     """Un turno en la conversación"""
@@ -49,13 +56,25 @@ class ConversationSession:
     resolution_status: str  # 'completed', 'pending', 'escalated'
     satisfaction_score: Optional[float]
 
+def _session_from_dict(data: Dict[str, Any]) -> "ConversationSession":
+    """Reconstruye una sesión desalojada (las fechas vuelven como texto ISO)."""
+    def _dt(value):
+        return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+    turns = [ConversationTurn(**{**turn, "timestamp": _dt(turn["timestamp"])}) for turn in data.get("turns", [])]
+    return ConversationSession(**{
+        **data,
+        "start_time": _dt(data["start_time"]),
+        "end_time": _dt(data.get("end_time")),
+        "turns": turns,
+    })
+
+
 class ConversationalMemory:
     """Sistema de memoria conversacional que mantiene contexto entre sesiones"""
     
     def __init__(self):
         self.persistent_memory = PersistentMemoryManager()
-        self.active_sessions = {}  # Cache de sesiones activas
-        self.conversation_history = {}  # Cache de historial por usuario
         
         # Configuración
         self.config = {
@@ -66,6 +85,24 @@ class ConversationalMemory:
             "importance_threshold": 0.7,
             "max_sessions_cache": 50
         }
+        
+        # Cache de sesiones activas: acotada (LRU + inactividad); las desalojadas se recargan del disco
+        self.active_sessions = SpillingSessionCache(
+            "conversation_sessions",
+            max_entries=self.config["max_sessions_cache"],
+            ttl_seconds=self.config["session_timeout_minutes"] * 60,
+            dump=asdict,
+            load=_session_from_dict,
+            retention_seconds=SESSION_RETENTION_SECONDS,
+        )
+        # Cache de historial por usuario (últimas max_sessions_cache sesiones de cada uno)
+        self.conversation_history = SpillingSessionCache(
+            "conversation_history",
+            max_entries=HISTORY_CACHE_USERS,
+            dump=lambda sessions: [asdict(session) for session in sessions],
+            load=lambda items: [_session_from_dict(item) for item in items],
+            retention_seconds=SESSION_RETENTION_SECONDS,
+        )
     
     async def start_conversation_session(self, user_id: str, initial_context: Dict[str, Any] = None) -> str:
         """Inicia una nueva sesión de conversación"""
@@ -93,6 +130,7 @@ class ConversationalMemory:
             
             # Inicializar memoria conversacional
             await self._initialize_session_memory(session, historical_context)
+            self.active_sessions[session_id] = session
             
             logger.info(f"Nueva sesión iniciada: {session_id} para usuario {user_id}")
             
@@ -149,6 +187,9 @@ class ConversationalMemory:
             # Verificar límites de contexto
             await self._manage_context_limits(session)
             
+            # Reasignar tras modificarla: si se desalojó durante los await, el cambio no se pierde
+            self.active_sessions[session_id] = session
+            
             return {
                 "success": True,
                 "turn_id": turn_id,
@@ -243,15 +284,12 @@ class ConversationalMemory:
             # Remover del cache activo
             del self.active_sessions[session_id]
             
-            # Añadir al historial
-            if session.user_id not in self.conversation_history:
-                self.conversation_history[session.user_id] = []
-            self.conversation_history[session.user_id].append(session)
+            # Añadir al historial (limitado en cache), leer-modificar-escribir bajo el lock de la caché
+            def _append_to_history(history: List[ConversationSession]) -> None:
+                history.append(session)
+                del history[:-self.config["max_sessions_cache"]]
             
-            # Limitar historial en cache
-            if len(self.conversation_history[session.user_id]) > self.config["max_sessions_cache"]:
-                self.conversation_history[session.user_id] = \
-                    self.conversation_history[session.user_id][-self.config["max_sessions_cache"]:]
+            self.conversation_history.update(session.user_id, _append_to_history, default_factory=list)
             
             return {
                 "success": True,
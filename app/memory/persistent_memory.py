@@ -9,8 +9,13 @@ from typing import Dict, Any, List, Optional
 from datetime import datetime
 import json
 import hashlib
+import os
+import time
+import threading
 
 from app.core.auth_manager import get_auth_client
+from app.memory.vector_index import LocalVectorIndex, extract_text
+from app.shared.helpers.local_store import get_local_store
 from app.actions import sharepoint_actions
 from app.actions import notion_actions
 
@@ -31,6 +36,68 @@ except Exception:
 
 logger = logging.getLogger(__name__)
 
+# Índice local compartido por todas las instancias: evita el viaje a SharePoint en
+# búsquedas y encuentra contexto relacionado aunque no coincida literalmente.
+# Las entradas se guardan en el almacén local; el índice se carga al primer uso con las
+# más recientes y cada MEMORY_INDEX_SYNC_SECONDS incorpora las que hayan escrito otros procesos.
+_MEMORY_INDEX_NAMESPACE = "persistent_memory_index"
+MEMORY_INDEX_SYNC_SECONDS = float(os.getenv("MEMORY_INDEX_SYNC_SECONDS", "5"))
+# Margen de relectura: otro proceso puede confirmar una escritura con un updated_at algo anterior
+_MEMORY_INDEX_SYNC_OVERLAP = 2.0
+_MEMORY_INDEX_SYNC_BATCH = 256
+_memory_index: Optional[LocalVectorIndex] = None
+_memory_index_synced_at = 0.0
+_memory_index_checked_at = 0.0
+_memory_index_lock = threading.Lock()
+
+def _get_memory_index() -> LocalVectorIndex:
+    global _memory_index, _memory_index_checked_at
+    with _memory_index_lock:
+        initial_load = _memory_index is None
+        if initial_load:
+            _memory_index = LocalVectorIndex()
+        now = time.monotonic()
+        if _memory_index.available and (initial_load or now - _memory_index_checked_at >= MEMORY_INDEX_SYNC_SECONDS):
+            _memory_index_checked_at = now
+            try:
+                _sync_memory_index(_memory_index, initial_load)
+            except Exception as e:
+                logger.warning(f"No se pudo sincronizar el índice de memoria local: {e}")
+        return _memory_index
+
+def _sync_memory_index(index: LocalVectorIndex, initial_load: bool) -> None:
+    """Indexa las entradas escritas (por este u otros procesos) desde la última sincronización"""
+    global _memory_index_synced_at
+    since = 0.0 if initial_load else max(0.0, _memory_index_synced_at - _MEMORY_INDEX_SYNC_OVERLAP)
+    # En la carga inicial solo caben las max_entries más recientes
+    entries = get_local_store().iter_updated_since(
+        _MEMORY_INDEX_NAMESPACE, since, newest=index.max_entries if initial_load else None
+    )
+    batch: List[tuple] = []
+    batch_last_at = _memory_index_synced_at
+    for key, entry, updated_at in entries:
+        if updated_at <= _memory_index_synced_at and key in index:
+            continue  # ya indexada en una sincronización anterior
+        batch.append((key, _memory_entry_text(entry), {"category": entry.get("category")}))
+        batch_last_at = max(batch_last_at, updated_at)
+        if len(batch) >= _MEMORY_INDEX_SYNC_BATCH:
+            index.add_many(batch)
+            _memory_index_synced_at, batch = batch_last_at, []
+    if batch:
+        index.add_many(batch)
+    # La marca solo avanza con lotes indexados: si el embedder falla se reintenta en la siguiente
+    _memory_index_synced_at = batch_last_at
+    if initial_load:
+        logger.info(f"Índice de memoria local cargado con {len(index)} entradas ({index.embedding_source})")
+
+def _memory_entry_text(entry: Dict[str, Any]) -> str:
+    return extract_text({
+        "query": entry.get("query_original"),
+        "action": entry.get("action_executed"),
+        "category": entry.get("category"),
+        "result": entry.get("result_summary")
+    })
+
 class PersistentMemoryManager:
     """Gestor de memoria persistente automática"""
     
@@ -72,6 +139,8 @@ class PersistentMemoryManager:
                 "response_size": len(json.dumps(interaction_data.get("result", {})))
             }
 
+            self._index_entry(memory_entry)
+
             # Detectar pista de almacenamiento (bucket) si viene en el payload o en params
             params_in = interaction_data.get("params", {}) if isinstance(interaction_data.get("params"), dict) else {}
             storage_type = interaction_data.get("storage_type") or params_in.get("storage_type") or params_in.get("resource_type")
@@ -201,8 +270,41 @@ class PersistentMemoryManager:
                 "message": f"Error obteniendo historial: {str(e)}"
             }
     
-    def search_memory(self, query: str, category: str = None) -> Dict[str, Any]:
-        """Busca en la memoria persistente"""
+    def _index_entry(self, memory_entry: Dict[str, Any]) -> None:
+        """Registra la interacción en el índice local (no bloquea el guardado si falla)"""
+        try:
+            key = f"{memory_entry['session_id']}:{memory_entry['interaction_id']}"
+            get_local_store().set(_MEMORY_INDEX_NAMESPACE, key, memory_entry)
+            _get_memory_index().add(key, _memory_entry_text(memory_entry), {"category": memory_entry.get("category")})
+        except Exception as e:
+            logger.warning(f"No se pudo indexar la interacción localmente: {e}")
+
+    def search_memory(self, query: str, category: str = None, limit: int = 20, use_index: bool = True) -> Dict[str, Any]:
+        """
+        Busca en la memoria persistente.
+        
+        Primero consulta el índice vectorial local (milisegundos, resultados ordenados por
+        similitud); si no hay coincidencias recurre a la búsqueda en SharePoint.
+        """
+        
+        if use_index:
+            try:
+                index = _get_memory_index()
+                category_filter = (lambda meta: meta.get("category") == category) if category else None
+                hits = index.search(query, limit, 0.2, category_filter)
+                if hits:
+                    entries = get_local_store().get_many(_MEMORY_INDEX_NAMESPACE, [key for key, _, _ in hits])
+                    results = [{**entries[key], "similarity": round(score, 4)} for key, score, _ in hits if key in entries]
+                    return {
+                        "status": "success",
+                        "query": query,
+                        "category": category,
+                        "results": results,
+                        "total_found": len(results),
+                        "source": "local_index"
+                    }
+            except Exception as e:
+                logger.warning(f"Índice local no disponible, buscando en SharePoint: {e}")
         
         try:
             auth_client = get_auth_client()
@@ -403,7 +505,7 @@ def search_memory(client, params: Dict[str, Any]) -> Dict[str, Any]:
     """Función para ACTION_MAP - buscar en memoria (alias canónico)"""
     query = params.get("query", "")
     category = params.get("category")
-    return memory_manager.search_memory(query, category)
+    return memory_manager.search_memory(query, category, limit=params.get("limit", 20), use_index=params.get("use_index", True))
 
 def export_memory_summary(client, params: Dict[str, Any]) -> Dict[str, Any]:
     """Función para ACTION_MAP - exportar resumen"""
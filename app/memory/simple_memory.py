@@ -3,14 +3,23 @@
 Sistema de Memoria Simplificado sin dependencias circulares
 """
 
+import os
 import logging
 from typing import Dict, Any, Optional, List
 from datetime import datetime
 from typing import Callable, Tuple
 import json
 
+from app.memory.vector_index import LocalVectorIndex, extract_text
+from app.shared.helpers.session_cache import SpillingSessionCache
+
 logger = logging.getLogger(__name__)
 
+# Sesiones en memoria por worker; las menos usadas o inactivas pasan al almacén local
+MAX_CACHED_SESSIONS = int(os.getenv("MEMORY_MAX_CACHED_SESSIONS", "1000"))
+SESSION_IDLE_SECONDS = int(os.getenv("MEMORY_SESSION_IDLE_SECONDS", "1800"))
+SESSION_RETENTION_SECONDS = int(os.getenv("MEMORY_SESSION_RETENTION_DAYS", "30")) * 86400
+
 class SimpleMemoryManager:
     """Gestor simplificado de memoria"""
     
@@ -88,19 +97,37 @@ class SimpleMemoryManager:
 
     def __init__(self):
         self.memory_storage = {}  # En memoria para simplificar
-        self.sessions = {}
+        # Índice de similitud sobre el texto de las interacciones de las sesiones en memoria:
+        # sus vectores salen y vuelven con la sesión al desalojarla y recargarla
+        self.vector_index = LocalVectorIndex()
+        self.sessions = SpillingSessionCache(
+            "simple_memory_sessions",
+            max_entries=MAX_CACHED_SESSIONS,
+            ttl_seconds=SESSION_IDLE_SECONDS,
+            retention_seconds=SESSION_RETENTION_SECONDS,
+            on_spill=self._unindex_session,
+            on_reload=self._index_session,
+        )
+
+    def _index_session(self, session_id: str, interactions: List[Dict[str, Any]]) -> None:
+        try:
+            self.vector_index.add_many(
+                ((session_id, interaction["id"]), extract_text(interaction.get("data")), {"session_id": session_id})
+                for interaction in interactions
+            )
+        except Exception as e:
+            logger.warning(f"No se pudo reindexar la sesión {session_id}: {e}")
+
+    def _unindex_session(self, session_id: str, interactions: List[Dict[str, Any]]) -> None:
+        self.vector_index.remove((session_id, interaction["id"]) for interaction in interactions)
     
     def save_interaction(self, session_id: str, interaction_data: Dict[str, Any], user_id: Optional[str] = None) -> Dict[str, Any]:
         """Guardar interacción en memoria"""
         try:
-            if session_id not in self.sessions:
-                self.sessions[session_id] = []
-            
             interaction = {
                 "timestamp": datetime.now().isoformat(),
                 "user_id": user_id,
                 "data": interaction_data,
-                "id": len(self.sessions[session_id]) + 1
             }
             
             # Persistencia opcional (SharePoint/OneDrive/Notion) si se indicó en data.persist_to
@@ -124,7 +151,14 @@ class SimpleMemoryManager:
                     if qa:
                         interaction.setdefault("quick_access", {}).update(qa)
             
-            self.sessions[session_id].append(interaction)
+            def _append(interactions: List[Dict[str, Any]]) -> None:
+                interaction["id"] = len(interactions) + 1
+                interactions.append(interaction)
+            
+            # El id y el append se hacen bajo el lock de la caché: un desalojo concurrente no pierde la interacción
+            self.sessions.update(session_id, _append, default_factory=list)
+            # El embedding puede ir a la API: se calcula fuera del lock de la caché
+            self.vector_index.add((session_id, interaction["id"]), extract_text(interaction_data), {"session_id": session_id})
             
             return {
                 "success": True,
@@ -142,23 +176,51 @@ class SimpleMemoryManager:
     def get_session_history(self, session_id: str, limit: int = 50) -> List[Dict[str, Any]]:
         """Obtener historial de sesión"""
         try:
-            if session_id not in self.sessions:
+            interactions = self.sessions.get(session_id)
+            if interactions is None:
                 return []
             
-            return self.sessions[session_id][-limit:] if limit > 0 else self.sessions[session_id]
+            return interactions[-limit:] if limit > 0 else interactions
         except Exception as e:
             logger.error(f"Error obteniendo historial: {str(e)}")
             return []
     
-    def search_interactions(self, query: str, session_id: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
-        """Buscar interacciones"""
+    def search_interactions(self, query: str, session_id: Optional[str] = None, limit: int = 20,
+                            mode: str = "auto", min_score: float = 0.2) -> List[Dict[str, Any]]:
+        """
+        Buscar interacciones.
+        
+        mode="semantic" usa el índice vectorial local (resultados con 'similarity'), que
+        cubre las sesiones en memoria; mode="exact" busca el texto literal en todas, también
+        las desalojadas; "auto" usa el índice y completa con coincidencias literales si no
+        alcanza 'limit' resultados.
+        """
         try:
             results = []
-            sessions_to_search = [session_id] if session_id else list(self.sessions.keys())
+            seen = set()
+            if mode in ("auto", "semantic") and self.vector_index.available:
+                session_filter = None
+                if session_id:
+                    # Pedir una sesión concreta la recarga (y reindexa) si estaba desalojada
+                    self.sessions.get(session_id)
+                    session_filter = lambda meta: meta.get("session_id") == session_id
+                for (sid, interaction_id), score, _ in self.vector_index.search(query, limit, min_score, session_filter):
+                    # Leer sin promover: una búsqueda no debe desalojar sesiones activas
+                    interactions = self.sessions.peek(sid) or []
+                    if 0 < interaction_id <= len(interactions):
+                        results.append({**interactions[interaction_id - 1], "similarity": round(score, 4)})
+                        seen.add((sid, interaction_id))
+                if mode == "semantic" or len(results) >= limit:
+                    return results
+            
+            # Sin sesión concreta se recorren también las desalojadas, sin recargarlas en memoria
+            sessions_to_search = [(session_id, self.sessions.get(session_id))] if session_id else self.sessions.iter_items()
             
-            for sid in sessions_to_search:
-                if sid in self.sessions:
-                    for interaction in self.sessions[sid]:
+            for sid, interactions in sessions_to_search:
+                if interactions:
+                    for interaction in interactions:
+                        if (sid, interaction.get("id")) in seen:
+                            continue
                         # Búsqueda simple por texto
                         interaction_text = json.dumps(interaction, ensure_ascii=False).lower()
                         if query.lower() in interaction_text:
@@ -174,13 +236,13 @@ class SimpleMemoryManager:
     def export_session_summary(self, session_id: str, format_type: str = "json") -> Dict[str, Any]:
         """Exportar resumen de sesión"""
         try:
-            if session_id not in self.sessions:
+            interactions = self.sessions.get(session_id)
+            if interactions is None:
                 return {
                     "success": False,
                     "error": f"Sesión '{session_id}' no encontrada"
                 }
             
-            interactions = self.sessions[session_id]
             summary = {
                 "session_id": session_id,
                 "total_interactions": len(interactions),
@@ -225,10 +287,10 @@ def get_memory_history(session_id: str, limit: int = 50) -> Dict[str, Any]:
             "error": str(e)
         }
 
-def search_memory(query: str, session_id: Optional[str] = None, limit: int = 20) -> Dict[str, Any]:
+def search_memory(query: str, session_id: Optional[str] = None, limit: int = 20, mode: str = "auto") -> Dict[str, Any]:
     """Buscar en memoria"""
     try:
-        results = simple_memory_manager.search_interactions(query, session_id, limit)
+        results = simple_memory_manager.search_interactions(query, session_id, limit, mode=mode)
         return {
             "success": True,
             "query": query,
@@ -0,0 +1,298 @@
+# app/memory/vector_index.py
+"""
+Índice vectorial local para búsqueda por similitud sobre la memoria del asistente.
+
+- Los textos se vectorizan con el despliegue de embeddings de Azure OpenAI
+  configurado en MEMORY_EMBEDDING_DEPLOYMENT, a través de get_embedding (lotes y
+  caché en disco: un texto ya visto no vuelve a la API). Sin despliegue configurado
+  se usa feature hashing local de palabras y trigramas de caracteres, que solo
+  captura similitud léxica.
+- La búsqueda aproximada usa LSH de hiperplanos aleatorios (varias tablas con
+  sondeo de bits vecinos) y reordena los candidatos por coseno exacto; por debajo
+  de EXACT_SEARCH_THRESHOLD entradas se compara contra todo el índice.
+- Los vectores se guardan en float16 en bloques de BLOCK_ROWS filas: crecer no copia
+  lo ya indexado y, con más de 'max_entries' elementos, se desaloja el más antiguo.
+- 'remove' libera la posición (se reutiliza en el siguiente 'add') para que quien
+  desaloja datos de memoria pueda desalojar también sus vectores.
+- Sin numpy disponible el índice queda inactivo y los llamadores recurren a su
+  búsqueda literal.
+"""
+
+import os
+import re
+import zlib
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy es opcional para este módulo
+    np = None
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+VECTOR_DIM = int(os.getenv("MEMORY_EMBEDDING_DIM", "512"))
+MEMORY_EMBEDDING_DEPLOYMENT = os.getenv("MEMORY_EMBEDDING_DEPLOYMENT", "")
+VECTOR_INDEX_MAX_ENTRIES = int(os.getenv("VECTOR_INDEX_MAX_ENTRIES", "100000"))
+BLOCK_ROWS = 4096
+LSH_TABLES = 8
+LSH_BITS = 14
+EXACT_SEARCH_THRESHOLD = 20000
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _stable_hash(value: str) -> int:
+    # hash() de Python cambia entre procesos; crc32 es estable y rápido
+    return zlib.crc32(value.encode("utf-8"))
+
+
+def extract_text(value: Any, max_chars: int = 4000) -> str:
+    """Concatena los textos de una estructura (dicts/listas anidados) para indexarla."""
+    parts: List[str] = []
+
+    def _walk(node: Any) -> None:
+        if isinstance(node, str):
+            parts.append(node)
+        elif isinstance(node, dict):
+            for key, item in node.items():
+                if key not in ("timestamp", "id", "interaction_id"):
+                    _walk(item)
+        elif isinstance(node, (list, tuple)):
+            for item in node:
+                _walk(item)
+        elif isinstance(node, (int, float)) and not isinstance(node, bool):
+            parts.append(str(node))
+
+    _walk(value)
+    return " ".join(parts)[:max_chars]
+
+
+def hash_embedding(text: str, dim: int = VECTOR_DIM):
+    """Vector normalizado por feature hashing: palabras (peso 1) y trigramas de caracteres (peso 0.5)."""
+    vector = np.zeros(dim, dtype=np.float32)
+    for token in _TOKEN_RE.findall(text.lower()):
+        features = [(token, 1.0)]
+        padded = f"#{token}#"
+        features.extend((padded[i:i + 3], 0.5) for i in range(len(padded) - 2))
+        for feature, weight in features:
+            h = _stable_hash(feature)
+            vector[h % dim] += weight if (h >> 31) & 1 else -weight
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm else vector
+
+
+class HashingEmbedder:
+    """Embeddings locales por feature hashing (modo sin conexión: similitud solo léxica)."""
+
+    source = "hashing"
+
+    def __init__(self, dim: int = VECTOR_DIM):
+        self.dim = dim
+
+    def __call__(self, texts: Sequence[str]):
+        return np.stack([hash_embedding(text, self.dim) for text in texts])
+
+
+class AzureOpenAIEmbedder:
+    """Embeddings del despliegue de Azure OpenAI vía get_embedding (lotes + caché en disco)."""
+
+    source = "azure_openai"
+
+    def __init__(self, deployment_id: str, dim: int = VECTOR_DIM):
+        self.deployment_id = deployment_id
+        self.dim = dim
+
+    def __call__(self, texts: Sequence[str]):
+        # Importación diferida: las acciones cargan dependencias que la memoria no necesita al importar
+        from app.core.auth_manager import get_auth_client
+        from app.actions.openai_actions import get_embedding
+
+        result = get_embedding(get_auth_client(), {
+            "deployment_id": self.deployment_id,
+            "input": list(texts),
+            "dimensions": self.dim
+        })
+        if result.get("status") != "success":
+            raise RuntimeError(result.get("message") or "Error generando embeddings")
+        items = sorted(result["data"]["data"], key=lambda item: item["index"])
+        return np.asarray([item["embedding"] for item in items], dtype=np.float32)
+
+
+def default_embedder(dim: int = VECTOR_DIM):
+    """Azure OpenAI si hay despliegue de embeddings configurado; si no, hashing local."""
+    if MEMORY_EMBEDDING_DEPLOYMENT and settings.AZURE_OPENAI_RESOURCE_ENDPOINT:
+        return AzureOpenAIEmbedder(MEMORY_EMBEDDING_DEPLOYMENT, dim)
+    return HashingEmbedder(dim)
+
+
+class LocalVectorIndex:
+    """Índice ANN incremental en memoria (LSH + reordenamiento exacto) con tamaño acotado."""
+
+    def __init__(self, dim: int = VECTOR_DIM, embedder: Optional[Callable[[Sequence[str]], Any]] = None,
+                 max_entries: int = VECTOR_INDEX_MAX_ENTRIES, tables: int = LSH_TABLES,
+                 bits: int = LSH_BITS, seed: int = 13):
+        self.available = np is not None
+        self.dim = dim
+        self.max_entries = max_entries
+        self._lock = threading.RLock()
+        self._ids: List[Any] = []
+        self._meta: List[Dict[str, Any]] = []
+        # Orden de inserción = orden de desalojo al superar max_entries
+        self._positions: Dict[Any, int] = {}
+        self._free: List[int] = []
+        if not self.available:
+            logger.warning("numpy no disponible: índice vectorial desactivado, se usará búsqueda literal")
+            return
+        self._embed = embedder or default_embedder(dim)
+        self.embedding_source = getattr(self._embed, "source", "custom")
+        rng = np.random.default_rng(seed)
+        self._planes = rng.standard_normal((tables, bits, dim)).astype(np.float32)
+        self._powers = (1 << np.arange(bits)).astype(np.int32)
+        self._vector_blocks: List["np.ndarray"] = []
+        self._code_blocks: List["np.ndarray"] = []
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __contains__(self, item_id: Any) -> bool:
+        return item_id in self._positions
+
+    def _embed_texts(self, texts: Sequence[str]):
+        vectors = np.asarray(self._embed(texts), dtype=np.float32)
+        if vectors.shape != (len(texts), self.dim):
+            raise ValueError(f"Embeddings con forma {vectors.shape}, se esperaba ({len(texts)}, {self.dim})")
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms > 0, norms, 1)
+
+    def _codes(self, vectors) -> "np.ndarray":
+        bits = (np.einsum("tbd,nd->ntb", self._planes, vectors) > 0).astype(np.int32)
+        return bits @ self._powers
+
+    def _allocate(self, item_id: Any) -> int:
+        if self._free:
+            position = self._free.pop()
+            self._ids[position] = item_id
+            return position
+        position = len(self._ids)
+        if position >= len(self._vector_blocks) * BLOCK_ROWS:
+            # Bloque nuevo en lugar de duplicar y copiar la matriz entera
+            self._vector_blocks.append(np.zeros((BLOCK_ROWS, self.dim), dtype=np.float16))
+            self._code_blocks.append(np.full((BLOCK_ROWS, self._planes.shape[0]), -1, dtype=np.int32))
+        self._ids.append(item_id)
+        self._meta.append({})
+        return position
+
+    def _release(self, position: int) -> None:
+        block, row = divmod(position, BLOCK_ROWS)
+        self._ids[position] = None
+        self._meta[position] = {}
+        self._vector_blocks[block][row] = 0
+        self._code_blocks[block][row] = -1  # ningún código de consulta queda a <= 1 bit de -1
+        self._free.append(position)
+
+    def add_many(self, items: Iterable[Tuple[Any, str, Optional[Dict[str, Any]]]]) -> int:
+        """
+        Indexa (o reemplaza) varios elementos (id, texto, metadatos) con una sola llamada al
+        embedder. Devuelve cuántos indexó; los errores del embedder se propagan.
+        """
+        items = [item for item in items if item[1]]
+        if not self.available or not items:
+            return 0
+        vectors = self._embed_texts([text for _, text, _ in items])
+        codes = self._codes(vectors)
+        with self._lock:
+            for (item_id, _, metadata), vector, code in zip(items, vectors, codes):
+                # Reindexar mueve el elemento al final del orden de desalojo
+                position = self._positions.pop(item_id, None)
+                if position is None:
+                    while len(self._positions) >= self.max_entries:
+                        self._release(self._positions.pop(next(iter(self._positions))))
+                    position = self._allocate(item_id)
+                self._positions[item_id] = position
+                block, row = divmod(position, BLOCK_ROWS)
+                self._vector_blocks[block][row] = vector
+                self._code_blocks[block][row] = code
+                self._meta[position] = metadata or {}
+        return len(items)
+
+    def add(self, item_id: Any, text: str, metadata: Optional[Dict[str, Any]] = None) -> bool:
+        """Indexa (o reemplaza) un elemento. Devuelve False si el índice está inactivo o el embedding falla."""
+        if not self.available or not text:
+            return False
+        try:
+            return self.add_many([(item_id, text, metadata)]) == 1
+        except Exception as e:
+            logger.warning(f"No se pudo indexar '{item_id}': {e}")
+            return False
+
+    def remove(self, item_ids) -> int:
+        """Quita elementos del índice; devuelve cuántos estaban indexados."""
+        if not self.available:
+            return 0
+        removed = 0
+        with self._lock:
+            for item_id in item_ids:
+                position = self._positions.pop(item_id, None)
+                if position is None:
+                    continue
+                self._release(position)
+                removed += 1
+        return removed
+
+    def _score(self, vector, query_codes=None) -> Tuple["np.ndarray", "np.ndarray"]:
+        """Posiciones y similitudes de todo el índice o, con query_codes, solo de los candidatos LSH."""
+        total = len(self._ids)
+        found_positions, found_scores = [], []
+        for block_index, (vectors, codes) in enumerate(zip(self._vector_blocks, self._code_blocks)):
+            rows = min(BLOCK_ROWS, total - block_index * BLOCK_ROWS)
+            if rows <= 0:
+                break
+            if query_codes is None:
+                rows_index = np.arange(rows)
+            else:
+                # Sondeo múltiple: mismo cubo o a un bit de distancia en alguna tabla
+                diff = codes[:rows] ^ query_codes
+                rows_index = np.flatnonzero(((diff & (diff - 1)) == 0).any(axis=1))
+            if len(rows_index):
+                found_scores.append(vectors[rows_index].astype(np.float32) @ vector)
+                found_positions.append(rows_index + block_index * BLOCK_ROWS)
+        if not found_positions:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        return np.concatenate(found_positions), np.concatenate(found_scores)
+
+    def search(self, text: str, k: int = 10, min_score: float = 0.0,
+               filter_fn: Optional[Callable[[Dict[str, Any]], bool]] = None) -> List[Tuple[Any, float, Dict[str, Any]]]:
+        """Devuelve hasta k tuplas (id, similitud coseno, metadatos) ordenadas por similitud."""
+        if not self.available or not text or not self._positions:
+            return []
+        try:
+            vector = self._embed_texts([text])[0]
+        except Exception as e:
+            logger.warning(f"No se pudo vectorizar la consulta: {e}")
+            return []
+        with self._lock:
+            if len(self._ids) <= EXACT_SEARCH_THRESHOLD:
+                positions, scores = self._score(vector)
+            else:
+                positions, scores = self._score(vector, self._codes(vector[None, :])[0])
+                if len(positions) < k:
+                    positions, scores = self._score(vector)
+            order = np.argsort(-scores)
+            results = []
+            for index in order:
+                score = float(scores[index])
+                if score < min_score:
+                    break
+                position = int(positions[index])
+                if self._ids[position] is None:
+                    continue  # posición liberada
+                meta = self._meta[position]
+                if filter_fn and not filter_fn(meta):
+                    continue
+                results.append((self._ids[position], score, meta))
+                if len(results) >= k:
+                    break
+        return results
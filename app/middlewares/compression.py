@@ -0,0 +1,97 @@
+# app/middlewares/compression.py
+"""
+Compresión negociada (brotli/gzip) de las respuestas de la API.
+
+Solo se comprimen respuestas de un único bloque, de tipo textual (JSON, texto, XML)
+y con al menos COMPRESSION_MIN_SIZE bytes; las respuestas en streaming (SSE, NDJSON,
+descargas) y las que ya traen Content-Encoding (documentos precalculados) pasan sin
+tocar. Brotli se usa si el cliente lo acepta y el paquete está instalado.
+"""
+
+import os
+import gzip
+from typing import Any, Dict, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app.shared.helpers.cached_response import choose_encoding
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli es opcional; se usa gzip
+    brotli = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv("RESPONSE_COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("RESPONSE_BROTLI_QUALITY", "4"))
+# Por encima de este tamaño se comprime en el threadpool para no bloquear el event loop
+THREADPOOL_COMPRESSION_SIZE = 256 * 1024
+_COMPRESSIBLE_TYPES = ("application/json", "text/", "application/xml", "application/javascript", "image/svg+xml")
+_AVAILABLE_ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware:
+    """Middleware ASGI que comprime respuestas grandes según Accept-Encoding."""
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Dict[str, Any], receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict((key.lower(), value) for key, value in scope.get("headers", []))
+        encoding = choose_encoding(headers.get(b"accept-encoding", b"").decode("latin-1"), _AVAILABLE_ENCODINGS)
+        if encoding == "identity" or scope.get("method") == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Dict[str, Any]] = None
+        passthrough = False
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough or start_message is None:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            response_headers: List = list(start_message.get("headers", []))
+            header_map = {key.lower(): value for key, value in response_headers}
+            content_type = header_map.get(b"content-type", b"").decode("latin-1").lower()
+            if (
+                message.get("more_body", False)
+                or b"content-encoding" in header_map
+                or len(body) < self.minimum_size
+                or not content_type.startswith(_COMPRESSIBLE_TYPES)
+            ):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            if len(body) >= THREADPOOL_COMPRESSION_SIZE:
+                compressed = await run_in_threadpool(_compress, body, encoding)
+            else:
+                compressed = _compress(body, encoding)
+            response_headers = [(k, v) for k, v in response_headers if k.lower() not in (b"content-length", b"vary")]
+            vary = header_map.get(b"vary")
+            response_headers += [
+                (b"content-encoding", encoding.encode("latin-1")),
+                (b"content-length", str(len(compressed)).encode("latin-1")),
+                (b"vary", vary + b", Accept-Encoding" if vary and b"accept-encoding" not in vary.lower() else vary or b"Accept-Encoding"),
+            ]
+            await send(dict(start_message, headers=response_headers))
+            await send({"type": "http.response.body", "body": compressed, "more_body": False})
+
+        await self.app(scope, receive, send_wrapper)
@@ -70,7 +70,8 @@ class WhatsAppClient:
             respect_retry_after_header=True
         )
         
-        adapter = HTTPAdapter(max_retries=retry_strategy)
+        # Pool amplio: los broadcasts envían desde varios hilos con la misma sesión
+        adapter = HTTPAdapter(max_retries=retry_strategy, pool_connections=4, pool_maxsize=32)
         session.mount("http://", adapter)
         session.mount("https://", adapter)
         
@@ -0,0 +1,124 @@
+# app/shared/helpers/cached_response.py
+"""
+Documentos JSON precalculados (catálogos de acciones, especificación OpenAPI).
+
+Cada documento se genera una vez por proceso: se serializa, se calcula su ETag
+fuerte (hash del contenido, igual en todos los workers del mismo despliegue) y se
+comprime con gzip (y brotli si el paquete está instalado). Al servirlo se respeta
+If-None-Match (304 sin cuerpo) y se elige la codificación según Accept-Encoding,
+así que un cliente que consulta el catálogo a menudo apenas cuesta CPU ni ancho de banda.
+"""
+
+import os
+import gzip
+import json
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli es opcional; se usa gzip
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+JSON_MEDIA_TYPE = "application/json"
+# Los clientes pueden guardar la copia pero deben revalidarla (304 si no cambió)
+DEFAULT_CACHE_CONTROL = "no-cache"
+# Marca del despliegue para los documentos (fecha/ID de build). Nunca la hora del proceso:
+# cambiaría el cuerpo, y con él el ETag, en cada worker y en cada reinicio
+BUILD_TIMESTAMP = os.getenv("APP_BUILD_TIMESTAMP")
+
+_documents: Dict[str, "PrecomputedDocument"] = {}
+_documents_lock = threading.Lock()
+
+
+class PrecomputedDocument:
+    """Cuerpo JSON ya serializado y comprimido, con un ETag por codificación."""
+
+    def __init__(self, content: Any):
+        self.body = json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+        digest = hashlib.sha256(self.body).hexdigest()[:32]
+        self.generated_at = datetime.now().isoformat()
+        self.bodies: Dict[str, bytes] = {"identity": self.body, "gzip": gzip.compress(self.body, 9, mtime=0)}
+        if brotli is not None:
+            self.bodies["br"] = brotli.compress(self.body, quality=11)
+        # Representaciones distintas, ETags fuertes distintos (RFC 9110 §8.8.3)
+        self.etags = {
+            encoding: f'"{digest}"' if encoding == "identity" else f'"{digest}-{encoding}"'
+            for encoding in self.bodies
+        }
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return bool(candidates & set(self.etags.values()))
+
+
+def _accepted_encodings(accept_encoding: str) -> Dict[str, float]:
+    accepted: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    return accepted
+
+
+def choose_encoding(accept_encoding: Optional[str], available) -> str:
+    """Mejor codificación disponible según Accept-Encoding (br > gzip > identity)."""
+    accepted = _accepted_encodings(accept_encoding or "")
+    for encoding in ("br", "gzip"):
+        if encoding in available and accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return "identity"
+
+
+def cached_document(key: str, builder: Callable[[], Any]) -> PrecomputedDocument:
+    """Devuelve el documento 'key', generándolo con 'builder' la primera vez."""
+    document = _documents.get(key)
+    if document is None:
+        with _documents_lock:
+            document = _documents.get(key)
+            if document is None:
+                document = PrecomputedDocument(builder())
+                _documents[key] = document
+                logger.info(f"Documento '{key}' precalculado ({len(document.body)} bytes, ETag {document.etags['identity']})")
+    return document
+
+
+def invalidate_document(key: Optional[str] = None) -> None:
+    """Descarta un documento (o todos) para que se regenere en la próxima petición."""
+    with _documents_lock:
+        if key is None:
+            _documents.clear()
+        else:
+            _documents.pop(key, None)
+
+
+def document_response(request: Request, document: PrecomputedDocument,
+                      cache_control: str = DEFAULT_CACHE_CONTROL) -> Response:
+    """Sirve un documento precalculado con ETag, compresión negociada y GET condicional."""
+    encoding = choose_encoding(request.headers.get("accept-encoding"), document.bodies)
+    headers = {"ETag": document.etags[encoding], "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    if document.matches(request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=document.bodies[encoding], media_type=JSON_MEDIA_TYPE, headers=headers)
@@ -0,0 +1,174 @@
+# app/shared/helpers/intent_router.py
+"""
+Enrutador de intenciones precompilado.
+
+Los patrones de intención del asistente son, en su gran mayoría, secuencias de grupos
+de palabras separados por '.*' ("(envía|manda).*(correo|email)"). Al construir el
+router se descomponen en esos grupos y todas las palabras se compilan en un único
+autómata Aho-Corasick; detectar intenciones es entonces una sola pasada sobre el
+mensaje más una comprobación de orden para los patrones cuyas palabras aparecieron,
+así el coste apenas crece al añadir patrones.
+
+Los patrones que no siguen esa forma se compilan una vez como regex y se evalúan
+aparte. La semántica es la de re.search sobre el texto en minúsculas (coincidencia
+por subcadena, sin límites de palabra), así que el resultado coincide con el
+recorrido secuencial de regex que reemplaza.
+"""
+
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+_GROUP_RE = re.compile(r"^\(([^()\\.*+?\[\]{}^$]+)\)$")
+_REGEX_META = set("\\.*+?[]{}()^$|")
+
+
+@dataclass
+class IntentMatch:
+    """Coincidencia de un patrón; 'priority' es su posición en la definición (0 = primero)."""
+    payload: Any
+    pattern: str
+    priority: int
+    keywords: List[str] = field(default_factory=list)
+    score: float = 0.0
+
+
+def _decompose(pattern: str) -> Optional[List[List[str]]]:
+    """'(a|b).*(c|d).*e' -> [['a', 'b'], ['c', 'd'], ['e']]; None si el patrón no tiene esa forma."""
+    groups: List[List[str]] = []
+    for part in pattern.split(".*"):
+        if not part:
+            continue
+        group_match = _GROUP_RE.match(part)
+        if group_match:
+            alternatives = group_match.group(1).split("|")
+        elif not any(char in _REGEX_META for char in part):
+            alternatives = [part]
+        else:
+            return None
+        if not all(alternatives):
+            return None
+        groups.append([alternative.lower() for alternative in alternatives])
+    return groups
+
+
+class _AhoCorasick:
+    """Autómata de búsqueda simultánea de palabras clave (una pasada sobre el texto)."""
+
+    def __init__(self, keywords: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[str]] = [[]]
+        for keyword in keywords:
+            state = 0
+            for char in keyword:
+                if char not in self._goto[state]:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                    self._goto[state][char] = len(self._goto) - 1
+                state = self._goto[state][char]
+            if keyword not in self._output[state]:
+                self._output[state].append(keyword)
+        # Enlaces de fallo por anchura
+        pending = deque(self._goto[0].values())
+        while pending:
+            state = pending.popleft()
+            for char, target in self._goto[state].items():
+                pending.append(target)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[target] = self._goto[fallback].get(char, 0)
+                self._output[target] = self._output[target] + self._output[self._fail[target]]
+
+    def scan(self, text: str) -> Dict[str, List[Tuple[int, int]]]:
+        """{palabra: [(inicio, fin), ...]} de todas las apariciones, solapadas incluidas."""
+        hits: Dict[str, List[Tuple[int, int]]] = {}
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for keyword in self._output[state]:
+                hits.setdefault(keyword, []).append((position + 1 - len(keyword), position + 1))
+        return hits
+
+
+class IntentRouter:
+    """Compila una vez una lista ordenada (patrón, payload) y devuelve las coincidencias por prioridad."""
+
+    def __init__(self, patterns: Iterable[Tuple[str, Any]]):
+        self._patterns: List[Tuple[str, Any]] = list(patterns)
+        self._groups: Dict[int, List[List[str]]] = {}
+        self._regexes: Dict[int, "re.Pattern"] = {}
+        self._always: List[int] = []
+        self._by_keyword: Dict[str, List[int]] = {}
+        for priority, (pattern, _) in enumerate(self._patterns):
+            groups = _decompose(pattern)
+            if groups is None:
+                self._regexes[priority] = re.compile(pattern, re.IGNORECASE)
+            elif not groups:
+                self._always.append(priority)
+            else:
+                self._groups[priority] = groups
+                # Basta indexar por el primer grupo: sin él el patrón no puede cumplirse
+                for keyword in groups[0]:
+                    self._by_keyword.setdefault(keyword, []).append(priority)
+        self._automaton = _AhoCorasick(kw for groups in self._groups.values() for group in groups for kw in group)
+
+    def __len__(self) -> int:
+        return len(self._patterns)
+
+    @staticmethod
+    def _match_groups(groups: List[List[str]], hits: Dict[str, List[Tuple[int, int]]]) -> Optional[List[str]]:
+        # Cada grupo debe aparecer a partir del final del anterior; elegir el fin más temprano es óptimo
+        position = 0
+        matched: List[str] = []
+        for group in groups:
+            best: Optional[Tuple[int, str]] = None
+            for keyword in group:
+                for start, end in hits.get(keyword, ()):
+                    if start >= position and (best is None or end < best[0]):
+                        best = (end, keyword)
+            if best is None:
+                return None
+            position = best[0]
+            matched.append(best[1])
+        return matched
+
+    def match(self, text: str, limit: Optional[int] = None) -> List[IntentMatch]:
+        """Coincidencias ordenadas por prioridad (orden de definición)."""
+        lowered = text.lower()
+        # '.*' no cruza saltos de línea en re.search: cada línea se evalúa por separado
+        line_hits = [self._automaton.scan(line) for line in lowered.split("\n")]
+        candidates = {priority for hits in line_hits for keyword in hits for priority in self._by_keyword.get(keyword, ())}
+        matches: List[IntentMatch] = []
+        for priority in sorted(candidates | set(self._regexes) | set(self._always)):
+            pattern, payload = self._patterns[priority]
+            if priority in self._groups:
+                keywords = next(
+                    (found for found in (self._match_groups(self._groups[priority], hits) for hits in line_hits) if found),
+                    None
+                )
+                if keywords is None:
+                    continue
+            elif priority in self._regexes:
+                found = self._regexes[priority].search(lowered)
+                if not found:
+                    continue
+                keywords = [found.group(0)] if found.group(0) else []
+            else:
+                keywords = []
+            # Puntuación: fracción del mensaje cubierta por las palabras reconocidas
+            score = round(sum(len(k) for k in keywords) / max(1, len(lowered)), 4)
+            matches.append(IntentMatch(payload=payload, pattern=pattern, priority=priority, keywords=keywords, score=score))
+            if limit is not None and len(matches) >= limit:
+                break
+        return matches
+
+    def best(self, text: str) -> Optional[IntentMatch]:
+        """Coincidencia de mayor prioridad (equivale al primer re.search que acierta)."""
+        matches = self.match(text, limit=1)
+        return matches[0] if matches else None
@@ -0,0 +1,62 @@
+# app/shared/helpers/json_response.py
+"""
+Serialización JSON rápida para respuestas grandes.
+
+JSONResponse de Starlette usa json.dumps sin 'default', así que un datetime o un
+Decimal en el resultado de una acción rompe la respuesta; por eso algunos módulos
+recorren sus resultados antes de devolverlos. FastJSONResponse usa orjson si está
+instalado (serializa datetime/date/UUID en C) y, si no, json.dumps compacto; en ambos
+casos los tipos no nativos pasan por 'json_default', que solo se invoca para esos
+valores en lugar de recorrer todo el resultado.
+"""
+
+import json
+import base64
+import datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any
+from uuid import UUID
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson es opcional; se usa json estándar
+    orjson = None
+
+
+def json_default(value: Any) -> Any:
+    """Convierte tipos no nativos de JSON (datetime, Decimal, sets, bytes, enums, UUID...)."""
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if isinstance(value, (bytes, bytearray)):
+        return base64.b64encode(bytes(value)).decode("ascii")
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, UUID):
+        return str(value)
+    if hasattr(value, "to_dict"):
+        return value.to_dict()
+    return str(value)
+
+
+def dumps_bytes(content: Any) -> bytes:
+    """Serializa a bytes UTF-8 por la vía más rápida disponible."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(content, default=json_default, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass  # p. ej. enteros de más de 64 bits: se recurre a json estándar
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=json_default).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse que acepta datetime/Decimal/etc. y serializa con orjson si está disponible."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps_bytes(content)
@@ -0,0 +1,259 @@
+# app/shared/helpers/local_store.py
+"""
+Almacén clave-valor local respaldado por SQLite (solo librería estándar).
+
+Se usa para estado que debe sobrevivir a reinicios del worker pero que no
+justifica un viaje a SharePoint/Notion: cursores de sincronización
+incremental, checkpoints de workflows y cachés persistentes.
+Los valores se guardan como JSON y se agrupan por 'namespace'.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_stores: Dict[str, "LocalStateStore"] = {}
+_stores_lock = threading.Lock()
+
+
+def _json_default(value: Any) -> Any:
+    """Serializa tipos no nativos de JSON (datetime, Decimal, sets...)."""
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    return str(value)
+
+
+class LocalStateStore:
+    """Almacén clave-valor persistente y seguro entre hilos y procesos del mismo host."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS kv (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+            """
+        )
+        # Arrendamientos (owner + caducidad) para repartir trabajo entre procesos del mismo host
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS leases (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                owner TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+            """
+        )
+        # Lecturas incrementales por fecha de modificación (iter_updated_since, purge_older_than)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS kv_updated ON kv (namespace, updated_at)")
+        self._conn.commit()
+
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM kv WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set(self, namespace: str, key: str, value: Any) -> None:
+        payload = json.dumps(value, default=_json_default, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO kv (namespace, key, value, updated_at) VALUES (?, ?, ?, ?)",
+                (namespace, key, payload, time.time())
+            )
+            self._conn.commit()
+
+    def add(self, namespace: str, key: str, value: Any) -> bool:
+        """Inserta solo si la clave no existe; True si la insertó (atómico entre procesos)."""
+        payload = json.dumps(value, default=_json_default, ensure_ascii=False)
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO kv (namespace, key, value, updated_at) VALUES (?, ?, ?, ?)",
+                (namespace, key, payload, time.time())
+            )
+            self._conn.commit()
+        return cursor.rowcount > 0
+
+    def get_many(self, namespace: str, keys: List[str]) -> Dict[str, Any]:
+        """Lee varias claves en bloque; devuelve solo las existentes."""
+        found: Dict[str, Any] = {}
+        unique_keys = list(dict.fromkeys(keys))
+        with self._lock:
+            # SQLite limita el número de parámetros por sentencia
+            for start in range(0, len(unique_keys), 500):
+                chunk = unique_keys[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM kv WHERE namespace = ? AND key IN ({','.join('?' * len(chunk))})",
+                    (namespace, *chunk)
+                ).fetchall()
+                found.update((k, json.loads(v)) for k, v in rows)
+        return found
+
+    def set_many(self, namespace: str, items: Dict[str, Any]) -> None:
+        """Escribe varias claves en una sola transacción."""
+        now = time.time()
+        rows = [(namespace, k, json.dumps(v, default=_json_default, ensure_ascii=False), now) for k, v in items.items()]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO kv (namespace, key, value, updated_at) VALUES (?, ?, ?, ?)", rows
+            )
+            self._conn.commit()
+
+    def delete(self, namespace: str, key: str) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM kv WHERE namespace = ? AND key = ?", (namespace, key)
+            )
+            self._conn.commit()
+        return cursor.rowcount > 0
+
+    def items(self, namespace: str, prefix: str = "") -> List[Tuple[str, Any]]:
+        """Lista (key, value) de un namespace, opcionalmente filtrando por prefijo de key."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, value FROM kv WHERE namespace = ? AND key LIKE ? ESCAPE '\\' ORDER BY key",
+                (namespace, prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+            ).fetchall()
+        return [(k, json.loads(v)) for k, v in rows]
+
+    def iter_items(self, namespace: str, page_size: int = 200) -> Iterator[Tuple[str, Any]]:
+        """Recorre (key, value) de un namespace por páginas (cursor por key), sin cargarlo entero."""
+        last_key = ""
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT key, value FROM kv WHERE namespace = ? AND key > ? ORDER BY key LIMIT ?",
+                    (namespace, last_key, page_size)
+                ).fetchall()
+            for key, value in rows:
+                yield key, json.loads(value)
+            if len(rows) < page_size:
+                return
+            last_key = rows[-1][0]
+
+    def iter_updated_since(self, namespace: str, since: float = 0.0, page_size: int = 200,
+                           newest: Optional[int] = None) -> Iterator[Tuple[str, Any, float]]:
+        """
+        Recorre (key, value, updated_at) modificados desde 'since' en orden de modificación,
+        por páginas. Con 'newest' empieza en la N-ésima entrada más reciente del namespace.
+        """
+        if newest:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT updated_at FROM kv WHERE namespace = ? ORDER BY updated_at DESC LIMIT 1 OFFSET ?",
+                    (namespace, newest - 1)
+                ).fetchone()
+            if row:
+                since = max(since, row[0])
+        last_at, last_key = since, ""
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    """
+                    SELECT key, value, updated_at FROM kv
+                    WHERE namespace = ? AND (updated_at > ? OR (updated_at = ? AND key > ?))
+                    ORDER BY updated_at, key LIMIT ?
+                    """,
+                    (namespace, last_at, last_at, last_key, page_size)
+                ).fetchall()
+            for key, value, updated_at in rows:
+                yield key, json.loads(value), updated_at
+            if len(rows) < page_size:
+                return
+            last_key, last_at = rows[-1][0], rows[-1][2]
+
+    def keys(self, namespace: str) -> List[str]:
+        """Claves de un namespace (sin leer los valores)."""
+        with self._lock:
+            rows = self._conn.execute("SELECT key FROM kv WHERE namespace = ?", (namespace,)).fetchall()
+        return [row[0] for row in rows]
+
+    def acquire_lease(self, namespace: str, key: str, owner: str, ttl_seconds: float) -> bool:
+        """
+        Toma (o renueva) el arrendamiento de 'key' para 'owner' durante 'ttl_seconds'.
+        Falla si otro owner lo tiene y aún no ha caducado.
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                """
+                INSERT INTO leases (namespace, key, owner, expires_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT (namespace, key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+                WHERE leases.owner = excluded.owner OR leases.expires_at < ?
+                """,
+                (namespace, key, owner, now + ttl_seconds, now)
+            )
+            self._conn.commit()
+        return cursor.rowcount > 0
+
+    def release_lease(self, namespace: str, key: str, owner: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM leases WHERE namespace = ? AND key = ? AND owner = ?", (namespace, key, owner)
+            )
+            self._conn.commit()
+
+    def unleased_items(self, namespace: str) -> List[Tuple[str, Any]]:
+        """(key, value) del namespace sin arrendamiento vigente, en orden de key."""
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT kv.key, kv.value FROM kv
+                LEFT JOIN leases ON leases.namespace = kv.namespace AND leases.key = kv.key
+                WHERE kv.namespace = ? AND (leases.key IS NULL OR leases.expires_at < ?)
+                ORDER BY kv.key
+                """,
+                (namespace, time.time())
+            ).fetchall()
+        return [(k, json.loads(v)) for k, v in rows]
+
+    def clear(self, namespace: str) -> int:
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM kv WHERE namespace = ?", (namespace,))
+            self._conn.commit()
+        return cursor.rowcount
+
+    def purge_older_than(self, namespace: str, max_age_seconds: float) -> int:
+        """Elimina entradas de un namespace no actualizadas en 'max_age_seconds'."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM kv WHERE namespace = ? AND updated_at < ?",
+                (namespace, time.time() - max_age_seconds)
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+
+def get_local_store(db_name: str = "state.db") -> LocalStateStore:
+    """Devuelve (y reutiliza) el almacén local para el archivo 'db_name' dentro de LOCAL_STATE_DIR."""
+    with _stores_lock:
+        store = _stores.get(db_name)
+        if store is None:
+            db_path = os.path.join(settings.LOCAL_STATE_DIR, db_name)
+            store = LocalStateStore(db_path)
+            _stores[db_name] = store
+            logger.info(f"Almacén local inicializado en {db_path}")
+        return store
@@ -0,0 +1,171 @@
+# app/shared/helpers/projection.py
+"""
+Proyección de campos para las respuestas de /dynamics.
+
+El cliente indica qué campos quiere ('_fields' en params o 'fields' en el cuerpo),
+como lista o cadena separada por comas; se admiten rutas con puntos
+("from.emailAddress.address"). Se aplica en dos niveles:
+
+1. Empuje al origen: si la acción acepta la selección de Microsoft Graph (parámetro
+   'select' o '$select'), se le pasan los campos de primer nivel (y, para los items de
+   listas de SharePoint, los subcampos de 'fields' vía $expand) para que Graph no envíe
+   el resto. Si Graph rechaza la selección (propiedad inexistente), se repite sin ella.
+2. Recorte en el servidor: el resultado se reduce a los campos pedidos, conservando el
+   sobre de la respuesta (status, paginación, mensajes). Así también se benefician las
+   acciones sin selección nativa (Meta, LinkedIn, HubSpot...).
+"""
+
+import inspect
+import logging
+import re
+import threading
+from typing import Any, Callable, Dict, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+FieldTree = Dict[str, "FieldTree"]
+
+# En el nivel superior se conservan los valores simples (status, message, totales...) y estas claves
+ENVELOPE_KEYS = {"status", "message", "http_status", "action", "total", "count", "total_items",
+                 "next_link", "nextLink", "@odata.nextLink", "@odata.count", "pagination", "paging"}
+
+_SELECT_PARAM_RE = re.compile(r"""params(?:\.get\(|\[)\s*['"](\$?select)['"]""")
+# Errores de Graph por una propiedad desconocida en $select/$expand
+_PROJECTION_ERROR_RE = re.compile(
+    r"\$select|\$expand|select and expand|could not find a property|not a valid property|property named",
+    re.IGNORECASE,
+)
+_EXPAND_FIELDS_RE = re.compile(r"""params\.get\(\s*['"]expand['"]\s*,\s*['"]fields\(select=""")
+
+_pushdown_cache: Dict[Callable, Dict[str, Any]] = {}
+_pushdown_lock = threading.Lock()
+
+
+def parse_fields(fields: Union[str, List[str], None]) -> List[str]:
+    """'id, subject' o ['id', 'subject'] -> ['id', 'subject'] (sin vacíos ni duplicados)."""
+    if not fields:
+        return []
+    items = fields.split(",") if isinstance(fields, str) else [str(f) for f in fields]
+    seen: List[str] = []
+    for item in items:
+        item = item.strip()
+        if item and item not in seen:
+            seen.append(item)
+    return seen
+
+
+def build_field_tree(fields: List[str]) -> FieldTree:
+    """['a.b', 'a.c', 'd'] -> {'a': {'b': {}, 'c': {}}, 'd': {}}; un campo completo anula sus subrutas."""
+    tree: FieldTree = {}
+    for path in fields:
+        node = tree
+        parts = [part for part in path.split(".") if part]
+        for index, part in enumerate(parts):
+            if part in node and not node[part]:
+                break  # ya se pidió el campo completo
+            if index == len(parts) - 1:
+                node[part] = {}
+            else:
+                node = node.setdefault(part, {})
+    return tree
+
+
+def _project_value(value: Any, tree: FieldTree) -> Any:
+    if not tree:
+        return value
+    if isinstance(value, list):
+        return [_project_value(item, tree) for item in value]
+    if isinstance(value, dict):
+        return {key: _project_value(value[key], sub) for key, sub in tree.items() if key in value}
+    return value
+
+
+def _trim(node: Any, tree: FieldTree) -> Any:
+    # Un dict con alguno de los campos pedidos es un registro; si no, es un contenedor
+    # (sobre, página de Graph...) y se busca dentro de sus listas y objetos
+    if isinstance(node, list):
+        return [_trim(item, tree) for item in node]
+    if isinstance(node, dict):
+        if not tree.keys().isdisjoint(node.keys()):
+            return _project_value(node, tree)
+        return {key: _trim(value, tree) if isinstance(value, (dict, list)) else value for key, value in node.items()}
+    return node
+
+
+def project_result(result: Any, fields: List[str]) -> Any:
+    """Recorta el resultado de una acción a 'fields' conservando el sobre de primer nivel."""
+    tree = build_field_tree(fields)
+    if not tree:
+        return result
+    if isinstance(result, dict):
+        # Si el propio resultado es el registro (campos en el nivel superior) solo queda el sobre conocido
+        record_at_top = not tree.keys().isdisjoint(result.keys())
+        projected = {}
+        for key, value in result.items():
+            if key in tree:
+                projected[key] = _project_value(value, tree[key])
+            elif key in ENVELOPE_KEYS or (not record_at_top and not isinstance(value, (dict, list))):
+                projected[key] = value
+            elif not record_at_top:
+                projected[key] = _trim(value, tree)
+        return projected
+    return _trim(result, tree)
+
+
+def _pushdown_support(action_function: Callable) -> Dict[str, Any]:
+    support = _pushdown_cache.get(action_function)
+    if support is None:
+        try:
+            source = inspect.getsource(action_function)
+        except (OSError, TypeError):
+            source = ""
+        select_match = _SELECT_PARAM_RE.search(source) if "$select" in source else None
+        support = {
+            # Nombre del parámetro de selección que lee la acción ('select' o '$select'), o None
+            "select": select_match.group(1) if select_match else None,
+            "expand_fields": bool(_EXPAND_FIELDS_RE.search(source)),
+        }
+        with _pushdown_lock:
+            _pushdown_cache[action_function] = support
+    return support
+
+
+def apply_pushdown(action_function: Callable, params: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    """
+    Añade a 'params' la selección nativa ($select/$expand de Graph) que la acción acepta.
+    No pisa lo que el cliente ya envió. Devuelve los parámetros añadidos (vacío si ninguno).
+    """
+    support = _pushdown_support(action_function)
+    tree = build_field_tree(fields)
+    added: Dict[str, Any] = {}
+    select_param = support["select"]
+    if select_param and not params.get(select_param):
+        # 'id' se pide siempre: muchas acciones lo usan para paginar o encadenar llamadas
+        top_level = ["id"] + [name for name in tree if name != "id"]
+        added[select_param] = ",".join(top_level)
+    if support["expand_fields"] and "expand" not in params and tree.get("fields"):
+        added["expand"] = f"fields(select={','.join(tree['fields'])})"
+    params.update(added)
+    return added
+
+
+def is_projection_error(result: Any) -> bool:
+    """True si 'result' es un error 400 de Graph causado por la selección de campos."""
+    if not isinstance(result, dict) or (result.get("status") != "error" and result.get("success") is not False):
+        return False
+    error_details = result.get("error_details") if isinstance(result.get("error_details"), dict) else {}
+    if 400 not in (result.get("http_status"), error_details.get("status_code")):
+        return False
+    text = " ".join(str(value) for value in (
+        result.get("details"), result.get("message"), result.get("error"), error_details.get("message")
+    ) if value)
+    return bool(_PROJECTION_ERROR_RE.search(text))
+
+
+def requested_fields(params: Dict[str, Any], body_fields: Union[str, List[str], None] = None) -> List[str]:
+    """
+    Extrae (y quita de params) los campos pedidos vía '_fields' o el cuerpo.
+    '$select' no se toca: algunas acciones (Bookings) lo leen como su selección nativa.
+    """
+    raw: Optional[Union[str, List[str]]] = params.pop("_fields", None)
+    return parse_fields(body_fields) or parse_fields(raw)
@@ -0,0 +1,56 @@
+# app/shared/helpers/rate_limiter.py
+"""
+Limitador de ritmo (token bucket) para las llamadas salientes a APIs de terceros.
+
+Cada integración configura el suyo con el límite que documenta su proveedor
+(Notion: 3 req/s por integración; WhatsApp Cloud API: mensajes/s por número emisor).
+El bucket es seguro entre hilos y un 429 con 'Retry-After' se comunica con
+block_for(), que pausa a todos los hilos que comparten ese bucket.
+"""
+
+import time
+import threading
+from typing import Dict, Optional
+
+
+class TokenBucket:
+    """Token bucket compartido entre hilos; un 429 pausa a todos los hilos hasta 'Retry-After'."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if now >= self._blocked_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = max(self._blocked_until - now, (1 - self._tokens) / self.rate)
+            time.sleep(wait)
+
+    def block_for(self, seconds: float) -> None:
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self._tokens = 0
+
+
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def get_rate_limiter(name: str, rate: float, capacity: Optional[float] = None) -> TokenBucket:
+    """Bucket compartido por nombre (p. ej. 'notion' o 'whatsapp:<phone_number_id>'), creado la primera vez."""
+    with _buckets_lock:
+        bucket = _buckets.get(name)
+        if bucket is None:
+            bucket = TokenBucket(rate, capacity)
+            _buckets[name] = bucket
+        return bucket
@@ -0,0 +1,220 @@
+# app/shared/helpers/session_cache.py
+"""
+Caché de sesiones acotada con desalojo a disco.
+
+Las sesiones de memoria y de los bots vivían en dicts que crecían con cada usuario.
+SpillingSessionCache se comporta como un dict pero mantiene en RAM como mucho
+'max_entries' sesiones, en orden LRU, y aparta las que llevan más de 'ttl_seconds'
+sin usarse. Las sesiones desalojadas no se pierden: se serializan en el almacén local
+(SQLite, namespace propio) y se recargan de forma transparente la próxima vez que se
+piden. Las apartadas más de 'retention_seconds' se purgan del disco.
+
+Si una sesión está en memoria, esa copia manda: la de disco se sobrescribe al volver
+a desalojarla. Quien modifique una sesión obtenida con get() debe reasignarla
+(cache[key] = value) al terminar, o usar update(), que hace leer-modificar-escribir
+bajo el lock; así un desalojo intermedio no pierde el cambio. Los hooks on_spill /
+on_reload permiten acompañar el desalojo con estado derivado (p. ej. índices).
+"""
+
+import time
+import weakref
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Iterator, MutableMapping, Optional, Tuple, TypeVar
+
+from app.shared.helpers.local_store import LocalStateStore, get_local_store
+
+logger = logging.getLogger(__name__)
+
+SESSION_STORE_DB = "sessions.db"
+# Cada cuántas escrituras a disco se purgan las sesiones desalojadas muy antiguas
+_PURGE_EVERY_SPILLS = 1000
+
+_MISSING = object()
+T = TypeVar("T")
+# Mapping no es hashable: se registran por id para poder volcarlas al apagar
+_caches: "weakref.WeakValueDictionary[int, SpillingSessionCache]" = weakref.WeakValueDictionary()
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+class SpillingSessionCache(MutableMapping):
+    """Mapping LRU+TTL que desaloja a un LocalStateStore y recarga bajo demanda."""
+
+    def __init__(self, namespace: str, max_entries: int, ttl_seconds: Optional[float] = None,
+                 dump: Callable[[Any], Any] = _identity, load: Callable[[Any], Any] = _identity,
+                 retention_seconds: Optional[float] = None,
+                 store: Optional[LocalStateStore] = None, db_name: str = SESSION_STORE_DB,
+                 on_spill: Optional[Callable[[str, Any], None]] = None,
+                 on_reload: Optional[Callable[[str, Any], None]] = None):
+        self.namespace = namespace
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = ttl_seconds
+        self.retention_seconds = retention_seconds
+        self._dump = dump
+        self._load = load
+        self._store = store
+        self._db_name = db_name
+        self._on_spill = on_spill
+        self._on_reload = on_reload
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._spills = 0
+        _caches[id(self)] = self
+
+    @property
+    def store(self) -> LocalStateStore:
+        if self._store is None:
+            self._store = get_local_store(self._db_name)
+        return self._store
+
+    # -- desalojo -----------------------------------------------------------
+
+    def _spill(self, key: str, value: Any) -> None:
+        if self._on_spill is not None:
+            self._on_spill(key, value)
+        try:
+            self.store.set(self.namespace, key, self._dump(value))
+        except Exception as e:
+            # Sin disco la sesión se pierde, pero la memoria del worker sigue acotada
+            logger.error(f"No se pudo desalojar la sesión '{key}' de '{self.namespace}': {e}")
+            return
+        self._spills += 1
+        if self.retention_seconds and self._spills % _PURGE_EVERY_SPILLS == 0:
+            purged = self.store.purge_older_than(self.namespace, self.retention_seconds)
+            if purged:
+                logger.info(f"Purgadas {purged} sesiones antiguas de '{self.namespace}'")
+
+    def _evict(self) -> None:
+        # Primero las caducadas (están al principio por orden de uso), luego por tamaño
+        if self.ttl_seconds is not None:
+            deadline = time.monotonic() - self.ttl_seconds
+            while self._entries:
+                key, (value, last_used) = next(iter(self._entries.items()))
+                if last_used >= deadline:
+                    break
+                del self._entries[key]
+                self._spill(key, value)
+        while len(self._entries) > self.max_entries:
+            key, (value, _) = self._entries.popitem(last=False)
+            self._spill(key, value)
+
+    def _reload(self, key: str) -> Any:
+        payload = self.store.get(self.namespace, key, _MISSING)
+        if payload is _MISSING:
+            return _MISSING
+        self.store.delete(self.namespace, key)
+        value = self._load(payload)
+        self._entries[key] = (value, time.monotonic())
+        if self._on_reload is not None:
+            self._on_reload(key, value)
+        self._evict()
+        return value
+
+    # -- interfaz de dict ---------------------------------------------------
+
+    def __getitem__(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries[key] = (entry[0], time.monotonic())
+                self._entries.move_to_end(key)
+                return entry[0]
+            value = self._reload(key)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def __delitem__(self, key: str) -> None:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            in_memory = entry is not None
+            if in_memory and self._on_spill is not None:
+                self._on_spill(key, entry[0])
+            on_disk = self.store.delete(self.namespace, key)
+        if not (in_memory or on_disk):
+            raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        with self._lock:
+            if key in self._entries:
+                return True
+        return self.store.get(self.namespace, key, _MISSING) is not _MISSING
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            in_memory = list(self._entries)
+        yield from in_memory
+        seen = set(in_memory)
+        yield from (key for key in self.store.keys(self.namespace) if key not in seen)
+
+    def __len__(self) -> int:
+        with self._lock:
+            in_memory = set(self._entries)
+        return len(in_memory) + sum(1 for key in self.store.keys(self.namespace) if key not in in_memory)
+
+    def peek(self, key: str, default: Any = None) -> Any:
+        """Lee una sesión sin alterar el orden LRU ni recargar en memoria las desalojadas."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                return entry[0]
+        payload = self.store.get(self.namespace, key, _MISSING)
+        return default if payload is _MISSING else self._load(payload)
+
+    def update(self, key: str, fn: Callable[[Any], T], default_factory: Optional[Callable[[], Any]] = None) -> T:
+        """
+        Leer-modificar-escribir atómico respecto al desalojo: aplica fn(sesión) bajo el lock
+        y deja la sesión en memoria. Sin la clave, usa default_factory() o lanza KeyError.
+        """
+        with self._lock:
+            value = self.get(key, _MISSING)
+            if value is _MISSING:
+                if default_factory is None:
+                    raise KeyError(key)
+                value = default_factory()
+            result = fn(value)
+            self[key] = value
+            return result
+
+    def iter_items(self, page_size: int = 200) -> Iterator[Tuple[str, Any]]:
+        """
+        Recorre todas las sesiones (memoria y disco) sin recargar las desalojadas en RAM;
+        las de disco se leen por páginas, así que la memoria usada no depende del total.
+        """
+        with self._lock:
+            in_memory = [(key, value) for key, (value, _) in self._entries.items()]
+        yield from in_memory
+        seen = {key for key, _ in in_memory}
+        for key, payload in self.store.iter_items(self.namespace, page_size):
+            if key not in seen:
+                yield key, self._load(payload)
+
+    def flush(self) -> int:
+        """Escribe todas las sesiones en memoria al disco (p. ej. al apagar el worker)."""
+        with self._lock:
+            entries = list(self._entries.items())
+            self._entries.clear()
+            for key, (value, _) in entries:
+                self._spill(key, value)
+        return len(entries)
+
+
+def flush_session_caches() -> int:
+    """Vuelca al disco las sesiones en memoria de todas las cachés (apagado ordenado)."""
+    total = 0
+    for cache in list(_caches.values()):
+        try:
+            total += cache.flush()
+        except Exception as e:
+            logger.warning(f"No se pudieron volcar las sesiones de '{cache.namespace}': {e}")
+    return total
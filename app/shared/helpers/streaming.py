@@ -0,0 +1,106 @@
+# app/shared/helpers/streaming.py
+"""
+Helpers para emitir resultados incrementales (tokens de modelos, registros paginados)
+como Server-Sent Events o NDJSON.
+
+Las acciones que soportan streaming devuelven un generador de dicts; los endpoints
+usan 'streaming_response' para enviarlo al cliente conforme se produce. Por
+convención, los registros de texto incremental son {"type": "delta", "text": ...}
+y el último es {"type": "done", ...} con el resultado completo.
+
+Las descargas binarias grandes se devuelven como 'FileStream' (iterador de bloques
+de bytes) y se envían con 'file_stream_response' sin cargarlas enteras en memoria.
+"""
+
+import json
+import inspect
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Optional, Union
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+SSE_MEDIA_TYPE = "text/event-stream"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def wants_event_stream(request: Optional[Request], body: Optional[Dict[str, Any]] = None) -> bool:
+    """True si el cliente pidió streaming (Accept: text/event-stream o "stream": true en el cuerpo)."""
+    if isinstance(body, dict) and body.get("stream") is True:
+        return True
+    accept = request.headers.get("accept", "") if request is not None else ""
+    return SSE_MEDIA_TYPE in accept.lower()
+
+
+def is_stream_result(result: Any) -> bool:
+    return inspect.isgenerator(result) or inspect.isasyncgen(result)
+
+
+def sse_format(record: Any) -> str:
+    """Serializa un registro como evento SSE; 'type' se usa como nombre del evento."""
+    event = record.get("type") if isinstance(record, dict) else None
+    data = json.dumps(record, ensure_ascii=False, default=str)
+    return f"event: {event}\ndata: {data}\n\n" if event else f"data: {data}\n\n"
+
+
+def _ndjson_format(record: Any) -> str:
+    return json.dumps(record, ensure_ascii=False, default=str) + "\n"
+
+
+def streaming_response(records: Union[Iterable[Any], AsyncIterator[Any]], request: Optional[Request] = None) -> StreamingResponse:
+    """
+    Envía un generador (sync o async) como SSE si el cliente acepta text/event-stream,
+    o como NDJSON en otro caso. Los generadores síncronos se ejecutan en el threadpool
+    de Starlette, así que las llamadas HTTP bloqueantes no frenan el event loop.
+    """
+    use_sse = wants_event_stream(request)
+    formatter = sse_format if use_sse else _ndjson_format
+
+    if inspect.isasyncgen(records):
+        async def _body():
+            async for record in records:
+                yield formatter(record)
+    else:
+        def _body():
+            for record in records:
+                yield formatter(record)
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(_body(), media_type=SSE_MEDIA_TYPE if use_sse else NDJSON_MEDIA_TYPE, headers=headers)
+
+
+class FileStream:
+    """Archivo binario producido por partes (p. ej. una descarga remota abierta con stream=True)."""
+
+    def __init__(self, chunks: Iterable[bytes], media_type: str = "application/octet-stream",
+                 filename: Optional[str] = None, size: Optional[int] = None,
+                 on_close: Optional[Callable[[], None]] = None):
+        self.chunks = chunks
+        self.media_type = media_type
+        self.filename = filename
+        self.size = size
+        self._on_close = on_close
+
+    def __iter__(self):
+        try:
+            for chunk in self.chunks:
+                if chunk:
+                    yield chunk
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        """Libera la conexión subyacente; es seguro llamarlo más de una vez."""
+        on_close, self._on_close = self._on_close, None
+        if on_close:
+            on_close()
+
+
+def file_stream_response(stream: FileStream) -> StreamingResponse:
+    """Envía un FileStream como descarga (Content-Disposition: attachment)."""
+    headers = {}
+    if stream.filename:
+        safe_filename = "".join(c if c.isalnum() or c in ".-_" else "_" for c in stream.filename)
+        headers["Content-Disposition"] = f'attachment; filename="{safe_filename}"'
+    if stream.size is not None:
+        headers["Content-Length"] = str(stream.size)
+    return StreamingResponse(iter(stream), media_type=stream.media_type, headers=headers)
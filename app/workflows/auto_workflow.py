@@ -4,8 +4,11 @@ Sistema de Workflows Automáticos para Elite Dynamics
 Permite ejecutar secuencias de acciones de forma inteligente
 """
 
+import asyncio
+import inspect
 import logging
-from typing import Dict, Any, List, Optional
+import threading
+from typing import Callable, Dict, Any, List, Optional
 from datetime import datetime, timedelta
 import json
 
@@ -13,6 +16,9 @@ from app.core.auth_manager import get_auth_client
 # REMOVED: from app.core.action_mapper import ACTION_MAP  # ❌ CAUSA IMPORT CIRCULAR
 from app.actions import gemini_actions
 from app.actions import resolver_actions
+from app.workflows import checkpoints
+from app.workflows.step_graph import ALL_PREVIOUS_RESULTS, DEFAULT_MAX_PARALLEL_STEPS, custom_workflow_concurrency, run_step_graph
+from app.workflows.templating import CompiledTemplate, LazyValue, compile_steps
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +35,9 @@ class AutoWorkflowManager:
     """Gestor de workflows automáticos con IA integrada"""
     
     def __init__(self):
+        self._context_lock = threading.Lock()
+        # Plantillas compiladas por workflow predefinido (las definiciones no cambian)
+        self._compiled_steps: Dict[str, List[CompiledTemplate]] = {}
         self.predefined_workflows = {
             "backup_completo": {
                 "name": "Backup Completo del Sistema",
@@ -50,7 +59,7 @@ class AutoWorkflowManager:
                     {"action": "googleads_get_campaigns", "save_to": "google_campaigns"},
                     {"action": "metaads_list_campaigns", "save_to": "meta_campaigns"},
                     {"action": "linkedin_list_campaigns", "save_to": "linkedin_campaigns"},
-                    {"action": "hubspot_get_deals", "save_to": "hubspot_deals"},
+                    {"action": "hubspot_sync_changes", "params": {"object_type": "deals"}, "save_to": "hubspot_deals"},
                     {"action": "notion_create_page_in_database", 
                      "params": {
                          "database_name": "Marketing Dashboard",
@@ -228,8 +237,14 @@ class AutoWorkflowManager:
                 "execution_time": datetime.now().isoformat()
             }
 
-    def execute_workflow(self, workflow_name: str, params: Dict[str, Any] = None) -> Dict[str, Any]:
-        """Ejecuta un workflow predefinido"""
+    def execute_workflow(self, workflow_name: str, params: Dict[str, Any] = None,
+                         execution_id: Optional[str] = None,
+                         on_step: Optional[Callable[[int, Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Ejecuta un workflow predefinido. Con 'execution_id' cada paso terminado se guarda
+        como checkpoint y, si la ejecución ya tenía checkpoints, se reanuda repitiendo
+        solo los pasos que no terminaron bien. 'on_step' se llama al acabar cada paso.
+        """
         
         if workflow_name not in self.predefined_workflows:
             return {
@@ -251,55 +266,52 @@ class AutoWorkflowManager:
                 "workflow_params": params or {}
             }
             
-            results = []
+            steps = workflow["steps"]
+            max_parallel = (params or {}).get("max_parallel_steps", workflow.get("max_concurrency", DEFAULT_MAX_PARALLEL_STEPS))
             
-            for i, step in enumerate(workflow["steps"]):
-                step_name = f"step_{i+1}_{step['action']}"
-                logger.info(f"Ejecutando paso {i+1}: {step['action']}")
-                
-                try:
-                    # Resolver parámetros con el contexto
-                    resolved_params = self._resolve_variables(step.get("params", {}), context)
-                    
-                    # Ejecutar la acción
-                    if step["action"] in get_action_map():
-                        action_function = get_action_map()[step["action"]]
-                        result = action_function(auth_client, resolved_params)
-                    else:
-                        # Si no está en get_action_map(), intentar con resolver
-                        result = resolver_actions.resolve_dynamic_query(auth_client, {
-                            "query": step["action"],
-                            "params": resolved_params
-                        })
-                    
-                    # Guardar resultado en contexto si se especifica
-                    if step.get("save_to"):
-                        context[step["save_to"]] = result
-                    
-                    results.append({
-                        "step": i + 1,
-                        "action": step["action"],
-                        "result": result,
-                        "timestamp": datetime.now().isoformat()
-                    })
-                    
-                except Exception as e:
-                    logger.error(f"Error en paso {i+1}: {e}")
-                    results.append({
-                        "step": i + 1,
-                        "action": step["action"],
-                        "error": str(e),
-                        "timestamp": datetime.now().isoformat()
-                    })
-                    
-                    # Decidir si continuar o abortar
-                    if step.get("critical", True):
-                        return {
-                            "status": "error",
-                            "message": f"Workflow abortado en paso {i+1}: {e}",
-                            "results": results,
-                            "workflow": workflow_name
-                        }
+            restored: Dict[int, Dict[str, Any]] = {}
+            if execution_id:
+                restored = checkpoints.completed_steps(execution_id, steps)
+                for index, outcome in restored.items():
+                    if steps[index].get("save_to"):
+                        context[steps[index]["save_to"]] = outcome.get("result")
+                if restored:
+                    logger.info(f"Reanudando workflow {workflow_name} ({execution_id}): {len(restored)}/{len(steps)} pasos recuperados de checkpoints")
+            
+            templates = self._compiled_steps.get(workflow_name)
+            if templates is None:
+                templates = self._compiled_steps[workflow_name] = compile_steps(steps)
+            
+            def run_and_checkpoint(index: int) -> Dict[str, Any]:
+                outcome = self._run_workflow_step(index, steps, context, auth_client, use_resolver=True, templates=templates)
+                if execution_id:
+                    checkpoints.save_checkpoint(execution_id, index, outcome)
+                if on_step:
+                    on_step(index, outcome)
+                return outcome
+            
+            # Los pasos independientes corren en paralelo; un fallo en un paso crítico
+            # (critical=True por defecto) detiene el lanzamiento de nuevos pasos
+            outcomes, fatal_index = run_step_graph(
+                steps,
+                run_and_checkpoint,
+                max_concurrency=max_parallel,
+                is_fatal=lambda i, outcome: checkpoints.step_failed(outcome) and steps[i].get("critical", True),
+                completed=set(restored),
+                templates=templates
+            )
+            outcomes.update({index: dict(outcome, restored=True) for index, outcome in restored.items()})
+            results = [outcomes[i] for i in sorted(outcomes)]
+            
+            if fatal_index is not None:
+                return {
+                    "status": "error",
+                    "message": f"Workflow abortado en paso {fatal_index+1}: {outcomes[fatal_index]['error']}",
+                    "results": results,
+                    "workflow": workflow_name,
+                    "execution_id": execution_id,
+                    "resumable": bool(execution_id)
+                }
             
             # Guardar resultado del workflow completo
             try:
@@ -323,8 +335,9 @@ class AutoWorkflowManager:
                     "saved_to": final_save.get("storage_locations", []),
                     "execution_summary": {
                         "total_steps": len(workflow["steps"]),
-                        "successful_steps": len([r for r in results if "error" not in r]),
-                        "failed_steps": len([r for r in results if "error" in r])
+                        "successful_steps": len([r for r in results if not checkpoints.step_failed(r)]),
+                        "failed_steps": len([r for r in results if checkpoints.step_failed(r)]),
+                        "restored_steps": len(restored)
                     }
                 }
                 
@@ -389,39 +402,23 @@ class AutoWorkflowManager:
             }
     
     def _execute_custom_workflow(self, workflow_def: Dict[str, Any], auth_client) -> Dict[str, Any]:
-        """Ejecuta un workflow generado dinámicamente"""
+        """Ejecuta un workflow generado dinámicamente (en el orden declarado salvo que opte por paralelismo)"""
         
-        results = []
         context = {
             "current_date": datetime.now().strftime('%Y-%m-%d'),
             "current_datetime": datetime.now().isoformat()
         }
+        steps = workflow_def.get("steps", [])
+        templates = compile_steps(steps)
         
-        for i, step in enumerate(workflow_def.get("steps", [])):
-            try:
-                action_name = step.get("action")
-                step_params = self._resolve_variables(step.get("params", {}), context)
-                
-                if action_name in get_action_map():
-                    action_function = get_action_map()[action_name]
-                    result = action_function(auth_client, step_params)
-                    
-                    if step.get("save_to"):
-                        context[step["save_to"]] = result
-                    
-                    results.append({
-                        "step": i + 1,
-                        "action": action_name,
-                        "result": result
-                    })
-                
-            except Exception as e:
-                logger.error(f"Error en paso personalizado {i+1}: {e}")
-                results.append({
-                    "step": i + 1,
-                    "action": step.get("action", "unknown"),
-                    "error": str(e)
-                })
+        outcomes, _ = run_step_graph(
+            steps,
+            lambda i: self._run_workflow_step(i, steps, context, auth_client, use_resolver=False, templates=templates),
+            max_concurrency=custom_workflow_concurrency(workflow_def),
+            templates=templates
+        )
+        # Las acciones desconocidas se omiten (resultado None)
+        results = [outcomes[i] for i in sorted(outcomes) if outcomes[i] is not None]
         
         return {
             "status": "success",
@@ -430,23 +427,68 @@ class AutoWorkflowManager:
             "workflow_generated": workflow_def
         }
     
-    def _resolve_variables(self, params: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
-        """Resuelve variables en parámetros usando el contexto"""
-        
-        if not isinstance(params, dict):
-            return params
+    def _run_workflow_step(self, index: int, steps: List[Dict[str, Any]], context: Dict[str, Any],
+                           auth_client, use_resolver: bool,
+                           templates: Optional[List[CompiledTemplate]] = None) -> Optional[Dict[str, Any]]:
+        """Ejecuta un paso (puede correr en paralelo con otros) y guarda 'save_to' en el contexto."""
+        step = steps[index]
+        action_name = step.get("action")
+        logger.info(f"Ejecutando paso {index+1}: {action_name}")
         
-        resolved = {}
-        for key, value in params.items():
-            if isinstance(value, str) and value.startswith("{{") and value.endswith("}}"):
-                var_name = value[2:-2].strip()
-                resolved[key] = context.get(var_name, value)
-            elif isinstance(value, dict):
-                resolved[key] = self._resolve_variables(value, context)
+        try:
+            template = templates[index] if templates is not None else CompiledTemplate(step.get("params", {}))
+            # Los resultados previos se pasan por referencia (sin copiar el contexto) y
+            # el agregado de todos solo se construye si la plantilla lo usa
+            with self._context_lock:
+                previous_results = LazyValue(lambda: {
+                    s["save_to"]: context[s["save_to"]]
+                    for s in steps[:index] if s.get("save_to") in context
+                })
+                resolved_params = template.render(context, {ALL_PREVIOUS_RESULTS: previous_results})
+            
+            action_map = get_action_map()
+            if action_name in action_map:
+                result = action_map[action_name](auth_client, resolved_params)
+            elif use_resolver:
+                # Si no está en get_action_map(), intentar con resolver
+                result = resolver_actions.resolve_dynamic_query(auth_client, {
+                    "query": action_name,
+                    "params": resolved_params
+                })
             else:
-                resolved[key] = value
-        
-        return resolved
+                return None
+            # Las acciones async se ejecutan en el loop propio de este hilo
+            if inspect.isawaitable(result):
+                result = asyncio.run(result)
+            
+            # Guardar resultado en contexto si se especifica
+            if step.get("save_to"):
+                with self._context_lock:
+                    context[step["save_to"]] = result
+            
+            outcome = {
+                "step": index + 1,
+                "action": action_name,
+                "result": result,
+                "timestamp": datetime.now().isoformat()
+            }
+            # Las acciones informan de sus fallos en el resultado en vez de lanzar
+            if checkpoints.step_failed(outcome):
+                outcome["error"] = str(result.get("message") or result.get("error") or "La acción devolvió un error")
+            return outcome
+            
+        except Exception as e:
+            logger.error(f"Error en paso {index+1}: {e}")
+            return {
+                "step": index + 1,
+                "action": action_name or "unknown",
+                "error": str(e),
+                "timestamp": datetime.now().isoformat()
+            }
+    
+    def _resolve_variables(self, params: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
+        """Resuelve variables en parámetros usando el contexto (compila la plantilla al vuelo)"""
+        return CompiledTemplate(params).render(context)
     
     def _get_next_business_day(self) -> str:
         """Obtiene el próximo día hábil"""
@@ -0,0 +1,141 @@
+# app/workflows/checkpoints.py
+"""
+Checkpoints durables de ejecuciones de workflow.
+
+Cada paso terminado se guarda en el almacén local en cuanto acaba, junto con el
+registro de la ejecución (workflow, parámetros, estado). Una ejecución fallida o
+interrumpida —también tras reiniciar el worker— puede reanudarse repitiendo solo
+los pasos que no terminaron bien.
+
+El proceso que ejecuta una ejecución la reclama (claim_run) y, mientras dura, renueva
+un latido en el registro (keep_alive). Otro worker solo la da por interrumpida cuando
+el latido lleva más de RUN_STALE_SECONDS sin renovarse.
+"""
+
+import os
+import time
+import socket
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.shared.helpers.local_store import get_local_store
+
+logger = logging.getLogger(__name__)
+
+RUNS_NAMESPACE = "workflow_runs"
+CHECKPOINTS_NAMESPACE = "workflow_checkpoints"
+CHECKPOINT_RETENTION_SECONDS = 7 * 24 * 60 * 60
+RUN_HEARTBEAT_SECONDS = float(os.getenv("WORKFLOW_RUN_HEARTBEAT_SECONDS", "30"))
+# Sin latido durante tres intervalos se considera que el worker dueño murió
+RUN_STALE_SECONDS = RUN_HEARTBEAT_SECONDS * 3
+RUN_OWNER = f"{socket.gethostname()}:{os.getpid()}"
+
+# Serializa leer-fusionar-escribir del registro entre el latido y las actualizaciones de estado
+_runs_lock = threading.Lock()
+
+
+def _store():
+    return get_local_store("workflows.db")
+
+
+def save_run(execution_id: str, record: Dict[str, Any]) -> None:
+    """Crea o actualiza el registro de una ejecución (se fusiona con lo guardado)."""
+    store = _store()
+    with _runs_lock:
+        current = store.get(RUNS_NAMESPACE, execution_id) or {}
+        current.update(record)
+        current["updated_at"] = time.time()
+        store.set(RUNS_NAMESPACE, execution_id, current)
+
+
+def get_run(execution_id: str) -> Optional[Dict[str, Any]]:
+    return _store().get(RUNS_NAMESPACE, execution_id)
+
+
+def claim_run(execution_id: str) -> bool:
+    """
+    Reclama la ejecución para este proceso (atómico entre workers). Falla si otro
+    proceso la tiene y su latido no ha caducado.
+    """
+    if not _store().acquire_lease(RUNS_NAMESPACE, execution_id, RUN_OWNER, RUN_STALE_SECONDS):
+        return False
+    save_run(execution_id, {"owner": RUN_OWNER, "heartbeat_at": time.time()})
+    return True
+
+
+def heartbeat(execution_id: str) -> None:
+    _store().acquire_lease(RUNS_NAMESPACE, execution_id, RUN_OWNER, RUN_STALE_SECONDS)
+    save_run(execution_id, {"owner": RUN_OWNER, "heartbeat_at": time.time()})
+
+
+@contextmanager
+def keep_alive(execution_id: str) -> Iterator[None]:
+    """Renueva el latido de la ejecución en segundo plano y la libera al salir."""
+    stop = threading.Event()
+
+    def beat() -> None:
+        while not stop.wait(RUN_HEARTBEAT_SECONDS):
+            try:
+                heartbeat(execution_id)
+            except Exception as e:
+                logger.warning(f"No se pudo renovar el latido de la ejecución {execution_id}: {e}")
+
+    thread = threading.Thread(target=beat, name=f"workflow-heartbeat-{execution_id[:8]}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+        _store().release_lease(RUNS_NAMESPACE, execution_id, RUN_OWNER)
+
+
+def is_run_stale(record: Dict[str, Any]) -> bool:
+    """True si ningún proceso ha renovado el latido de la ejecución a tiempo."""
+    last_beat = record.get("heartbeat_at") or record.get("updated_at") or 0
+    return time.time() - last_beat > RUN_STALE_SECONDS
+
+
+def list_runs(user_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    runs = [dict(record, execution_id=key) for key, record in _store().items(RUNS_NAMESPACE)]
+    return [run for run in runs if user_id is None or run.get("user_id") == user_id]
+
+
+def save_checkpoint(execution_id: str, index: int, outcome: Dict[str, Any]) -> None:
+    _store().set(CHECKPOINTS_NAMESPACE, f"{execution_id}:{index:04d}", outcome)
+
+
+def load_checkpoints(execution_id: str) -> Dict[int, Dict[str, Any]]:
+    """Resultados guardados por índice de paso (base 0)."""
+    prefix = f"{execution_id}:"
+    return {int(key[len(prefix):]): outcome for key, outcome in _store().items(CHECKPOINTS_NAMESPACE, prefix)}
+
+
+def step_failed(outcome: Dict[str, Any]) -> bool:
+    """
+    True si el paso falló: lanzó una excepción ('error') o la acción devolvió su error
+    en el resultado ({"status": "error"} o {"success": False}), como hacen casi todas.
+    """
+    if "error" in outcome:
+        return True
+    result = outcome.get("result")
+    return isinstance(result, dict) and (result.get("status") == "error" or result.get("success") is False)
+
+
+def completed_steps(execution_id: str, steps: List[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+    """Checkpoints reutilizables: pasos sin error cuya acción coincide con la definición actual."""
+    reusable: Dict[int, Dict[str, Any]] = {}
+    for index, outcome in load_checkpoints(execution_id).items():
+        if index < len(steps) and not step_failed(outcome) and outcome.get("action") == steps[index].get("action"):
+            reusable[index] = outcome
+    return reusable
+
+
+def purge_expired() -> None:
+    store = _store()
+    removed = store.purge_older_than(CHECKPOINTS_NAMESPACE, CHECKPOINT_RETENTION_SECONDS)
+    removed += store.purge_older_than(RUNS_NAMESPACE, CHECKPOINT_RETENTION_SECONDS)
+    if removed:
+        logger.info(f"Checkpoints de workflow caducados eliminados: {removed}")
@@ -0,0 +1,352 @@
+# app/workflows/scheduler.py
+"""
+Programador de workflows dentro del servicio.
+
+Las programaciones (workflow predefinido o definición personalizada + expresión cron)
+se guardan en el almacén local, así que todos los procesos worker del host las ven.
+Cada proceso corre un hilo que revisa las que tocan; antes de ejecutar una se toma un
+lock de archivo por programación y se vuelve a comprobar que sigue pendiente, de modo
+que cada disparo se ejecuta una sola vez aunque haya varios workers.
+
+- 'jitter_seconds' reparte las ejecuciones en una ventana aleatoria tras la hora cron.
+- WORKFLOW_SCHEDULER_MAX_CONCURRENCY limita las ejecuciones simultáneas por proceso;
+  las que no caben esperan al siguiente hueco (no se pierden).
+"""
+
+import os
+import time
+import uuid
+import random
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - sin fcntl (Windows) el lock es solo del proceso
+    fcntl = None
+
+from app.core.config import settings
+from app.shared.helpers.local_store import get_local_store
+from app.workflows import checkpoints
+
+logger = logging.getLogger(__name__)
+
+SCHEDULES_NAMESPACE = "workflow_schedules"
+SCHEDULER_ENABLED = os.getenv("WORKFLOW_SCHEDULER_ENABLED", "true").lower() in ("1", "true", "yes")
+SCHEDULER_MAX_CONCURRENCY = int(os.getenv("WORKFLOW_SCHEDULER_MAX_CONCURRENCY", "2"))
+SCHEDULER_POLL_SECONDS = float(os.getenv("WORKFLOW_SCHEDULER_POLL_SECONDS", "30"))
+MAX_JITTER_SECONDS = 6 * 60 * 60
+
+_CRON_ALIASES = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@weekly": "0 0 * * 0",
+    "@monthly": "0 0 1 * *",
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+}
+_CRON_NAMES = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+    "sun": 0, "mon": 1, "tue": 2, "wed": 3, "thu": 4, "fri": 5, "sat": 6,
+}
+
+
+class CronExpression:
+    """Expresión cron de 5 campos (minuto hora día-mes mes día-semana), con alias @daily, etc."""
+
+    _RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expression: str):
+        self.expression = expression.strip()
+        fields = _CRON_ALIASES.get(self.expression.lower(), self.expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"Expresión cron inválida '{expression}': se esperan 5 campos")
+        parsed = [self._parse_field(field, low, high) for field, (low, high) in zip(fields, self._RANGES)]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        self.weekdays = {0 if day == 7 else day for day in weekdays}
+        # Semántica cron: si día-mes y día-semana están restringidos basta con que cumpla uno
+        self._days_restricted = fields[2] != "*"
+        self._weekdays_restricted = fields[4] != "*"
+
+    @staticmethod
+    def _value(token: str, low: int, high: int) -> int:
+        value = _CRON_NAMES.get(token.lower()) if not token.isdigit() else int(token)
+        if value is None or not low <= value <= high:
+            raise ValueError(f"Valor cron fuera de rango: '{token}' ({low}-{high})")
+        return value
+
+    @classmethod
+    def _parse_field(cls, field: str, low: int, high: int) -> Set[int]:
+        values: Set[int] = set()
+        for part in field.split(","):
+            base, _, step_text = part.partition("/")
+            step = int(step_text) if step_text else 1
+            if step < 1:
+                raise ValueError(f"Paso cron inválido: '{part}'")
+            if base == "*":
+                start, end = low, high
+            elif "-" in base:
+                start_text, end_text = base.split("-", 1)
+                start, end = cls._value(start_text, low, high), cls._value(end_text, low, high)
+            else:
+                start = cls._value(base, low, high)
+                end = high if step_text else start
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day_ok = moment.day in self.days
+        weekday_ok = (moment.weekday() + 1) % 7 in self.weekdays
+        if self._days_restricted and self._weekdays_restricted:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def next_after(self, moment: datetime) -> datetime:
+        """Primer minuto que cumple la expresión estrictamente posterior a 'moment'."""
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 5)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                candidate = (candidate.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"La expresión cron '{self.expression}' no tiene próximas ejecuciones")
+
+
+def _store():
+    return get_local_store("workflows.db")
+
+
+def _next_run_at(schedule: Dict[str, Any], after: Optional[float] = None) -> float:
+    after_dt = datetime.fromtimestamp(after if after is not None else time.time())
+    next_time = CronExpression(schedule["cron"]).next_after(after_dt).timestamp()
+    return next_time + random.uniform(0, float(schedule.get("jitter_seconds") or 0))
+
+
+def create_schedule(definition: Dict[str, Any]) -> Dict[str, Any]:
+    """Valida y guarda una programación; devuelve el registro con su próxima ejecución."""
+    if not definition.get("workflow_id") and not (definition.get("workflow_definition") or {}).get("steps"):
+        raise ValueError("Se requiere 'workflow_id' o 'workflow_definition' con 'steps'")
+    CronExpression(definition.get("cron") or "")
+    jitter = float(definition.get("jitter_seconds") or 0)
+    if not 0 <= jitter <= MAX_JITTER_SECONDS:
+        raise ValueError(f"'jitter_seconds' debe estar entre 0 y {MAX_JITTER_SECONDS}")
+
+    schedule = {
+        "schedule_id": definition.get("schedule_id") or str(uuid.uuid4()),
+        "workflow_id": definition.get("workflow_id"),
+        "workflow_definition": definition.get("workflow_definition"),
+        "params": definition.get("params") or {},
+        "cron": definition["cron"],
+        "jitter_seconds": jitter,
+        "enabled": definition.get("enabled", True),
+        "user_id": definition.get("user_id"),
+        "created_at": datetime.now().isoformat(),
+        "last_run_at": None,
+        "last_status": None,
+        "last_execution_id": None,
+    }
+    schedule["next_run_at"] = _next_run_at(schedule)
+    _store().set(SCHEDULES_NAMESPACE, schedule["schedule_id"], schedule)
+    workflow_scheduler.wake()
+    return schedule
+
+
+def get_schedule(schedule_id: str) -> Optional[Dict[str, Any]]:
+    return _store().get(SCHEDULES_NAMESPACE, schedule_id)
+
+
+def list_schedules(user_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    schedules = [schedule for _, schedule in _store().items(SCHEDULES_NAMESPACE)]
+    return [s for s in schedules if user_id is None or s.get("user_id") == user_id]
+
+
+def delete_schedule(schedule_id: str) -> bool:
+    return _store().delete(SCHEDULES_NAMESPACE, schedule_id)
+
+
+class _ScheduleLock:
+    """Lock exclusivo no bloqueante por programación, compartido entre procesos del host."""
+
+    def __init__(self, schedule_id: str):
+        lock_dir = os.path.join(settings.LOCAL_STATE_DIR, "locks")
+        os.makedirs(lock_dir, exist_ok=True)
+        self.path = os.path.join(lock_dir, f"workflow-schedule-{schedule_id}.lock")
+        self._file = None
+
+    def acquire(self) -> bool:
+        self._file = open(self.path, "a")
+        if fcntl is None:
+            return True
+        try:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            self._file.close()
+            self._file = None
+            return False
+
+    def release(self) -> None:
+        if self._file is not None:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+
+class WorkflowScheduler:
+    """Hilo que dispara las programaciones vencidas respetando el límite de concurrencia."""
+
+    def __init__(self, max_concurrency: int = SCHEDULER_MAX_CONCURRENCY, poll_seconds: float = SCHEDULER_POLL_SECONDS):
+        self.max_concurrency = max(1, max_concurrency)
+        self.poll_seconds = max(1.0, poll_seconds)
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._running: Set[str] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def running_schedules(self) -> Set[str]:
+        with self._lock:
+            return set(self._running)
+
+    def start(self) -> None:
+        """Arranca el hilo del programador (una vez por proceso)."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="workflow-scheduler", daemon=True)
+            self._thread.start()
+        logger.info(f"Programador de workflows iniciado (máx. {self.max_concurrency} ejecuciones simultáneas)")
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    def wake(self) -> None:
+        """Revisa las programaciones ya (p. ej. tras crear una nueva)."""
+        self._wake.set()
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            wait_seconds = self.poll_seconds
+            try:
+                wait_seconds = min(wait_seconds, self.run_due())
+            except Exception as e:
+                logger.error(f"Error revisando programaciones de workflows: {e}", exc_info=True)
+            self._wake.wait(max(0.5, wait_seconds))
+            self._wake.clear()
+
+    def run_due(self) -> float:
+        """Lanza las programaciones vencidas; devuelve los segundos hasta la siguiente."""
+        now = time.time()
+        next_due = float("inf")
+        for schedule in sorted(list_schedules(), key=lambda s: s.get("next_run_at") or 0):
+            if not schedule.get("enabled", True) or schedule["schedule_id"] in self.running_schedules:
+                continue
+            if schedule["next_run_at"] > now:
+                next_due = min(next_due, schedule["next_run_at"] - now)
+                continue
+            if not self._slots.acquire(blocking=False):
+                # Sin hueco: queda pendiente y se reintenta en la próxima revisión
+                break
+            if not self._claim_and_launch(schedule["schedule_id"]):
+                self._slots.release()
+        return next_due
+
+    def _claim_and_launch(self, schedule_id: str) -> bool:
+        lock = _ScheduleLock(schedule_id)
+        if not lock.acquire():
+            return False  # Otro proceso la está ejecutando
+        try:
+            # Releer tras tomar el lock: otro proceso pudo ejecutarla y avanzar next_run_at
+            schedule = get_schedule(schedule_id)
+            if not schedule or not schedule.get("enabled", True) or schedule["next_run_at"] > time.time():
+                lock.release()
+                return False
+            execution_id = str(uuid.uuid4())
+            schedule.update({
+                "next_run_at": _next_run_at(schedule),
+                "last_run_at": datetime.now().isoformat(),
+                "last_status": "ejecutando",
+                "last_execution_id": execution_id,
+            })
+            _store().set(SCHEDULES_NAMESPACE, schedule_id, schedule)
+        except Exception:
+            lock.release()
+            raise
+        with self._lock:
+            self._running.add(schedule_id)
+        threading.Thread(
+            target=self._run_schedule, args=(schedule, execution_id, lock),
+            name=f"workflow-schedule-{schedule_id[:8]}", daemon=True
+        ).start()
+        return True
+
+    def _run_schedule(self, schedule: Dict[str, Any], execution_id: str, lock: _ScheduleLock) -> None:
+        # Import diferido: auto_workflow carga el mapa de acciones
+        from app.workflows.auto_workflow import AutoWorkflowManager
+        from app.core.auth_manager import get_auth_client
+
+        schedule_id = schedule["schedule_id"]
+        status = "error"
+        try:
+            manager = AutoWorkflowManager()
+            if schedule.get("workflow_id"):
+                workflow_id = schedule["workflow_id"]
+                checkpoints.save_run(execution_id, {
+                    "workflow_id": workflow_id,
+                    "status": "ejecutando",
+                    "started_at": datetime.now().isoformat(),
+                    "user_id": schedule.get("user_id"),
+                    "current_step": 0,
+                    "total_steps": len(manager.predefined_workflows.get(workflow_id, {}).get("steps", [])),
+                    "params": schedule.get("params", {}),
+                    "trigger": "schedule",
+                    "schedule_id": schedule_id,
+                })
+                checkpoints.claim_run(execution_id)
+                with checkpoints.keep_alive(execution_id):
+                    result = manager.execute_workflow(workflow_id, schedule.get("params", {}), execution_id)
+            else:
+                result = manager._execute_custom_workflow(schedule["workflow_definition"], get_auth_client())
+            status = "completado" if result.get("status") == "success" else "error"
+            if schedule.get("workflow_id"):
+                checkpoints.save_run(execution_id, {"status": status, "completed_at": datetime.now().isoformat()})
+            logger.info(f"Programación {schedule_id} ejecutada ({status}), ejecución {execution_id}")
+        except Exception as e:
+            logger.error(f"Error ejecutando la programación {schedule_id}: {e}", exc_info=True)
+        finally:
+            current = get_schedule(schedule_id)
+            if current is not None:
+                current["last_status"] = status
+                _store().set(SCHEDULES_NAMESPACE, schedule_id, current)
+            with self._lock:
+                self._running.discard(schedule_id)
+            lock.release()
+            self._slots.release()
+            self._wake.set()
+
+
+workflow_scheduler = WorkflowScheduler()
+
+
+def start_scheduler() -> None:
+    """Arranca el programador si está habilitado (WORKFLOW_SCHEDULER_ENABLED)."""
+    if SCHEDULER_ENABLED:
+        workflow_scheduler.start()
+    else:
+        logger.info("Programador de workflows deshabilitado (WORKFLOW_SCHEDULER_ENABLED=false)")
@@ -0,0 +1,116 @@
+# app/workflows/step_graph.py
+"""
+Ejecución de pasos de workflow según sus dependencias.
+
+Las dependencias se infieren de las referencias '{{nombre...}}' en los parámetros de
+cada paso y de los 'save_to' de los pasos anteriores (más 'depends_on' explícito).
+Los pasos sin dependencias pendientes se ejecutan en paralelo hasta un límite de
+concurrencia, así la duración total tiende a la del camino crítico.
+"""
+
+import logging
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from app.workflows.templating import CompiledTemplate
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_PARALLEL_STEPS = 4
+ALL_PREVIOUS_RESULTS = "all_previous_results"
+
+
+def step_references(step: Dict[str, Any]) -> Set[str]:
+    """Nombres raíz referenciados por un paso ('{{new_post.url}}' -> 'new_post')."""
+    return CompiledTemplate(step.get("params", {})).references
+
+
+def build_dependencies(steps: List[Dict[str, Any]],
+                       templates: Optional[List[CompiledTemplate]] = None) -> List[Set[int]]:
+    """
+    Para cada paso, índices de los pasos anteriores de los que depende. Si se pasan
+    las plantillas ya compiladas de los pasos se usan sus referencias sin re-analizar.
+    """
+    dependencies: List[Set[int]] = []
+    last_producer: Dict[str, int] = {}
+    for index, step in enumerate(steps):
+        deps: Set[int] = set()
+        references = templates[index].references if templates is not None else step_references(step)
+        if ALL_PREVIOUS_RESULTS in references:
+            deps.update(range(index))
+        for name in references:
+            if name in last_producer:
+                deps.add(last_producer[name])
+        for explicit in step.get("depends_on") or []:
+            if isinstance(explicit, int) and 1 <= explicit <= index:
+                deps.add(explicit - 1)  # Número de paso (base 1)
+            elif explicit in last_producer:
+                deps.add(last_producer[explicit])
+        save_to = step.get("save_to")
+        if save_to:
+            # Dos pasos que escriben el mismo nombre conservan su orden
+            if save_to in last_producer:
+                deps.add(last_producer[save_to])
+            last_producer[save_to] = index
+        dependencies.append(deps)
+    return dependencies
+
+
+def custom_workflow_concurrency(workflow_def: Dict[str, Any]) -> int:
+    """
+    Concurrencia de un workflow personalizado o generado. Sus pasos pueden depender entre sí
+    por efectos no declarados (crear y luego actualizar el mismo recurso), así que corren en
+    el orden declarado salvo que la definición lo permita: con 'max_concurrency' explícito o,
+    si algún paso declara 'depends_on', con DEFAULT_MAX_PARALLEL_STEPS.
+    """
+    if workflow_def.get("max_concurrency") is not None:
+        return max(1, int(workflow_def["max_concurrency"]))
+    if any(step.get("depends_on") for step in workflow_def.get("steps", [])):
+        return DEFAULT_MAX_PARALLEL_STEPS
+    return 1
+
+
+def run_step_graph(
+    steps: List[Dict[str, Any]],
+    run_step: Callable[[int], Any],
+    max_concurrency: int = DEFAULT_MAX_PARALLEL_STEPS,
+    is_fatal: Optional[Callable[[int, Any], bool]] = None,
+    completed: Optional[Set[int]] = None,
+    templates: Optional[List[CompiledTemplate]] = None,
+) -> Tuple[Dict[int, Any], Optional[int]]:
+    """
+    Ejecuta 'run_step(índice)' respetando las dependencias. Cuando 'is_fatal' marca un
+    resultado como fatal no se lanzan más pasos (los que ya corren terminan).
+    'completed' indica pasos ya hechos (p. ej. al reanudar) que no se vuelven a ejecutar.
+    Devuelve ({índice: resultado}, índice del paso fatal o None).
+    """
+    dependencies = build_dependencies(steps, templates)
+    done: Set[int] = set(completed or ())
+    pending = [index for index in range(len(steps)) if index not in done]
+    outcomes: Dict[int, Any] = {}
+    fatal_index: Optional[int] = None
+    max_concurrency = max(1, int(max_concurrency or 1))
+
+    with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="workflow-step") as executor:
+        running: Dict[Any, int] = {}
+        while pending or running:
+            if fatal_index is None:
+                # Se lanza en orden de índice para que con concurrencia 1 sea secuencial
+                for index in [i for i in pending if dependencies[i] <= done]:
+                    if len(running) >= max_concurrency:
+                        break
+                    pending.remove(index)
+                    running[executor.submit(run_step, index)] = index
+            if not running:
+                if pending and fatal_index is None:
+                    logger.error(f"Dependencias sin resolver en los pasos {[i + 1 for i in pending]}; se omiten")
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                index = running.pop(future)
+                outcome = future.result()
+                outcomes[index] = outcome
+                done.add(index)
+                if fatal_index is None and is_fatal is not None and is_fatal(index, outcome):
+                    fatal_index = index
+    return outcomes, fatal_index
@@ -0,0 +1,170 @@
+# app/workflows/templating.py
+"""
+Plantillas '{{...}}' compiladas para los parámetros de los pasos de workflow.
+
+Cada definición de parámetros se analiza una sola vez y queda como un árbol de nodos;
+renderizar solo recorre ese árbol (coste proporcional al tamaño de la plantilla, no
+al de los resultados previos). Reglas:
+
+- Un valor que es exactamente '{{ruta}}' se sustituye por el objeto referenciado tal
+  cual, sin copiarlo ni serializarlo (los resultados grandes pasan por referencia).
+- Un placeholder dentro de un texto ('Cliente_{{new_contact.email}}') se interpola
+  como str.
+- Las rutas admiten claves, índices y 'length': 'recent_videos.items.length',
+  'campaigns[0].name'. Si una ruta no existe se deja el texto original.
+- Los valores envueltos en LazyValue solo se calculan si alguna plantilla los usa.
+"""
+
+import re
+from typing import Any, Callable, Dict, List, Mapping, Optional, Set, Tuple, Union
+
+PLACEHOLDER_RE = re.compile(r"\{\{\s*([^{}]+?)\s*\}\}")
+_PATH_TOKEN_RE = re.compile(r"([^.\[\]]+)|\[(\d+)\]")
+_MISSING = object()
+
+
+class LazyValue:
+    """Valor de contexto que se calcula al primer uso dentro de un render."""
+
+    __slots__ = ("factory",)
+
+    def __init__(self, factory: Callable[[], Any]):
+        self.factory = factory
+
+
+def _parse_path(expression: str) -> Tuple[Union[str, int], ...]:
+    return tuple(int(index) if index else name.strip() for name, index in _PATH_TOKEN_RE.findall(expression))
+
+
+class _Renderer:
+    """Resuelve rutas contra el contexto; memoriza los LazyValue durante un render."""
+
+    __slots__ = ("context", "extra", "_lazy_cache")
+
+    def __init__(self, context: Mapping[str, Any], extra: Optional[Mapping[str, Any]]):
+        self.context = context
+        self.extra = extra or {}
+        self._lazy_cache: Dict[str, Any] = {}
+
+    def lookup(self, path: Tuple[Union[str, int], ...]) -> Any:
+        root = path[0]
+        if root in self._lazy_cache:
+            current = self._lazy_cache[root]
+        else:
+            current = self.extra.get(root, _MISSING) if root in self.extra else self.context.get(root, _MISSING)
+            if isinstance(current, LazyValue):
+                current = current.factory()
+                self._lazy_cache[root] = current
+        for segment in path[1:]:
+            if current is _MISSING:
+                break
+            if isinstance(current, Mapping) and segment in current:
+                current = current[segment]
+            elif isinstance(segment, int) and isinstance(current, (list, tuple)) and -len(current) <= segment < len(current):
+                current = current[segment]
+            elif segment == "length" and hasattr(current, "__len__"):
+                current = len(current)
+            else:
+                current = _MISSING
+        return current
+
+
+class _Literal:
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+    def render(self, renderer: _Renderer) -> Any:
+        return self.value
+
+
+class _Reference:
+    __slots__ = ("path", "raw")
+
+    def __init__(self, expression: str, raw: str):
+        self.path = _parse_path(expression)
+        self.raw = raw
+
+    def render(self, renderer: _Renderer) -> Any:
+        value = renderer.lookup(self.path) if self.path else _MISSING
+        return self.raw if value is _MISSING else value
+
+
+class _Interpolation:
+    __slots__ = ("parts",)
+
+    def __init__(self, parts: List[Union[str, _Reference]]):
+        self.parts = parts
+
+    def render(self, renderer: _Renderer) -> str:
+        return "".join(part if isinstance(part, str) else str(part.render(renderer)) for part in self.parts)
+
+
+class _DictNode:
+    __slots__ = ("items",)
+
+    def __init__(self, items: List[Tuple[Any, Any]]):
+        self.items = items
+
+    def render(self, renderer: _Renderer) -> Dict[Any, Any]:
+        # Contenedor nuevo en cada render para que una acción que modifique sus params
+        # no altere la definición del workflow; los valores no se copian
+        return {key.render(renderer): node.render(renderer) for key, node in self.items}
+
+
+class _ListNode:
+    __slots__ = ("items",)
+
+    def __init__(self, items: List[Any]):
+        self.items = items
+
+    def render(self, renderer: _Renderer) -> List[Any]:
+        return [node.render(renderer) for node in self.items]
+
+
+def _compile_node(value: Any, references: Set[str]):
+    if isinstance(value, str):
+        matches = list(PLACEHOLDER_RE.finditer(value))
+        if not matches:
+            return _Literal(value)
+        for match in matches:
+            path = _parse_path(match.group(1))
+            if path:
+                references.add(str(path[0]))
+        if len(matches) == 1 and matches[0].span() == (0, len(value)):
+            return _Reference(matches[0].group(1), value)
+        parts: List[Union[str, _Reference]] = []
+        position = 0
+        for match in matches:
+            if match.start() > position:
+                parts.append(value[position:match.start()])
+            parts.append(_Reference(match.group(1), match.group(0)))
+            position = match.end()
+        if position < len(value):
+            parts.append(value[position:])
+        return _Interpolation(parts)
+    if isinstance(value, dict):
+        return _DictNode([(_compile_node(key, references), _compile_node(item, references)) for key, item in value.items()])
+    if isinstance(value, list):
+        return _ListNode([_compile_node(item, references) for item in value])
+    return _Literal(value)
+
+
+class CompiledTemplate:
+    """Plantilla de parámetros ya analizada; 'references' son los nombres raíz usados."""
+
+    __slots__ = ("_root", "references")
+
+    def __init__(self, source: Any):
+        self.references: Set[str] = set()
+        self._root = _compile_node(source, self.references)
+
+    def render(self, context: Mapping[str, Any], extra: Optional[Mapping[str, Any]] = None) -> Any:
+        """Renderiza contra 'context'; 'extra' tiene prioridad (valores propios del paso)."""
+        return self._root.render(_Renderer(context, extra))
+
+
+def compile_steps(steps: List[Dict[str, Any]]) -> List[CompiledTemplate]:
+    """Compila los 'params' de cada paso de una definición de workflow."""
+    return [CompiledTemplate(step.get("params", {})) for step in steps]
@@ -23,7 +23,10 @@ from botbuilder.schema import ChannelAccount, Activity
 import aiohttp
 import json
 import os
-from typing import List
+import time
+from typing import List, Optional
+
+from app.shared.helpers.session_cache import SpillingSessionCache
 
 class TeamsAssistantBot(ActivityHandler):
     """Bot de Teams que conecta con tu asistente inteligente"""
@@ -31,7 +34,15 @@ class TeamsAssistantBot(ActivityHandler):
     def __init__(self):
         super().__init__()
         self.api_base_url = os.getenv('YOUR_API_URL', 'https://tu-app.azurewebsites.net')
-        self.session_storage = {}  # En producción usar Redis/CosmosDB
+        self.chat_path = os.getenv('ASSISTANT_CHAT_PATH', '/api/v1/assistant/chat')
+        self.stream_update_interval = float(os.getenv('TEAMS_STREAM_UPDATE_INTERVAL', '1.0'))  # Teams limita las ediciones por segundo
+        # user_id -> session_id; acotado en memoria, el resto queda en el almacén local y se recarga al volver el usuario
+        self.session_storage = SpillingSessionCache(
+            "teams_bot_sessions",
+            max_entries=int(os.getenv('TEAMS_MAX_CACHED_SESSIONS', '10000')),
+            ttl_seconds=float(os.getenv('TEAMS_SESSION_IDLE_SECONDS', '3600')),
+            retention_seconds=float(os.getenv('TEAMS_SESSION_RETENTION_DAYS', '30')) * 86400,
+        )
 
     async def on_message_activity(self, turn_context: TurnContext):
         """Manejar mensajes de usuarios en Teams"""
@@ -39,24 +50,28 @@ class TeamsAssistantBot(ActivityHandler):
         user_message = turn_context.activity.text
         
         # Iniciar sesión si no existe
-        if user_id not in self.session_storage:
+        session_id = self.session_storage.get(user_id)
+        if session_id is None:
             session_id = await self.start_assistant_session(user_id)
             self.session_storage[user_id] = session_id
         
-        # Enviar mensaje al asistente inteligente
+        # Enviar mensaje al asistente inteligente (la respuesta se va mostrando mientras llega)
         response = await self.send_to_assistant(
             user_message, 
             user_id, 
-            self.session_storage[user_id]
+            session_id,
+            turn_context
         )
         
         # Responder en Teams
         if response:
-            await turn_context.send_activity(MessageFactory.text(response['response']))
+            if not response.get('_streamed'):
+                await turn_context.send_activity(MessageFactory.text(response['response']))
             
             # Enviar información adicional si existe
-            if response.get('action_executed'):
-                action_msg = f"✅ Acción ejecutada: {response['action_executed']}"
+            action_executed = response.get('action_executed') or (response.get('execution_result') or {}).get('action_executed')
+            if action_executed:
+                action_msg = f"✅ Acción ejecutada: {action_executed}"
                 await turn_context.send_activity(MessageFactory.text(action_msg))
             
             if response.get('suggestions'):
@@ -108,28 +123,90 @@ class TeamsAssistantBot(ActivityHandler):
             print(f"Error starting session: {e}")
             return None
 
-    async def send_to_assistant(self, message: str, user_id: str, session_id: str):
-        """Enviar mensaje al asistente inteligente"""
+    async def send_to_assistant(self, message: str, user_id: str, session_id: str,
+                                turn_context: Optional[TurnContext] = None):
+        """
+        Enviar mensaje al asistente inteligente.
+        
+        Pide la respuesta como Server-Sent Events: el primer fragmento se publica en Teams
+        en cuanto llega y los siguientes editan ese mismo mensaje. Si el servidor responde
+        JSON (no soporta streaming), se devuelve la respuesta completa como antes.
+        """
         try:
             async with aiohttp.ClientSession() as session:
                 payload = {
                     "message": message,
                     "user_id": f"teams_{user_id}",
-                    "session_id": session_id
+                    "session_id": session_id,
+                    "stream": turn_context is not None
                 }
+                headers = {"Accept": "text/event-stream, application/json"}
                 
                 async with session.post(
-                    f"{self.api_base_url}/api/v1/intelligent-assistant/chat",
-                    json=payload
+                    f"{self.api_base_url}{self.chat_path}",
+                    json=payload,
+                    headers=headers
                 ) as response:
-                    if response.status == 200:
-                        return await response.json()
-                    else:
+                    if response.status != 200:
                         return None
+                    if turn_context is None or 'text/event-stream' not in response.headers.get('Content-Type', ''):
+                        return await response.json(content_type=None)
+                    return await self._relay_stream(response, turn_context)
         except Exception as e:
             print(f"Error sending message to assistant: {e}")
             return None
 
+    async def _relay_stream(self, response, turn_context: TurnContext):
+        """Lee eventos SSE y refleja el texto acumulado en un único mensaje de Teams"""
+        text = ""
+        published = ""  # Texto ya visible en Teams
+        activity_id = None  # None: nada enviado aún; "": enviado pero sin id para editarlo
+        last_update = 0.0
+        final = None
+        
+        async def _publish(force: bool = False, final_flush: bool = False):
+            nonlocal activity_id, published, last_update
+            if not text or text == published:
+                return
+            if not (force or final_flush) and time.monotonic() - last_update < self.stream_update_interval:
+                return
+            if activity_id is None:
+                sent = await turn_context.send_activity(MessageFactory.text(text))
+                activity_id = getattr(sent, 'id', None) or ""
+            elif activity_id:
+                activity = MessageFactory.text(text)
+                activity.id = activity_id
+                await turn_context.update_activity(activity)
+            elif final_flush:
+                # El mensaje no se puede editar: lo que faltaba va en un segundo mensaje
+                await turn_context.send_activity(MessageFactory.text(text[len(published):]))
+            else:
+                return
+            published = text
+            last_update = time.monotonic()
+        
+        async for raw_line in response.content:
+            line = raw_line.decode('utf-8').strip()
+            if not line.startswith('data:'):
+                continue
+            event = json.loads(line[len('data:'):].strip())
+            if event.get('type') == 'delta':
+                text += event.get('text', '')
+                # El primer fragmento se publica de inmediato; los siguientes, con throttling
+                await _publish(force=activity_id is None)
+            elif event.get('type') in ('done', 'error'):
+                final = event
+        
+        await _publish(final_flush=True)
+        # Si ya se publicó algo, el texto completo está en Teams y no debe reenviarse
+        streamed = bool(published)
+        if final is None:
+            return {"response": text, "_streamed": streamed}
+        if final.get('type') == 'error':
+            final.setdefault('response', final.get('message', text))
+        final['_streamed'] = streamed
+        return final
+
 
 # Teams App Manifest (teams_manifest.json)
 TEAMS_MANIFEST = {
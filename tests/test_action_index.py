@@ -0,0 +1,46 @@
+# tests/test_action_index.py
+"""Raíz y sinónimos del índice de acciones en lenguaje natural."""
+
+import pytest
+
+from app.core.action_index import ActionIndex, stem, tokenize
+
+
+@pytest.mark.parametrize("plural, singular", [
+    ("mensajes", "mensaje"),
+    ("clientes", "cliente"),
+    ("informes", "informe"),
+    ("reportes", "reporte"),
+    ("canales", "canal"),
+    ("reuniones", "reunion"),
+    ("pedidos", "pedido"),
+    ("messages", "message"),
+])
+def test_plural_folds_into_singular(plural, singular):
+    assert stem(plural) == stem(singular)
+    assert tokenize(plural) == tokenize(singular)
+
+
+@pytest.mark.parametrize("word, canonical", [
+    ("mensajes", "message"),
+    ("clientes", "customer"),
+    ("informes", "report"),
+])
+def test_plural_synonyms_map_to_canonical(word, canonical):
+    assert tokenize(word) == tokenize(canonical)
+
+
+def test_news_is_not_create():
+    assert tokenize("news") != tokenize("new")
+
+
+def test_search_matches_plural_query():
+    def listar_clientes():
+        """Lista los clientes."""
+
+    def enviar_informe():
+        """Envía un informe."""
+
+    index = ActionIndex({"customer_list": listar_clientes, "report_send": enviar_informe})
+    assert index.search("ver clientes")[0]["action"] == "customer_list"
+    assert index.search("enviar informes")[0]["action"] == "report_send"
@@ -0,0 +1,122 @@
+# tests/test_gemini_cache.py
+"""Caché y deduplicación de llamadas a Gemini contra un endpoint local falso."""
+
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("requests")
+
+from app.actions import gemini_actions
+
+
+class _FakeGemini(BaseHTTPRequestHandler):
+    """Responde como generateContent/streamGenerateContent y cuenta las llamadas recibidas."""
+
+    calls = 0
+    delay = 0.0
+    status = 200
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with _FakeGemini.lock:
+            _FakeGemini.calls += 1
+        time.sleep(_FakeGemini.delay)
+        prompt = body["contents"][0]["parts"][0]["text"]
+        if _FakeGemini.status != 200:
+            payload = json.dumps({"error": {"message": "fallo simulado"}}).encode("utf-8")
+            self.send_response(_FakeGemini.status)
+            self.send_header("Content-Type", "application/json")
+        elif ":streamGenerateContent" in self.path:
+            chunks = [prompt[:3], prompt[3:]]
+            payload = "".join(
+                "data: " + json.dumps({"candidates": [{"content": {"parts": [{"text": c}]}}]}) + "\n\n" for c in chunks
+            ).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+        else:
+            payload = json.dumps({"candidates": [{"content": {"parts": [{"text": f"eco: {prompt}"}]}}]}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_gemini(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeGemini)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(gemini_actions, "GEMINI_API_BASE", f"http://127.0.0.1:{server.server_address[1]}/v1")
+    monkeypatch.setattr(gemini_actions.settings, "GEMINI_API_KEY", "test-key", raising=False)
+    _FakeGemini.calls, _FakeGemini.delay, _FakeGemini.status = 0, 0.0, 200
+    gemini_actions.clear_gemini_cache()
+    yield _FakeGemini
+    server.shutdown()
+    server.server_close()
+    gemini_actions.clear_gemini_cache()
+
+
+def test_identical_prompts_hit_cache(fake_gemini):
+    first = gemini_actions._make_gemini_request("hola")
+    second = gemini_actions._make_gemini_request("hola")
+    assert first["text"] == second["text"] == "eco: hola"
+    assert second.get("cached") is True
+    assert fake_gemini.calls == 1
+
+
+def test_different_prompt_or_instruction_is_not_shared(fake_gemini):
+    gemini_actions._make_gemini_request("hola")
+    gemini_actions._make_gemini_request("adios")
+    gemini_actions._make_gemini_request("hola", system_instruction="breve")
+    assert fake_gemini.calls == 3
+
+
+def test_cache_expires_after_ttl(fake_gemini, monkeypatch):
+    monkeypatch.setattr(gemini_actions, "GEMINI_CACHE_TTL", 0.05)
+    gemini_actions._make_gemini_request("hola")
+    time.sleep(0.1)
+    gemini_actions._make_gemini_request("hola")
+    assert fake_gemini.calls == 2
+
+
+def test_cache_is_bounded(fake_gemini, monkeypatch):
+    monkeypatch.setattr(gemini_actions, "GEMINI_CACHE_MAX_ENTRIES", 2)
+    for prompt in ("a", "b", "c"):
+        gemini_actions._make_gemini_request(prompt)
+    gemini_actions._make_gemini_request("a")
+    assert fake_gemini.calls == 4
+
+
+def test_concurrent_identical_prompts_share_one_call(fake_gemini):
+    fake_gemini.delay = 0.3
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: gemini_actions._make_gemini_request("hola"), range(8)))
+    assert fake_gemini.calls == 1
+    assert all(result["text"] == "eco: hola" for result in results)
+
+
+def test_errors_are_not_cached(fake_gemini):
+    fake_gemini.status = 500
+    assert gemini_actions._make_gemini_request("hola")["success"] is False
+    fake_gemini.status = 200
+    assert gemini_actions._make_gemini_request("hola")["success"] is True
+    assert fake_gemini.calls == 2
+
+
+def test_stream_then_cache(fake_gemini):
+    events = list(gemini_actions.iter_gemini_text("hola mundo"))
+    assert "".join(e["text"] for e in events if e["type"] == "delta") == "hola mundo"
+    assert fake_gemini.calls == 1
+    done = list(gemini_actions.iter_gemini_text("hola mundo"))[-1]
+    assert done["cached"] is True and done["text"] == "hola mundo"
+    assert fake_gemini.calls == 1
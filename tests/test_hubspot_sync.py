@@ -0,0 +1,76 @@
+# tests/test_hubspot_sync.py
+"""Cursor de hubspot_sync_changes: solo avanza cuando los cambios se entregan."""
+
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("hubspot")
+
+from app.actions import hubspot_actions
+from app.shared.helpers.local_store import LocalStateStore
+
+MODIFIED = "hs_lastmodifieddate"
+
+
+class _FakeSearchApi:
+    """Search API en memoria ordenada por fecha; 'fail_on_page' lanza al pedir esa página."""
+
+    def __init__(self, records, fail_on_page=None):
+        self.records = records
+        self.fail_on_page = fail_on_page
+        self.pages = 0
+
+    def do_search(self, public_object_search_request):
+        request = public_object_search_request
+        self.pages += 1
+        if self.pages == self.fail_on_page:
+            raise RuntimeError("fallo simulado en la página")
+        since = int(request.filter_groups[0]["filters"][0]["value"]) if request.filter_groups else None
+        rows = [r for r in self.records if since is None or int(r.properties[MODIFIED]) >= since]
+        start = int(request.after or 0)
+        page = rows[start:start + request.limit]
+        more = start + request.limit < len(rows)
+        return SimpleNamespace(results=page, paging=SimpleNamespace(next=SimpleNamespace(after=str(start + request.limit))) if more else None)
+
+
+def _record(index):
+    return SimpleNamespace(id=str(index), properties={MODIFIED: str(1000 + index)}, created_at=None, updated_at=None)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = LocalStateStore(str(tmp_path / "state.db"))
+    monkeypatch.setattr(hubspot_actions, "get_local_store", lambda *args: store)
+    return store
+
+
+def _use_api(monkeypatch, api):
+    client = SimpleNamespace(crm=SimpleNamespace(deals=SimpleNamespace(search_api=api)))
+    monkeypatch.setattr(hubspot_actions, "_get_hubspot_client", lambda params: client)
+
+
+def test_failed_page_does_not_move_cursor(store, monkeypatch):
+    records = [_record(i) for i in range(10)]
+    _use_api(monkeypatch, _FakeSearchApi(records[:4]))
+    first = hubspot_actions.hubspot_sync_changes(None, {"object_type": "deals", "page_size": 2})
+    assert first["status"] == "success" and first["data"]["total"] == 4
+    cursor_key = hubspot_actions._get_sync_cursor_key({}, "deals")
+    saved = store.get(hubspot_actions._SYNC_NAMESPACE, cursor_key)
+
+    _use_api(monkeypatch, _FakeSearchApi(records, fail_on_page=2))
+    failed = hubspot_actions.hubspot_sync_changes(None, {"object_type": "deals", "page_size": 2})
+    assert failed["status"] == "error"
+    assert store.get(hubspot_actions._SYNC_NAMESPACE, cursor_key) == saved
+
+    _use_api(monkeypatch, _FakeSearchApi(records))
+    retried = hubspot_actions.hubspot_sync_changes(None, {"object_type": "deals", "page_size": 2})
+    assert [r["id"] for r in retried["data"]["results"]] == [str(i) for i in range(4, 10)]
+
+
+def test_max_records_continues_on_next_call(store, monkeypatch):
+    _use_api(monkeypatch, _FakeSearchApi([_record(i) for i in range(6)]))
+    first = hubspot_actions.hubspot_sync_changes(None, {"object_type": "deals", "page_size": 2, "max_records": 4})
+    assert first["data"]["total"] == 4 and first["data"]["has_more"] is True
+    rest = hubspot_actions.hubspot_sync_changes(None, {"object_type": "deals", "page_size": 2})
+    assert [r["id"] for r in rest["data"]["results"]] == ["4", "5"]
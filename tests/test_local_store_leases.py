@@ -0,0 +1,61 @@
+# tests/test_local_store_leases.py
+"""Arrendamientos del almacén local: exclusión entre owners, caducidad y elementos libres."""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("pydantic")
+
+from app.shared.helpers.local_store import LocalStateStore
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "leases.db")
+
+
+def test_only_one_owner_wins(db_path):
+    # Cada owner con su propia conexión, como procesos distintos sobre el mismo archivo
+    stores = [LocalStateStore(db_path) for _ in range(8)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        won = list(pool.map(lambda i: stores[i].acquire_lease("jobs", "run-1", f"owner-{i}", 30), range(8)))
+    assert won.count(True) == 1
+
+
+def test_owner_renews_and_others_wait(db_path):
+    store = LocalStateStore(db_path)
+    assert store.acquire_lease("jobs", "run-1", "a", 30)
+    assert store.acquire_lease("jobs", "run-1", "a", 30)
+    assert not store.acquire_lease("jobs", "run-1", "b", 30)
+
+
+def test_expired_lease_can_be_taken_over(db_path):
+    store = LocalStateStore(db_path)
+    assert store.acquire_lease("jobs", "run-1", "a", 0.05)
+    time.sleep(0.1)
+    assert store.acquire_lease("jobs", "run-1", "b", 30)
+    # El owner anterior ya no puede renovar sobre el arrendamiento ajeno vigente
+    assert not store.acquire_lease("jobs", "run-1", "a", 30)
+
+
+def test_release_only_by_owner(db_path):
+    store = LocalStateStore(db_path)
+    store.acquire_lease("jobs", "run-1", "a", 30)
+    store.release_lease("jobs", "run-1", "b")
+    assert not store.acquire_lease("jobs", "run-1", "b", 30)
+    store.release_lease("jobs", "run-1", "a")
+    assert store.acquire_lease("jobs", "run-1", "b", 30)
+
+
+def test_unleased_items(db_path):
+    store = LocalStateStore(db_path)
+    for key in ("k1", "k2", "k3"):
+        store.set("jobs", key, {"key": key})
+    store.acquire_lease("jobs", "k1", "a", 30)
+    store.acquire_lease("jobs", "k3", "a", 0.05)
+    store.acquire_lease("other", "k2", "a", 30)  # otro namespace no cuenta
+    assert [key for key, _ in store.unleased_items("jobs")] == ["k2"]
+    time.sleep(0.1)
+    assert store.unleased_items("jobs") == [("k2", {"key": "k2"}), ("k3", {"key": "k3"})]
@@ -0,0 +1,53 @@
+# tests/test_powerbi_paging.py
+"""Paginación de listados de Power BI: nextLink, $skip ignorado y tope de páginas."""
+
+import pytest
+
+pytest.importorskip("azure.identity")
+
+from app.actions import powerbi_actions
+
+
+def _fake_pages(monkeypatch, responder):
+    calls = []
+
+    def _get_json(url, headers, query=None):
+        calls.append((url, query))
+        return responder(url, query)
+
+    monkeypatch.setattr(powerbi_actions, "_pbi_get_json", _get_json)
+    monkeypatch.setattr(powerbi_actions, "PBI_LIST_PAGE_SIZE", 2)
+    return calls
+
+
+def test_follows_next_link(monkeypatch):
+    pages = {
+        None: {"value": [{"id": "a"}, {"id": "b"}], "@odata.nextLink": "https://pbi.test/next1"},
+        "https://pbi.test/next1": {"value": [{"id": "c"}], "@odata.nextLink": "https://pbi.test/next2"},
+        "https://pbi.test/next2": {"value": [{"id": "d"}]},
+    }
+    calls = _fake_pages(monkeypatch, lambda url, query: pages[None if query else url])
+    items = powerbi_actions._pbi_list_all("https://pbi.test/groups", {}, {})
+    assert [item["id"] for item in items] == ["a", "b", "c", "d"]
+    assert calls[1] == ("https://pbi.test/next1", None)
+
+
+def test_skip_paging_until_short_page(monkeypatch):
+    data = [{"id": str(i)} for i in range(5)]
+    _fake_pages(monkeypatch, lambda url, query: {"value": data[query["$skip"]:query["$skip"] + query["$top"]]})
+    assert len(powerbi_actions._pbi_list_all("https://pbi.test/groups", {}, {})) == 5
+
+
+def test_stops_when_skip_is_ignored(monkeypatch):
+    calls = _fake_pages(monkeypatch, lambda url, query: {"value": [{"id": "a"}, {"id": "b"}]})
+    items = powerbi_actions._pbi_list_all("https://pbi.test/groups", {}, {})
+    assert [item["id"] for item in items] == ["a", "b"]
+    assert len(calls) == 2
+
+
+def test_max_pages_bounds_the_loop(monkeypatch):
+    monkeypatch.setattr(powerbi_actions, "PBI_LIST_MAX_PAGES", 3)
+    counter = iter(range(1000))
+    calls = _fake_pages(monkeypatch, lambda url, query: {"value": [{"id": str(next(counter))}, {"id": "x"}]})
+    assert len(powerbi_actions._pbi_list_all("https://pbi.test/groups", {}, {})) == 6
+    assert len(calls) == 3
@@ -0,0 +1,64 @@
+# tests/test_scheduler_cron.py
+"""Cálculo de la próxima ejecución de expresiones cron del programador de workflows."""
+
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("pydantic")
+
+from app.workflows.scheduler import CronExpression
+
+
+def _next(expression: str, moment: str) -> str:
+    return CronExpression(expression).next_after(datetime.fromisoformat(moment)).isoformat(timespec="minutes")
+
+
+@pytest.mark.parametrize("expression, moment, expected", [
+    # Día-mes y día-semana restringidos: basta con que se cumpla uno (viernes o día 13)
+    ("0 0 13 * 5", "2024-01-01T00:00", "2024-01-05T00:00"),
+    ("0 0 13 * 5", "2024-01-12T00:00", "2024-01-13T00:00"),
+    # Con solo uno restringido manda ese campo
+    ("0 0 13 * *", "2024-01-01T00:00", "2024-01-13T00:00"),
+    ("0 0 * * fri", "2024-01-06T00:00", "2024-01-12T00:00"),
+    ("0 0 * * 7", "2024-01-01T00:00", "2024-01-07T00:00"),
+])
+def test_day_of_month_and_weekday(expression, moment, expected):
+    assert _next(expression, moment) == expected
+
+
+@pytest.mark.parametrize("expression, moment, expected", [
+    ("*/15 * * * *", "2024-01-01T10:07", "2024-01-01T10:15"),
+    ("*/15 * * * *", "2024-01-01T10:45", "2024-01-01T11:00"),
+    ("5/20 * * * *", "2024-01-01T10:26", "2024-01-01T10:45"),
+    ("0 9-17/4 * * *", "2024-01-01T13:30", "2024-01-01T17:00"),
+    ("0 9-17/4 * * *", "2024-01-01T17:00", "2024-01-02T09:00"),
+])
+def test_steps_and_ranges(expression, moment, expected):
+    assert _next(expression, moment) == expected
+
+
+@pytest.mark.parametrize("expression, moment, expected", [
+    ("0 0 31 * *", "2024-01-31T00:00", "2024-03-31T00:00"),
+    ("30 23 30 * *", "2024-01-31T00:00", "2024-03-30T23:30"),
+    ("@yearly", "2024-06-01T12:00", "2025-01-01T00:00"),
+    ("0 0 29 2 *", "2024-03-01T00:00", "2028-02-29T00:00"),
+    ("59 23 31 12 *", "2024-12-31T23:59", "2025-12-31T23:59"),
+])
+def test_month_and_year_rollover(expression, moment, expected):
+    assert _next(expression, moment) == expected
+
+
+def test_next_after_is_strictly_later():
+    assert _next("30 8 * * *", "2024-01-01T08:30:45") == "2024-01-02T08:30"
+
+
+@pytest.mark.parametrize("expression", ["* * * *", "60 * * * *", "*/0 * * * *", "0 0 * 13 *", "0 0 * * funday"])
+def test_invalid_expressions(expression):
+    with pytest.raises(ValueError):
+        CronExpression(expression)
+
+
+def test_impossible_date_has_no_next_run():
+    with pytest.raises(ValueError):
+        CronExpression("0 0 30 2 *").next_after(datetime(2024, 1, 1))
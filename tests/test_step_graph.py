@@ -0,0 +1,109 @@
+# tests/test_step_graph.py
+"""Ejecución de pasos por dependencias y concurrencia de workflows personalizados."""
+
+import threading
+import time
+
+import pytest
+
+from app.workflows.step_graph import DEFAULT_MAX_PARALLEL_STEPS, custom_workflow_concurrency, run_step_graph
+
+
+def _recording_runner(delay: float = 0.02):
+    """run_step que anota inicio/fin de cada paso y la concurrencia máxima observada."""
+    events = []
+    active = {"now": 0, "peak": 0}
+    lock = threading.Lock()
+
+    def run(index):
+        with lock:
+            events.append(("start", index))
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+        time.sleep(delay)
+        with lock:
+            active["now"] -= 1
+            events.append(("end", index))
+        return {"result": index}
+
+    return run, events, active
+
+
+@pytest.mark.parametrize("workflow_def, expected", [
+    ({"steps": [{"action": "a"}, {"action": "b"}]}, 1),
+    ({"steps": [{"action": "a"}, {"action": "b", "depends_on": [1]}]}, DEFAULT_MAX_PARALLEL_STEPS),
+    ({"max_concurrency": 3, "steps": [{"action": "a"}]}, 3),
+    ({"max_concurrency": 0, "steps": [{"action": "a", "depends_on": [1]}]}, 1),
+])
+def test_custom_workflow_concurrency(workflow_def, expected):
+    assert custom_workflow_concurrency(workflow_def) == expected
+
+
+def test_custom_workflow_without_opt_in_runs_in_declared_order():
+    # Sin referencias entre pasos el grafo los consideraría independientes
+    workflow_def = {"steps": [{"action": "create_page"}, {"action": "update_page"}, {"action": "notify"}]}
+    run, events, active = _recording_runner()
+    run_step_graph(workflow_def["steps"], run, max_concurrency=custom_workflow_concurrency(workflow_def))
+    assert active["peak"] == 1
+    assert events == [(kind, i) for i in range(3) for kind in ("start", "end")]
+
+
+def test_dependent_step_waits_and_independent_steps_overlap():
+    steps = [
+        {"action": "get_contact", "save_to": "contact"},
+        {"action": "send_email", "params": {"to": "{{contact.email}}"}},
+        {"action": "list_videos"},
+    ]
+    run, events, active = _recording_runner()
+    outcomes, fatal_index = run_step_graph(steps, run, max_concurrency=4)
+    assert fatal_index is None and sorted(outcomes) == [0, 1, 2]
+    assert events.index(("end", 0)) < events.index(("start", 1))
+    assert events.index(("start", 2)) < events.index(("end", 0))
+    assert active["peak"] == 2
+
+
+def test_explicit_and_all_previous_dependencies():
+    steps = [
+        {"action": "a"},
+        {"action": "b"},
+        {"action": "c", "depends_on": [2]},
+        {"action": "summary", "params": {"data": "{{all_previous_results}}"}},
+    ]
+    run, events, _ = _recording_runner()
+    run_step_graph(steps, run, max_concurrency=4)
+    assert events.index(("end", 1)) < events.index(("start", 2))
+    assert all(events.index(("end", i)) < events.index(("start", 3)) for i in range(3))
+
+
+def test_critical_failure_stops_launching_steps():
+    steps = [{"action": "a"}, {"action": "b"}, {"action": "c"}]
+    run, events, _ = _recording_runner(delay=0)
+    outcomes, fatal_index = run_step_graph(steps, run, max_concurrency=1, is_fatal=lambda i, outcome: i == 0)
+    assert fatal_index == 0
+    assert sorted(outcomes) == [0]
+    assert ("start", 1) not in events
+
+
+def test_running_steps_finish_after_critical_failure():
+    steps = [{"action": "fails"}, {"action": "slow"}, {"action": "later", "depends_on": [1]}]
+
+    def run(index):
+        time.sleep(0.05 if index == 1 else 0)
+        return {"error": "boom"} if index == 0 else {"result": index}
+
+    outcomes, fatal_index = run_step_graph(steps, run, max_concurrency=2,
+                                           is_fatal=lambda i, outcome: "error" in outcome)
+    assert fatal_index == 0
+    assert sorted(outcomes) == [0, 1]
+
+
+def test_completed_steps_are_not_rerun_on_resume():
+    steps = [
+        {"action": "a", "save_to": "first"},
+        {"action": "b", "params": {"x": "{{first.id}}"}},
+        {"action": "c"},
+    ]
+    run, events, _ = _recording_runner(delay=0)
+    outcomes, _ = run_step_graph(steps, run, max_concurrency=1, completed={0, 2})
+    assert sorted(outcomes) == [1]
+    assert events == [("start", 1), ("end", 1)]
@@ -0,0 +1,67 @@
+# tests/test_templating.py
+"""Plantillas compiladas de parámetros de workflow."""
+
+from app.workflows.templating import CompiledTemplate, LazyValue, compile_steps
+
+
+def test_whole_value_reference_keeps_the_object():
+    rows = [{"id": 1}, {"id": 2}]
+    rendered = CompiledTemplate({"items": "{{report.rows}}"}).render({"report": {"rows": rows}})
+    assert rendered["items"] is rows
+
+
+def test_interpolation_paths_and_length():
+    template = CompiledTemplate({
+        "title": "Cliente_{{contact.email}}",
+        "summary": "{{ videos.items.length }} vídeos, primero: {{videos.items[0].name}}",
+    })
+    context = {"contact": {"email": "ana@example.com"}, "videos": {"items": [{"name": "intro"}, {"name": "demo"}]}}
+    assert template.render(context) == {
+        "title": "Cliente_ana@example.com",
+        "summary": "2 vídeos, primero: intro",
+    }
+
+
+def test_missing_paths_keep_the_original_text():
+    template = CompiledTemplate({"a": "{{missing.value}}", "b": "x-{{contact.phone}}-y", "c": ["{{contact.email.length}}"]})
+    assert template.render({"contact": {"email": "abc"}}) == {
+        "a": "{{missing.value}}",
+        "b": "x-{{contact.phone}}-y",
+        "c": [3],
+    }
+
+
+def test_keys_literals_and_extra_priority():
+    template = CompiledTemplate({"{{field}}": "{{value}}", "limit": 10, "flag": None})
+    rendered = template.render({"field": "ctx_key", "value": "ctx"}, extra={"value": "paso"})
+    assert rendered == {"ctx_key": "paso", "limit": 10, "flag": None}
+
+
+def test_each_render_returns_new_containers():
+    template = CompiledTemplate({"tags": ["a", "{{tag}}"]})
+    first = template.render({"tag": "b"})
+    first["tags"].append("c")
+    assert template.render({"tag": "b"}) == {"tags": ["a", "b"]}
+
+
+def test_lazy_values_are_computed_once_and_only_when_used():
+    calls = []
+
+    def factory():
+        calls.append(1)
+        return {"total": 5}
+
+    context = {"stats": LazyValue(factory), "unused": LazyValue(lambda: calls.append("unused"))}
+    rendered = CompiledTemplate({"a": "{{stats.total}}", "b": "n={{stats.total}}"}).render(context)
+    assert rendered == {"a": 5, "b": "n=5"}
+    assert calls == [1]
+
+
+def test_references_and_compile_steps():
+    steps = [
+        {"action": "a", "params": {"x": "{{contact.email}}", "y": ["{{campaigns[0].name}}", "fijo"]}},
+        {"action": "b"},
+    ]
+    templates = compile_steps(steps)
+    assert templates[0].references == {"contact", "campaigns"}
+    assert templates[1].references == set() and templates[1].render({}) == {}
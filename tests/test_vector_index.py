@@ -0,0 +1,123 @@
+# tests/test_vector_index.py
+"""Índice vectorial de memoria: tamaño acotado, fallos del embedder y sincronización entre procesos."""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.memory import persistent_memory, vector_index
+from app.memory.vector_index import HashingEmbedder, LocalVectorIndex
+from app.shared.helpers.local_store import LocalStateStore
+
+
+def test_search_finds_similar_text():
+    index = LocalVectorIndex(embedder=HashingEmbedder())
+    index.add("a", "factura pendiente de pago del cliente")
+    index.add("b", "reunión de equipo el lunes")
+    assert index.search("facturas pendientes", k=1)[0][0] == "a"
+
+
+def test_max_entries_evicts_oldest_and_reuses_memory():
+    index = LocalVectorIndex(embedder=HashingEmbedder(), max_entries=3)
+    for i in range(5):
+        index.add(i, f"documento número {i}")
+    assert len(index) == 3
+    assert 0 not in index and 1 not in index and 4 in index
+    assert len(index._vector_blocks) == 1
+    assert index._vector_blocks[0].dtype == np.float16
+
+
+def test_blocks_grow_without_copying(monkeypatch):
+    monkeypatch.setattr(vector_index, "BLOCK_ROWS", 4)
+    index = LocalVectorIndex(embedder=HashingEmbedder())
+    index.add_many((i, f"texto {i}", None) for i in range(10))
+    assert len(index._vector_blocks) == 3
+    assert index.search("texto 9", k=1)[0][0] == 9
+
+
+def test_lsh_search_matches_exact(monkeypatch):
+    index = LocalVectorIndex(embedder=HashingEmbedder())
+    index.add_many((i, f"registro {i} categoría {i % 7}", None) for i in range(300))
+    exact = index.search("registro 42 categoría 0", k=1)
+    monkeypatch.setattr(vector_index, "EXACT_SEARCH_THRESHOLD", 10)
+    assert index.search("registro 42 categoría 0", k=1)[0][0] == exact[0][0] == 42
+
+
+def test_embedder_failure_does_not_index_or_raise():
+    def _broken(texts):
+        raise RuntimeError("API caída")
+
+    index = LocalVectorIndex(embedder=_broken)
+    assert index.add("a", "texto") is False
+    assert len(index) == 0
+    assert index.search("texto") == []
+
+
+def test_wrong_dimension_is_rejected():
+    index = LocalVectorIndex(dim=8, embedder=lambda texts: np.ones((len(texts), 4)))
+    with pytest.raises(ValueError):
+        index.add_many([("a", "texto", None)])
+
+
+@pytest.fixture
+def memory_store(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "memory.db")
+    monkeypatch.setattr(persistent_memory, "get_local_store", lambda: LocalStateStore(db_path))
+    monkeypatch.setattr(persistent_memory, "_memory_index", None)
+    monkeypatch.setattr(persistent_memory, "_memory_index_synced_at", 0.0)
+    monkeypatch.setattr(persistent_memory, "MEMORY_INDEX_SYNC_SECONDS", 0)
+    monkeypatch.setattr(persistent_memory, "LocalVectorIndex", lambda: LocalVectorIndex(embedder=HashingEmbedder()))
+    return db_path
+
+
+def test_index_picks_up_entries_written_by_other_processes(memory_store):
+    LocalStateStore(memory_store).set(persistent_memory._MEMORY_INDEX_NAMESPACE, "s1:1", {
+        "query_original": "presupuesto de marketing", "category": "user_interactions"
+    })
+    index = persistent_memory._get_memory_index()
+    assert "s1:1" in index
+
+    # Otro proceso escribe con su propia conexión después de la carga inicial
+    LocalStateStore(memory_store).set(persistent_memory._MEMORY_INDEX_NAMESPACE, "s2:1", {
+        "query_original": "contrato de alquiler de oficinas", "category": "user_interactions"
+    })
+    index = persistent_memory._get_memory_index()
+    assert "s2:1" in index
+    assert index.search("contrato alquiler", k=1)[0][0] == "s2:1"
+
+
+def test_failed_sync_is_retried(memory_store, monkeypatch):
+    persistent_memory._get_memory_index()
+    LocalStateStore(memory_store).set(persistent_memory._MEMORY_INDEX_NAMESPACE, "s1:1", {"query_original": "nómina de octubre"})
+    index = persistent_memory._memory_index
+    working_embed = index._embed
+    index._embed = lambda texts: (_ for _ in ()).throw(RuntimeError("API caída"))
+    persistent_memory._get_memory_index()
+    assert "s1:1" not in index
+
+    index._embed = working_embed
+    persistent_memory._get_memory_index()
+    assert "s1:1" in index
+
+
+def test_configured_deployment_uses_embedding_client(monkeypatch):
+    from app.actions import openai_actions
+    from app.core import auth_manager
+
+    calls = []
+
+    def _fake_get_embedding(client, params):
+        calls.append(params)
+        data = [{"index": i, "embedding": [1.0 if j == i % 4 else 0.0 for j in range(4)]} for i in range(len(params["input"]))]
+        return {"status": "success", "data": {"data": list(reversed(data))}}
+
+    monkeypatch.setattr(vector_index, "MEMORY_EMBEDDING_DEPLOYMENT", "emb-small")
+    monkeypatch.setattr(vector_index.settings, "AZURE_OPENAI_RESOURCE_ENDPOINT", "https://aoai.test", raising=False)
+    monkeypatch.setattr(openai_actions, "get_embedding", _fake_get_embedding)
+    monkeypatch.setattr(auth_manager, "get_auth_client", lambda: object())
+
+    index = LocalVectorIndex(dim=4)
+    assert index.embedding_source == "azure_openai"
+    assert index.add_many([("a", "uno", None), ("b", "dos", None)]) == 2
+    assert calls[0]["deployment_id"] == "emb-small" and calls[0]["dimensions"] == 4
+    assert index.search("uno", k=1)[0][0] == "a"
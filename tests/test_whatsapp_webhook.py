@@ -0,0 +1,116 @@
+# tests/test_whatsapp_webhook.py
+"""Reintentos, dead-letter y lease de la cola durable del webhook de WhatsApp."""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from app.api.routes import whatsapp_webhook as webhook
+from app.memory import memory_functions
+from app.core import auth_manager
+from app.shared.helpers.local_store import LocalStateStore
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = LocalStateStore(str(tmp_path / "webhook.db"))
+    monkeypatch.setattr(webhook, "_webhook_store", lambda: store)
+    monkeypatch.setattr(auth_manager, "get_auth_client", lambda: None)
+
+    async def _no_sleep(seconds):
+        return None
+
+    monkeypatch.setattr(webhook.asyncio, "sleep", _no_sleep)
+    return store
+
+
+def _text_event():
+    return {
+        "event_id": "message:wamid.1",
+        "conversation": "34600000000",
+        "kind": "message",
+        "message": {"id": "wamid.1", "from": "34600000000", "type": "text", "text": {"body": "hola"}},
+        "contact_info": {},
+    }
+
+
+def _queue(store, event, key="0001:message:wamid.1"):
+    store.acquire_lease(webhook.WEBHOOK_QUEUE_NAMESPACE, key, webhook.WEBHOOK_WORKER_ID, 60)
+    store.set(webhook.WEBHOOK_QUEUE_NAMESPACE, key, event)
+    store.add(webhook.WEBHOOK_SEEN_NAMESPACE, event["event_id"], {"state": "queued"})
+    return key
+
+
+def _mock_actions(monkeypatch, send_results, save_result=None):
+    sent = []
+
+    async def fake_send(client, params):
+        sent.append(params)
+        return send_results[min(len(sent), len(send_results)) - 1]
+
+    async def fake_save(client, params):
+        return save_result or {"success": True}
+
+    monkeypatch.setattr(webhook, "whatsapp_send_text", fake_send)
+    monkeypatch.setattr(memory_functions, "save_memory", fake_save)
+    return sent
+
+
+def test_failed_reply_is_retried_then_dead_lettered(store, monkeypatch):
+    sent = _mock_actions(monkeypatch, [{"status": "error", "message": "rate limit"}])
+    event = _text_event()
+    key = _queue(store, event)
+
+    asyncio.run(webhook._process_queued_event(key, event))
+
+    assert len(sent) == webhook.WEBHOOK_MAX_ATTEMPTS
+    assert "rate limit" in store.get(webhook.WEBHOOK_DEAD_NAMESPACE, key)["error"]
+    assert store.get(webhook.WEBHOOK_SEEN_NAMESPACE, event["event_id"])["state"] == "failed"
+    assert store.get(webhook.WEBHOOK_QUEUE_NAMESPACE, key) is None
+
+
+def test_transient_failure_recovers_on_retry(store, monkeypatch):
+    sent = _mock_actions(monkeypatch, [{"status": "error", "message": "timeout"}, {"status": "success"}])
+    event = _text_event()
+    key = _queue(store, event)
+
+    asyncio.run(webhook._process_queued_event(key, event))
+
+    assert len(sent) == 2
+    assert store.get(webhook.WEBHOOK_DEAD_NAMESPACE, key) is None
+    assert store.get(webhook.WEBHOOK_SEEN_NAMESPACE, event["event_id"])["state"] == "done"
+
+
+def test_failed_memory_write_is_retried(store, monkeypatch):
+    sent = _mock_actions(monkeypatch, [{"status": "success"}], save_result={"success": False, "error": "disk"})
+    event = _text_event()
+    key = _queue(store, event)
+
+    asyncio.run(webhook._process_queued_event(key, event))
+
+    assert sent == []
+    assert "disk" in store.get(webhook.WEBHOOK_DEAD_NAMESPACE, key)["error"]
+
+
+def test_lost_lease_stops_retries(store, monkeypatch):
+    event = _text_event()
+    key = _queue(store, event)
+    sent = []
+
+    async def fake_send(client, params):
+        sent.append(params)
+        # Mientras falla, otro proceso reclama la fila (lease caducado)
+        store.release_lease(webhook.WEBHOOK_QUEUE_NAMESPACE, key, webhook.WEBHOOK_WORKER_ID)
+        store.acquire_lease(webhook.WEBHOOK_QUEUE_NAMESPACE, key, "other-process", 60)
+        return {"status": "error", "message": "timeout"}
+
+    _mock_actions(monkeypatch, [{"status": "success"}])
+    monkeypatch.setattr(webhook, "whatsapp_send_text", fake_send)
+
+    asyncio.run(webhook._process_queued_event(key, event))
+
+    assert len(sent) == 1
+    assert store.get(webhook.WEBHOOK_QUEUE_NAMESPACE, key) == event
+    assert store.get(webhook.WEBHOOK_SEEN_NAMESPACE, event["event_id"])["state"] == "queued"
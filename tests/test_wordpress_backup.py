@@ -0,0 +1,37 @@
+# tests/test_wordpress_backup.py
+"""Backup de WordPress/WooCommerce: cada colección se recorre en un orden estable por id."""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+pytest.importorskip("requests")
+
+from app.actions import wordpress_actions
+from app.shared.helpers.local_store import LocalStateStore
+
+
+def test_backup_queries_use_stable_id_order(tmp_path, monkeypatch):
+    queries = {}
+
+    def _iter(ctx, endpoint, query, max_workers):
+        queries[endpoint] = query
+        return iter([{"id": 1, "modified": "2024-01-01T00:00:00", "date_modified_gmt": "2024-01-01T00:00:00"}])
+
+    store = LocalStateStore(str(tmp_path / "wp.db"))
+    monkeypatch.setattr(wordpress_actions, "get_local_store", lambda: store)
+    monkeypatch.setattr(wordpress_actions, "_iter_wp_collection", _iter)
+    monkeypatch.setattr(wordpress_actions, "_build_wp_request_context",
+                        lambda params, api: {"site_url": "https://wp.test", "session": MagicMock()})
+
+    result = wordpress_actions.wordpress_backup_content(None, {
+        "backup_types": list(wordpress_actions.WP_BACKUP_COLLECTIONS),
+        "backup_path": str(tmp_path),
+        "modified_after": "2024-01-01T00:00:00",
+    })
+
+    assert result["status"] == "success"
+    assert set(queries) == {endpoint for _, endpoint, _, _ in wordpress_actions.WP_BACKUP_COLLECTIONS.values()}
+    for query in queries.values():
+        assert query["orderby"] == "id" and query["order"] == "asc"
+    assert queries["posts"]["status"] == "any" and queries["posts"]["modified_after"] == "2024-01-01T00:00:00"
@@ -0,0 +1,50 @@
+# tests/test_wordpress_media.py
+"""Optimización de la biblioteca multimedia: sin optimizador no se marcan imágenes ni se inventan ahorros."""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("requests")
+
+from app.actions import wordpress_enhanced
+from app.shared.helpers.local_store import LocalStateStore
+
+_IMAGES = [
+    {"id": 1, "modified_gmt": "2024-01-01T00:00:00", "source_url": "https://wp.test/a.jpg"},
+    {"id": 2, "modified_gmt": "2024-01-02T00:00:00", "source_url": "https://wp.test/b.png"},
+]
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = LocalStateStore(str(tmp_path / "wp.db"))
+    monkeypatch.setattr(wordpress_enhanced, "get_local_store", lambda: store)
+    monkeypatch.setattr(wordpress_enhanced, "_iter_wp_collection", lambda ctx, endpoint, query: iter(_IMAGES))
+    return store
+
+
+def test_step_reports_not_implemented_without_optimizer(monkeypatch):
+    monkeypatch.setattr(wordpress_enhanced, "MEDIA_OPTIMIZER", None)
+    result = asyncio.run(wordpress_enhanced._optimize_wordpress_images("https://wp.test/wp-json", ("u", "p"), {}))
+    assert result["status"] == "not_implemented"
+    assert "statistics" not in result
+
+
+def test_failed_optimization_does_not_persist_marker(store, monkeypatch):
+    def _fail(item, config):
+        raise RuntimeError("compresor caído")
+
+    monkeypatch.setattr(wordpress_enhanced, "MEDIA_OPTIMIZER", _fail)
+    stats = wordpress_enhanced._optimize_media_library("https://wp.test/wp-json", ("u", "p"), {})
+    assert stats["optimized"] == 0 and stats["errors"] == 2
+    assert stats["space_saved"] == 0
+    assert store.items(wordpress_enhanced._MEDIA_OPTIMIZED_NAMESPACE) == []
+
+
+def test_successful_optimization_is_skipped_next_run(store, monkeypatch):
+    monkeypatch.setattr(wordpress_enhanced, "MEDIA_OPTIMIZER", lambda item, config: 100)
+    first = wordpress_enhanced._optimize_media_library("https://wp.test/wp-json", ("u", "p"), {})
+    assert first["optimized"] == 2 and first["space_saved"] == 200
+    second = wordpress_enhanced._optimize_media_library("https://wp.test/wp-json", ("u", "p"), {})
+    assert second["optimized"] == 0 and second["skipped_unchanged"] == 2
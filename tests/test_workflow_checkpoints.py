@@ -0,0 +1,67 @@
+# tests/test_workflow_checkpoints.py
+"""Checkpoints de workflows: los pasos que devuelven un error no se reutilizan al reanudar."""
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from app.workflows import auto_workflow, checkpoints
+from app.shared.helpers.local_store import LocalStateStore
+
+
+@pytest.mark.parametrize("outcome, failed", [
+    ({"result": {"status": "success"}}, False),
+    ({"result": [1, 2]}, False),
+    ({"error": "boom"}, True),
+    ({"result": {"status": "error", "message": "403"}}, True),
+    ({"result": {"success": False, "error": "x"}}, True),
+])
+def test_step_failed(outcome, failed):
+    assert checkpoints.step_failed(outcome) is failed
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    store = LocalStateStore(str(tmp_path / "workflows.db"))
+    monkeypatch.setattr(checkpoints, "_store", lambda: store)
+    monkeypatch.setattr(auto_workflow, "get_auth_client", lambda: None)
+    monkeypatch.setattr(auto_workflow.resolver_actions, "smart_save_resource", lambda client, params: {})
+    manager = auto_workflow.AutoWorkflowManager()
+    manager.predefined_workflows["test_flow"] = {
+        "name": "Prueba",
+        "steps": [
+            {"action": "first_action", "params": {}, "save_to": "first"},
+            {"action": "second_action", "params": {"value": "{{first.value}}"}},
+            {"action": "third_action", "params": {}},
+        ],
+    }
+    return manager
+
+
+def test_error_result_aborts_and_is_rerun_on_resume(manager, monkeypatch):
+    calls = []
+    second = {"status": "error", "message": "HubSpot 403"}
+
+    def action(name, result):
+        def run(client, params):
+            calls.append(name)
+            return result() if callable(result) else result
+        return run
+
+    actions = {
+        "first_action": action("first", {"status": "success", "value": 1}),
+        "second_action": action("second", lambda: second),
+        "third_action": action("third", {"status": "success"}),
+    }
+    monkeypatch.setattr(auto_workflow, "get_action_map", lambda: actions)
+
+    failed = manager.execute_workflow("test_flow", {"max_parallel_steps": 1}, "exec-1")
+    assert failed["status"] == "error" and "HubSpot 403" in failed["message"]
+    assert calls == ["first", "second"]
+
+    second = {"status": "success"}
+    calls.clear()
+    resumed = manager.execute_workflow("test_flow", {"max_parallel_steps": 1}, "exec-1")
+    assert resumed["status"] == "success"
+    assert calls == ["second", "third"]
+    assert resumed["execution_summary"]["restored_steps"] == 1